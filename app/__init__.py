@@ -11,7 +11,10 @@ import markdown
 from flask_login import current_user
 from app.utils.activity_logger import log_user_activity
 
-logging.basicConfig(level=logging.DEBUG)
+from app.utils.config.logging_config import configure_logging
+
+# Queued JSON logging; levels from LOG_LEVEL / LOG_LEVELS
+configure_logging()
 logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()  # Define SQLAlchemy instance
@@ -65,6 +68,22 @@ def create_app(config_class=Config):
             url = request.url.replace('http://', 'https://', 1)
             return redirect(url, code=301)
 
+    # Tell clients when cached data was served past its soft TTL
+    from app.utils.cache.stale_while_revalidate import apply_staleness_headers
+    app.after_request(apply_staleness_headers)
+
+    # Per-route wall / DB / Redis / HTTP / CPU time for /metrics
+    from app.utils.performance.request_profiler import init_request_profiling
+    init_request_profiling(app)
+
+    # Statement counts per request; flags N+1 query patterns
+    from app.utils.performance.query_tracker import init_query_tracking
+    init_query_tracking(app)
+
+    # RSS watchdog (and opt-in allocation sampling) for this worker
+    from app.utils.performance.memory_watchdog import init_memory_monitoring
+    init_memory_monitoring(app)
+
     @login_manager.user_loader
     def load_user(id):
         return User.query.get(int(id))
@@ -189,10 +208,11 @@ def create_app(config_class=Config):
                 logger.error(f"Error checking if route exists: {str(e)}")
                 return False
 
-        # Debug: Print all registered endpoints
-        logger.debug("Registered URLs:")
-        for rule in app.url_map.iter_rules():
-            logger.debug(f"{rule.endpoint}: {rule.rule}")
+        # Debug: Print all registered endpoints (one record, only when asked for)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Registered URLs:\n" + "\n".join(
+                f"{rule.endpoint}: {rule.rule}" for rule in app.url_map.iter_rules()
+            ))
 
         # Error handlers with proper navigation
         @app.errorhandler(404)
@@ -7,6 +7,10 @@ from functools import wraps
 from app.admin import bp
 from app.utils.cache.db_cache import db_cache
 from app.utils.cache.user_cache import user_cache
+from app.utils.cache.news_cache import (
+    CACHE_NAMESPACES, NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_NEWS_FEED
+)
+from app.utils.search.news_feeds import news_feeds
 import logging
 
 logger = logging.getLogger(__name__)
@@ -341,6 +345,7 @@ def clear_buffer_articles():
         # Clear all articles from buffer (this is safe - buffer table only)
         cleared_count = NewsArticle.query.delete()
         db.session.commit()
+        db_cache.invalidate_article_cache()
         
         logger.info(f"Admin {current_user.username} cleared {cleared_count} articles from buffer table")
         
@@ -403,6 +408,9 @@ def clear_search_index():
         # Clear all articles from search index (DANGEROUS - permanent data)
         cleared_count = NewsSearchIndex.query.delete()
         db.session.commit()
+        db_cache.bump_namespace(NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_NEWS_FEED)
+        # The materialized feeds are not namespaced; drop them so deleted articles stop showing
+        news_feeds.reset()
         
         logger.warning(f"Admin {current_user.username} cleared {cleared_count} articles from PERMANENT search index table")
         
@@ -543,6 +551,55 @@ def force_kill_schedulers():
             'message': f'Error in force kill API: {str(e)}'
         }), 500
 
+@bp.route("/api/cache-namespaces", methods=['GET'])
+@login_required
+@admin_required
+def get_cache_namespaces():
+    """Current generation of each generation-counted cache namespace"""
+    return jsonify({
+        'status': 'success',
+        'namespaces': list(CACHE_NAMESPACES),
+        'generations': db_cache.get_namespace_generations()
+    })
+
+@bp.route("/api/clear-cache-namespaces", methods=['POST'])
+@login_required
+@admin_required
+def clear_cache_namespaces():
+    """Invalidate whole cache namespaces by bumping their generation counters"""
+    try:
+        data = request.get_json() or {}
+        namespaces = data.get('namespaces') or list(CACHE_NAMESPACES)
+        
+        unknown = [namespace for namespace in namespaces if namespace not in CACHE_NAMESPACES]
+        if unknown:
+            return jsonify({
+                'status': 'error',
+                'message': f"Unknown cache namespaces: {', '.join(unknown)}"
+            }), 400
+        
+        generations = db_cache.bump_namespace(*namespaces)
+        if not generations:
+            return jsonify({
+                'status': 'error',
+                'message': 'Cache is not available'
+            }), 503
+        
+        logger.info(f"Admin {current_user.username} cleared cache namespaces: {', '.join(namespaces)}")
+        
+        return jsonify({
+            'status': 'success',
+            'message': f"Cleared {len(generations)} cache namespace(s)",
+            'generations': generations
+        })
+        
+    except Exception as e:
+        logger.error(f"Error clearing cache namespaces: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Error clearing cache namespaces: {str(e)}'
+        }), 500
+
 @bp.route("/api/clear-scheduled-jobs", methods=['POST'])
 @login_required
 @admin_required
@@ -82,6 +82,8 @@ class NewsSearchIndex(db.Model):
    source = db.Column(db.String(100), nullable=False, index=True)
    ai_sentiment_rating = db.Column(db.Integer, index=True)
    symbols_json = db.Column(db.Text)  # JSON string of symbols for faster search
+   # Regions from symbols and source, as bits (utils/search/news_regions.py); NULL = not classified yet
+   region_mask = db.Column(db.Integer)
    # AI content fields for search
    ai_summary = db.Column(db.Text, index=True)  # AI-generated summary for search
    ai_insights = db.Column(db.Text, index=True)  # AI-generated insights for search
@@ -96,6 +98,7 @@ class NewsSearchIndex(db.Model):
        Index('idx_search_published_sentiment', 'published_at', 'ai_sentiment_rating'),
        Index('idx_search_source_published', 'source', 'published_at'),
        Index('idx_search_external_published', 'external_id', 'published_at'),
+       Index('idx_search_region_published', 'region_mask', 'published_at'),
        # AI content search indexes
        Index('idx_search_ai_summary', 'ai_summary'),
        Index('idx_search_ai_insights', 'ai_insights'),
@@ -158,6 +161,10 @@ class NewsSearchIndex(db.Model):
        # Store symbols as JSON for faster search
        symbols = [symbol.symbol for symbol in article.symbols]
        self.symbols_json = json.dumps(symbols)
+
+       # Classify once here so region filters are index lookups
+       from app.utils.search.news_regions import region_mask
+       self.region_mask = region_mask(symbols, article.source)
        self.updated_at = datetime.utcnow()
 
    @classmethod
@@ -167,17 +174,51 @@ class NewsSearchIndex(db.Model):
        search_index.update_from_article(article)
        return search_index
 
+class CanonicalSymbol(db.Model):
+   """
+   One row per instrument, whatever exchange prefix, suffix or padding it
+   is written with. The canonical form is the yfinance one (AAPL, 0700.HK,
+   600519.SS, GC=F).
+   """
+   __tablename__ = 'canonical_symbols'
+
+   id = db.Column(db.Integer, primary_key=True)
+   symbol = db.Column(db.String(32), unique=True, nullable=False)
+   name = db.Column(db.String(255))
+   created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+   aliases = relationship('SymbolAlias', back_populates='canonical', cascade='all, delete-orphan')
+
+class SymbolAlias(db.Model):
+   """Every known spelling of a symbol (NASDAQ:AAPL, HKEX:700, 0700, ...) -> its canonical id"""
+   __tablename__ = 'symbol_alias'
+
+   alias = db.Column(db.String(32), primary_key=True)
+   symbol_id = db.Column(db.Integer, db.ForeignKey('canonical_symbols.id', ondelete='CASCADE'), nullable=False)
+
+   canonical = relationship('CanonicalSymbol', back_populates='aliases')
+
+   __table_args__ = (
+       # Covering: alias lookups never touch the table
+       Index('idx_symbol_alias_lookup', 'alias', 'symbol_id'),
+       Index('idx_symbol_alias_symbol', 'symbol_id'),
+   )
+
 class ArticleSymbol(db.Model):
    __tablename__ = 'article_symbols'
    
    article_id = db.Column(db.Integer, db.ForeignKey('news_articles.id', ondelete='CASCADE'), primary_key=True)
    symbol = db.Column(db.String(20), primary_key=True, index=True)
+   # Canonical instrument; NULL until resolved (see utils/search/symbol_alias.py)
+   symbol_id = db.Column(db.Integer, db.ForeignKey('canonical_symbols.id'), nullable=True)
 
    article = db.relationship('NewsArticle', back_populates='symbols')
 
    __table_args__ = (
        db.UniqueConstraint('article_id', 'symbol'),
        Index('idx_symbol_article', 'symbol', 'article_id'),
+       # Covering index for symbol search: symbol_id = ? -> article ids
+       Index('idx_symbol_id_article', 'symbol_id', 'article_id'),
    )
 
    def to_dict(self):
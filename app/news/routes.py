@@ -153,10 +153,11 @@ def index():
         symbol = request.args.get('symbol', 'all')
         days = 7 if period == 'week' else (30 if period == 'month' else 1)
 
-        # Get latest articles
-        latest_articles = NewsArticle.query.order_by(
+        # Get latest articles (column projection, symbols in one query)
+        from app.utils.search.news_projection import article_cards
+        latest_articles = article_cards(db.session, NewsArticle.query.order_by(
             NewsArticle.published_at.desc()
-        ).limit(10).all()
+        ).limit(10))
 
         # Get most mentioned symbols
         trending_symbols = news_service.get_trending_symbols(days=days)
@@ -1,12 +1,12 @@
 from time import sleep
 from random import random
-from flask import Blueprint, render_template, request, make_response, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, make_response, jsonify, redirect, url_for, flash, Response, stream_with_context
 from datetime import datetime
 import yfinance as yf
 import logging
-import sys
 import re
 import os
+import time
 import traceback
 from flask_login import login_required, current_user
 from app.utils.analyzer.stock_analyzer import create_stock_visualization, create_stock_visualization_old
@@ -32,18 +32,12 @@ import threading
 import queue
 import json
 from app.utils.config.analyze_config import ANALYZE_CONFIG
+from app.utils.performance.admission_control import admission_controlled, lookback_cost, SHED_RETRY_AFTER
 # from flask_login import current_user
 
 # StockNewsService is now used as a static class (no instance needed)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Logging is configured once by app.utils.config.logging_config
 logger = logging.getLogger(__name__)
 
 # Create Blueprint
@@ -58,14 +52,20 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def verify_ticker(symbol):
-    """Verify ticker with cached yfinance data and get company name"""
+def verify_ticker(symbol, cached_info=None):
+    """Verify ticker with cached yfinance data and get company name
+    
+    cached_info can be passed in when the caller already prefetched company
+    info for several symbols (see CompanyInfoCache.get_cached_company_info_many).
+    """
     try:
         logger.info(f"Verifying ticker: {symbol}")
         
         # Try cached company info first (much faster!)
-        from app.utils.cache.company_info_cache import company_info_cache
-        info = company_info_cache.get_basic_company_info(symbol)
+        info = cached_info
+        if not info:
+            from app.utils.cache.company_info_cache import company_info_cache
+            info = company_info_cache.get_basic_company_info(symbol)
         
         if not info:
             # Fallback to direct yfinance call if cache fails
@@ -348,10 +348,16 @@ def search_ticker():
             normalized_variations = normalize_ticker(query)
             variations.extend([v for v in normalized_variations if v != query])
             
+            # Prefetch cached company info for all variants in one round trip
+            from app.utils.cache.company_info_cache import company_info_cache
+            prefetched_info = company_info_cache.get_cached_company_info_many(
+                variations, ['basic_info', 'financial_metrics']
+            )
+            
             for variant in variations:
                 if variant != f"{query}{exchange_suffix}":  # Skip if already checked with exchange suffix
                     try:
-                        is_valid, company_name = verify_ticker(variant)
+                        is_valid, company_name = verify_ticker(variant, prefetched_info.get(variant.upper()))
                         if is_valid:
                             # If symbol exists in TICKER_DICT, use that name instead
                             if variant in TICKER_DICT:
@@ -468,6 +474,7 @@ def determine_asset_type(symbol: str, name: str) -> str:
 
 @bp.route('/analyze_json', methods=['POST'])
 @login_required
+@admission_controlled(degrade=lambda: _degrade_to_analysis_job())
 def analyze_json():
     try:
         ticker_input = request.form.get('ticker', '').split()[0].upper()
@@ -492,14 +499,12 @@ def analyze_json():
         if crossover_days < 30 or crossover_days > 1000:
             return jsonify({'success': False, 'error': "Crossover days must be between 30 and 1000"}), 400
         
-        # 🔄 AUTO NEWS CHECK: Check for recent news and trigger background fetching if needed
-        try:
-            from app.utils.analysis.stock_news_service import StockNewsService
-            news_result = StockNewsService.auto_check_and_fetch_news(ticker_input)
-            logger.info(f"Auto news check for {ticker_input}: {news_result['status']}")
-        except Exception as e:
-            logger.warning(f"Auto news check failed for {ticker_input}: {str(e)}")
-            news_result = {'status': 'error', 'message': str(e)}
+        # Job-queue mode: return a job id at once and let the client poll
+        if request.form.get('async', 'false').lower() == 'true':
+            return _submit_analysis_job(ticker_input, end_date, lookback_days, crossover_days) or _job_queue_unavailable()
+        
+        # 🔄 AUTO NEWS CHECK: Runs in the background, off the analysis critical path
+        news_result = _schedule_news_check(ticker_input)
         
         fig = create_stock_visualization_old(
             ticker_input,
@@ -528,7 +533,177 @@ def analyze_json():
             'success': False,
             'error': error_msg
         }), 500
+
+def _schedule_news_check(ticker):
+    """Run the auto news check in the background; the analysis does not wait for it"""
+    from flask import current_app
+    from app.utils.analyzer.stage_graph import submit_background
+    
+    app = current_app._get_current_object()
+    
+    def check():
+        with app.app_context():
+            result = StockNewsService.auto_check_and_fetch_news(ticker)
+            logger.info(f"Auto news check for {ticker}: {result['status']}")
+    
+    try:
+        submit_background(check)
+        return {'status': 'scheduled', 'message': f'News check for {ticker} runs in the background'}
+    except Exception as e:
+        logger.warning(f"Auto news check failed for {ticker}: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+def _degrade_to_analysis_job():
+    """Under load, queue a valid analyze_json request as a job instead of shedding it"""
+    ticker_input = request.form.get('ticker', '').split()
+    end_date = request.form.get('end_date') or None
+    try:
+        lookback_days = int(request.form.get('lookback_days', 365))
+        crossover_days = int(request.form.get('crossover_days', 365))
+        if end_date:
+            datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        return None
+    if not ticker_input or not 30 <= lookback_days <= 10000 or not 30 <= crossover_days <= 1000:
+        return None
+    return _submit_analysis_job(ticker_input[0].upper(), end_date, lookback_days, crossover_days)
+
+def _submit_analysis_job(ticker, end_date, lookback_days, crossover_days):
+    """Queue an analysis job and answer 202 with where to poll for it; None if it could not be queued"""
+    from app.utils.analyzer.analysis_jobs import analysis_job_queue
+    
+    job = analysis_job_queue.submit(ticker, end_date, lookback_days, crossover_days)
+    if job is None:
+        return None
+    return jsonify({
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'deduplicated': job['deduplicated'],
+        'poll_url': url_for('main.get_analysis_job', job_id=job['job_id'])
+    }), 202
+
+def _job_queue_unavailable():
+    """503 with Retry-After while the job queue cannot take jobs"""
+    response = jsonify({'success': False, 'error': "The analysis queue is unavailable, please retry shortly",
+                        'retry_after': SHED_RETRY_AFTER})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(SHED_RETRY_AFTER)
+    return response
+
+@bp.route('/api/analysis/jobs', methods=['POST'])
+@login_required
+def submit_analysis_job():
+    """Submit an analysis to the job queue (JSON or form parameters)"""
+    try:
+        params = request.get_json(silent=True) or request.form
+        ticker_input = str(params.get('ticker', '')).strip().upper()
+        if not ticker_input:
+            return jsonify({'success': False, 'error': "Ticker symbol is required"}), 400
+        
+        end_date = params.get('end_date') or None
+        if end_date:
+            try:
+                datetime.strptime(end_date, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'success': False, 'error': "Invalid date format. Please use YYYY-MM-DD format"}), 400
+        
+        lookback_days = int(params.get('lookback_days', 365))
+        if lookback_days < 30 or lookback_days > 10000:
+            return jsonify({'success': False, 'error': "Lookback days must be between 30 and 10000"}), 400
+        
+        crossover_days = int(params.get('crossover_days', 365))
+        if crossover_days < 30 or crossover_days > 1000:
+            return jsonify({'success': False, 'error': "Crossover days must be between 30 and 1000"}), 400
+        
+        return (_submit_analysis_job(ticker_input.split()[0], end_date, lookback_days, crossover_days)
+                or _job_queue_unavailable())
+    
+    except Exception as e:
+        logger.error(f"Error submitting analysis job: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/analysis/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_analysis_job(job_id):
+    """Poll an analysis job; finished jobs include the figure"""
+    try:
+        from app.utils.analyzer.analysis_jobs import analysis_job_queue, STATUS_DONE
+        
+        job = analysis_job_queue.get_job(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': f'Unknown or expired job {job_id}'}), 404
+        
+        response = {
+            'success': True,
+            'job_id': job_id,
+            'ticker': job['params']['ticker'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'progress': job['progress'],
+            'error': job.get('error')
+        }
+        if job['status'] == STATUS_DONE:
+            figure_json = analysis_job_queue.get_result(job_id)
+            if figure_json is None:
+                return jsonify({'success': False, 'error': f'Result of job {job_id} has expired'}), 404
+            fig_json = json.loads(figure_json)
+            response.update({'data': fig_json['data'], 'layout': fig_json['layout']})
+        return jsonify(response)
+    
+    except Exception as e:
+        logger.error(f"Error getting analysis job {job_id}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/analysis/stream', methods=['GET'])
+@login_required
+@admission_controlled()
+def stream_analysis():
+    """Stream the analysis as server-sent events, one event per stage as it is ready"""
+    ticker_input = request.args.get('ticker', '').strip().upper()
+    if not ticker_input:
+        return jsonify({'success': False, 'error': "Ticker symbol is required"}), 400
+    ticker_input = ticker_input.split()[0]
+    
+    end_date = request.args.get('end_date') or None
+    if end_date:
+        try:
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'success': False, 'error': "Invalid date format. Please use YYYY-MM-DD format"}), 400
+    
+    try:
+        lookback_days = int(request.args.get('lookback_days', 365))
+        crossover_days = int(request.args.get('crossover_days', 365))
+    except ValueError:
+        return jsonify({'success': False, 'error': "Lookback and crossover days must be integers"}), 400
+    if lookback_days < 30 or lookback_days > 10000:
+        return jsonify({'success': False, 'error': "Lookback days must be between 30 and 10000"}), 400
+    if crossover_days < 30 or crossover_days > 1000:
+        return jsonify({'success': False, 'error': "Crossover days must be between 30 and 1000"}), 400
+    
+    from app.utils.analyzer.progressive_analysis import iter_analysis_stages, format_sse
+    
+    def generate():
+        start_time = time.time()
+        try:
+            for stage, payload in iter_analysis_stages(ticker_input, end_date, lookback_days, crossover_days):
+                payload = dict(payload, elapsed_ms=round((time.time() - start_time) * 1000, 1))
+                yield format_sse(stage, payload)
+            yield format_sse('done', {'ticker': ticker_input, 'elapsed_ms': round((time.time() - start_time) * 1000, 1)})
+        except Exception as e:
+            logger.error(f"Error streaming analysis for {ticker_input}: {str(e)}")
+            yield format_sse('error', {'ticker': ticker_input, 'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @bp.route('/quick_analyze_json', methods=['POST'])
+@admission_controlled(cost=lambda: lookback_cost(ANALYZE_CONFIG['lookback_days']))
 def quick_analyze_json():
     try:
         ticker_input = request.form.get('ticker', '').split()[0].upper()
@@ -537,14 +712,8 @@ def quick_analyze_json():
         if not ticker_input:
             return jsonify({'success': False, 'error': "Ticker symbol is required"}), 400
             
-        # 🔄 AUTO NEWS CHECK: Check for recent news and trigger background fetching if needed
-        try:
-            from app.utils.analysis.stock_news_service import StockNewsService
-            news_result = StockNewsService.auto_check_and_fetch_news(ticker_input)
-            logger.info(f"Auto news check for {ticker_input}: {news_result['status']}")
-        except Exception as e:
-            logger.warning(f"Auto news check failed for {ticker_input}: {str(e)}")
-            news_result = {'status': 'error', 'message': str(e)}
+        # 🔄 AUTO NEWS CHECK: Runs in the background, off the analysis critical path
+        news_result = _schedule_news_check(ticker_input)
             
         # Use default values for quick analysis
         fig = create_stock_visualization_old(
@@ -578,20 +747,15 @@ def quick_analyze_json():
             'error': error_msg
         }), 500
 @bp.route('/quick_analyze', methods=['POST'])
+@admission_controlled(cost=lambda: lookback_cost(ANALYZE_CONFIG['lookback_days']), html=True)
 def quick_analyze():
     try:
         ticker_input = request.form.get('ticker', '').split()[0].upper()
         if not ticker_input:
             raise ValueError("Ticker symbol is required")
             
-        # 🔄 AUTO NEWS CHECK: Check for recent news and trigger background fetching if needed
-        try:
-            from app.utils.analysis.stock_news_service import StockNewsService
-            news_result = StockNewsService.auto_check_and_fetch_news(ticker_input)
-            logger.info(f"Auto news check for {ticker_input}: {news_result['status']}")
-        except Exception as e:
-            logger.warning(f"Auto news check failed for {ticker_input}: {str(e)}")
-            news_result = {'status': 'error', 'message': str(e)}
+        # 🔄 AUTO NEWS CHECK: Runs in the background, off the analysis critical path
+        news_result = _schedule_news_check(ticker_input)
             
         # Use default values for quick analysis
         fig = create_stock_visualization_old(
@@ -997,6 +1161,7 @@ def quick_analyze():
 
 @bp.route('/analyze', methods=['POST'])
 @login_required
+@admission_controlled(html=True)
 def analyze():
     try:
         ticker_input = request.form.get('ticker', '').split()[0].upper()
@@ -1021,14 +1186,8 @@ def analyze():
         if crossover_days < 30 or crossover_days > 1000:
             raise ValueError("Crossover days must be between 30 and 1000")
         
-        # 🔄 AUTO NEWS CHECK: Check for recent news and trigger background fetching if needed
-        try:
-            from app.utils.analysis.stock_news_service import StockNewsService
-            news_result = StockNewsService.auto_check_and_fetch_news(ticker_input)
-            logger.info(f"Auto news check for {ticker_input}: {news_result['status']}")
-        except Exception as e:
-            logger.warning(f"Auto news check failed for {ticker_input}: {str(e)}")
-            news_result = {'status': 'error', 'message': str(e)}
+        # 🔄 AUTO NEWS CHECK: Runs in the background, off the analysis critical path
+        news_result = _schedule_news_check(ticker_input)
         
         fig = create_stock_visualization_old(
             ticker_input,
@@ -2448,7 +2607,7 @@ def get_stock_recent_news(symbol):
     """Get recent news articles for a stock symbol"""
     try:
         from app.utils.search.news_search import NewsSearch
-        from app.models import NewsArticle, ArticleSymbol
+        from app.models import NewsArticle
         from app import db
         
         limit = request.args.get('limit', 10, type=int)
@@ -2459,8 +2618,14 @@ def get_stock_recent_news(symbol):
         symbol_variants = news_search.get_symbol_variants(symbol)
         
         # Query recent articles with any of the symbol variants
-        recent_articles = db.session.query(NewsArticle).join(ArticleSymbol).filter(
-            ArticleSymbol.symbol.in_(symbol_variants)
+        from sqlalchemy.orm import selectinload
+        from app.utils.search.symbol_alias import symbol_registry
+        matching_ids = symbol_registry.article_ids_query(db.session, symbol_variants)
+        # Full article shape (content, summaries, metrics); relations load in one query each
+        recent_articles = db.session.query(NewsArticle).options(
+            selectinload(NewsArticle.symbols), selectinload(NewsArticle.metrics)
+        ).filter(
+            NewsArticle.id.in_(matching_ids)
         ).order_by(NewsArticle.published_at.desc()).limit(limit).all()
         
         articles = [article.to_dict() for article in recent_articles]
@@ -2617,6 +2782,7 @@ def get_basic_chart():
 @bp.route('/api/enhanced-chart', methods=['POST'])
 @login_required
 @optimized_response(cache_ttl=180, cache_key_params=['ticker', 'lookback_days', 'end_date'])
+@admission_controlled()
 async def get_enhanced_chart():
     """Get enhanced chart with async technical indicators"""
     try:
@@ -2706,6 +2872,7 @@ async def get_enhanced_chart():
 @bp.route('/api/full-analysis', methods=['POST'])
 @login_required
 @optimized_response(cache_ttl=600, cache_key_params=['ticker', 'lookback_days', 'crossover_days', 'end_date'])
+@admission_controlled()
 def get_full_analysis():
     """Get complete analysis dashboard with optimization"""
     try:
@@ -2775,6 +2942,92 @@ def get_indicators_performance_stats():
         logger.error(f"Error getting indicators stats: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/performance/analysis-cache-stats', methods=['GET'])
+@login_required
+def get_analysis_cache_stats():
+    """Get hit rates of the memoized analysis outputs and figures"""
+    try:
+        from app.utils.cache.analysis_result_cache import analysis_result_cache
+        from app.utils.cache.single_flight import get_single_flight_stats
+        from app.utils.cache.stale_while_revalidate import get_refresh_stats
+        from app.utils.analyzer.analysis_jobs import analysis_job_queue
+        from app.utils.analyzer.stage_graph import get_stage_timing_stats
+        from app.utils.cache.price_arena import price_arena
+        from app.utils.performance.admission_control import get_admission_stats
+        return jsonify({
+            'success': True,
+            'stats': analysis_result_cache.get_stats(),
+            'single_flight': get_single_flight_stats(),
+            'stale_refresh': get_refresh_stats(),
+            'job_queue': analysis_job_queue.get_stats(),
+            'stage_timings': get_stage_timing_stats(),
+            'price_arena': price_arena.get_stats(),
+            'admission': get_admission_stats(),
+            'timestamp': time.time()
+        })
+    except Exception as e:
+        logger.error(f"Error getting analysis cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-route request histograms of this worker in Prometheus text format"""
+    from app.utils.performance.request_profiler import render_metrics
+    from app.utils.performance.query_tracker import query_stats
+    from app.utils.config.logging_config import logging_stats
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+    return Response(render_metrics() + query_stats.render_prometheus() + logging_stats.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@bp.route('/api/performance/slow-profiles', methods=['GET'])
+@login_required
+@admin_required
+def get_slow_request_profiles():
+    """Sampled profiles of recent slow requests"""
+    from app.utils.performance.request_profiler import get_slow_profiles
+    from app.utils.performance.query_tracker import get_query_stats
+    return jsonify({
+        'success': True,
+        'profiles': get_slow_profiles(),
+        'queries': get_query_stats(),
+        'timestamp': time.time()
+    })
+
+@bp.route('/api/performance/memory', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def get_memory_hot_spots():
+    """RSS, watchdog state and the top allocation sites of this worker
+
+    POST with action=start|stop|snapshot controls allocation tracing;
+    GET takes compare=previous|baseline and limit.
+    """
+    from app.utils.performance.memory_watchdog import allocation_sampler, get_memory_stats
+    try:
+        if request.method == 'POST':
+            action = (request.get_json(silent=True) or {}).get('action') or request.form.get('action')
+            if action == 'start':
+                allocation_sampler.start()
+            elif action == 'stop':
+                allocation_sampler.stop()
+            elif action == 'snapshot' and allocation_sampler.tracing:
+                allocation_sampler.snapshot()
+            else:
+                return jsonify({'success': False, 'error': 'action must be start, stop or snapshot (while tracing)'}), 400
+
+        compare_to = request.args.get('compare', 'previous')
+        limit = request.args.get('limit', 25, type=int)
+        return jsonify({
+            'success': True,
+            'memory': get_memory_stats(),
+            'top_allocators': allocation_sampler.top_allocators(limit, compare_to),
+            'timestamp': time.time()
+        })
+    except Exception as e:
+        logger.error(f"Error getting memory hot spots: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/performance/clear-cache', methods=['POST'])
 @login_required
 def clear_performance_cache():
@@ -2794,10 +3047,15 @@ def clear_performance_cache():
         except Exception as e:
             logger.warning(f"Async indicators cache clear failed: {e}")
         
+        # Orphan all cached analysis results with one generation bump
+        from app.utils.cache.stock_cache import stock_cache
+        analysis_generations = stock_cache.invalidate_analysis_cache()
+        
         return jsonify({
             'success': True,
             'response_cache_cleared': response_cache_cleared,
             'indicators_cache_cleared': indicators_cache_cleared,
+            'analysis_cache_cleared': bool(analysis_generations),
             'timestamp': time.time()
         })
     except Exception as e:
@@ -2810,6 +3068,7 @@ def get_company_info_api(ticker):
     """Get cached company information for a ticker"""
     try:
         from app.utils.cache.company_info_cache import company_info_cache
+        from app.utils.cache.stale_while_revalidate import served_staleness
         
         # Get query parameters
         categories = request.args.get('categories', '').split(',') if request.args.get('categories') else None
@@ -2829,6 +3088,7 @@ def get_company_info_api(ticker):
         return jsonify({
             'ticker': ticker.upper(),
             'info': filtered_info,
+            'cache': served_staleness('company_info'),
             'cache_stats': company_info_cache.get_cache_stats(ticker)
         })
         
@@ -2842,6 +3102,7 @@ def get_basic_company_info_api(ticker):
     """Get essential company information (optimized for common use)"""
     try:
         from app.utils.cache.company_info_cache import company_info_cache
+        from app.utils.cache.stale_while_revalidate import served_staleness
         
         company_info = company_info_cache.get_basic_company_info(ticker)
         
@@ -2863,7 +3124,8 @@ def get_basic_company_info_api(ticker):
         return jsonify({
             'ticker': ticker.upper(),
             'basic_info': formatted_info,
-            'cached': True
+            'cached': True,
+            'cache': served_staleness('company_info')
         })
         
     except Exception as e:
@@ -15,6 +15,20 @@ from app.utils.cache.enhanced_stock_cache import enhanced_stock_cache
 
 logger = logging.getLogger(__name__)
 
+# Exchanges whose trading week runs Sunday to Thursday; weeks elsewhere start on Monday
+SUNDAY_WEEK_SUFFIXES = ('.SR', '.QA', '.KW')
+
+# How each daily column combines into a longer bar; unlisted columns keep the last value
+_BAR_AGGREGATION = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Adj Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+}
+
 def analyze_stock_multi_period_cached(ticker_symbol: str, period: str = "2y") -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Analyzes a stock with comprehensive caching for performance optimization
@@ -40,43 +54,28 @@ def analyze_stock_multi_period_cached(ticker_symbol: str, period: str = "2y") ->
             logger.info(f"🎯 Multi-period cache hit for {ticker_symbol} {period} ({duration*1000:.1f}ms)")
             return daily_data, weekly_data, monthly_data
         
-        # Check for individual cached yfinance data
+        # One daily fetch (or cache read); weekly and monthly bars are derived from it
         daily_data = enhanced_stock_cache.get_yfinance_data(ticker_symbol, period, "1d")
-        weekly_data = enhanced_stock_cache.get_yfinance_data(ticker_symbol, period, "1wk")
-        monthly_data = enhanced_stock_cache.get_yfinance_data(ticker_symbol, period, "1mo")
-        
-        data_cache_hits = sum([daily_data is not None, weekly_data is not None, monthly_data is not None])
-        
-        # Fetch missing data from yfinance
-        stock = yf.Ticker(ticker_symbol)
+        data_cache_hits = int(daily_data is not None)
         
         if daily_data is None:
             logger.info(f"🔄 Fetching daily data for {ticker_symbol} {period}")
-            daily_data = stock.history(period=period)
+            daily_data = yf.Ticker(ticker_symbol).history(period=period)
             if len(daily_data) > 0:
                 enhanced_stock_cache.set_yfinance_data(ticker_symbol, period, "1d", daily_data)
         
-        if weekly_data is None:
-            logger.info(f"🔄 Fetching weekly data for {ticker_symbol} {period}")
-            weekly_data = stock.history(period=period, interval="1wk")
-            if len(weekly_data) > 0:
-                enhanced_stock_cache.set_yfinance_data(ticker_symbol, period, "1wk", weekly_data)
-        
-        if monthly_data is None:
-            logger.info(f"🔄 Fetching monthly data for {ticker_symbol} {period}")
-            monthly_data = stock.history(period=period, interval="1mo")
-            if len(monthly_data) > 0:
-                enhanced_stock_cache.set_yfinance_data(ticker_symbol, period, "1mo", monthly_data)
-        
         # Check if we have valid data
         if daily_data is None or len(daily_data) == 0:
             logger.error(f"No data found for {ticker_symbol}")
             return None, None, None
         
+        weekly_data = aggregate_bars(daily_data, _week_frequency(ticker_symbol))
+        monthly_data = aggregate_bars(daily_data, 'M')
+        
         # Process the data with technical indicators
-        daily_data = _add_technical_indicators(daily_data)
-        weekly_data = _add_technical_indicators(weekly_data) if weekly_data is not None and len(weekly_data) > 0 else pd.DataFrame()
-        monthly_data = _add_technical_indicators(monthly_data) if monthly_data is not None and len(monthly_data) > 0 else pd.DataFrame()
+        daily_data = _add_technical_indicators(daily_data, frequency='daily')
+        weekly_data = _add_technical_indicators(weekly_data, frequency='weekly')
+        monthly_data = _add_technical_indicators(monthly_data, frequency='monthly')
         
         # Cache the complete multi-period analysis
         enhanced_stock_cache.set_multi_period_analysis(ticker_symbol, period, daily_data, weekly_data, monthly_data)
@@ -85,7 +84,7 @@ def analyze_stock_multi_period_cached(ticker_symbol: str, period: str = "2y") ->
         cache_hit = data_cache_hits > 0
         enhanced_stock_cache.track_analysis_performance(ticker_symbol, "multi_period_analysis", duration, cache_hit=cache_hit)
         
-        logger.info(f"✅ Multi-period analysis for {ticker_symbol} {period} completed ({duration*1000:.1f}ms, {data_cache_hits}/3 cache hits)")
+        logger.info(f"✅ Multi-period analysis for {ticker_symbol} {period} completed ({duration*1000:.1f}ms, daily data {'cached' if data_cache_hits else 'fetched'})")
         return daily_data, weekly_data, monthly_data
         
     except Exception as e:
@@ -94,16 +93,63 @@ def analyze_stock_multi_period_cached(ticker_symbol: str, period: str = "2y") ->
         logger.error(f"❌ Error analyzing {ticker_symbol}: {str(e)}")
         return None, None, None
 
-def _add_technical_indicators(data: pd.DataFrame) -> pd.DataFrame:
-    """Add technical indicators to the data"""
+def _week_frequency(ticker_symbol: str) -> str:
+    """Period frequency whose weeks match the exchange's trading week"""
+    return 'W-SAT' if ticker_symbol.upper().endswith(SUNDAY_WEEK_SUFFIXES) else 'W-SUN'
+
+def _local_index(index) -> pd.DatetimeIndex:
+    """Exchange wall-clock dates (cached frames may come back with mixed UTC offsets)"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.tz_localize(None) if index.tz is not None else index
+    return pd.DatetimeIndex([pd.Timestamp(ts).tz_localize(None) if pd.Timestamp(ts).tzinfo else pd.Timestamp(ts)
+                             for ts in index])
+
+def aggregate_bars(daily_data: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """
+    Combine daily OHLCV bars into weekly ('W-SUN', 'W-SAT') or monthly ('M') bars
+    
+    Bars are grouped by the exchange's local calendar and labeled with the
+    first calendar day of the period, like yfinance's 1wk/1mo intervals.
+    Periods without trading days produce no bar.
+    """
+    if daily_data is None or len(daily_data) == 0:
+        return pd.DataFrame()
+    
+    local_index = _local_index(daily_data.index)
+    periods = local_index.to_period(frequency)
+    
+    aggregation = {}
+    for column in daily_data.columns:
+        if column == 'Stock Splits':
+            # Combined split ratio of the period; 0 means no split, as in yfinance
+            aggregation[column] = lambda splits: splits[splits != 0].prod() if (splits != 0).any() else 0.0
+        else:
+            aggregation[column] = _BAR_AGGREGATION.get(column, 'last')
+    
+    bars = daily_data.groupby(periods.values).agg(aggregation)
+    labels = pd.PeriodIndex(bars.index, freq=frequency).start_time
+    tz = daily_data.index.tz if isinstance(daily_data.index, pd.DatetimeIndex) else None
+    bars.index = (labels.tz_localize(tz) if tz is not None else labels).rename('Date')
+    return bars
+
+def _add_technical_indicators(data: pd.DataFrame, frequency: Optional[str] = None) -> pd.DataFrame:
+    """
+    Add technical indicators to the data
+    
+    frequency is 'daily', 'weekly' or 'monthly'; if omitted it is guessed
+    from the number of rows.
+    """
     if data is None or len(data) == 0:
         return data
     
+    if frequency is None:
+        frequency = 'daily' if len(data) > 252 else 'weekly' if len(data) > 52 else 'monthly'
+    
     # Calculate returns and volatility
     data['Return'] = data['Close'].pct_change()
     
     # Calculate volatility based on data frequency
-    if len(data) > 252:  # Likely daily data
+    if frequency == 'daily':
         data['Volatility'] = data['Return'].rolling(window=21).std() * np.sqrt(252)
         # Add moving averages for daily data
         data['MA_100'] = data['Close'].rolling(window=100).mean()
@@ -119,9 +165,9 @@ def _add_technical_indicators(data: pd.DataFrame) -> pd.DataFrame:
         else:
             data['MA_1000'] = np.nan
             
-    elif len(data) > 52:  # Likely weekly data
+    elif frequency == 'weekly':
         data['Volatility'] = data['Return'].rolling(window=4).std() * np.sqrt(52)
-    else:  # Likely monthly data
+    else:
         data['Volatility'] = data['Return'].rolling(window=3).std() * np.sqrt(12)
     
     return data
@@ -1,5 +1,6 @@
 # src/analysis/analysis_service.py
 
+import os
 import numpy as np
 import pandas as pd
 import math
@@ -15,6 +16,11 @@ from .consolidated_refinements import ConsolidatedRefinements
 
 logger = logging.getLogger(__name__)
 
+# Histories at least this long are analyzed in compact (float32, columnar) mode
+COMPACT_ANALYSIS_MIN_ROWS = int(os.getenv('COMPACT_ANALYSIS_MIN_ROWS', 2500))
+
+_NS_PER_DAY = 86_400 * 10**9
+
 class AnalysisService:
     # Configuration constants for rating system
     RATING_CONFIG = {
@@ -1391,11 +1397,22 @@ class AnalysisService:
         return analysis_dates, r2_values
 
     @staticmethod
-    def analyze_stock_data(data, crossover_days=365, lookback_days=365):
-        """Perform comprehensive stock analysis"""
+    def analyze_stock_data(data, crossover_days=365, lookback_days=365, compact=None):
+        """
+        Perform comprehensive stock analysis
+        
+        compact=True returns only Date, Close/Price and the derived percentage
+        columns, stored as float32; by default it is used for histories of
+        COMPACT_ANALYSIS_MIN_ROWS rows or more.
+        """
         logger = logging.getLogger(__name__)
         logger.debug(f"Starting stock analysis with shape: {data.shape}")
         
+        if compact is None:
+            compact = len(data) >= COMPACT_ANALYSIS_MIN_ROWS
+        if compact:
+            return AnalysisService._analyze_stock_data_compact(data, crossover_days, lookback_days)
+        
         try:
             result_data = []
             
@@ -1494,6 +1511,78 @@ class AnalysisService:
             logger.error(f"Error in analyze_stock_data: {str(e)}", exc_info=True)
             raise
         
+    @staticmethod
+    def _window_starts(ns, days):
+        """First row of each row's trailing calendar window, as analyze_stock_data slices it"""
+        starts = np.searchsorted(ns, ns - days * _NS_PER_DAY, side='right')
+        # Windows that do not reach back past the first row keep all earlier rows
+        starts[(ns - ns[0]) // _NS_PER_DAY <= days] = 0
+        return starts
+
+    @staticmethod
+    def _analyze_stock_data_compact(data, crossover_days=365, lookback_days=365):
+        """
+        Memory-lean analyze_stock_data for very long histories
+        
+        Works on one close-price array and row offsets instead of per-day
+        DataFrame copies; the R² fit is the same degree-2 least squares,
+        solved directly with NumPy.
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            close = data['Close'].to_numpy(dtype=np.float64)
+            ns = data.index.asi8
+            rows = len(close)
+            
+            tech_starts = AnalysisService._window_starts(ns, crossover_days)
+            r2_starts = AnalysisService._window_starts(ns, lookback_days)
+            ends = np.arange(1, rows + 1)
+            analyzed = np.flatnonzero(ends - tech_starts >= 20)  # Minimum data points needed
+            
+            ratio = np.zeros(len(analyzed), dtype=np.float32)
+            position = np.zeros(len(analyzed), dtype=np.float32)
+            r2_pct = np.full(len(analyzed), np.nan, dtype=np.float32)
+            log_close = np.log(close)
+            
+            for out, i in enumerate(analyzed):
+                window = close[tech_starts[i]:i + 1]
+                highest_price = window.max()
+                lowest_price = window.min()
+                total_move = highest_price - lowest_price
+                if total_move > 0:
+                    ratio[out] = (highest_price - close[i]) / total_move * 100
+                    position[out] = (close[i] - lowest_price) / total_move * 100
+                
+                start = r2_starts[i]
+                if i + 1 - start < 20:
+                    continue
+                y = log_close[start:i + 1]
+                if not np.isfinite(y).all():
+                    continue
+                x = (ns[start:i + 1] - ns[start]) // _NS_PER_DAY
+                x = x / x.max()
+                design = np.column_stack((np.ones_like(x), x, x * x))
+                coef = np.linalg.lstsq(design, y, rcond=None)[0]
+                ss_res = np.sum((y - design @ coef) ** 2)
+                ss_tot = np.sum((y - y.mean()) ** 2)
+                r2_pct[out] = (1 - ss_res / ss_tot) * 100 if ss_tot > 0 else (100.0 if np.isclose(ss_res, 0) else 0.0)
+            
+            prices = close[analyzed]
+            df = pd.DataFrame({
+                'Date': data.index[analyzed],
+                'Close': prices,
+                'Price': prices,  # Add Price column for backward compatibility
+                'Retracement_Ratio_Pct': ratio,
+                'Price_Position_Pct': position,
+                'R2_Pct': r2_pct,
+            }, copy=False)
+            logger.info(f"Analysis complete (compact, {len(df)} rows)")
+            return df
+        
+        except Exception as e:
+            logger.error(f"Error in compact analyze_stock_data: {str(e)}", exc_info=True)
+            raise
+        
     @staticmethod
     def _calculate_recent_momentum(data):
         """Simple recent momentum calculation"""
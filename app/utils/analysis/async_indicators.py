@@ -22,9 +22,10 @@ from typing import Dict, List, Optional, Tuple, Union, Any
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, asdict
 from functools import lru_cache
-import redis
 import hashlib
 
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, record_redis_outcome
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -50,24 +51,8 @@ class AsyncTechnicalIndicators:
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         
-        # Redis caching setup
-        self.redis_client = redis_client
-        if not self.redis_client:
-            try:
-                self.redis_client = redis.Redis(
-                    host='localhost', 
-                    port=6379, 
-                    db=1,  # Use separate DB for indicators
-                    decode_responses=True,
-                    socket_keepalive=True,
-                    socket_keepalive_options={}
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("✅ Redis connected for indicator caching")
-            except Exception as e:
-                logger.warning(f"⚠️ Redis unavailable for indicator caching: {e}")
-                self.redis_client = None
+        # Redis caching setup - separate DB for indicators on the shared pool
+        self._redis_client = redis_client or get_redis_client(db=1, decode_responses=True)
         
         # Performance tracking
         self.calculation_stats = {
@@ -84,6 +69,11 @@ class AsyncTechnicalIndicators:
         
         logger.info(f"🔧 AsyncTechnicalIndicators initialized with {max_workers} workers")
     
+    @property
+    def redis_client(self):
+        """Shared-pool client, or None while the Redis circuit breaker is open (read once per operation)"""
+        return self._redis_client if get_circuit_breaker().allow_request() else None
+    
     def _generate_cache_key(self, indicator: str, data_hash: str, **params) -> str:
         """Generate unique cache key for indicator calculation"""
         param_str = json.dumps(params, sort_keys=True)
@@ -100,14 +90,16 @@ class AsyncTechnicalIndicators:
     
     async def _get_cached_result(self, cache_key: str) -> Optional[IndicatorResult]:
         """Get cached indicator result"""
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return None
         
         try:
             loop = asyncio.get_event_loop()
             cached_data = await loop.run_in_executor(
-                None, self.redis_client.get, cache_key
+                None, redis_client.get, cache_key
             )
+            record_redis_outcome()
             
             if cached_data:
                 data = json.loads(cached_data)
@@ -115,23 +107,27 @@ class AsyncTechnicalIndicators:
                 logger.debug(f"📦 Cache hit for {cache_key}")
                 return IndicatorResult(**data)
         except Exception as e:
+            record_redis_outcome(e)
             logger.warning(f"Cache retrieval error: {e}")
         
         return None
     
     async def _set_cached_result(self, cache_key: str, result: IndicatorResult) -> None:
         """Cache indicator result"""
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return
         
         try:
             loop = asyncio.get_event_loop()
             data = json.dumps(result.to_dict())
             await loop.run_in_executor(
-                None, self.redis_client.setex, cache_key, self.cache_ttl, data
+                None, redis_client.setex, cache_key, self.cache_ttl, data
             )
+            record_redis_outcome()
             logger.debug(f"💾 Cached result for {cache_key}")
         except Exception as e:
+            record_redis_outcome(e)
             logger.warning(f"Cache storage error: {e}")
     
     async def calculate_sma_async(self, data: Union[pd.Series, List[float]], 
@@ -581,30 +577,33 @@ class AsyncTechnicalIndicators:
         return {
             **self.calculation_stats,
             'cache_hit_rate': round(cache_hit_rate, 2),
-            'redis_available': self.redis_client is not None,
+            'redis_available': not get_circuit_breaker().is_open,
             'max_workers': self.max_workers
         }
     
     async def clear_cache(self) -> bool:
         """Clear all cached indicators"""
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return False
         
         try:
             loop = asyncio.get_event_loop()
             # Get all indicator cache keys
             keys = await loop.run_in_executor(
-                None, self.redis_client.keys, 'indicator:*'
+                None, redis_client.keys, 'indicator:*'
             )
             
             if keys:
                 await loop.run_in_executor(
-                    None, self.redis_client.delete, *keys
+                    None, redis_client.delete, *keys
                 )
                 logger.info(f"🧹 Cleared {len(keys)} cached indicators")
             
+            record_redis_outcome()
             return True
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"Cache clear failed: {e}")
             return False
     
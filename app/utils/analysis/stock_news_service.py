@@ -261,7 +261,7 @@ class FetchRecordTracker:
         
         cache_key = self.get_daily_fetch_key(symbol, date)
         try:
-            self.cache.redis.delete(cache_key) if self.cache.redis else None
+            self.cache.delete(cache_key)
             logger.info(f"🧹 Cleared daily fetch record for {symbol}")
             return True
         except Exception as e:
@@ -416,7 +416,8 @@ class StockNewsService:
             
             # Cache the result for a few minutes to avoid repeated checks
             if cache.is_available():
-                cache.set_json(cache_key, result, expire=NewsOptimizationConfig.NEWS_CHECK_CACHE_DURATION)
+                cache.set_json(cache_key, result, expire=NewsOptimizationConfig.NEWS_CHECK_CACHE_DURATION,
+                               tags=['news_check', f"news_check:{symbol}"])
             
             logger.info(f"📊 News status for {symbol}: {fetch_reason}")
             return result
@@ -838,13 +839,11 @@ class StockNewsService:
             
         if symbol:
             # Clear cache for specific symbol
-            pattern = f"news_check:{symbol}:*"
-            cache.delete_pattern(pattern)
+            cache.invalidate_tags(f"news_check:{symbol}")
             logger.info(f"🧹 Cleared news check cache for {symbol}")
         else:
             # Clear all news check cache
-            pattern = "news_check:*"
-            cache.delete_pattern(pattern)
+            cache.invalidate_tags('news_check')
             logger.info("🧹 Cleared all news check cache")
 
     @staticmethod
@@ -937,14 +936,18 @@ class StockNewsService:
             
             cache = NewsCache()
             
+            # One MGET for every symbol instead of a GET per symbol
+            cached_results = {}
+            if cache.is_available():
+                # Simplified check - in reality you'd scan for matching keys
+                cached_results = cache.get_many(f"news_check:{symbol}:None:True" for symbol in symbols)
+            
             for symbol in symbols:
                 stats['total_symbols_checked'] += 1
                 
                 # Check if we have cached data
-                cache_key = f"news_check:{symbol}:*"
                 if cache.is_available():
-                    # Simplified check - in reality you'd scan for matching keys
-                    cached_result = cache.get_json(f"news_check:{symbol}:None:True")
+                    cached_result = cached_results.get(f"news_check:{symbol}:None:True")
                     if cached_result:
                         stats['cache_hits'] += 1
                         if not cached_result.get('should_fetch', True):
@@ -0,0 +1,348 @@
+# app/utils/analyzer/analysis_jobs.py
+
+"""
+Asynchronous analysis jobs with result polling.
+
+Submitting an analysis returns a job id at once; the analysis runs outside
+the web workers and the client polls for progress and the finished figure.
+Jobs are keyed by their parameters, so identical submissions share one job.
+
+Two backends:
+
+- ``redis`` (default): jobs go onto a Redis list and are executed by
+  separate worker processes started with ``run_analysis_worker.py``
+  (the Docker image starts them next to gunicorn);
+- ``local`` (development): jobs run on a process pool owned by the web
+  process, with progress shared through a multiprocessing manager. Jobs
+  are only visible to that one process, so it refuses to start when
+  WEB_CONCURRENCY says gunicorn runs more than one worker.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional
+
+from redis import Redis, RedisError
+
+from app.utils.cache.local_cache import LocalLRUCache
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, NO_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_JOB_BACKEND = os.getenv('ANALYSIS_JOB_BACKEND', 'redis')
+LOCAL_JOB_WORKERS = int(os.getenv('ANALYSIS_LOCAL_JOB_WORKERS', 2))
+# Finished figures kept by the local backend (bytes); older ones are evicted first
+LOCAL_RESULT_MAX_BYTES = int(os.getenv('ANALYSIS_LOCAL_RESULT_MAX_MB', 64)) * 1024 * 1024
+# gunicorn reads its worker count from WEB_CONCURRENCY too
+WEB_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+
+JOB_PREFIX = "analysis_job:"
+QUEUE_KEY = "analysis_jobs:queue"
+JOB_TTL = int(os.getenv('ANALYSIS_JOB_TTL', 3600))          # job state and result retention
+JOB_STALL_SECONDS = int(os.getenv('ANALYSIS_JOB_STALL_SECONDS', 300))  # running job without progress
+WORKER_POLL_SECONDS = 5
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def job_id_for(ticker: str, end_date: Optional[str], lookback_days: int, crossover_days: int) -> str:
+    """Jobs are identified by their parameters (an open end date means today)"""
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    key_material = f"{ticker.upper()}|{end_date}|{lookback_days}|{crossover_days}"
+    return hashlib.sha1(key_material.encode()).hexdigest()[:16]
+
+
+def execute_analysis_job(params: Dict[str, Any], report: Callable[[str, int], None]) -> str:
+    """Run one analysis and return the figure JSON (runs in a job worker process)"""
+    from app.utils.analyzer.stock_analyzer import create_stock_visualization_old
+    from app.utils.performance.admission_control import analysis_slot
+
+    # Jobs count against the same global concurrency limit as the analysis routes
+    with analysis_slot(report):
+        fig = create_stock_visualization_old(
+            params['ticker'],
+            end_date=params['end_date'],
+            lookback_days=params['lookback_days'],
+            crossover_days=params['crossover_days'],
+            progress=report
+        )
+    report('rendering', 95)
+    return fig.to_json()
+
+
+def _run_local_job(job_id: str, params: Dict[str, Any], shared_jobs) -> str:
+    """Process-pool entry point for the local backend"""
+    def report(stage: str, percent: int):
+        job = dict(shared_jobs[job_id])
+        job.update({'stage': stage, 'progress': percent, 'updated_at': time.time()})
+        shared_jobs[job_id] = job
+
+    job = dict(shared_jobs[job_id])
+    job.update({'status': STATUS_RUNNING, 'started_at': time.time(), 'updated_at': time.time()})
+    shared_jobs[job_id] = job
+    return execute_analysis_job(params, report)
+
+
+class AnalysisJobQueue:
+    """Submit analysis jobs, report their progress and hand out finished results"""
+
+    def __init__(self, backend: str = None):
+        self.backend = backend or ANALYSIS_JOB_BACKEND
+        if self.backend == 'local' and WEB_WORKERS > 1:
+            raise RuntimeError(
+                f"ANALYSIS_JOB_BACKEND=local keeps jobs inside one web worker, but WEB_CONCURRENCY={WEB_WORKERS}: "
+                f"polls landing on another worker would 404. Use ANALYSIS_JOB_BACKEND=redis."
+            )
+        self._breaker = get_circuit_breaker()
+        self._lock = threading.RLock()
+        self._executor = None
+        self._manager = None
+        self._local_jobs = None
+        self._local_results = self._new_result_cache()
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0}
+
+    @cached_property
+    def _redis(self) -> Redis:
+        """Created on first use, so importing this module does not connect to Redis"""
+        return get_redis_client(decode_responses=True)
+
+    def submit(self, ticker: str, end_date: Optional[str] = None, lookback_days: int = 365,
+               crossover_days: int = 365) -> Optional[Dict[str, Any]]:
+        """
+        Queue an analysis, or return the existing job for the same parameters.
+
+        Returns None when the job store (Redis) is unavailable, so callers
+        can shed the request instead of failing it.
+        """
+        params = {
+            'ticker': ticker.upper(),
+            'end_date': end_date or datetime.now().strftime('%Y-%m-%d'),
+            'lookback_days': int(lookback_days),
+            'crossover_days': int(crossover_days),
+        }
+        job_id = job_id_for(**params)
+        now = time.time()
+        job = {
+            'job_id': job_id,
+            'params': params,
+            'status': STATUS_QUEUED,
+            'stage': STATUS_QUEUED,
+            'progress': 0,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        with self._lock:
+            if self.backend == 'redis':
+                if not self._breaker.allow_request():
+                    logger.warning(f"⚠️ Analysis job {job_id} not queued: Redis circuit is open")
+                    return None
+                try:
+                    existing = self._read_redis_job(job_id)
+                    reuse = existing is not None and not self._is_dead(existing)
+                    if not reuse:
+                        self._enqueue_redis(job, replace=existing is not None)
+                    self._breaker.record_success()
+                except RedisError as e:
+                    self._breaker.record_failure(e)
+                    logger.warning(f"⚠️ Analysis job {job_id} not queued, Redis unavailable: {str(e)}")
+                    return None
+            else:
+                existing = self.get_job(job_id)
+                reuse = existing is not None and not self._is_dead(existing)
+                if not reuse:
+                    self._enqueue_local(job)
+
+            if reuse:
+                self._stats['deduplicated'] += 1
+                return dict(existing, deduplicated=True)
+            self._stats['submitted'] += 1
+
+        logger.info(f"📥 Queued analysis job {job_id} for {params['ticker']} ({params['lookback_days']} days)")
+        return dict(job, deduplicated=False)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.backend == 'redis':
+            return self._load_redis_job(job_id)
+        if self._local_jobs is None:
+            return None
+        job = self._local_jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def get_result(self, job_id: str) -> Optional[str]:
+        """Figure JSON of a finished job"""
+        if self.backend == 'redis':
+            try:
+                return self._redis.get(JOB_PREFIX + job_id + ":result")
+            except RedisError as e:
+                self._breaker.record_failure(e)
+                return None
+        return self._local_results.get(job_id, None)
+
+    def _is_dead(self, job: Dict[str, Any]) -> bool:
+        """Failed jobs, lost results and running jobs whose worker stopped reporting are resubmitted"""
+        if job['status'] == STATUS_FAILED:
+            return True
+        if job['status'] == STATUS_DONE and self.backend == 'local':
+            # The figure may have been evicted from the bounded result cache
+            return self._local_results.get(job['job_id'], None) is None
+        return job['status'] == STATUS_RUNNING and time.time() - job['updated_at'] > JOB_STALL_SECONDS
+
+    # Redis backend
+
+    def _enqueue_redis(self, job: Dict[str, Any], replace: bool = False):
+        job_key = JOB_PREFIX + job['job_id']
+        if not replace and not self._redis.set(job_key, json.dumps(job), nx=True, ex=JOB_TTL):
+            # Another web worker queued the same job a moment ago
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        if replace:
+            pipe.set(job_key, json.dumps(job), ex=JOB_TTL)
+        pipe.lpush(QUEUE_KEY, job['job_id'])
+        pipe.execute()
+
+    def _load_redis_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._read_redis_job(job_id)
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            return None
+
+    def _read_redis_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        payload = self._redis.get(JOB_PREFIX + job_id)
+        return json.loads(payload) if payload else None
+
+    def _save_redis_job(self, job: Dict[str, Any], **changes):
+        job.update(changes, updated_at=time.time())
+        self._redis.set(JOB_PREFIX + job['job_id'], json.dumps(job), ex=JOB_TTL)
+
+    def run_worker(self, max_jobs: int = None):
+        """Execute queued jobs until stopped (body of an analysis worker process)"""
+        blocking_redis = get_redis_client(decode_responses=True, socket_timeout=NO_TIMEOUT)
+        processed = 0
+        logger.info(f"👷 Analysis job worker {os.getpid()} waiting for jobs")
+        while max_jobs is None or processed < max_jobs:
+            try:
+                item = blocking_redis.brpop(QUEUE_KEY, timeout=WORKER_POLL_SECONDS)
+            except RedisError as e:
+                logger.warning(f"⚠️ Analysis job queue unavailable: {str(e)}")
+                time.sleep(WORKER_POLL_SECONDS)
+                continue
+            if item is None:
+                continue
+            self.run_redis_job(item[1])
+            processed += 1
+
+    def run_redis_job(self, job_id: str):
+        job = self._load_redis_job(job_id)
+        if job is None or job['status'] not in (STATUS_QUEUED, STATUS_RUNNING):
+            return
+
+        def report(stage: str, percent: int):
+            try:
+                self._save_redis_job(job, stage=stage, progress=percent)
+            except RedisError as e:
+                logger.debug(f"Progress update for job {job_id} failed: {str(e)}")
+
+        self._save_redis_job(job, status=STATUS_RUNNING, stage='starting', started_at=time.time())
+        start_time = time.time()
+        try:
+            figure_json = execute_analysis_job(job['params'], report)
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(JOB_PREFIX + job_id + ":result", figure_json, ex=JOB_TTL)
+            job.update(status=STATUS_DONE, stage=STATUS_DONE, progress=100,
+                       finished_at=time.time(), updated_at=time.time())
+            pipe.set(JOB_PREFIX + job_id, json.dumps(job), ex=JOB_TTL)
+            pipe.execute()
+            self._record('completed')
+            logger.info(f"✅ Analysis job {job_id} finished in {time.time() - start_time:.1f}s")
+        except Exception as e:
+            self._save_redis_job(job, status=STATUS_FAILED, error=str(e), finished_at=time.time())
+            self._record('failed')
+            logger.error(f"❌ Analysis job {job_id} failed: {str(e)}")
+
+    # Local backend
+
+    def _enqueue_local(self, job: Dict[str, Any]):
+        if self._executor is None:
+            context = multiprocessing.get_context('spawn')
+            self._manager = context.Manager()
+            self._local_jobs = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=LOCAL_JOB_WORKERS, mp_context=context)
+
+        self._prune_local_jobs()
+        job_id = job['job_id']
+        self._local_jobs[job_id] = job
+        self._local_results.delete(job_id)
+        future = self._executor.submit(_run_local_job, job_id, job['params'], self._local_jobs)
+        future.add_done_callback(lambda done: self._finish_local(job_id, done))
+
+    def _finish_local(self, job_id: str, future):
+        job = dict(self._local_jobs[job_id])
+        error = future.exception()
+        if error is None:
+            figure_json = future.result()
+            self._local_results.set(job_id, figure_json, len(figure_json))
+            job.update(status=STATUS_DONE, stage=STATUS_DONE, progress=100)
+            self._record('completed')
+        else:
+            job.update(status=STATUS_FAILED, error=str(error))
+            self._record('failed')
+            logger.error(f"❌ Analysis job {job_id} failed: {str(error)}")
+        job.update(finished_at=time.time(), updated_at=time.time())
+        self._local_jobs[job_id] = job
+
+    def _prune_local_jobs(self):
+        """Forget finished jobs after JOB_TTL, like their Redis keys would expire"""
+        cutoff = time.time() - JOB_TTL
+        for job_id, job in list(self._local_jobs.items()):
+            if job.get('finished_at') and job['finished_at'] < cutoff:
+                self._local_jobs.pop(job_id, None)
+
+    @staticmethod
+    def _new_result_cache() -> LocalLRUCache:
+        return LocalLRUCache(max_bytes=LOCAL_RESULT_MAX_BYTES, max_item_bytes=LOCAL_RESULT_MAX_BYTES,
+                             default_ttl=JOB_TTL)
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def reset_after_fork(self):
+        """Pools and manager connections belong to the parent"""
+        self._executor = None
+        self._manager = None
+        self._local_jobs = None
+        self._local_results = self._new_result_cache()
+        self._lock = threading.RLock()
+        self.__dict__.pop('_redis', None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = self.backend
+        if self.backend == 'redis':
+            try:
+                stats['queue_length'] = self._redis.llen(QUEUE_KEY)
+            except RedisError:
+                stats['queue_length'] = None
+        return stats
+
+
+# Global instance
+analysis_job_queue = AnalysisJobQueue()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=analysis_job_queue.reset_after_fork)
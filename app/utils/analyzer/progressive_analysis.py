@@ -0,0 +1,129 @@
+# app/utils/analyzer/progressive_analysis.py
+
+"""
+Staged stock analysis for progressive (server-sent events) rendering.
+
+The analysis is split into stages that are emitted as soon as each is
+ready, cheapest first:
+
+1. ``price_chart`` - the display-period price series (one cached price read)
+2. ``regression``  - regression bands, total score and S&P 500 comparison
+3. ``fundamentals`` - financial metrics table and trading signal returns
+
+Every stage is memoized on its own, keyed by the same price-data
+fingerprint as the full analysis, so a later request replays cached stages
+and only computes the ones that are missing.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+from app.utils.data.data_service import DataService
+from app.utils.analysis.analysis_service import AnalysisService
+from app.utils.config.metrics_config import ANALYSIS_DEFAULTS
+from app.utils.config.layout_config import LAYOUT_CONFIG
+from app.utils.symbol_utils import normalize_ticker
+from app.utils.cache.analysis_result_cache import analysis_result_cache, ANALYSIS_FIGURE_TTL
+from app.utils.analyzer.stock_analyzer import _build_signal_returns, _fetch_metrics_table, analyze_signals
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('price_chart', 'regression', 'fundamentals')
+
+
+def format_sse(event: str, payload: Dict[str, Any]) -> str:
+    """One server-sent event; NaN and numpy/pandas values are made JSON-safe"""
+    return f"event: {event}\ndata: {json.dumps(payload, cls=PlotlyJSONEncoder)}\n\n"
+
+
+def iter_analysis_stages(
+    ticker: str,
+    end_date: Optional[str] = None,
+    lookback_days: int = ANALYSIS_DEFAULTS['lookback_days'],
+    crossover_days: int = ANALYSIS_DEFAULTS['crossover_days']
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (stage, payload) pairs in STAGES order"""
+    data_service = DataService()
+    if end_date is None or not end_date.strip():
+        end_date = datetime.now().strftime("%Y-%m-%d")
+
+    extended_start_date = data_service.get_analysis_dates(end_date, 'days', lookback_days + crossover_days)
+    display_start_date = data_service.get_analysis_dates(end_date, 'days', lookback_days)
+
+    yahoo_ticker = normalize_ticker(ticker, purpose='analyze')
+    historical_data_extended = data_service.get_historical_data(yahoo_ticker, extended_start_date, end_date)
+    if historical_data_extended is None or historical_data_extended.empty:
+        raise ValueError(f"No historical data found for {ticker}")
+
+    historical_data = historical_data_extended.loc[display_start_date:]
+    if historical_data.empty:
+        raise ValueError(f"No data available for analysis period for {ticker}")
+
+    fingerprint = analysis_result_cache.fingerprint(
+        'stream', ticker, end_date, lookback_days, crossover_days, historical_data_extended
+    )
+
+    def stage(name: str, build: Callable[[], Dict[str, Any]], expire: int = None) -> Dict[str, Any]:
+        payload = analysis_result_cache.get_stage(ticker, fingerprint, name)
+        if payload is None:
+            payload = build()
+            kwargs = {'expire': expire} if expire else {}
+            analysis_result_cache.set_stage(ticker, fingerprint, name, payload, **kwargs)
+        return payload
+
+    yield 'price_chart', stage('price_chart', lambda: {
+        'ticker': ticker,
+        'dates': historical_data.index.strftime('%Y-%m-%d').tolist(),
+        'close': historical_data['Close'].tolist(),
+        'start_date': display_start_date,
+        'end_date': end_date,
+    })
+
+    def build_regression() -> Dict[str, Any]:
+        regression_results = AnalysisService.perform_polynomial_regression(
+            historical_data,
+            future_days=int(lookback_days * LAYOUT_CONFIG['lookback_days_ratio']),
+            symbol=ticker
+        )
+        total_score = regression_results.get('total_score') or {}
+        return {
+            'dates': pd.date_range(
+                start=historical_data.index[0], periods=len(regression_results['predictions']), freq='D'
+            ).strftime('%Y-%m-%d').tolist(),
+            'predictions': regression_results['predictions'],
+            'upper_band': regression_results['upper_band'],
+            'lower_band': regression_results['lower_band'],
+            'r2': regression_results.get('r2'),
+            'equation': regression_results.get('equation'),
+            'total_score': total_score,
+            'benchmark': total_score.get('benchmark'),
+        }
+
+    yield 'regression', stage('regression', build_regression)
+
+    def build_fundamentals() -> Dict[str, Any]:
+        analysis_df = AnalysisService.analyze_stock_data(historical_data_extended, crossover_days)
+        analysis_df = analysis_df.iloc[analysis_df['Date'].searchsorted(pd.to_datetime(display_start_date)):]
+        crossover_data = AnalysisService.find_crossover_points(
+            analysis_df['Date'].tolist(),
+            analysis_df['Retracement_Ratio_Pct'].tolist(),
+            analysis_df['Price_Position_Pct'].tolist(),
+            analysis_df['Price'].tolist()
+        )
+        signal_returns = _build_signal_returns(crossover_data, historical_data)
+        metrics_df = _fetch_metrics_table(data_service, ticker)
+        metrics = json.loads(metrics_df.to_json(orient='split')) if metrics_df is not None and not metrics_df.empty else None
+        # Round-trip so the cached payload holds plain JSON types only
+        return json.loads(json.dumps({
+            'metrics': metrics,
+            'signal_returns': signal_returns,
+            'signal_summary': analyze_signals(signal_returns),
+        }, cls=PlotlyJSONEncoder))
+
+    # Metrics come from the database and change independently of prices
+    yield 'fundamentals', stage('fundamentals', build_fundamentals, expire=ANALYSIS_FIGURE_TTL)
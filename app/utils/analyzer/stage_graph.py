@@ -0,0 +1,251 @@
+# app/utils/analyzer/stage_graph.py
+
+"""
+Dependency-graph execution of analysis stages.
+
+An analysis needs several independent round trips (price history, ROIC
+financials, company info, the S&P 500 benchmark). ``StageGraph`` runs every
+stage as soon as its dependencies are done, on a bounded thread pool shared
+by all requests, with a timeout per stage:
+
+- a required stage that fails or times out fails the whole run;
+- an optional stage falls back to its default and its dependents go on.
+
+A stage's timeout starts when a pool thread picks it up, so time spent
+queued behind other requests' stages does not count against it. ``run``
+can stop early once ``done_when`` is satisfied (a memoized result, say),
+without waiting for slow stages nobody needs any more.
+
+Per-stage timings are logged, returned with the results and aggregated for
+the performance stats endpoint. Work that nobody waits for (the news
+auto-fetch) goes to a separate small pool via ``submit_background``.
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGE_WORKERS = int(os.getenv('ANALYSIS_STAGE_WORKERS', 8))
+BACKGROUND_WORKERS = int(os.getenv('ANALYSIS_BACKGROUND_WORKERS', 2))
+DEFAULT_STAGE_TIMEOUT = float(os.getenv('ANALYSIS_STAGE_TIMEOUT', 30))
+# How often run() looks for queued stages that have started (and so have a deadline)
+QUEUED_POLL_SECONDS = 0.05
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+STATUS_TIMEOUT = 'timeout'
+
+
+class StageTimeout(TimeoutError):
+    """A required stage did not finish within its timeout"""
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str],
+                 timeout: float, required: bool, default: Any):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.required = required
+        self.default = default
+
+
+class StageResults(dict):
+    """Stage name -> result, plus how each stage went"""
+
+    def __init__(self):
+        super().__init__()
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def ok(self, name: str) -> bool:
+        return self.timings.get(name, {}).get('status') == STATUS_OK
+
+
+class _Executors:
+    """Process-wide pools, created lazily and recreated after fork"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_pool = None
+        self._background_pool = None
+
+    def stage_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._stage_pool is None:
+                self._stage_pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='analysis-stage')
+            return self._stage_pool
+
+    def background_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._background_pool is None:
+                self._background_pool = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS,
+                                                           thread_name_prefix='analysis-background')
+            return self._background_pool
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._stage_pool = None
+        self._background_pool = None
+
+
+_executors = _Executors()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_executors.reset_after_fork)
+
+
+class StageGraph:
+    """A small DAG of named stages; each stage function receives the results so far"""
+
+    def __init__(self, label: str = 'analysis'):
+        self.label = label
+        self._stages: Dict[str, _Stage] = {}
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = (),
+            timeout: float = DEFAULT_STAGE_TIMEOUT, required: bool = True, default: Any = None) -> 'StageGraph':
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self._stages[name] = _Stage(name, fn, deps, timeout, required, default)
+        return self
+
+    def run(self, done_when: Callable[[StageResults], bool] = None) -> StageResults:
+        """
+        Run all stages, independent ones concurrently; returns when every
+        stage has settled, or as soon as ``done_when(results)`` is true.
+        Stages still queued or running at that point are abandoned.
+        """
+        pool = _executors.stage_pool()
+        results = StageResults()
+        waiting = dict(self._stages)
+        running = {}  # future -> (stage, submitted_at)
+        started = {}  # stage name -> when a pool thread picked it up
+        run_start = time.monotonic()
+        finished_early = False
+
+        try:
+            while waiting or running:
+                for name in [name for name, stage in waiting.items() if all(dep in results for dep in stage.deps)]:
+                    stage = waiting.pop(name)
+                    # Copy the context so stage time is charged to the request profile
+                    future = pool.submit(contextvars.copy_context().run, self._execute, stage, results, started)
+                    running[future] = (stage, time.monotonic())
+
+                now = time.monotonic()
+                deadlines = [started[stage.name] + stage.timeout if stage.name in started else now + QUEUED_POLL_SECONDS
+                             for stage, _ in running.values()]
+                done, _ = wait(list(running), timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, submitted = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        self._settle(results, stage, submitted, started, STATUS_OK, future.result())
+                    else:
+                        self._settle(results, stage, submitted, started, STATUS_ERROR, stage.default, error)
+                        if stage.required:
+                            raise error
+
+                if done_when is not None and done and done_when(results):
+                    finished_early = True
+                    break
+
+                now = time.monotonic()
+                for future, (stage, submitted) in list(running.items()):
+                    if stage.name in started and now - started[stage.name] >= stage.timeout and not future.done():
+                        # The thread cannot be killed; its result is simply ignored
+                        running.pop(future)
+                        future.cancel()
+                        self._settle(results, stage, submitted, started, STATUS_TIMEOUT, stage.default)
+                        if stage.required:
+                            raise StageTimeout(f"Stage {stage.name} timed out after {stage.timeout:.0f}s")
+        finally:
+            for future in running:
+                future.cancel()
+            total_ms = round((time.monotonic() - run_start) * 1000, 1)
+            complete = finished_early or len(results) == len(self._stages)
+            results.timings['_total'] = {'ms': total_ms, 'status': STATUS_OK if complete else STATUS_ERROR}
+            stage_timing_stats.record(results.timings)
+            logger.info(f"⏱️ {self.label} stages: " + ', '.join(
+                f"{name}={timing['ms']:.0f}ms" + ('' if timing['status'] == STATUS_OK else f" ({timing['status']})")
+                for name, timing in results.timings.items()
+            ))
+        return results
+
+    @staticmethod
+    def _execute(stage: _Stage, results: StageResults, started: Dict[str, float]) -> Any:
+        started[stage.name] = time.monotonic()
+        return stage.fn(results)
+
+    @staticmethod
+    def _settle(results: StageResults, stage: _Stage, submitted: float, started: Dict[str, float],
+                status: str, value: Any, error: Exception = None):
+        results[stage.name] = value
+        began = started.get(stage.name, time.monotonic())
+        results.timings[stage.name] = {
+            'ms': round((time.monotonic() - began) * 1000, 1),
+            'queued_ms': round((began - submitted) * 1000, 1),
+            'status': status,
+        }
+        if error is not None and not stage.required:
+            logger.warning(f"⚠️ Optional stage {stage.name} failed, using default: {str(error)}")
+        elif status == STATUS_TIMEOUT and not stage.required:
+            logger.warning(f"⏱️ Optional stage {stage.name} timed out after {stage.timeout:.0f}s, using default")
+
+
+class StageTimingStats:
+    """Running per-stage counts, mean and max duration, timeouts and errors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, timings: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for name, timing in timings.items():
+                entry = self._stats.setdefault(name, {'runs': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                      STATUS_TIMEOUT: 0, STATUS_ERROR: 0})
+                entry['runs'] += 1
+                entry['total_ms'] += timing['ms']
+                entry['max_ms'] = max(entry['max_ms'], timing['ms'])
+                if timing['status'] in (STATUS_TIMEOUT, STATUS_ERROR):
+                    entry[timing['status']] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    'runs': entry['runs'],
+                    'avg_ms': round(entry['total_ms'] / entry['runs'], 1),
+                    'max_ms': entry['max_ms'],
+                    'timeouts': entry[STATUS_TIMEOUT],
+                    'errors': entry[STATUS_ERROR],
+                }
+                for name, entry in self._stats.items()
+            }
+
+
+# Global instance
+stage_timing_stats = StageTimingStats()
+
+
+def submit_background(fn: Callable[[], Any]) -> Optional[Any]:
+    """Run ``fn`` off the request path; failures are logged, never raised"""
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"⚠️ Background analysis task failed: {str(e)}")
+    return _executors.background_pool().submit(run)
+
+
+def get_stage_timing_stats() -> Dict[str, Dict[str, Any]]:
+    return stage_timing_stats.get_stats()
@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from ...models import NewsArticle, ArticleSymbol, ArticleMetric
+from ..search.symbol_alias import link_article_symbols
 import pandas as pd
 from datetime import datetime
 import logging
@@ -43,13 +44,17 @@ class NewsBatchProcessor:
             # Create symbol and metric instances
             symbols = []
             metrics = []
+            symbol_ids = link_article_symbols(
+                self.session, {symbol for article in articles for symbol in article['symbols']}
+            )
             
             for article, article_id in zip(articles, article_ids):
                 # Add symbols
                 for symbol in article['symbols']:
                     symbols.append(ArticleSymbol(
                         article_id=article_id,
-                        symbol=symbol
+                        symbol=symbol,
+                        symbol_id=symbol_ids.get(symbol)
                     ))
 
                 # Add metrics
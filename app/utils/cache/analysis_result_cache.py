@@ -0,0 +1,158 @@
+"""
+Memoization of stock analysis results keyed by an input-data fingerprint
+
+The fingerprint covers the request parameters, a hash of the most recent
+price rows and the code version of the analysis pipeline. When a new bar
+arrives the last rows change; when the analysis or chart code changes the
+code hash changes. Either way the old entries are simply never read again
+and expire by TTL.
+
+Analysis outputs (DataFrames, regression results, crossovers, signals) and
+the assembled figure JSON are cached separately: the figure also depends on
+financial metrics and chart layout, so it is rebuilt from cached outputs
+when only the presentation side is missing.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from app.utils.cache.stock_cache import stock_cache
+
+logger = logging.getLogger(__name__)
+
+# Bump to force recomputation when results change without a code change
+ANALYSIS_ALGORITHM_VERSION = "1"
+
+# Trailing price rows hashed into the fingerprint
+FINGERPRINT_ROWS = int(os.getenv('ANALYSIS_FINGERPRINT_ROWS', 5))
+
+ANALYSIS_OUTPUT_TTL = int(os.getenv('ANALYSIS_OUTPUT_TTL', 21600))  # 6 hours
+ANALYSIS_FIGURE_TTL = int(os.getenv('ANALYSIS_FIGURE_TTL', 3600))   # 1 hour (also depends on metrics)
+
+_UTILS_DIR = Path(__file__).resolve().parents[1]
+
+# Source files whose contents version each cached layer
+ANALYSIS_SOURCES = (
+    'analysis/analysis_service.py',
+    'analyzer/stock_analyzer.py',
+)
+FIGURE_SOURCES = ANALYSIS_SOURCES + (
+    'visualization/visualization_service.py',
+    'config/layout_config.py',
+    'config/metrics_config.py',
+    'analyzer/progressive_analysis.py',
+)
+
+
+def _hash_sources(relative_paths) -> str:
+    digest = hashlib.sha1(ANALYSIS_ALGORITHM_VERSION.encode())
+    for relative_path in relative_paths:
+        try:
+            digest.update((_UTILS_DIR / relative_path).read_bytes())
+        except OSError:
+            digest.update(relative_path.encode())
+    return digest.hexdigest()[:10]
+
+
+class AnalysisResultCache:
+    """
+    Fingerprint-keyed cache for analysis outputs and figure JSON with hit-rate tracking
+    """
+
+    def __init__(self):
+        self.cache = stock_cache
+        self.analysis_version = _hash_sources(ANALYSIS_SOURCES)
+        self.figure_version = _hash_sources(FIGURE_SOURCES)
+        self._lock = threading.Lock()
+        self._stats = {
+            'figure_hits': 0, 'figure_misses': 0,
+            'analysis_hits': 0, 'analysis_misses': 0,
+            'stage_hits': 0, 'stage_misses': 0,
+        }
+
+    def fingerprint(self, variant: str, ticker: str, end_date: str, lookback_days: int,
+                    crossover_days: int, price_data: pd.DataFrame) -> str:
+        """Hash of request parameters, the trailing price rows and the algorithm version"""
+        tail = price_data.tail(FINGERPRINT_ROWS)
+        row_hash = hashlib.sha1(pd.util.hash_pandas_object(tail, index=True).values.tobytes()).hexdigest()
+        key_material = '|'.join(str(part) for part in (
+            variant, ticker.upper(), end_date, lookback_days, crossover_days,
+            len(price_data), price_data.index[0] if len(price_data) else '', row_hash,
+        ))
+        return hashlib.sha1(key_material.encode()).hexdigest()[:20]
+
+    def get_analysis(self, ticker: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        outputs = self.cache.get_analysis_object(ticker, 'memo_outputs', f"{self.analysis_version}:{fingerprint}")
+        self._record('analysis', outputs is not None)
+        return outputs
+
+    def set_analysis(self, ticker: str, fingerprint: str, outputs: Dict[str, Any]) -> bool:
+        return self.cache.set_analysis_object(
+            ticker, 'memo_outputs', f"{self.analysis_version}:{fingerprint}", outputs, expire=ANALYSIS_OUTPUT_TTL
+        )
+
+    def get_figure(self, ticker: str, fingerprint: str):
+        """Return the cached plotly Figure, or None"""
+        figure_json = self.cache.get_analysis_object(ticker, 'memo_figure', f"{self.figure_version}:{fingerprint}")
+        if figure_json is None:
+            self._record('figure', False)
+            return None
+        try:
+            import plotly.io as pio
+            figure = pio.from_json(figure_json)
+        except Exception as e:
+            logger.debug(f"Cached figure for {ticker} could not be restored: {str(e)}")
+            self._record('figure', False)
+            return None
+        self._record('figure', True)
+        return figure
+
+    def set_figure(self, ticker: str, fingerprint: str, figure) -> bool:
+        try:
+            figure_json = figure.to_json()
+        except Exception as e:
+            logger.debug(f"Figure for {ticker} is not serializable: {str(e)}")
+            return False
+        return self.cache.set_analysis_object(
+            ticker, 'memo_figure', f"{self.figure_version}:{fingerprint}", figure_json, expire=ANALYSIS_FIGURE_TTL
+        )
+
+    def get_stage(self, ticker: str, fingerprint: str, stage: str) -> Optional[Dict[str, Any]]:
+        """JSON-ready payload of one streamed analysis stage"""
+        payload = self.cache.get_analysis_object(ticker, f'memo_stage:{stage}', f"{self.figure_version}:{fingerprint}")
+        self._record('stage', payload is not None)
+        return payload
+
+    def set_stage(self, ticker: str, fingerprint: str, stage: str, payload: Dict[str, Any],
+                  expire: int = ANALYSIS_OUTPUT_TTL) -> bool:
+        return self.cache.set_analysis_object(
+            ticker, f'memo_stage:{stage}', f"{self.figure_version}:{fingerprint}", payload, expire=expire
+        )
+
+    def _record(self, layer: str, hit: bool):
+        with self._lock:
+            self._stats[f"{layer}_{'hits' if hit else 'misses'}"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        for layer in ('figure', 'analysis', 'stage'):
+            lookups = stats[f'{layer}_hits'] + stats[f'{layer}_misses']
+            stats[f'{layer}_hit_rate'] = round(stats[f'{layer}_hits'] / lookups, 4) if lookups else 0.0
+        stats.update({
+            'analysis_version': self.analysis_version,
+            'figure_version': self.figure_version,
+            'fingerprint_rows': FINGERPRINT_ROWS,
+            'cache_available': self.cache.is_available(),
+        })
+        return stats
+
+
+# Global instance
+analysis_result_cache = AnalysisResultCache()
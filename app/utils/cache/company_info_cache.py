@@ -10,8 +10,15 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 import pandas as pd
 from app.utils.cache.stock_cache import stock_cache
+from app.utils.cache.single_flight import single_flight
+from app.utils.cache.stale_while_revalidate import (
+    serve_cached, record_staleness, miss_metadata, staleness, mark_fresh_for, hard_ttl,
+    without_freshness, FRESH_UNTIL_FIELD
+)
+from app.utils.config.logging_config import get_hot_logger
 
 logger = logging.getLogger(__name__)
+hot_logger = get_hot_logger(__name__)
 
 class CompanyInfoCache:
     """
@@ -93,7 +100,8 @@ class CompanyInfoCache:
         Returns:
         --------
         Dict[str, Any]
-            Company information dictionary
+            Company information dictionary. Cache staleness is not part of it;
+            it is recorded for the request (see ``served_staleness('company_info')``).
         """
         ticker = ticker.upper()
         
@@ -102,26 +110,67 @@ class CompanyInfoCache:
         
         company_info = {}
         missing_categories = []
+        stale_categories = []
         
-        # Check cache for each category
+        # Check cache for all categories in one round trip
+        cached_categories = self._get_cached_categories([ticker], categories)
         for category in categories:
-            cached_data = self._get_cached_category(ticker, category)
+            cached_data = cached_categories.get((ticker, category))
             if cached_data:
-                company_info.update(cached_data)
+                company_info.update(without_freshness(cached_data))
+                if staleness(cached_data)['status'] == 'stale':
+                    stale_categories.append(category)
                 logger.debug(f"🎯 Company info cache hit for {ticker} {category}")
             else:
                 missing_categories.append(category)
         
-        # Fetch missing categories from yfinance
+        # Past the soft TTL: serve what we have, refresh in the background
+        if cached_categories:
+            stalest = min(cached_categories.values(),
+                          key=lambda data: data.get(FRESH_UNTIL_FIELD, float('inf')))
+            serve_cached(
+                'company_info',
+                f"company_info:{ticker}:{','.join(sorted(stale_categories))}",
+                stalest,
+                lambda: self._fetch_and_cache(ticker, stale_categories)
+            )
+        
+        # Fetch missing categories from yfinance (once for concurrent misses)
         if missing_categories:
-            fresh_data = self._fetch_from_yfinance(ticker, missing_categories)
+            fresh_data = single_flight.do(
+                f"company_info:{ticker}:{','.join(sorted(missing_categories))}",
+                lambda: self._fetch_and_cache(ticker, missing_categories)
+            )
             if fresh_data:
                 company_info.update(fresh_data)
-                # Cache the fresh data by category
-                self._cache_by_categories(ticker, fresh_data)
+                if not cached_categories:
+                    record_staleness('company_info', miss_metadata())
         
         return company_info
     
+    def _fetch_and_cache(self, ticker: str, categories: List[str]) -> Dict[str, Any]:
+        """Fetch categories from yfinance and cache them by category"""
+        fresh_data = self._fetch_from_yfinance(ticker, categories)
+        if fresh_data:
+            self._cache_by_categories(ticker, fresh_data)
+        return fresh_data
+    
+    def get_cached_company_info_many(self, tickers: List[str], categories: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached company information for several tickers with a single MGET
+        
+        Only cached data is returned (no yfinance calls); tickers without any
+        cached category are omitted from the result.
+        """
+        tickers = [ticker.upper() for ticker in tickers]
+        if categories is None:
+            categories = list(self.cache_categories.keys())
+        
+        results = {}
+        for (ticker, category), cached_data in self._get_cached_categories(tickers, categories).items():
+            results.setdefault(ticker, {}).update(without_freshness(cached_data))
+        return results
+    
     def get_basic_company_info(self, ticker: str) -> Dict[str, Any]:
         """Get essential company information (most commonly used)"""
         return self.get_company_info(ticker, ['basic_info', 'financial_metrics'])
@@ -155,8 +204,19 @@ class CompanyInfoCache:
         cache_key = f"company:{category}:{ticker}"
         return self.cache.get_json(cache_key)
     
+    def _get_cached_categories(self, tickers: List[str], categories: List[str]) -> Dict[tuple, Dict[str, Any]]:
+        """Get cached data for every (ticker, category) pair in one round trip"""
+        keys = {
+            f"company:{category}:{ticker}": (ticker, category)
+            for ticker in tickers for category in categories
+        }
+        cached = self.cache.get_many(keys.keys())
+        return {keys[key]: value for key, value in cached.items() if value}
+    
     def _cache_by_categories(self, ticker: str, data: Dict[str, Any]):
-        """Cache data organized by categories"""
+        """Cache data organized by categories (one pipelined write, per-category TTLs)"""
+        entries = {}
+        expirations = {}
         for category, config in self.cache_categories.items():
             category_data = {}
             
@@ -173,8 +233,13 @@ class CompanyInfoCache:
                 category_data['_category'] = category
                 category_data['_ticker'] = ticker
                 
-                self.cache.set_json(cache_key, category_data, config['expire'])
-                logger.debug(f"💾 Cached company {category} for {ticker} (expires in {config['expire']}s)")
+                # 'expire' is the soft TTL; stale entries stay servable until the hard TTL
+                entries[cache_key] = mark_fresh_for(category_data, config['expire'])
+                expirations[cache_key] = hard_ttl(config['expire'])
+        
+        if entries:
+            self.cache.set_many(entries, expire=expirations)
+            logger.debug(f"💾 Cached {len(entries)} company info categories for {ticker}")
     
     def _fetch_from_yfinance(self, ticker: str, categories: List[str]) -> Dict[str, Any]:
         """Fetch company information from yfinance"""
@@ -206,7 +271,7 @@ class CompanyInfoCache:
             
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"Error fetching company info for {ticker}: {str(e)} (took {duration:.2f}s)")
+            hot_logger.warning(f"Error fetching company info for {ticker}: {str(e)} (took {duration:.2f}s)")
             return {}
     
     def bulk_cache_company_info(self, tickers: List[str], batch_size: int = 10) -> Dict[str, bool]:
@@ -221,7 +286,14 @@ class CompanyInfoCache:
         for i in range(0, len(tickers), batch_size):
             batch = tickers[i:i + batch_size]
             
+            # One MGET for the whole batch; only uncached tickers hit yfinance
+            cached_batch = self.get_cached_company_info_many(batch)
+            
             for ticker in batch:
+                if ticker.upper() in cached_batch and self._is_fully_cached(cached_batch[ticker.upper()]):
+                    results[ticker] = True
+                    continue
+                
                 try:
                     company_info = self.get_company_info(ticker)
                     results[ticker] = bool(company_info)
@@ -229,10 +301,10 @@ class CompanyInfoCache:
                     if company_info:
                         logger.debug(f"✅ Cached {ticker}: {len(company_info)} fields")
                     else:
-                        logger.warning(f"❌ Failed to cache {ticker}")
+                        hot_logger.warning(f"❌ Failed to cache {ticker}")
                         
                 except Exception as e:
-                    logger.error(f"Error caching {ticker}: {str(e)}")
+                    hot_logger.error(f"Error caching {ticker}: {str(e)}")
                     results[ticker] = False
                 
                 # Brief pause to avoid rate limiting
@@ -248,24 +320,33 @@ class CompanyInfoCache:
         
         return results
     
+    def _is_fully_cached(self, info: Dict[str, Any]) -> bool:
+        """Whether merged cached info contains data from every category"""
+        # _category is overwritten on merge, so check one field per category instead
+        return all(
+            any(field in info for field in config['fields'])
+            for config in self.cache_categories.values()
+        )
+    
     def get_cache_stats(self, ticker: str = None) -> Dict[str, Any]:
         """Get cache statistics for company information"""
         stats = {
             'categories': {},
             'total_cached': 0,
-            'cache_efficiency': {}
+            'cache_efficiency': self.cache.get_tier_stats()
         }
         
         if ticker:
             # Stats for specific ticker
             ticker = ticker.upper()
+            cached_categories = self._get_cached_categories([ticker], list(self.cache_categories))
             for category in self.cache_categories:
-                cache_key = f"company:{category}:{ticker}"
-                cached_data = self.cache.get_json(cache_key)
+                cached_data = cached_categories.get((ticker, category))
                 stats['categories'][category] = {
                     'cached': bool(cached_data),
                     'fields': len(cached_data) if cached_data else 0,
-                    'cached_at': cached_data.get('_cached_at') if cached_data else None
+                    'cached_at': cached_data.get('_cached_at') if cached_data else None,
+                    'stale': staleness(cached_data)['status'] == 'stale' if cached_data else None
                 }
                 if cached_data:
                     stats['total_cached'] += 1
@@ -276,9 +357,7 @@ class CompanyInfoCache:
         """Clear company information cache"""
         if ticker:
             ticker = ticker.upper()
-            for category in self.cache_categories:
-                cache_key = f"company:{category}:{ticker}"
-                self.cache.delete(cache_key)
+            self.cache.delete(*[f"company:{category}:{ticker}" for category in self.cache_categories])
             logger.info(f"🧹 Cleared company cache for {ticker}")
         else:
             # This would require iterating through all keys, which is expensive
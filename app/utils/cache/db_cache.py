@@ -1,4 +1,4 @@
-from .news_cache import NewsCache
+from .news_cache import NewsCache, NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_NEWS_FEED
 from typing import Optional, Dict, List, Any
 import hashlib
 import json
@@ -91,7 +91,7 @@ class DatabaseCache(NewsCache):
         if symbol:
             key_parts.insert(0, symbol)
         key_suffix = ":".join(key_parts)
-        cache_key = f"{self.db_prefix}:recent_articles:{key_suffix}"
+        cache_key = self.namespace_key(NAMESPACE_NEWS_FEED, f"{self.db_prefix}:recent_articles:{key_suffix}")
         
         result = self.get_json(cache_key)
         return result.get('articles') if result else None
@@ -103,7 +103,7 @@ class DatabaseCache(NewsCache):
         if symbol:
             key_parts.insert(0, symbol)
         key_suffix = ":".join(key_parts)
-        cache_key = f"{self.db_prefix}:recent_articles:{key_suffix}"
+        cache_key = self.namespace_key(NAMESPACE_NEWS_FEED, f"{self.db_prefix}:recent_articles:{key_suffix}")
         
         data = {
             'articles': articles,
@@ -169,13 +169,13 @@ class DatabaseCache(NewsCache):
     def get_search_metadata(self, search_params: Dict) -> Optional[Dict]:
         """Get cached search metadata (total counts, facets, etc.)"""
         query_hash = self._generate_query_hash(search_params)
-        cache_key = f"{self.db_prefix}:search_metadata:{query_hash}"
+        cache_key = self.namespace_key(NAMESPACE_SEARCH, f"{self.db_prefix}:search_metadata:{query_hash}")
         return self.get_json(cache_key)
     
     def set_search_metadata(self, search_params: Dict, metadata: Dict, expire: int = 600) -> bool:
         """Cache search metadata (10 minutes default)"""
         query_hash = self._generate_query_hash(search_params)
-        cache_key = f"{self.db_prefix}:search_metadata:{query_hash}"
+        cache_key = self.namespace_key(NAMESPACE_SEARCH, f"{self.db_prefix}:search_metadata:{query_hash}")
         
         data = {
             'metadata': metadata,
@@ -187,13 +187,13 @@ class DatabaseCache(NewsCache):
     # Symbol Lookup Caching
     def get_symbol_suggestions(self, query: str) -> Optional[List[Dict]]:
         """Get cached symbol suggestions"""
-        cache_key = f"{self.db_prefix}:symbol_suggest:{query.lower()}"
+        cache_key = self.namespace_key(NAMESPACE_SUGGESTION, f"{self.db_prefix}:symbol_suggest:{query.lower()}")
         result = self.get_json(cache_key)
         return result.get('suggestions') if result else None
     
     def set_symbol_suggestions(self, query: str, suggestions: List[Dict], expire: int = 3600) -> bool:
         """Cache symbol suggestions (1 hour default)"""
-        cache_key = f"{self.db_prefix}:symbol_suggest:{query.lower()}"
+        cache_key = self.namespace_key(NAMESPACE_SUGGESTION, f"{self.db_prefix}:symbol_suggest:{query.lower()}")
         
         data = {
             'suggestions': suggestions,
@@ -239,29 +239,16 @@ class DatabaseCache(NewsCache):
     
     def invalidate_article_cache(self, symbol: str = None):
         """Invalidate article-related cache entries"""
-        patterns = [
-            f"{self.stats_prefix}:articles:*",
-            f"{self.db_prefix}:recent_articles:*"
-        ]
+        # Recent-article feeds live in a generation namespace: one INCR drops them all
+        self.bump_namespace(NAMESPACE_NEWS_FEED)
+        self.delete_pattern(f"{self.stats_prefix}:articles:*")
         
         if symbol:
-            patterns.extend([
-                f"{self.stats_prefix}:symbol_processing:{symbol}",
-                f"{self.db_prefix}:recent_articles:{symbol}:*"
-            ])
-        
-        for pattern in patterns:
-            self.delete_pattern(pattern)
+            self.delete(f"{self.stats_prefix}:symbol_processing:{symbol}")
     
     def invalidate_search_cache(self):
         """Invalidate search-related cache entries"""
-        patterns = [
-            f"{self.db_prefix}:search_metadata:*",
-            f"{self.db_prefix}:symbol_suggest:*"
-        ]
-        
-        for pattern in patterns:
-            self.delete_pattern(pattern)
+        self.bump_namespace(NAMESPACE_SEARCH, NAMESPACE_SUGGESTION)
     
     def invalidate_admin_cache(self):
         """Invalidate admin dashboard cache"""
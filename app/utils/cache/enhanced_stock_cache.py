@@ -68,7 +68,7 @@ class EnhancedStockCache(StockCache):
                 'rows': len(data)
             }
             
-            success = self.set_json(cache_key, cache_data, expire)
+            success = self.set_json(cache_key, cache_data, expire, tags=[self.ticker_tag(ticker)])
             if success:
                 logger.info(f"💾 Cached yfinance data: {ticker} {period} {interval} ({len(data)} rows)")
             return success
@@ -116,7 +116,7 @@ class EnhancedStockCache(StockCache):
                 'cached_at': datetime.now().isoformat()
             }
             
-            success = self.set_json(cache_key, cache_data, expire)
+            success = self.set_json(cache_key, cache_data, expire, tags=[self.ticker_tag(ticker)])
             if success:
                 logger.info(f"💾 Cached multi-period analysis: {ticker} {period}")
             return success
@@ -154,7 +154,7 @@ class EnhancedStockCache(StockCache):
                 'cached_at': datetime.now().isoformat()
             }
             
-            success = self.set_json(cache_key, cache_data, expire)
+            success = self.set_json(cache_key, cache_data, expire, tags=[self.ticker_tag(ticker)])
             if success:
                 logger.info(f"💾 Cached complete analysis: {ticker} {period}")
             return success
@@ -194,7 +194,7 @@ class EnhancedStockCache(StockCache):
                 'cached_at': datetime.now().isoformat()
             }
             
-            success = self.set_json(cache_key, cache_data, expire)
+            success = self.set_json(cache_key, cache_data, expire, tags=[self.ticker_tag(ticker)])
             if success:
                 logger.info(f"💾 Cached Plotly figure: {ticker} {period} {chart_type}")
             return success
@@ -234,7 +234,7 @@ class EnhancedStockCache(StockCache):
             perf_data['last_updated'] = datetime.now().isoformat()
             
             # Cache performance data for 24 hours
-            self.set_json(perf_key, perf_data, expire=86400)
+            self.set_json(perf_key, perf_data, expire=86400, tags=[self.ticker_tag(ticker)])
             
         except Exception as e:
             logger.error(f"Error tracking performance: {str(e)}")
@@ -262,20 +262,13 @@ class EnhancedStockCache(StockCache):
     
     def invalidate_ticker_cache(self, ticker: str):
         """Invalidate all cache entries for a ticker"""
-        ticker = ticker.upper()
-        patterns = [
-            f"{self.yfinance_prefix}:*:{ticker}:*",
-            f"{self.analysis_prefix}:*:{ticker}:*", 
-            f"{self.visualization_prefix}:*:{ticker}:*",
-            f"{self.performance_prefix}:*:{ticker}:*"
-        ]
-        
-        for pattern in patterns:
-            try:
-                self.delete_pattern(pattern)
-                logger.info(f"💥 Invalidated cache pattern: {pattern}")
-            except Exception as e:
-                logger.error(f"Error invalidating cache pattern {pattern}: {str(e)}")
+        try:
+            removed = self.invalidate_tags(self.ticker_tag(ticker))
+            logger.info(f"💥 Invalidated {removed} cache entries for {ticker.upper()}")
+            return removed
+        except Exception as e:
+            logger.error(f"Error invalidating cache for {ticker}: {str(e)}")
+            return 0
     
     def warm_popular_stocks(self, tickers: List[str], periods: List[str] = None):
         """Warm cache for popular stocks (would be called by background job)"""
@@ -319,6 +312,7 @@ class EnhancedStockCache(StockCache):
                 self.visualization_prefix,
                 self.performance_prefix
             ],
+            'tiers': self.get_tier_stats(),
             'status': 'operational' if self.is_available() else 'unavailable'
         }
 
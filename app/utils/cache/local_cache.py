@@ -0,0 +1,323 @@
+# app/utils/cache/local_cache.py
+
+"""
+In-process LRU/TTL cache tier that sits in front of Redis.
+
+Every gunicorn worker keeps its own bounded copy of small, hot cache entries
+(company names, ticker metadata, user records, ...) so repeated reads skip the
+Redis round-trip. Entries hold the serialized payload and every hit decodes
+its own copy, so callers may mutate what they get back without affecting
+other threads. Writes and invalidations are broadcast over Redis pub/sub so
+all workers evict consistently.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import fnmatch
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Thread-safe LRU cache bounded by total payload bytes with per-entry TTL.
+
+    Values are stored decoded and returned as-is, so callers must treat them
+    as read-only (copy before mutating).
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_item_bytes: int = 64 * 1024,
+                 default_ttl: int = 60):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """Return the cached value or ``default`` (a private sentinel if omitted)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[int] = None) -> bool:
+        """Store a value; ``size`` is the serialized payload length in bytes"""
+        if size > self.max_item_bytes or size > self.max_bytes:
+            # Too large for the local tier - make sure no stale copy survives
+            self.delete(key)
+            return False
+
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if ttl <= 0:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._invalidations += 1
+                return True
+        return False
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            self._invalidations += removed
+        return removed
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Evict keys matching a Redis-style glob pattern"""
+        with self._lock:
+            matched = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+            for key in matched:
+                self._remove(key)
+            self._invalidations += len(matched)
+        return len(matched)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def _remove(self, key: str):
+        # Caller must hold the lock
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'max_item_bytes': self.max_item_bytes,
+                'default_ttl': self.default_ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
+
+
+class TierStats:
+    """Per-tier hit counters for the two-tier cache (local -> redis -> miss)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.local_hits = 0
+            self.redis_hits = 0
+            self.misses = 0
+
+    def record(self, tier: str):
+        with self._lock:
+            if tier == 'local':
+                self.local_hits += 1
+            elif tier == 'redis':
+                self.redis_hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.local_hits + self.redis_hits + self.misses
+            redis_lookups = self.redis_hits + self.misses
+            return {
+                'lookups': total,
+                'local_hits': self.local_hits,
+                'redis_hits': self.redis_hits,
+                'misses': self.misses,
+                'local_hit_ratio': round(self.local_hits / total, 4) if total else 0.0,
+                'redis_hit_ratio': round(self.redis_hits / redis_lookups, 4) if redis_lookups else 0.0,
+                'overall_hit_ratio': round((self.local_hits + self.redis_hits) / total, 4) if total else 0.0,
+            }
+
+
+class CacheInvalidationBus:
+    """Broadcasts local-tier invalidations to every worker over Redis pub/sub"""
+
+    def __init__(self, cache: LocalLRUCache, channel: str = INVALIDATION_CHANNEL):
+        self.cache = cache
+        self.channel = channel
+        self.origin = self._new_origin()
+        self._listener_thread = None
+        self._listener_lock = threading.Lock()
+        self._messages_received = 0
+        self._messages_published = 0
+
+    @staticmethod
+    def _new_origin() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def publish(self, redis_client, keys: Iterable[str] = None, pattern: str = None) -> bool:
+        """Tell the other workers to drop keys (or a pattern) from their local tier"""
+        if redis_client is None:
+            return False
+        message = {'origin': self.origin}
+        if keys:
+            message['keys'] = list(keys)
+        if pattern:
+            message['pattern'] = pattern
+        if len(message) == 1:
+            return False
+        try:
+            redis_client.publish(self.channel, json.dumps(message))
+            self._messages_published += 1
+            return True
+        except Exception as e:
+            logger.debug(f"Cache invalidation publish failed: {str(e)}")
+            return False
+
+    def ensure_listener(self, redis_client) -> bool:
+        """Start the subscriber thread for this process if it is not running"""
+        if redis_client is None:
+            return False
+        if self._listener_thread is not None and self._listener_thread.is_alive():
+            return True
+        with self._listener_lock:
+            if self._listener_thread is not None and self._listener_thread.is_alive():
+                return True
+            self._listener_thread = threading.Thread(
+                target=self._listen,
+                args=(redis_client,),
+                name="cache-invalidation-listener",
+                daemon=True
+            )
+            self._listener_thread.start()
+            return True
+
+    def _listen(self, redis_client):
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.handle_message(message.get('data'))
+            except Exception as e:
+                # Evict everything: while disconnected we may have missed invalidations
+                self.cache.clear()
+                logger.debug(f"Cache invalidation listener error: {str(e)}; retrying in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def handle_message(self, data) -> int:
+        """Apply an invalidation message received from another worker"""
+        try:
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return 0
+
+        if message.get('origin') == self.origin:
+            return 0
+
+        self._messages_received += 1
+        removed = 0
+        if message.get('keys'):
+            removed += self.cache.delete_many(message['keys'])
+        if message.get('pattern'):
+            removed += self.cache.delete_pattern(message['pattern'])
+        return removed
+
+    def reset_after_fork(self):
+        """Forked children inherit no threads and must not reuse the parent's origin id"""
+        self.origin = self._new_origin()
+        self._listener_thread = None
+        self._listener_lock = threading.Lock()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'channel': self.channel,
+            'origin': self.origin,
+            'listener_alive': bool(self._listener_thread and self._listener_thread.is_alive()),
+            'messages_published': self._messages_published,
+            'messages_received': self._messages_received,
+        }
+
+
+LOCAL_CACHE_ENABLED = os.getenv('LOCAL_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Process-wide instances shared by every NewsCache subclass
+local_cache = LocalLRUCache(
+    max_bytes=int(os.getenv('LOCAL_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    max_item_bytes=int(os.getenv('LOCAL_CACHE_MAX_ITEM_BYTES', 64 * 1024)),
+    default_ttl=int(os.getenv('LOCAL_CACHE_TTL', 60))
+)
+tier_stats = TierStats()
+invalidation_bus = CacheInvalidationBus(local_cache)
+
+
+def _after_fork_in_child():
+    local_cache.clear()
+    tier_stats.reset()
+    invalidation_bus.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_local_tier_stats() -> Dict[str, Any]:
+    """Combined stats for the local tier, per-tier hit ratios and the pub/sub bus"""
+    return {
+        'enabled': LOCAL_CACHE_ENABLED,
+        'local': local_cache.get_stats(),
+        'tiers': tier_stats.snapshot(),
+        'invalidation': invalidation_bus.get_stats(),
+    }
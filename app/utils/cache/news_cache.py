@@ -1,94 +1,146 @@
 # app/utils/cache/news_cache.py
 
-from redis import Redis, ConnectionError, RedisError
+from redis import ConnectionError, Redis, RedisError
 import json
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Iterable, Union
+from contextlib import contextmanager
+from functools import cached_property
 import pickle
+import threading
+import time
 from datetime import timedelta
-import os
 import logging
 
+from .local_cache import local_cache, tier_stats, invalidation_bus, get_local_tier_stats, LOCAL_CACHE_ENABLED
+from .redis_pool import (
+    CircuitBreaker, get_redis_client, get_circuit_breaker, get_pool_stats, redis_pool_manager, NO_TIMEOUT
+)
+
 logger = logging.getLogger(__name__)
 
+# Tag sets must not expire before the keys they index
+TAG_SET_MIN_TTL = 86400
+# Tag sets used to be plain sets under this prefix; still read until they expire
+LEGACY_TAG_PREFIX = 'tag:'
+
+# Namespaces invalidated by bumping a generation counter (see NewsCache.namespace_key)
+NAMESPACE_SEARCH = 'search'
+NAMESPACE_SUGGESTION = 'suggestion'
+NAMESPACE_STOCK_ANALYSIS = 'stock_analysis'
+NAMESPACE_NEWS_FEED = 'news_feed'
+CACHE_NAMESPACES = (NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_STOCK_ANALYSIS, NAMESPACE_NEWS_FEED)
+
+# Seconds a worker reuses its local copy of a generation; bumps are also broadcast
+NAMESPACE_GENERATION_LOCAL_TTL = 5
+
+# Per-thread buffer used by NewsCache.batched_writes()
+_deferred_writes = threading.local()
+
 class NewsCache:
+    # Consult the per-process LRU tier before Redis (see local_cache.py)
+    use_local_tier = LOCAL_CACHE_ENABLED
+
     def __init__(self):
-        """Initialize Redis cache connection with error handling"""
-        self.redis_available = False
-        self.redis = None
-        self.binary_redis = None
-        
-        try:
-            # Redis connection using environment variable or default
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-            logger.info("🔄 Connecting to Redis using Coolify URL...")
-            
-            try:
-                # Connect using the provided Redis URL
-                self.redis = Redis.from_url(redis_url, decode_responses=True)
-                self.binary_redis = Redis.from_url(redis_url, decode_responses=False)
-                
-                # Test connection
-                self.redis.ping()
-                self.redis_available = True
-                logger.info("✅ Redis connected successfully using Coolify URL")
-                
-            except Exception as e:
-                logger.debug(f"❌ Coolify Redis URL connection failed: {str(e)}")
-                
-                # Fallback to localhost for development
-                try:
-                    logger.info("🔄 Falling back to localhost for development...")
-                    self.redis = Redis(host='localhost', port=6379, db=0, decode_responses=True)
-                    self.binary_redis = Redis(host='localhost', port=6379, db=0)
-                    
-                    # Test connection
-                    self.redis.ping()
-                    self.redis_available = True
-                    logger.info("✅ Redis connected successfully: localhost:6379")
-                    
-                except Exception as e2:
-                    logger.debug(f"❌ localhost connection failed: {str(e2)}")
-                    raise ConnectionError("Redis connection failed on both Coolify URL and localhost")
-            
-        except (ConnectionError, RedisError, Exception) as e:
-            logger.warning(f"⚠️ Redis cache unavailable: {str(e)}. Operating without cache.")
-            self.redis_available = False
-            self.redis = None
-            self.binary_redis = None
+        """Use the shared Redis connection pool (no per-instance PING)"""
+        self._breaker = get_circuit_breaker()
+
+    # Clients are fetched on first use, so module-level caches do not connect at import
+    @cached_property
+    def redis(self) -> Redis:
+        return get_redis_client(decode_responses=True)
+
+    @cached_property
+    def binary_redis(self) -> Redis:
+        return get_redis_client(decode_responses=False)
+
+    @property
+    def redis_available(self) -> bool:
+        """False while the shared circuit breaker is open, so calls fail fast
+
+        Only looks at the state: the half-open probe is claimed (allow_request)
+        by the method that actually talks to Redis, which then reports back.
+        """
+        return self._breaker.state != CircuitBreaker.OPEN
 
     def is_available(self) -> bool:
         """Check if Redis is available"""
         return self.redis_available
 
+    def _on_redis_success(self):
+        """Close a half-open circuit and make sure this worker hears invalidations"""
+        self._breaker.record_success()
+        if self.use_local_tier:
+            invalidation_bus.ensure_listener(get_redis_client(decode_responses=True, socket_timeout=NO_TIMEOUT))
+
     def get_json(self, key: str) -> Optional[Any]:
         """Get JSON data from cache with error handling"""
+        buffer = getattr(_deferred_writes, 'buffer', None)
+        if buffer and key in buffer:
+            return buffer[key][0]
+
         if not self.redis_available:
             return None
-            
+
+        if self.use_local_tier:
+            data = local_cache.get(key, None)
+            if data is not None:
+                tier_stats.record('local')
+                # The tier keeps the payload, so every caller decodes a copy it may mutate
+                return json.loads(data)
+
+        if not self._breaker.allow_request():
+            return None
+
         try:
             data = self.redis.get(key)
+            self._on_redis_success()
             if data:
-                return json.loads(data)
+                value = json.loads(data)
+                tier_stats.record('redis')
+                if self.use_local_tier:
+                    local_cache.set(key, data, len(data))
+                return value
+            tier_stats.record('miss')
         except (ConnectionError, RedisError, json.JSONDecodeError) as e:
             logger.debug(f"Cache get error for key {key}: {str(e)}")
             if "Authentication required" in str(e):
                 logger.debug("Redis authentication required - disabling cache")
-            self._handle_connection_error()
+            self._handle_connection_error(e)
         return None
 
-    def set_json(self, key: str, value: Any, expire: int = 3600) -> bool:
-        """Set JSON data in cache with expiration and error handling"""
-        if not self.redis_available:
+    def set_json(self, key: str, value: Any, expire: int = 3600, tags: Iterable[str] = None) -> bool:
+        """Set JSON data in cache with expiration and error handling
+
+        ``tags`` registers the key in tag sets so it can later be dropped with
+        invalidate_tags() instead of a keyspace scan.
+        """
+        buffer = getattr(_deferred_writes, 'buffer', None)
+        if buffer is not None:
+            buffer[key] = (value, expire, tags)
+            return True
+
+        if not self._breaker.allow_request():
             return False
             
         try:
-            self.redis.set(key, json.dumps(value), ex=expire)
+            payload = json.dumps(value)
+            if tags:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(key, payload, ex=expire)
+                self._add_to_tags(pipe, key, tags, expire)
+                pipe.execute()
+            else:
+                self.redis.set(key, payload, ex=expire)
+            self._on_redis_success()
+            if self.use_local_tier:
+                local_cache.set(key, payload, len(payload), expire)
+                invalidation_bus.publish(self.redis, keys=[key])
             return True
-        except (ConnectionError, RedisError, json.JSONEncodeError) as e:
+        except (ConnectionError, RedisError, TypeError, ValueError) as e:
             logger.debug(f"Cache set error for key {key}: {str(e)}")
             if "Authentication required" in str(e):
                 logger.debug("Redis authentication required - disabling cache")
-            self._handle_connection_error()
+            self._handle_connection_error(e)
             return False
 
     def get_object(self, key: str) -> Optional[Any]:
@@ -96,49 +148,353 @@ class NewsCache:
         if not self.redis_available:
             return None
             
+        if self.use_local_tier:
+            data = local_cache.get(key, None)
+            if data is not None:
+                tier_stats.record('local')
+                return pickle.loads(data)
+
+        if not self._breaker.allow_request():
+            return None
+
         try:
             data = self.binary_redis.get(key)
+            self._on_redis_success()
             if data:
-                return pickle.loads(data)
+                value = pickle.loads(data)
+                tier_stats.record('redis')
+                if self.use_local_tier:
+                    local_cache.set(key, data, len(data))
+                return value
+            tier_stats.record('miss')
         except (ConnectionError, RedisError, pickle.PickleError) as e:
             logger.debug(f"Cache get object error for key {key}: {str(e)}")
-            self._handle_connection_error()
+            self._handle_connection_error(e)
         return None
 
-    def set_object(self, key: str, value: Any, expire: int = 3600) -> bool:
+    def set_object(self, key: str, value: Any, expire: int = 3600, tags: Iterable[str] = None) -> bool:
         """Set pickled object in cache with expiration and error handling"""
-        if not self.redis_available:
+        if not self._breaker.allow_request():
             return False
             
         try:
-            self.binary_redis.set(key, pickle.dumps(value), ex=expire)
+            payload = pickle.dumps(value)
+            self.binary_redis.set(key, payload, ex=expire)
+            if tags:
+                pipe = self.redis.pipeline(transaction=False)
+                self._add_to_tags(pipe, key, tags, expire)
+                pipe.execute()
+            self._on_redis_success()
+            if self.use_local_tier:
+                local_cache.set(key, payload, len(payload), expire)
+                invalidation_bus.publish(self.redis, keys=[key])
             return True
         except (ConnectionError, RedisError, pickle.PickleError) as e:
             logger.debug(f"Cache set object error for key {key}: {str(e)}")
-            self._handle_connection_error()
+            self._handle_connection_error(e)
             return False
 
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several JSON values in one MGET round trip; missing keys are omitted"""
+        keys = list(dict.fromkeys(keys))
+        results = {}
+        if not keys or not self.redis_available:
+            return results
+
+        remote_keys = []
+        for key in keys:
+            data = local_cache.get(key, None) if self.use_local_tier else None
+            if data is not None:
+                tier_stats.record('local')
+                results[key] = json.loads(data)
+            else:
+                remote_keys.append(key)
+
+        if not remote_keys or not self._breaker.allow_request():
+            return results
+
+        try:
+            payloads = self.redis.mget(remote_keys)
+            self._on_redis_success()
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache get_many error for {len(remote_keys)} keys: {str(e)}")
+            self._handle_connection_error(e)
+            return results
+
+        for key, data in zip(remote_keys, payloads):
+            if not data:
+                tier_stats.record('miss')
+                continue
+            try:
+                value = json.loads(data)
+            except json.JSONDecodeError:
+                tier_stats.record('miss')
+                continue
+            tier_stats.record('redis')
+            results[key] = value
+            if self.use_local_tier:
+                local_cache.set(key, data, len(data))
+        return results
+
+    def set_many(self, mapping: Dict[str, Any], expire: Union[int, Dict[str, int]] = 3600,
+                 tags: Union[Iterable[str], Dict[str, Iterable[str]]] = None) -> bool:
+        """Set several JSON values with one pipelined round trip
+
+        ``expire`` is either a single TTL or a dict of per-key TTLs (keys
+        missing from the dict fall back to one hour). ``tags`` is either a
+        list applied to every key or a dict of per-key tag lists.
+        """
+        if not mapping or not self._breaker.allow_request():
+            return False
+
+        try:
+            payloads = {}
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                ttl = expire.get(key, 3600) if isinstance(expire, dict) else expire
+                payload = json.dumps(value)
+                payloads[key] = (payload, ttl)
+                pipe.setex(key, ttl, payload)
+                key_tags = tags.get(key) if isinstance(tags, dict) else tags
+                if key_tags:
+                    self._add_to_tags(pipe, key, key_tags, ttl)
+            pipe.execute()
+            self._on_redis_success()
+        except (ConnectionError, RedisError, TypeError, ValueError) as e:
+            logger.debug(f"Cache set_many error for {len(mapping)} keys: {str(e)}")
+            self._handle_connection_error(e)
+            return False
+
+        if self.use_local_tier:
+            for key, (payload, ttl) in payloads.items():
+                local_cache.set(key, payload, len(payload), ttl)
+            invalidation_bus.publish(self.redis, keys=list(mapping))
+        return True
+
+    @contextmanager
+    def batched_writes(self):
+        """Buffer set_json calls made in this thread and flush them with one set_many
+
+        Applies to every NewsCache instance used inside the block, so code that
+        creates its own cache (e.g. OptimizedNewsSearch) is batched as well.
+        """
+        if getattr(_deferred_writes, 'buffer', None) is not None:
+            # Nested block: the outermost one flushes
+            yield
+            return
+
+        _deferred_writes.buffer = {}
+        try:
+            yield
+        finally:
+            buffer = _deferred_writes.buffer
+            _deferred_writes.buffer = None
+            if buffer:
+                self.set_many(
+                    {key: value for key, (value, _, _) in buffer.items()},
+                    expire={key: ttl for key, (_, ttl, _) in buffer.items()},
+                    tags={key: key_tags for key, (_, _, key_tags) in buffer.items() if key_tags}
+                )
+                logger.debug(f"Flushed {len(buffer)} batched cache writes")
+
     def build_key(self, *args) -> str:
         """Build cache key from arguments"""
         return ':'.join(str(arg) for arg in args)
 
+    def delete(self, *keys: str) -> bool:
+        """Delete specific keys from both cache tiers"""
+        if not keys:
+            return False
+
+        if self.use_local_tier:
+            local_cache.delete_many(keys)
+
+        if not self._breaker.allow_request():
+            return False
+
+        try:
+            self.redis.delete(*keys)
+            self._on_redis_success()
+            if self.use_local_tier:
+                invalidation_bus.publish(self.redis, keys=keys)
+            return True
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache delete error for keys {keys}: {str(e)}")
+            self._handle_connection_error(e)
+            return False
+
+    @staticmethod
+    def tag_key(tag: str) -> str:
+        return f"tagz:{tag}"
+
+    def _add_to_tags(self, pipe, key: str, tags: Iterable[str], expire: int):
+        """Queue ZADD for each tag set, scored by when the member expires
+
+        Members that have expired on their own are trimmed on every write,
+        so tags that are never invalidated do not grow without bound.
+        """
+        now = time.time()
+        for tag in tags:
+            tag_key = self.tag_key(tag)
+            pipe.zadd(tag_key, {key: now + expire})
+            pipe.zremrangebyscore(tag_key, '-inf', now)
+            pipe.expire(tag_key, max(expire, TAG_SET_MIN_TTL))
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under the given tags with one pipelined UNLINK
+
+        Returns the number of member keys removed.
+        """
+        if not tags or not self._breaker.allow_request():
+            return 0
+
+        try:
+            tag_keys = [self.tag_key(tag) for tag in tags]
+            legacy_keys = [f"{LEGACY_TAG_PREFIX}{tag}" for tag in tags]
+            pipe = self.redis.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.zrangebyscore(tag_key, time.time(), '+inf')
+            for legacy_key in legacy_keys:
+                pipe.smembers(legacy_key)
+            members = set()
+            for tag_members in pipe.execute():
+                members.update(tag_members or ())
+
+            pipe = self.redis.pipeline(transaction=False)
+            if members:
+                pipe.unlink(*members)
+            pipe.unlink(*tag_keys, *legacy_keys)
+            pipe.execute()
+            self._on_redis_success()
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache tag invalidation error for {tags}: {str(e)}")
+            self._handle_connection_error(e)
+            return 0
+
+        if members and self.use_local_tier:
+            local_cache.delete_many(members)
+            invalidation_bus.publish(self.redis, keys=members)
+        logger.debug(f"Invalidated {len(members)} cache keys for tags: {', '.join(tags)}")
+        return len(members)
+
     def delete_pattern(self, pattern: str) -> bool:
-        """Delete all keys matching pattern with error handling"""
-        if not self.redis_available:
+        """Delete all keys matching pattern with error handling
+
+        Prefer invalidate_tags(); this still walks the keyspace with SCAN,
+        but unlinks matches in pipelined batches instead of one DEL per key.
+        """
+        if self.use_local_tier:
+            local_cache.delete_pattern(pattern)
+
+        if not self._breaker.allow_request():
             return False
             
         try:
             deleted_count = 0
-            for key in self.redis.scan_iter(pattern):
-                self.redis.delete(key)
-                deleted_count += 1
+            batch = []
+            for key in self.redis.scan_iter(pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.redis.unlink(*batch)
+                    deleted_count += len(batch)
+                    batch = []
+            if batch:
+                self.redis.unlink(*batch)
+                deleted_count += len(batch)
+            self._on_redis_success()
+            if self.use_local_tier:
+                invalidation_bus.publish(self.redis, pattern=pattern)
             logger.debug(f"Deleted {deleted_count} cache keys matching pattern: {pattern}")
             return True
         except (ConnectionError, RedisError) as e:
             logger.debug(f"Cache delete pattern error for {pattern}: {str(e)}")
-            self._handle_connection_error()
+            self._handle_connection_error(e)
             return False
             
+    @staticmethod
+    def generation_key(namespace: str) -> str:
+        return f"ns:gen:{namespace}"
+
+    def get_generation(self, namespace: str) -> Optional[int]:
+        """Current generation of a cache namespace, or None if Redis is unavailable"""
+        gen_key = self.generation_key(namespace)
+        if self.use_local_tier:
+            generation = local_cache.get(gen_key, None)
+            if generation is not None:
+                return generation
+
+        if not self._breaker.allow_request():
+            return None
+
+        try:
+            value = self.redis.get(gen_key)
+            if value is None:
+                # Seed from the clock so a lost counter never rewinds onto live keys
+                self.redis.set(gen_key, int(time.time()), nx=True)
+                value = self.redis.get(gen_key)
+            generation = int(value)
+            self._on_redis_success()
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache generation lookup error for {namespace}: {str(e)}")
+            self._handle_connection_error(e)
+            return None
+
+        if self.use_local_tier:
+            local_cache.set(gen_key, generation, len(gen_key) + 16, ttl=NAMESPACE_GENERATION_LOCAL_TTL)
+        return generation
+
+    def namespace_key(self, namespace: str, key: str) -> str:
+        """Embed the namespace generation in a key: ``ns:{namespace}:{generation}:{key}``
+
+        Bumping the generation orphans every key of the namespace at once;
+        the old entries are never read again and simply expire by TTL.
+        """
+        generation = self.get_generation(namespace)
+        # Generation 0 is never live (counters are seeded from the clock), and
+        # without Redis nothing is read or written under it anyway
+        return f"ns:{namespace}:{generation or 0}:{key}"
+
+    def bump_namespace(self, *namespaces: str) -> Dict[str, int]:
+        """Invalidate whole namespaces in O(1) by incrementing their generations"""
+        if not namespaces or not self._breaker.allow_request():
+            return {}
+
+        gen_keys = [self.generation_key(namespace) for namespace in namespaces]
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            now = int(time.time())
+            for gen_key in gen_keys:
+                pipe.set(gen_key, now, nx=True)
+                pipe.incr(gen_key)
+            results = pipe.execute()
+            self._on_redis_success()
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache namespace bump error for {namespaces}: {str(e)}")
+            self._handle_connection_error(e)
+            return {}
+
+        if self.use_local_tier:
+            local_cache.delete_many(gen_keys)
+            invalidation_bus.publish(self.redis, keys=gen_keys)
+
+        generations = {namespace: int(results[i * 2 + 1]) for i, namespace in enumerate(namespaces)}
+        logger.info(f"🔄 Bumped cache namespaces: {', '.join(f'{ns}={gen}' for ns, gen in generations.items())}")
+        return generations
+
+    def get_namespace_generations(self) -> Dict[str, Optional[int]]:
+        """Current generation of every known namespace (None if never bumped)"""
+        if not self._breaker.allow_request():
+            return {}
+        try:
+            values = self.redis.mget([self.generation_key(namespace) for namespace in CACHE_NAMESPACES])
+            self._on_redis_success()
+        except (ConnectionError, RedisError) as e:
+            logger.debug(f"Cache namespace stats error: {str(e)}")
+            self._handle_connection_error(e)
+            return {}
+        return {namespace: int(value) if value is not None else None
+                for namespace, value in zip(CACHE_NAMESPACES, values)}
+
     def get_or_set(self, key: str, callback, expire: int = 3600):
         """Get from cache or set if not exists with error handling"""
         if not self.redis_available:
@@ -155,20 +511,31 @@ class NewsCache:
             logger.debug(f"Cache get_or_set error for key {key}: {str(e)}")
             return callback()
     
-    def _handle_connection_error(self):
-        """Handle Redis connection errors by marking cache as unavailable"""
-        if self.redis_available:
-            logger.warning("🔄 Redis connection lost, disabling cache")
-            self.redis_available = False
+    def get_tier_stats(self) -> dict:
+        """Hit ratios for the local LRU tier and Redis tier"""
+        stats = get_local_tier_stats()
+        stats['redis_available'] = self.redis_available
+        return stats
+
+    def get_pool_stats(self) -> dict:
+        """Shared connection pool usage and circuit breaker state"""
+        return get_pool_stats()
+
+    def _handle_connection_error(self, error: Exception = None):
+        """Record a Redis failure; the circuit breaker decides when to stop calling Redis"""
+        if isinstance(error, (ValueError, TypeError, pickle.PickleError)):
+            # Bad payload, not a connection problem
+            return
+        was_open = self._breaker.is_open
+        self._breaker.record_failure(error)
+        if self._breaker.is_open and not was_open:
+            logger.warning("🔄 Redis connection lost, failing fast until health check succeeds")
+        redis_pool_manager.ensure_health_thread()
             
     def reconnect(self) -> bool:
         """Attempt to reconnect to Redis"""
-        try:
-            if self.redis:
-                self.redis.ping()
-                self.redis_available = True
-                logger.info("✅ Redis cache reconnected successfully")
-                return True
-        except (ConnectionError, RedisError) as e:
-            logger.debug(f"Redis reconnection failed: {str(e)}")
-        return False
\ No newline at end of file
+        if redis_pool_manager.check_health():
+            logger.info("✅ Redis cache reconnected successfully")
+            return True
+        logger.debug("Redis reconnection failed")
+        return False
@@ -7,12 +7,20 @@ import time
 import logging
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple, List
+from typing import Callable, Dict, Optional, Tuple, List
 import pandas as pd
 from app.utils.cache.enhanced_stock_cache import enhanced_stock_cache
+from app.utils.cache.news_cache import NAMESPACE_STOCK_ANALYSIS
+from app.utils.cache.stale_while_revalidate import (
+    serve_cached, mark_fresh_for, hard_ttl, FRESH_UNTIL_FIELD
+)
 
 logger = logging.getLogger(__name__)
 
+# Soft TTLs of the two partitions; stale partitions are served until hard_ttl()
+HISTORICAL_PARTITION_TTL = 86400  # 24 hours
+RECENT_PARTITION_TTL = 300        # 5 minutes
+
 class LongPeriodAnalysisCache:
     """
     Specialized caching for long-period analysis with smart data partitioning
@@ -21,15 +29,19 @@ class LongPeriodAnalysisCache:
     def __init__(self):
         self.cache = enhanced_stock_cache
         
-    def get_partitioned_data(self, ticker: str, lookback_days: int, end_date: str) -> Tuple[Optional[pd.DataFrame], bool]:
+    def get_partitioned_data(self, ticker: str, lookback_days: int, end_date: str,
+                             loader: Callable[[], pd.DataFrame] = None) -> Tuple[Optional[pd.DataFrame], bool]:
         """
         Get historical data using partitioned caching strategy
         
         Strategy:
-        1. Historical data (older than 2 days): Cache for 24 hours
-        2. Recent data (last 2 days): Cache for 5 minutes  
+        1. Historical data (older than 2 days): Fresh for 24 hours
+        2. Recent data (last 2 days): Fresh for 5 minutes  
         3. Combine cached historical + fresh recent data
         
+        Past their soft TTL partitions are still returned; if ``loader`` is
+        given it re-fetches the full range in the background.
+        
         Returns:
         --------
         Tuple[pd.DataFrame, bool]: (data, was_fully_cached)
@@ -41,17 +53,27 @@ class LongPeriodAnalysisCache:
             # Split into historical (stable) and recent (changing) parts
             cutoff_date = end_dt - timedelta(days=2)
             
-            # Try to get historical part (stable, long cache)
-            historical_data = self._get_historical_partition(ticker, start_dt, cutoff_date)
+            # Fetch historical (stable, long cache) and recent (volatile, short cache)
+            # parts in a single MGET round trip
+            historical_key = self._historical_key(ticker, start_dt, cutoff_date)
+            recent_key = self._recent_key(ticker, cutoff_date, end_dt)
+            cached = self.cache.get_many([historical_key, recent_key])
             
-            # Try to get recent part (volatile, short cache)  
-            recent_data = self._get_recent_partition(ticker, cutoff_date, end_dt)
+            historical_data = self._partition_to_dataframe(cached.get(historical_key))
+            recent_data = self._partition_to_dataframe(cached.get(recent_key))
             
             # Combine cached parts
             if historical_data is not None and recent_data is not None:
                 combined_data = pd.concat([historical_data, recent_data])
                 combined_data = combined_data.sort_index()
                 logger.info(f"📊 Partitioned cache hit for {ticker}: {len(combined_data)} rows")
+                if loader is not None:
+                    stalest = min((cached[historical_key], cached[recent_key]),
+                                  key=lambda payload: payload.get(FRESH_UNTIL_FIELD, float('inf')))
+                    serve_cached(
+                        'long_period_data', f"long_period:{ticker}:{lookback_days}:{end_date}", stalest,
+                        lambda: self._refresh_partitioned_data(ticker, loader, lookback_days, end_date)
+                    )
                 return combined_data, True
             
             # If either part missing, return None for full fetch
@@ -67,6 +89,7 @@ class LongPeriodAnalysisCache:
         """
         try:
             end_dt = pd.to_datetime(end_date)
+            start_dt = end_dt - timedelta(days=lookback_days)
             cutoff_date = end_dt - timedelta(days=2)
             
             # Split data
@@ -76,19 +99,57 @@ class LongPeriodAnalysisCache:
             historical_data = data[historical_mask]
             recent_data = data[recent_mask]
             
-            # Cache historical part (24 hours)
+            # Cache historical part (24 hours) and recent part (5 minutes)
+            # with one pipelined write, under the keys get_partitioned_data() reads
+            entries = {}
+            expirations = {}
             if not historical_data.empty:
-                self._set_historical_partition(ticker, historical_data, expire=86400)
+                key = self._historical_key(ticker, start_dt, cutoff_date)
+                entries[key] = mark_fresh_for(self._partition_payload(historical_data), HISTORICAL_PARTITION_TTL)
+                expirations[key] = hard_ttl(HISTORICAL_PARTITION_TTL)
             
-            # Cache recent part (5 minutes)  
             if not recent_data.empty:
-                self._set_recent_partition(ticker, recent_data, expire=300)
+                key = self._recent_key(ticker, cutoff_date, end_dt)
+                entries[key] = mark_fresh_for(self._partition_payload(recent_data), RECENT_PARTITION_TTL)
+                expirations[key] = hard_ttl(RECENT_PARTITION_TTL)
+            
+            if entries:
+                self.cache.set_many(entries, expire=expirations)
                 
             logger.info(f"💾 Cached partitioned data for {ticker}: {len(historical_data)} historical + {len(recent_data)} recent")
             
         except Exception as e:
             logger.error(f"Error caching partitioned data: {str(e)}")
     
+    def _refresh_partitioned_data(self, ticker: str, loader: Callable[[], pd.DataFrame],
+                                  lookback_days: int, end_date: str):
+        """Background refresh of a stale long-period range"""
+        data = loader()
+        if data is not None and not data.empty:
+            self.set_partitioned_data(ticker, data, lookback_days, end_date)
+    
+    def _historical_key(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> str:
+        return f"stock:historical:{ticker}:{start_date.strftime('%Y%m%d')}:{end_date.strftime('%Y%m%d')}"
+    
+    def _recent_key(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> str:
+        return f"stock:recent:{ticker}:{start_date.strftime('%Y%m%d')}:{end_date.strftime('%Y%m%d')}"
+    
+    def _partition_payload(self, data: pd.DataFrame) -> Dict:
+        """Serialize a partition for caching"""
+        return {
+            'data': data.to_dict('records'),
+            'index': data.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            'cached_at': datetime.now().isoformat()
+        }
+    
+    def _partition_to_dataframe(self, cached_data: Optional[Dict]) -> Optional[pd.DataFrame]:
+        """Rebuild a cached partition, or None on a miss"""
+        if not cached_data:
+            return None
+        df = pd.DataFrame(cached_data['data'])
+        df.index = pd.to_datetime(cached_data['index'])
+        return df
+    
     def _get_historical_partition(self, ticker: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> Optional[pd.DataFrame]:
         """Get cached historical data partition"""
         cache_key = f"stock:historical:{ticker}:{start_date.strftime('%Y%m%d')}:{end_date.strftime('%Y%m%d')}"
@@ -161,13 +222,13 @@ class LongPeriodAnalysisCache:
         2. Return full analysis when ready
         3. Use incremental computation for technical indicators
         """
-        cache_key = f"progressive:analysis:{ticker}:{lookback_days}:{end_date}"
+        cache_key = self.cache.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"progressive:analysis:{ticker}:{lookback_days}:{end_date}")
         return self.cache.get_json(cache_key)
     
     def set_progressive_analysis(self, ticker: str, lookback_days: int, end_date: str, 
                                analysis_data: Dict, expire: int = 1800):
         """Cache progressive analysis results (30 minutes)"""
-        cache_key = f"progressive:analysis:{ticker}:{lookback_days}:{end_date}"
+        cache_key = self.cache.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"progressive:analysis:{ticker}:{lookback_days}:{end_date}")
         self.cache.set_json(cache_key, analysis_data, expire)
 
     def get_compressed_chart_data(self, ticker: str, lookback_days: int, end_date: str) -> Optional[Dict]:
@@ -0,0 +1,331 @@
+# app/utils/cache/price_arena.py
+
+"""
+Shared-memory arena for hot price series, shared by all workers on a host.
+
+Every gunicorn worker used to hold its own copies of popular price histories
+(^GSPC above all) and decode them from Redis JSON on each use. The arena
+keeps them once per host as memory-mapped files under /dev/shm:
+
+- one immutable file per series: a small JSON header (key, columns, dtypes,
+  expiry) followed by contiguous int64 dates and float64/int64 column
+  blocks. The file name is derived from the key, so the directory is the
+  index and a lookup is a single open();
+- readers take no lock. Files are published with an atomic rename and never
+  modified in place, so a reader sees either the old or the new series. The
+  mapping is copy-on-write (MAP_PRIVATE), which means the DataFrame shares
+  the page cache and still tolerates in-place edits by callers;
+- writers are serialized by an flock on the arena directory. A publish that
+  finds the lock busy is skipped rather than queued;
+- total size is bounded. The writer evicts least recently used files
+  (readers refresh the file mtime at most once per TOUCH_INTERVAL). Unless
+  PRICE_ARENA_MAX_MB is set, the bound is half the arena's filesystem, at
+  most 48MB, since Docker's default /dev/shm is only 64MB.
+
+Only series requested PROMOTE_AFTER times by a worker are published, so the
+arena holds the most requested tickers rather than everything ever fetched.
+"""
+
+import os
+import json
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'stock_price_arena')
+
+PRICE_ARENA_ENABLED = os.getenv('PRICE_ARENA_ENABLED', 'true').lower() == 'true'
+PRICE_ARENA_DIR = os.getenv('PRICE_ARENA_DIR', _DEFAULT_DIR)
+# None: sized from the arena's filesystem (see _default_max_bytes)
+PRICE_ARENA_MAX_BYTES = int(os.getenv('PRICE_ARENA_MAX_MB')) * 1024 * 1024 if os.getenv('PRICE_ARENA_MAX_MB') else None
+DEFAULT_MAX_BYTES = 48 * 1024 * 1024
+PROMOTE_AFTER = int(os.getenv('PRICE_ARENA_PROMOTE_AFTER', 2))
+
+# Series ending today keep changing; historical ranges are stable
+LIVE_TTL = int(os.getenv('PRICE_ARENA_LIVE_TTL', 60))
+HISTORICAL_TTL = int(os.getenv('PRICE_ARENA_HISTORICAL_TTL', 900))
+
+TOUCH_INTERVAL = 30
+MAX_TRACKED_KEYS = 4096
+
+_MAGIC = b'PXA1'
+_PREFIX = struct.Struct('<4sI')  # magic, header length
+_ALIGN = 8
+_SUFFIX = '.px'
+_LOCK_FILE = '.writer.lock'
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _default_max_bytes(directory: str) -> int:
+    """Half the filesystem holding ``directory``, capped at DEFAULT_MAX_BYTES"""
+    try:
+        st = os.statvfs(directory)
+    except OSError:
+        return DEFAULT_MAX_BYTES
+    return min(DEFAULT_MAX_BYTES, st.f_blocks * st.f_frsize // 2)
+
+
+class PriceArena:
+    """Zero-copy, cross-process store of price DataFrames"""
+
+    def __init__(self, directory: str = PRICE_ARENA_DIR, max_bytes: Optional[int] = PRICE_ARENA_MAX_BYTES,
+                 promote_after: int = PROMOTE_AFTER, enabled: bool = PRICE_ARENA_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.promote_after = promote_after
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'published': 0,
+                      'skipped_busy': 0, 'unsupported': 0, 'evicted': 0, 'errors': 0}
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠️ Price arena disabled, cannot create {self.directory}: {str(e)}")
+                self.enabled = False
+        if self.max_bytes is None:
+            self.max_bytes = _default_max_bytes(self.directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest()[:24] + _SUFFIX)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    # Reading (lock-free)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """The cached series, backed by the shared mapping, or None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        try:
+            st = os.fstat(fd)
+            buffer = mmap.mmap(fd, st.st_size, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError) as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Price arena read failed for {key}: {str(e)}")
+            return None
+        finally:
+            os.close(fd)
+
+        try:
+            header, offset = self._read_header(buffer)
+            if header['key'] != key:
+                self._count('misses')
+                return None
+            if header['expires_at'] < time.time():
+                self._count('expired')
+                return None
+            df = self._frame(buffer, header, offset)
+        except (ValueError, KeyError, struct.error) as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Corrupt price arena entry for {key}: {str(e)}")
+            return None
+
+        if time.time() - st.st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self._count('hits')
+        return df
+
+    @staticmethod
+    def _read_header(buffer) -> tuple:
+        magic, header_len = _PREFIX.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("bad magic")
+        start = _PREFIX.size
+        header = json.loads(bytes(buffer[start:start + header_len]))
+        return header, _aligned(start + header_len)
+
+    @staticmethod
+    def _frame(buffer, header: Dict[str, Any], offset: int) -> pd.DataFrame:
+        rows = header['rows']
+        dates = np.frombuffer(buffer, dtype=np.int64, count=rows, offset=offset)
+        offset += dates.nbytes
+
+        index = pd.DatetimeIndex(dates.view('M8[ns]'), name=header['index_name'])
+        if header['tz']:
+            index = index.tz_localize('UTC').tz_convert(header['tz'])
+
+        frames = {}
+        for dtype, columns in header['blocks']:
+            block = np.frombuffer(buffer, dtype=np.dtype(dtype), count=rows * len(columns), offset=offset)
+            offset += block.nbytes
+            # One 2-D block per dtype: the DataFrame wraps it without copying
+            frames[dtype] = pd.DataFrame(block.reshape(rows, len(columns)), index=index, columns=columns, copy=False)
+
+        blocks = list(frames.values())
+        df = blocks[0]
+        for other in blocks[1:]:
+            for column in other.columns:
+                df[column] = other[column]
+        # Reordering copies, so only do it when the blocks interleave
+        if list(df.columns) != header['columns']:
+            df = df[header['columns']]
+        return df
+
+    # Writing (serialized across processes)
+
+    def note_request(self, key: str) -> bool:
+        """Count a request for ``key``; True once it is popular enough to publish"""
+        with self._lock:
+            if len(self._requests) >= MAX_TRACKED_KEYS:
+                self._requests.clear()
+            count = self._requests.get(key, 0) + 1
+            self._requests[key] = count
+            return count >= self.promote_after
+
+    def put(self, key: str, df: pd.DataFrame, ttl: int = HISTORICAL_TTL) -> bool:
+        """Publish ``df`` under ``key``; False if unsupported, too large or another writer is busy"""
+        if not self.enabled or df is None or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            return False
+
+        blocks = {}
+        for column in df.columns:
+            kind = df[column].dtype
+            if kind == np.float64 or kind == np.float32:
+                blocks.setdefault('<f8', []).append(column)
+            elif kind == np.int64 or kind == np.int32:
+                blocks.setdefault('<i8', []).append(column)
+            else:
+                self._count('unsupported')
+                return False
+
+        index = df.index
+        tz = str(index.tz) if index.tz is not None else None
+        dates = (index.tz_convert('UTC').tz_localize(None) if tz else index).values.astype('M8[ns]').view(np.int64)
+        header = json.dumps({
+            'key': key,
+            'rows': len(df),
+            'columns': [str(column) for column in df.columns],
+            'blocks': [[dtype, [str(column) for column in columns]] for dtype, columns in blocks.items()],
+            'index_name': index.name,
+            'tz': tz,
+            'expires_at': time.time() + ttl,
+        }).encode()
+
+        payload = [np.ascontiguousarray(dates)]
+        for dtype, columns in blocks.items():
+            payload.append(np.ascontiguousarray(df[columns].to_numpy(dtype=np.dtype(dtype))))
+
+        data_offset = _aligned(_PREFIX.size + len(header))
+        size = data_offset + sum(part.nbytes for part in payload)
+        if size > self.max_bytes:
+            return False
+
+        try:
+            lock_fd = os.open(os.path.join(self.directory, _LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Price arena lock unavailable: {str(e)}")
+            return False
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._count('skipped_busy')
+                os.close(lock_fd)
+                lock_fd = None
+                return False
+
+            self._evict(size, keep=self._path(key))
+            tmp_path = os.path.join(self.directory, f".tmp-{os.getpid()}-{threading.get_ident()}")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(_PREFIX.pack(_MAGIC, len(header)))
+                    f.write(header)
+                    f.write(b'\0' * (data_offset - _PREFIX.size - len(header)))
+                    for part in payload:
+                        f.write(part.tobytes())
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                # A half-written file (ENOSPC on a full /dev/shm) would hold the space indefinitely
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+            self._count('published')
+            return True
+        except OSError as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Price arena publish failed for {key}: {str(e)}")
+            return False
+        finally:
+            if lock_fd is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
+
+    def _evict(self, incoming: int, keep: str):
+        """Drop expired, then least recently used entries until ``incoming`` bytes fit (writer lock held)"""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(_SUFFIX) or entry.path == keep:
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for mtime, size, path in entries:
+            if total + incoming <= self.max_bytes and now - mtime < HISTORICAL_TTL:
+                break
+            try:
+                # Readers that already mapped the file keep their pages
+                os.unlink(path)
+                total -= size
+                self._count('evicted')
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({'enabled': self.enabled, 'directory': self.directory, 'max_bytes': self.max_bytes})
+        if self.enabled:
+            sizes = []
+            for entry in os.scandir(self.directory):
+                try:
+                    if entry.name.endswith(_SUFFIX):
+                        sizes.append(entry.stat().st_size)
+                except FileNotFoundError:
+                    continue
+            stats.update({'entries': len(sizes), 'bytes': sum(sizes)})
+        return stats
+
+
+# Global instance
+price_arena = PriceArena()
+
+
+def price_arena_ttl(end_date: str) -> int:
+    """Short TTL for ranges that reach today, long for historical ones"""
+    return LIVE_TTL if pd.to_datetime(end_date).date() >= pd.Timestamp.now().date() else HISTORICAL_TTL
@@ -0,0 +1,267 @@
+# app/utils/cache/redis_pool.py
+
+"""
+Process-wide Redis connection pool factory with a circuit breaker.
+
+All caches share one fork-safe connection pool per (url, db, decode_responses,
+socket_timeout) instead of opening their own client and sending PING on every
+instantiation. While Redis is unreachable the circuit breaker makes cache
+calls fail fast; a background health check closes the circuit again as soon
+as Redis recovers.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from redis import Redis, ConnectionPool, RedisError
+
+from app.utils.performance.request_profiler import timed_connection_class
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
+# Request-path friendly timeouts: never block a request for seconds on a dead Redis
+SOCKET_CONNECT_TIMEOUT = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', 0.5))
+SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 1.0))
+MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 5))
+
+# Sentinel so callers can ask for a pool without socket timeout (pub/sub listeners)
+NO_TIMEOUT = -1
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures; half-open probe after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.rejected_calls = 0
+        self.opened_at = 0.0
+        self.last_failure = None
+
+    def allow_request(self) -> bool:
+        """Whether a Redis call should be attempted right now"""
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let exactly one request probe the connection
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self):
+        if self.state == self.CLOSED and self.consecutive_failures == 0:
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ Redis circuit closed - cache re-enabled")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self, error: Exception = None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_failure = str(error) if error else None
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"⚠️ Redis circuit opened after {self.consecutive_failures} failure(s): {self.last_failure}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def force_open(self, error: Exception = None):
+        with self._lock:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.last_failure = str(error) if error else None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'total_failures': self.total_failures,
+            'rejected_calls': self.rejected_calls,
+            'last_failure': self.last_failure,
+            'open_for_seconds': round(time.monotonic() - self.opened_at, 1) if self.state != self.CLOSED else 0,
+        }
+
+
+class RedisPoolManager:
+    """Owns the shared pools, the circuit breaker and the health-check thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[Tuple, ConnectionPool] = {}
+        self._url: Optional[str] = None
+        self._health_thread: Optional[threading.Thread] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('REDIS_CIRCUIT_FAILURES', 3)),
+            reset_timeout=float(os.getenv('REDIS_CIRCUIT_RESET_SECONDS', 10))
+        )
+
+    def _resolve_url(self) -> str:
+        """Pick the configured Redis URL, falling back to localhost for development"""
+        if self._url:
+            return self._url
+
+        candidates = [os.getenv("REDIS_URL", DEFAULT_REDIS_URL)]
+        if candidates[0] != DEFAULT_REDIS_URL:
+            candidates.append(DEFAULT_REDIS_URL)
+
+        for url in candidates:
+            try:
+                Redis.from_url(url, socket_connect_timeout=SOCKET_CONNECT_TIMEOUT,
+                               socket_timeout=SOCKET_TIMEOUT).ping()
+                logger.info(f"✅ Redis reachable at {url.split('@')[-1]}")
+                self._url = url
+                return url
+            except Exception as e:
+                logger.debug(f"❌ Redis probe failed for {url.split('@')[-1]}: {str(e)}")
+
+        # Nothing reachable yet: keep the configured URL and let the health check recover
+        self._url = candidates[0]
+        self.breaker.force_open(ConnectionError("Redis unreachable at startup"))
+        logger.warning("⚠️ Redis unavailable at startup - caches disabled until it recovers")
+        return self._url
+
+    def get_pool(self, db: Optional[int] = None, decode_responses: bool = True,
+                 socket_timeout: float = None) -> ConnectionPool:
+        if socket_timeout is None:
+            socket_timeout = SOCKET_TIMEOUT
+        key = (db, decode_responses, socket_timeout)
+
+        pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                url = self._resolve_url()
+                kwargs = {
+                    'decode_responses': decode_responses,
+                    'max_connections': MAX_CONNECTIONS,
+                    'socket_connect_timeout': SOCKET_CONNECT_TIMEOUT,
+                    'socket_timeout': None if socket_timeout == NO_TIMEOUT else socket_timeout,
+                    'socket_keepalive': True,
+                    'health_check_interval': 30,
+                    'retry_on_timeout': False,
+                }
+                pool = ConnectionPool.from_url(url, **kwargs)
+                if db is not None:
+                    # from_url lets the URL's /<db> path win over a db= keyword
+                    pool.connection_kwargs['db'] = db
+                # Charge socket time to the request being profiled
+                pool.connection_class = timed_connection_class(pool.connection_class)
+                self._pools[key] = pool
+                self.ensure_health_thread()
+        return pool
+
+    def get_client(self, db: Optional[int] = None, decode_responses: bool = True,
+                   socket_timeout: float = None) -> Redis:
+        return Redis(connection_pool=self.get_pool(db, decode_responses, socket_timeout))
+
+    def ensure_health_thread(self):
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="redis-health-check", daemon=True
+        )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            if self.breaker.state == CircuitBreaker.CLOSED:
+                continue
+            self.check_health()
+
+    def check_health(self) -> bool:
+        """PING through the shared pool and update the breaker"""
+        try:
+            self.get_client().ping()
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            self.breaker.record_failure(e)
+            return False
+
+    def reset_after_fork(self):
+        """Forked workers must not share sockets or threads with the parent"""
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._health_thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        pools = []
+        for (db, decode_responses, socket_timeout), pool in list(self._pools.items()):
+            pools.append({
+                'db': pool.connection_kwargs.get('db', db),
+                'decode_responses': decode_responses,
+                'socket_timeout': pool.connection_kwargs.get('socket_timeout'),
+                'max_connections': pool.max_connections,
+                'created_connections': getattr(pool, '_created_connections', None),
+                'in_use_connections': len(getattr(pool, '_in_use_connections', ())),
+                'available_connections': len(getattr(pool, '_available_connections', ())),
+            })
+        return {
+            'url': self._url.split('@')[-1] if self._url else None,
+            'pid': os.getpid(),
+            'pools': pools,
+            'circuit_breaker': self.breaker.get_stats(),
+            'health_check_alive': bool(self._health_thread and self._health_thread.is_alive()),
+        }
+
+
+redis_pool_manager = RedisPoolManager()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=redis_pool_manager.reset_after_fork)
+
+
+def get_redis_client(db: Optional[int] = None, decode_responses: bool = True,
+                     socket_timeout: float = None) -> Redis:
+    """Return a client backed by the shared, process-wide connection pool"""
+    return redis_pool_manager.get_client(db, decode_responses, socket_timeout)
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    return redis_pool_manager.breaker
+
+
+def record_redis_outcome(error: Exception = None):
+    """
+    Report how a guarded operation went to the shared breaker.
+
+    Callers that check allow_request() before using Redis must check once
+    per operation, since HALF_OPEN lets a single call through, and then
+    report the result here so the probe closes or re-opens the circuit.
+    Errors other than RedisError say nothing about Redis and are ignored.
+    """
+    if error is None:
+        redis_pool_manager.breaker.record_success()
+    elif isinstance(error, RedisError):
+        redis_pool_manager.breaker.record_failure(error)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return redis_pool_manager.get_stats()
@@ -0,0 +1,257 @@
+# app/utils/cache/single_flight.py
+
+"""
+Single-flight coalescing of identical expensive computations.
+
+When several requests miss the cache for the same key at once (a popular
+ticker expiring, market open), only one of them computes the value:
+
+- threads in the same worker share one in-process call;
+- across gunicorn workers a per-key Redis lock with a short lease elects
+  the leader, and the others subscribe for its result, which is handed over
+  through a short-lived Redis key.
+
+If the leader dies the lease expires and a waiter takes over. Without Redis
+only in-process coalescing applies.
+"""
+
+import os
+import time
+import uuid
+import pickle
+import logging
+import threading
+from functools import cached_property
+from typing import Any, Callable, Dict
+
+from redis import Redis, RedisError
+
+from .redis_pool import get_redis_client, get_circuit_breaker, redis_pool_manager
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "sf:lock:"
+RESULT_PREFIX = "sf:result:"
+CHANNEL_PREFIX = "sf:done:"
+
+DEFAULT_LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', 15))
+DEFAULT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 30))
+RESULT_TTL = int(os.getenv('SINGLE_FLIGHT_RESULT_TTL', 30))
+
+# Waiters re-check the lock at this interval in case the leader died
+POLL_INTERVAL = 0.5
+
+# Delete the lock only if we still own it (the lease may have expired)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    """One in-process computation that other threads can join"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key across threads and workers; everyone gets the result"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._breaker = get_circuit_breaker()
+        self._stats = {
+            'leader_runs': 0,
+            'local_joins': 0,
+            'remote_joins': 0,
+            'takeovers': 0,
+            'wait_timeouts': 0,
+            'redis_bypassed': 0,
+        }
+
+    @cached_property
+    def _redis(self) -> Redis:
+        """Created on first use, so importing this module does not connect to Redis"""
+        return get_redis_client(decode_responses=False)
+
+    def do(self, key: str, fn: Callable[[], Any], lease_seconds: int = None,
+           wait_timeout: float = None) -> Any:
+        """Return ``fn()``, computed at most once for concurrent callers of ``key``
+
+        ``lease_seconds`` should exceed the usual run time of ``fn``: once it
+        lapses another worker may start a duplicate computation.
+        """
+        lease_seconds = lease_seconds or DEFAULT_LEASE_SECONDS
+        wait_timeout = wait_timeout or DEFAULT_WAIT_TIMEOUT
+
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            self._record('local_joins')
+            if not call.event.wait(wait_timeout):
+                self._record('wait_timeouts')
+                logger.warning(f"⏱️ Single-flight wait timed out for {key}, computing locally")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_distributed(key, fn, lease_seconds, wait_timeout)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _do_distributed(self, key: str, fn: Callable[[], Any], lease_seconds: int,
+                        wait_timeout: float) -> Any:
+        if not self._breaker.allow_request():
+            self._record('redis_bypassed')
+            return self._run(fn)
+
+        lock_key = LOCK_PREFIX + key
+        result_key = RESULT_PREFIX + key
+        channel = CHANNEL_PREFIX + key
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_timeout
+        pubsub = None
+        waited = False
+
+        try:
+            while True:
+                try:
+                    acquired = self._redis.set(lock_key, token, nx=True, ex=lease_seconds)
+                except RedisError as e:
+                    self._on_redis_error(e)
+                    return self._run(fn)
+                # Resolves the HALF_OPEN probe allow_request() may have handed us
+                self._breaker.record_success()
+
+                if acquired:
+                    if waited:
+                        # The leader may have just finished: its result beats a takeover
+                        payload = self._get_result(result_key)
+                        if payload is not None:
+                            self._release(lock_key, channel, token)
+                            self._record('remote_joins')
+                            return pickle.loads(payload)
+                        # The previous leader failed or its lease lapsed
+                        self._record('takeovers')
+                    return self._lead(fn, lock_key, result_key, channel, token)
+
+                waited = True
+                try:
+                    if pubsub is None:
+                        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                        pubsub.subscribe(channel)
+                    # Checked after subscribing so a result published in between is not missed
+                    payload = self._redis.get(result_key)
+                    if payload is not None:
+                        self._record('remote_joins')
+                        return pickle.loads(payload)
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._record('wait_timeouts')
+                        logger.warning(f"⏱️ Single-flight wait timed out for {key}, computing locally")
+                        return self._run(fn)
+                    pubsub.get_message(timeout=min(remaining, POLL_INTERVAL))
+                except (RedisError, pickle.PickleError) as e:
+                    self._on_redis_error(e)
+                    return self._run(fn)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def _lead(self, fn: Callable[[], Any], lock_key: str, result_key: str,
+              channel: str, token: str) -> Any:
+        try:
+            result = self._run(fn)
+        except Exception:
+            self._release(lock_key, channel, token)
+            raise
+
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(result_key, pickle.dumps(result), ex=RESULT_TTL)
+            pipe.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            pipe.publish(channel, b'1')
+            pipe.execute()
+        except (RedisError, pickle.PickleError, TypeError, AttributeError) as e:
+            # Waiters fall back to taking over once the lock is gone
+            logger.debug(f"Single-flight result handoff failed for {lock_key}: {str(e)}")
+            self._release(lock_key, channel, token)
+        return result
+
+    def _get_result(self, result_key: str):
+        try:
+            return self._redis.get(result_key)
+        except RedisError as e:
+            self._on_redis_error(e)
+            return None
+
+    def _release(self, lock_key: str, channel: str, token: str):
+        """Free the lock and wake waiters so one of them can take over"""
+        try:
+            self._redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            self._redis.publish(channel, b'0')
+        except RedisError as e:
+            self._on_redis_error(e)
+
+    def _run(self, fn: Callable[[], Any]) -> Any:
+        self._record('leader_runs')
+        return fn()
+
+    def _on_redis_error(self, error: Exception):
+        if isinstance(error, RedisError):
+            self._breaker.record_failure(error)
+            redis_pool_manager.ensure_health_thread()
+        logger.debug(f"Single-flight falling back to local computation: {str(error)}")
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def reset_after_fork(self):
+        """Calls in flight in the parent never finish in the child"""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.__dict__.pop('_redis', None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        joins = stats['local_joins'] + stats['remote_joins']
+        total = joins + stats['leader_runs']
+        stats['coalesced_ratio'] = round(joins / total, 4) if total else 0.0
+        return stats
+
+
+# Global instance
+single_flight = SingleFlight()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=single_flight.reset_after_fork)
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    return single_flight.get_stats()
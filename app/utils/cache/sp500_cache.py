@@ -3,13 +3,14 @@ SP500 Score Cache Service
 Efficiently caches SP500 scores for different time periods to improve analysis performance
 """
 
-import redis
 import json
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import hashlib
 
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, record_redis_outcome
+
 logger = logging.getLogger(__name__)
 
 class SP500Cache:
@@ -18,40 +19,13 @@ class SP500Cache:
     """
     
     def __init__(self):
-        self.redis_client = None
-        self._connect_redis()
-        
-    def _connect_redis(self):
-        """Initialize Redis connection with fallback handling"""
-        try:
-            # Try to connect to Redis directly
-            import redis
-            
-            # Try localhost first (for development)
-            try:
-                self.redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-                self.redis_client.ping()
-                logger.info("✅ SP500 Cache: Redis connected successfully (localhost)")
-                return
-            except Exception:
-                pass
-                
-            # Try Redis URL from environment
-            import os
-            redis_url = os.getenv('REDIS_URL')
-            if redis_url:
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
-                self.redis_client.ping()
-                logger.info("✅ SP500 Cache: Redis connected successfully (URL)")
-                return
-                
-            # No Redis available
-            logger.warning("⚠️ SP500 Cache: Redis not available, using in-memory fallback")
-            self.redis_client = None
-                
-        except Exception as e:
-            logger.warning(f"⚠️ SP500 Cache: Redis connection failed: {str(e)}")
-            self.redis_client = None
+        # Shared, fork-safe connection pool (see redis_pool.py)
+        self._redis_client = get_redis_client(decode_responses=True)
+
+    @property
+    def redis_client(self):
+        """Shared-pool client, or None while the Redis circuit breaker is open (read once per operation)"""
+        return self._redis_client if get_circuit_breaker().allow_request() else None
     
     def _generate_cache_key(self, start_date: datetime, end_date: datetime, lookback_days: int = None) -> str:
         """
@@ -91,12 +65,14 @@ class SP500Cache:
         Returns:
             Cached SP500 data or None if not found
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return None
             
         try:
             cache_key = self._generate_cache_key(start_date, end_date, lookback_days)
-            cached_data = self.redis_client.get(cache_key)
+            cached_data = redis_client.get(cache_key)
+            record_redis_outcome()
             
             if cached_data:
                 data = json.loads(cached_data)
@@ -107,13 +83,14 @@ class SP500Cache:
                     return data
                 else:
                     # Remove invalid cache entry
-                    self.redis_client.delete(cache_key)
+                    redis_client.delete(cache_key)
                     logger.warning(f"🗑️ SP500 Cache: Removed invalid entry {cache_key}")
                     
             logger.info(f"❌ SP500 Cache MISS: {cache_key}")
             return None
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Cache: Error retrieving cache: {str(e)}")
             return None
     
@@ -132,7 +109,8 @@ class SP500Cache:
         Returns:
             True if cached successfully, False otherwise
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return False
             
         try:
@@ -156,11 +134,12 @@ class SP500Cache:
             expire_seconds = self._get_cache_expiration(end_date)
             
             # Store in Redis
-            success = self.redis_client.setex(
+            success = redis_client.setex(
                 cache_key, 
                 expire_seconds, 
                 json.dumps(cache_data)
             )
+            record_redis_outcome()
             
             if success:
                 logger.info(f"💾 SP500 Cache STORED: {cache_key} (score: {score}, expires: {expire_seconds}s)")
@@ -170,6 +149,7 @@ class SP500Cache:
                 return False
                 
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Cache: Error storing cache: {str(e)}")
             return False
     
@@ -249,38 +229,41 @@ class SP500Cache:
         Returns:
             Number of keys invalidated
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return 0
             
         try:
             # Find all SP500 cache keys
             pattern = "sp500:score:*"
-            keys = self.redis_client.keys(pattern)
+            keys = redis_client.keys(pattern)
+            record_redis_outcome()
             
             invalidated = 0
             cutoff_date = datetime.now() - timedelta(days=days_back)
             
             for key in keys:
                 try:
-                    cached_data = self.redis_client.get(key)
+                    cached_data = redis_client.get(key)
                     if cached_data:
                         data = json.loads(cached_data)
                         end_date = datetime.strptime(data['end_date'], '%Y-%m-%d')
                         
                         # Invalidate if end date is recent
                         if end_date >= cutoff_date:
-                            self.redis_client.delete(key)
+                            redis_client.delete(key)
                             invalidated += 1
                             
                 except Exception:
                     # Delete malformed cache entries
-                    self.redis_client.delete(key)
+                    redis_client.delete(key)
                     invalidated += 1
             
             logger.info(f"🗑️ SP500 Cache: Invalidated {invalidated} recent entries")
             return invalidated
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Cache: Error invalidating cache: {str(e)}")
             return 0
     
@@ -291,12 +274,14 @@ class SP500Cache:
         Returns:
             Dictionary with cache statistics
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return {'status': 'redis_unavailable'}
             
         try:
             pattern = "sp500:score:*"
-            keys = self.redis_client.keys(pattern)
+            keys = redis_client.keys(pattern)
+            record_redis_outcome()
             
             total_entries = len(keys)
             valid_entries = 0
@@ -305,7 +290,7 @@ class SP500Cache:
             sample_size = min(10, total_entries)
             for key in keys[:sample_size]:
                 try:
-                    cached_data = self.redis_client.get(key)
+                    cached_data = redis_client.get(key)
                     if cached_data:
                         data = json.loads(cached_data)
                         if self._is_cache_valid(data):
@@ -321,6 +306,7 @@ class SP500Cache:
             }
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Cache: Error getting stats: {str(e)}")
             return {'status': 'error', 'error': str(e)}
 
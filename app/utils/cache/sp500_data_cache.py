@@ -3,7 +3,6 @@ SP500 Historical Data Cache Service
 Efficiently caches SP500 OHLC data to reduce Yahoo Finance API calls and improve performance
 """
 
-import redis
 import json
 import logging
 import pandas as pd
@@ -12,6 +11,8 @@ from typing import Optional, Dict, Any, Tuple
 import hashlib
 import numpy as np
 
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, record_redis_outcome
+
 logger = logging.getLogger(__name__)
 
 class SP500DataCache:
@@ -19,40 +20,17 @@ class SP500DataCache:
     Caches SP500 historical OHLC data to minimize API calls and improve performance
     """
     
+    # Sorted set of cached ranges: score = start date epoch, member = "<key>|<end date>"
+    RANGE_INDEX_KEY = "sp500:data:ranges"
+    
     def __init__(self):
-        self.redis_client = None
-        self._connect_redis()
-        
-    def _connect_redis(self):
-        """Initialize Redis connection with fallback handling"""
-        try:
-            import redis
-            
-            # Try localhost first (for development)
-            try:
-                self.redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-                self.redis_client.ping()
-                logger.info("✅ SP500 Data Cache: Redis connected successfully (localhost)")
-                return
-            except Exception:
-                pass
-                
-            # Try Redis URL from environment
-            import os
-            redis_url = os.getenv('REDIS_URL')
-            if redis_url:
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
-                self.redis_client.ping()
-                logger.info("✅ SP500 Data Cache: Redis connected successfully (URL)")
-                return
-                
-            # No Redis available
-            logger.warning("⚠️ SP500 Data Cache: Redis not available, using in-memory fallback")
-            self.redis_client = None
-                
-        except Exception as e:
-            logger.warning(f"⚠️ SP500 Data Cache: Redis connection failed: {str(e)}")
-            self.redis_client = None
+        # Shared, fork-safe connection pool (see redis_pool.py)
+        self._redis_client = get_redis_client(decode_responses=True)
+
+    @property
+    def redis_client(self):
+        """Shared-pool client, or None while the Redis circuit breaker is open (read once per operation)"""
+        return self._redis_client if get_circuit_breaker().allow_request() else None
     
     def _generate_cache_key(self, start_date: str, end_date: str) -> str:
         """
@@ -103,7 +81,8 @@ class SP500DataCache:
         Returns:
             DataFrame with SP500 OHLC data or None if not found
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return None
             
         try:
@@ -111,7 +90,8 @@ class SP500DataCache:
             
             # First, try exact match
             exact_key = self._generate_cache_key(start_date, end_date)
-            cached_data = self.redis_client.get(exact_key)
+            cached_data = redis_client.get(exact_key)
+            record_redis_outcome()
             
             if cached_data:
                 data = json.loads(cached_data)
@@ -120,12 +100,13 @@ class SP500DataCache:
                     logger.info(f"✅ SP500 Data Cache HIT (exact): {exact_key} ({len(df)} rows)")
                     return df
                 else:
-                    self.redis_client.delete(exact_key)
+                    redis_client.delete(exact_key)
+                    redis_client.zrem(self.RANGE_INDEX_KEY, self._index_member(exact_key, end_date))
                     logger.warning(f"🗑️ SP500 Data Cache: Removed invalid entry {exact_key}")
             
             # Try to find overlapping cached data that contains our range
-            overlap_data = self._find_overlapping_cache(start_date, end_date)
-            if overlap_data:
+            overlap_data = self._find_overlapping_cache(redis_client, start_date, end_date)
+            if overlap_data is not None:
                 logger.info(f"✅ SP500 Data Cache HIT (overlap): Found overlapping data")
                 return overlap_data
                 
@@ -133,14 +114,29 @@ class SP500DataCache:
             return None
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Data Cache: Error retrieving cache: {str(e)}")
             return None
     
-    def _find_overlapping_cache(self, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    def _index_member(self, cache_key: str, end_date: str) -> str:
+        """Range index member: the cache key plus the end date it covers"""
+        return f"{cache_key}|{end_date}"
+    
+    @staticmethod
+    def _date_score(date_str: str) -> float:
+        """Sorted-set score for a YYYY-MM-DD date (UTC epoch seconds)"""
+        return (datetime.strptime(date_str, '%Y-%m-%d') - datetime(1970, 1, 1)).total_seconds()
+    
+    def _find_overlapping_cache(self, redis_client, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
         """
         Find cached data that overlaps with the requested date range
         
+        Uses the sorted-set range index (score = start date) so only ranges
+        starting on or before the requested start are considered, nearest
+        first, and only the winning blob is downloaded.
+        
         Args:
+            redis_client: Client the caller already obtained from the breaker
             start_date: Requested start date
             end_date: Requested end date
             
@@ -148,47 +144,54 @@ class SP500DataCache:
             DataFrame subset that matches the requested range or None
         """
         try:
-            # Search for SP500 data cache keys
-            pattern = "sp500:data:*"
-            keys = self.redis_client.keys(pattern)
-            
             target_start = datetime.strptime(start_date, '%Y-%m-%d')
             target_end = datetime.strptime(end_date, '%Y-%m-%d')
             
-            for key in keys:
+            candidates = redis_client.zrevrangebyscore(
+                self.RANGE_INDEX_KEY, self._date_score(start_date), '-inf'
+            )
+            
+            stale_members = []
+            result = None
+            for member in candidates:
+                cache_key, _, cached_end = member.rpartition('|')
                 try:
-                    cached_data = self.redis_client.get(key)
-                    if not cached_data:
-                        continue
-                        
-                    data = json.loads(cached_data)
-                    if not self._is_cache_valid(data):
+                    if datetime.strptime(cached_end, '%Y-%m-%d') < target_end:
                         continue
+                except ValueError:
+                    stale_members.append(member)
+                    continue
+                
+                cached_data = redis_client.get(cache_key)
+                if not cached_data:
+                    # Blob expired; drop it from the index
+                    stale_members.append(member)
+                    continue
                     
-                    cached_start = datetime.strptime(data['start_date'], '%Y-%m-%d')
-                    cached_end = datetime.strptime(data['end_date'], '%Y-%m-%d')
-                    
-                    # Check if cached data contains our target range
-                    if cached_start <= target_start and cached_end >= target_end:
-                        # Extract the subset we need
-                        df = self._json_to_dataframe(data['ohlc_data'])
-                        
-                        # Filter to exact date range
-                        df_filtered = df[
-                            (df.index >= target_start) & 
-                            (df.index <= target_end)
-                        ]
-                        
-                        if not df_filtered.empty:
-                            logger.info(f"📊 SP500 Data Cache: Extracted {len(df_filtered)} rows from larger cache")
-                            return df_filtered
-                            
-                except Exception:
+                data = json.loads(cached_data)
+                if not self._is_cache_valid(data):
+                    stale_members.append(member)
                     continue
+                
+                # Extract the subset we need
+                df = self._json_to_dataframe(data['ohlc_data'])
+                df_filtered = df[
+                    (df.index >= target_start) & 
+                    (df.index <= target_end)
+                ]
+                
+                if not df_filtered.empty:
+                    logger.info(f"📊 SP500 Data Cache: Extracted {len(df_filtered)} rows from larger cache")
+                    result = df_filtered
+                    break
+            
+            if stale_members:
+                redis_client.zrem(self.RANGE_INDEX_KEY, *stale_members)
                     
-            return None
+            return result
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Data Cache: Error finding overlapping cache: {str(e)}")
             return None
     
@@ -204,7 +207,10 @@ class SP500DataCache:
         Returns:
             True if cached successfully, False otherwise
         """
-        if not self.redis_client or df is None or df.empty:
+        if df is None or df.empty:
+            return False
+        redis_client = self.redis_client
+        if not redis_client:
             return False
             
         try:
@@ -231,12 +237,12 @@ class SP500DataCache:
             # Determine expiration time
             expire_seconds = self._get_cache_expiration(end_date)
             
-            # Store in Redis
-            success = self.redis_client.setex(
-                cache_key, 
-                expire_seconds, 
-                json.dumps(cache_data)
-            )
+            # Store the blob and register its range in the index in one round trip
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.setex(cache_key, expire_seconds, json.dumps(cache_data))
+            pipe.zadd(self.RANGE_INDEX_KEY, {self._index_member(cache_key, end_date): self._date_score(start_date)})
+            success = pipe.execute()[0]
+            record_redis_outcome()
             
             if success:
                 logger.info(f"💾 SP500 Data Cache STORED: {cache_key} ({len(df)} rows, expires: {expire_seconds}s)")
@@ -246,6 +252,7 @@ class SP500DataCache:
                 return False
                 
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Data Cache: Error storing cache: {str(e)}")
             return False
     
@@ -383,7 +390,7 @@ class SP500DataCache:
         Returns:
             Dictionary with coverage statistics
         """
-        if not self.redis_client:
+        if get_circuit_breaker().is_open:
             return {'coverage': 0, 'status': 'redis_unavailable'}
             
         try:
@@ -427,37 +434,32 @@ class SP500DataCache:
         Returns:
             Number of keys invalidated
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return 0
             
         try:
-            pattern = "sp500:data:*"
-            keys = self.redis_client.keys(pattern)
-            
-            invalidated = 0
-            cutoff_date = datetime.now() - timedelta(days=days_back)
-            
-            for key in keys:
-                try:
-                    cached_data = self.redis_client.get(key)
-                    if cached_data:
-                        data = json.loads(cached_data)
-                        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d')
-                        
-                        # Invalidate if end date is recent
-                        if end_date >= cutoff_date:
-                            self.redis_client.delete(key)
-                            invalidated += 1
-                            
-                except Exception:
-                    # Delete malformed cache entries
-                    self.redis_client.delete(key)
-                    invalidated += 1
-            
+            cutoff_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+            
+            # Ranges ending after the cutoff, read from the index instead of KEYS
+            members = [
+                member for member in redis_client.zrange(self.RANGE_INDEX_KEY, 0, -1)
+                if member.rpartition('|')[2] >= cutoff_date
+            ]
+            
+            if members:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.unlink(*[member.rpartition('|')[0] for member in members])
+                pipe.zrem(self.RANGE_INDEX_KEY, *members)
+                pipe.execute()
+            
+            record_redis_outcome()
+            invalidated = len(members)
             logger.info(f"🗑️ SP500 Data Cache: Invalidated {invalidated} recent entries")
             return invalidated
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Data Cache: Error invalidating cache: {str(e)}")
             return 0
     
@@ -468,12 +470,13 @@ class SP500DataCache:
         Returns:
             Dictionary with cache statistics
         """
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return {'status': 'redis_unavailable'}
             
         try:
-            pattern = "sp500:data:*"
-            keys = self.redis_client.keys(pattern)
+            members = redis_client.zrange(self.RANGE_INDEX_KEY, 0, -1)
+            keys = [member.rpartition('|')[0] for member in members]
             
             total_entries = len(keys)
             total_data_points = 0
@@ -481,9 +484,10 @@ class SP500DataCache:
             
             # Sample some entries for statistics
             sample_size = min(20, total_entries)
-            for key in keys[:sample_size]:
+            sample_blobs = redis_client.mget(keys[:sample_size]) if sample_size else []
+            record_redis_outcome()
+            for cached_data in sample_blobs:
                 try:
-                    cached_data = self.redis_client.get(key)
                     if cached_data:
                         data = json.loads(cached_data)
                         if self._is_cache_valid(data):
@@ -506,6 +510,7 @@ class SP500DataCache:
             }
             
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"❌ SP500 Data Cache: Error getting stats: {str(e)}")
             return {'status': 'error', 'error': str(e)}
 
@@ -0,0 +1,245 @@
+# app/utils/cache/stale_while_revalidate.py
+
+"""
+Stale-while-revalidate support for slow-to-rebuild cache entries.
+
+Entries carry two deadlines:
+
+- the soft TTL, stored inside the payload (``_fresh_until``): past it the
+  cached value is still served immediately, and one background refresh is
+  scheduled;
+- the hard TTL, the Redis expiry: only once the key is gone does a request
+  block on the origin (yfinance).
+
+Refreshes run on a small bounded thread pool and are deduplicated per key,
+in-process and across workers (a short Redis lease). When the pool is
+saturated further refreshes are dropped; the next stale read reschedules.
+
+Staleness of what a request served is collected on ``flask.g`` and exposed
+as ``X-Cache-Status`` / ``X-Cache-Age`` response headers.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional
+
+from flask import g, has_request_context
+from redis import Redis, RedisError
+
+from .redis_pool import get_redis_client, get_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+STORED_AT_FIELD = '_stored_at'
+FRESH_UNTIL_FIELD = '_fresh_until'
+
+# Hard TTL = soft TTL * factor unless a cache sets its own
+HARD_TTL_FACTOR = int(os.getenv('SWR_HARD_TTL_FACTOR', 4))
+REFRESH_WORKERS = int(os.getenv('SWR_REFRESH_WORKERS', 4))
+MAX_PENDING_REFRESHES = int(os.getenv('SWR_MAX_PENDING_REFRESHES', 32))
+REFRESH_LEASE_SECONDS = int(os.getenv('SWR_REFRESH_LEASE_SECONDS', 60))
+
+REFRESH_LOCK_PREFIX = "swr:refresh:"
+
+
+def hard_ttl(soft_ttl: int) -> int:
+    """Redis expiry for an entry that turns stale after ``soft_ttl`` seconds"""
+    return soft_ttl * HARD_TTL_FACTOR
+
+
+def mark_fresh_for(payload: Dict[str, Any], soft_ttl: int) -> Dict[str, Any]:
+    """Stamp a cache payload with its soft deadline (in place)"""
+    now = time.time()
+    payload[STORED_AT_FIELD] = now
+    payload[FRESH_UNTIL_FIELD] = now + soft_ttl
+    return payload
+
+
+def without_freshness(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a cache payload without its soft-deadline stamps"""
+    return {k: v for k, v in payload.items() if k not in (STORED_AT_FIELD, FRESH_UNTIL_FIELD)}
+
+
+def staleness(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Staleness metadata for a cached payload
+
+    Payloads written before soft TTLs existed count as fresh; they still
+    expire by their Redis TTL.
+    """
+    now = time.time()
+    stored_at = payload.get(STORED_AT_FIELD)
+    fresh_until = payload.get(FRESH_UNTIL_FIELD)
+    return {
+        'status': 'stale' if fresh_until is not None and now > fresh_until else 'fresh',
+        'age_seconds': round(now - stored_at, 1) if stored_at is not None else None,
+    }
+
+
+def miss_metadata() -> Dict[str, Any]:
+    """Staleness metadata for data that was just fetched from the origin"""
+    return {'status': 'miss', 'age_seconds': 0.0, 'refreshing': False}
+
+
+class RefreshScheduler:
+    """Bounded, deduplicated executor for background cache refreshes"""
+
+    def __init__(self, max_workers: int = REFRESH_WORKERS, max_pending: int = MAX_PENDING_REFRESHES):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._breaker = get_circuit_breaker()
+        self._stats = {
+            'scheduled': 0,
+            'deduplicated': 0,
+            'dropped': 0,
+            'skipped_remote': 0,
+            'completed': 0,
+            'failed': 0,
+        }
+
+    @cached_property
+    def _redis(self) -> Redis:
+        """Created on first use, so importing this module does not connect to Redis"""
+        return get_redis_client(decode_responses=True)
+
+    def schedule(self, key: str, refresh_fn: Callable[[], Any]) -> bool:
+        """Queue ``refresh_fn`` unless a refresh of ``key`` is already pending
+
+        Returns True if a refresh for the key is (now) in progress.
+        """
+        with self._lock:
+            if key in self._pending:
+                self._stats['deduplicated'] += 1
+                return True
+            if len(self._pending) >= self.max_pending:
+                self._stats['dropped'] += 1
+                logger.debug(f"Stale refresh queue full, dropping refresh of {key}")
+                return False
+            self._pending.add(key)
+            self._stats['scheduled'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='swr-refresh')
+            executor = self._executor
+
+        executor.submit(self._run, key, refresh_fn)
+        return True
+
+    def _run(self, key: str, refresh_fn: Callable[[], Any]):
+        lock_key = REFRESH_LOCK_PREFIX + key
+        locked = False
+        try:
+            locked = self._acquire(lock_key)
+            if locked is False:
+                # Another worker is already refreshing this key
+                self._record('skipped_remote')
+                return
+            refresh_fn()
+            self._record('completed')
+            logger.debug(f"🔄 Refreshed stale cache entry {key}")
+        except Exception as e:
+            self._record('failed')
+            logger.warning(f"⚠️ Background refresh failed for {key}: {str(e)}")
+        finally:
+            if locked:
+                try:
+                    self._redis.delete(lock_key)
+                except RedisError:
+                    pass
+            with self._lock:
+                self._pending.discard(key)
+
+    def _acquire(self, lock_key: str) -> Optional[bool]:
+        """Take the cross-worker refresh lease; None when Redis is unavailable"""
+        if not self._breaker.allow_request():
+            return None
+        try:
+            acquired = bool(self._redis.set(lock_key, '1', nx=True, ex=REFRESH_LEASE_SECONDS))
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            return None
+        self._breaker.record_success()
+        return acquired
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def reset_after_fork(self):
+        """The parent's pool threads do not exist in the child"""
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.__dict__.pop('_redis', None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats.update({
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'hard_ttl_factor': HARD_TTL_FACTOR,
+        })
+        return stats
+
+
+# Global instance
+refresh_scheduler = RefreshScheduler()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=refresh_scheduler.reset_after_fork)
+
+
+def serve_cached(source: str, key: str, payload: Dict[str, Any],
+                 refresh_fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Check a cache hit for staleness, schedule its refresh if stale and record it
+
+    Returns the staleness metadata; the caller serves ``payload`` either way.
+    """
+    meta = staleness(payload)
+    meta['refreshing'] = meta['status'] == 'stale' and refresh_scheduler.schedule(key, refresh_fn)
+    record_staleness(source, meta)
+    return meta
+
+
+def record_staleness(source: str, meta: Dict[str, Any]):
+    """Remember what the current request served, for the response headers"""
+    if not has_request_context():
+        return
+    served = g.setdefault('cache_staleness', {})
+    if served.get(source, {}).get('status') != 'stale':
+        served[source] = meta
+
+
+def served_staleness(source: str) -> Optional[Dict[str, Any]]:
+    """Staleness metadata recorded for ``source`` in the current request, if any"""
+    if not has_request_context():
+        return None
+    return g.get('cache_staleness', {}).get(source)
+
+
+def apply_staleness_headers(response):
+    """after_request hook: expose the stalest cached data the request served"""
+    served = g.get('cache_staleness') if has_request_context() else None
+    if not served:
+        return response
+    statuses = {meta['status'] for meta in served.values()}
+    for status in ('stale', 'fresh', 'miss'):
+        if status in statuses:
+            response.headers['X-Cache-Status'] = status
+            break
+    ages = [meta['age_seconds'] for meta in served.values() if meta.get('age_seconds') is not None]
+    if ages:
+        response.headers['X-Cache-Age'] = str(int(max(ages)))
+    return response
+
+
+def get_refresh_stats() -> Dict[str, Any]:
+    return refresh_scheduler.get_stats()
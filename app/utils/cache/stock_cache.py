@@ -1,7 +1,8 @@
 # app/utils/cache/stock_cache.py
 
-from .news_cache import NewsCache
-from typing import Optional, Dict, List
+from .news_cache import NewsCache, NAMESPACE_STOCK_ANALYSIS
+from .stale_while_revalidate import mark_fresh_for, hard_ttl
+from typing import Optional, Dict, List, Any
 import pandas as pd
 import json
 import logging
@@ -18,6 +19,11 @@ class StockCache(NewsCache):
         self.financial_prefix = "financial"
         self.analysis_prefix = "analysis"
         
+    @staticmethod
+    def ticker_tag(ticker: str) -> str:
+        """Tag shared by every cache entry that belongs to one ticker"""
+        return f"ticker:{ticker.upper()}"
+    
     # Stock Price Data Caching
     def get_stock_data(self, ticker: str, start_date: str, end_date: str) -> Optional[Dict]:
         """Get cached stock price data"""
@@ -25,7 +31,11 @@ class StockCache(NewsCache):
         return self.get_json(cache_key)
     
     def set_stock_data(self, ticker: str, start_date: str, end_date: str, data: pd.DataFrame, expire: int = 3600) -> bool:
-        """Cache stock price data (1 hour default)"""
+        """Cache stock price data (fresh for 1 hour by default)
+
+        ``expire`` is the soft TTL: after it the entry is served stale while it
+        is refreshed, until the hard TTL drops it.
+        """
         cache_key = f"{self.stock_prefix}:price:{ticker}:{start_date}:{end_date}"
         # Convert DataFrame to cacheable format
         cache_data = {
@@ -37,7 +47,15 @@ class StockCache(NewsCache):
             'end_date': end_date,
             'cached_at': datetime.now().isoformat()
         }
-        return self.set_json(cache_key, cache_data, expire)
+        mark_fresh_for(cache_data, expire)
+        return self.set_json(cache_key, cache_data, hard_ttl(expire), tags=[self.ticker_tag(ticker)])
+    
+    @staticmethod
+    def stock_data_to_dataframe(cache_data: Dict) -> pd.DataFrame:
+        """Rebuild the DataFrame stored by set_stock_data()"""
+        df = pd.DataFrame(cache_data['data'], columns=cache_data.get('columns'))
+        df.index = pd.DatetimeIndex(pd.to_datetime(cache_data['index']), name='Date')
+        return df
     
     # Financial Metrics Caching
     def get_financial_data(self, ticker: str, metric: str, start_year: str, end_year: str) -> Optional[Dict]:
@@ -59,7 +77,7 @@ class StockCache(NewsCache):
             'end_year': end_year,
             'cached_at': datetime.now().isoformat()
         }
-        return self.set_json(cache_key, cache_data, expire)
+        return self.set_json(cache_key, cache_data, expire, tags=[self.ticker_tag(ticker)])
     
     def get_financial_metric(self, ticker: str, metric: str, start_year: str, end_year: str) -> Optional[Dict]:
         """Get cached financial metric data"""
@@ -69,7 +87,7 @@ class StockCache(NewsCache):
     def set_financial_metric(self, ticker: str, metric: str, start_year: str, end_year: str, data: Dict, expire: int = 86400) -> bool:
         """Cache financial metric data (24 hours default)"""
         cache_key = f"{self.financial_prefix}:metric:{ticker}:{metric}:{start_year}:{end_year}"
-        return self.set_json(cache_key, data, expire)
+        return self.set_json(cache_key, data, expire, tags=[self.ticker_tag(ticker)])
     
     # Company Information Caching
     def get_company_info(self, ticker: str) -> Optional[Dict]:
@@ -80,18 +98,28 @@ class StockCache(NewsCache):
     def set_company_info(self, ticker: str, info: Dict, expire: int = 86400) -> bool:
         """Cache company information (24 hours default)"""
         cache_key = f"{self.stock_prefix}:info:{ticker}"
-        return self.set_json(cache_key, info, expire)
+        return self.set_json(cache_key, info, expire, tags=[self.ticker_tag(ticker)])
     
     # Stock Analysis Results Caching
     def get_analysis_result(self, ticker: str, analysis_type: str, params_hash: str) -> Optional[Dict]:
         """Get cached analysis result"""
-        cache_key = f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}"
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}")
         return self.get_json(cache_key)
     
     def set_analysis_result(self, ticker: str, analysis_type: str, params_hash: str, result: Dict, expire: int = 3600) -> bool:
         """Cache analysis result (1 hour default)"""
-        cache_key = f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}"
-        return self.set_json(cache_key, result, expire)
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}")
+        return self.set_json(cache_key, result, expire, tags=[self.ticker_tag(ticker)])
+    
+    def get_analysis_object(self, ticker: str, analysis_type: str, params_hash: str) -> Optional[Any]:
+        """Get cached analysis output that is not JSON-serializable (DataFrames, arrays)"""
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}")
+        return self.get_object(cache_key)
+    
+    def set_analysis_object(self, ticker: str, analysis_type: str, params_hash: str, result: Any, expire: int = 3600) -> bool:
+        """Cache pickled analysis output (1 hour default)"""
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:{analysis_type}:{ticker}:{params_hash}")
+        return self.set_object(cache_key, result, expire, tags=[self.ticker_tag(ticker)])
     
     # Market Data Caching
     def get_market_data(self, market_type: str, date: str = None) -> Optional[Dict]:
@@ -139,13 +167,13 @@ class StockCache(NewsCache):
     # Performance Ratios Caching
     def get_performance_ratios(self, ticker: str, period: str) -> Optional[Dict]:
         """Get cached performance ratios"""
-        cache_key = f"{self.analysis_prefix}:ratios:{ticker}:{period}"
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:ratios:{ticker}:{period}")
         return self.get_json(cache_key)
     
     def set_performance_ratios(self, ticker: str, period: str, ratios: Dict, expire: int = 7200) -> bool:
         """Cache performance ratios (2 hours default)"""
-        cache_key = f"{self.analysis_prefix}:ratios:{ticker}:{period}"
-        return self.set_json(cache_key, ratios, expire)
+        cache_key = self.namespace_key(NAMESPACE_STOCK_ANALYSIS, f"{self.analysis_prefix}:ratios:{ticker}:{period}")
+        return self.set_json(cache_key, ratios, expire, tags=[self.ticker_tag(ticker)])
     
     # Trending Stocks Caching
     def get_trending_stocks(self, category: str = 'general') -> Optional[List[Dict]]:
@@ -161,19 +189,16 @@ class StockCache(NewsCache):
     # Bulk Cache Operations
     def invalidate_ticker_cache(self, ticker: str):
         """Invalidate all cache entries for a specific ticker"""
-        patterns = [
-            f"{self.stock_prefix}:price:{ticker}:*",
-            f"{self.stock_prefix}:info:{ticker}",
-            f"{self.financial_prefix}:metric:{ticker}:*",
-            f"{self.analysis_prefix}:*:{ticker}:*"
-        ]
-        for pattern in patterns:
-            self.delete_pattern(pattern)
+        return self.invalidate_tags(self.ticker_tag(ticker))
+    
+    def invalidate_analysis_cache(self) -> Dict[str, int]:
+        """Invalidate every cached analysis result and performance ratio at once"""
+        return self.bump_namespace(NAMESPACE_STOCK_ANALYSIS)
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics for monitoring"""
         if not self.is_available():
-            return {'cache_available': False}
+            return {'cache_available': False, 'connection_pool': self.get_pool_stats()}
         
         try:
             # This would require Redis info commands
@@ -181,6 +206,9 @@ class StockCache(NewsCache):
             return {
                 'cache_available': True,
                 'cache_type': 'redis',
+                'tiers': self.get_tier_stats(),
+                'namespace_generations': self.get_namespace_generations(),
+                'connection_pool': self.get_pool_stats(),
                 'timestamp': datetime.now().isoformat()
             }
         except Exception as e:
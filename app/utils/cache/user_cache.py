@@ -55,16 +55,16 @@ class UserCache(NewsCache):
     
     def invalidate_user(self, user_id: int = None, email: str = None, username: str = None):
         """Invalidate user cache entries"""
-        patterns = []
+        keys = []
         if user_id:
-            patterns.append(f"{self.cache_prefix}:id:{user_id}")
+            keys.append(f"{self.cache_prefix}:id:{user_id}")
         if email:
-            patterns.append(f"{self.cache_prefix}:email:{email.lower()}")
+            keys.append(f"{self.cache_prefix}:email:{email.lower()}")
         if username:
-            patterns.append(f"{self.cache_prefix}:username:{username.lower()}")
+            keys.append(f"{self.cache_prefix}:username:{username.lower()}")
         
-        for pattern in patterns:
-            self.delete_pattern(pattern)
+        if keys:
+            self.delete(*keys)
     
     def get_user_stats(self) -> Optional[Dict]:
         """Get cached user statistics"""
@@ -84,7 +84,7 @@ class UserCache(NewsCache):
     def set_user_activities(self, user_id: int, activities: List[Dict], page: int = 1, expire: int = 600) -> bool:
         """Cache user activities (10 minutes default)"""
         cache_key = f"{self.cache_prefix}:activities:{user_id}:page:{page}"
-        return self.set_json(cache_key, activities, expire)
+        return self.set_json(cache_key, activities, expire, tags=[f"{self.cache_prefix}:activities"])
     
     def get_admin_user_list(self, page: int = 1) -> Optional[Dict]:
         """Get cached admin user list"""
@@ -94,13 +94,12 @@ class UserCache(NewsCache):
     def set_admin_user_list(self, user_list: Dict, page: int = 1, expire: int = 300) -> bool:
         """Cache admin user list (5 minutes default)"""
         cache_key = f"{self.cache_prefix}:admin_list:page:{page}"
-        return self.set_json(cache_key, user_list, expire)
+        return self.set_json(cache_key, user_list, expire, tags=[f"{self.cache_prefix}:admin_list"])
     
     def invalidate_admin_caches(self):
         """Invalidate admin-related caches"""
-        self.delete_pattern(f"{self.cache_prefix}:stats")
-        self.delete_pattern(f"{self.cache_prefix}:admin_list:*")
-        self.delete_pattern(f"{self.cache_prefix}:activities:*")
+        self.delete(f"{self.cache_prefix}:stats")
+        self.invalidate_tags(f"{self.cache_prefix}:admin_list", f"{self.cache_prefix}:activities")
 
 # Global instance
 user_cache = UserCache() 
\ No newline at end of file
@@ -0,0 +1,303 @@
+# app/utils/config/logging_config.py
+
+"""
+Queued, structured logging.
+
+configure_logging() replaces the root handlers with one QueueHandler. The
+calling thread only puts the record on an in-memory queue, and a
+QueueListener thread formats it (JSON by default) and writes it to stdout
+and the optional LOG_FILE. A full queue drops the record and counts the
+drop instead of blocking the request.
+
+Environment:
+    LOG_LEVEL       root level (default INFO)
+    LOG_LEVELS      per-module levels, e.g. "app.routes=DEBUG,yfinance=ERROR"
+    LOG_FORMAT      json | text (default json)
+    LOG_FILE        also write to this file (rotated)
+    LOG_QUEUE_SIZE  records buffered before dropping (default 10000)
+
+Hot loops log through get_hot_logger(), a child logger whose records are
+rate-limited per call site, with a count of what was suppressed.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import traceback
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+LOG_FILE = os.getenv('LOG_FILE')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+HOT_LOG_INTERVAL = float(os.getenv('HOT_LOG_INTERVAL', 60))
+HOT_LOG_BURST = int(os.getenv('HOT_LOG_BURST', 5))
+
+# Third-party loggers that are chatty at DEBUG/INFO
+DEFAULT_MODULE_LEVELS = {
+    'urllib3': 'WARNING',
+    'yfinance': 'WARNING',
+    'peewee': 'WARNING',
+    'matplotlib': 'WARNING',
+    'apscheduler': 'WARNING',
+    'werkzeug': 'INFO',
+    'sqlalchemy.engine': 'WARNING',
+}
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Enqueues without formatting; drops (and counts) when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread. Only resolve what may
+        # change or die before it gets there: %-args and the traceback.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            logging_stats.record(record.levelname)
+        except queue.Full:
+            logging_stats.record_drop()
+
+
+class _TimedQueueListener(QueueListener):
+    """Measures the time spent formatting and writing records"""
+
+    def handle(self, record: logging.LogRecord):
+        start = time.perf_counter()
+        super().handle(record)
+        logging_stats.record_write(time.perf_counter() - start)
+
+
+class LoggingStats:
+    """Records enqueued per level, drops, and listener write time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._records: Dict[str, int] = {}
+            self._dropped = 0
+            self._suppressed = 0
+            self._write_seconds = 0.0
+            self._written = 0
+
+    def record(self, level: str):
+        with self._lock:
+            self._records[level] = self._records.get(level, 0) + 1
+
+    def record_drop(self):
+        with self._lock:
+            self._dropped += 1
+
+    def record_suppressed(self):
+        with self._lock:
+            self._suppressed += 1
+
+    def record_write(self, seconds: float):
+        with self._lock:
+            self._written += 1
+            self._write_seconds += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'records': dict(self._records),
+                'dropped': self._dropped,
+                'suppressed': self._suppressed,
+                'written': self._written,
+                'avg_write_ms': round(self._write_seconds / self._written * 1000, 3) if self._written else 0.0,
+                'queue_depth': _pipeline.queue.qsize() if _pipeline.queue is not None else 0,
+            }
+
+    def render_prometheus(self) -> str:
+        worker = os.getpid()
+        stats = self.get_stats()
+        lines = [
+            '# HELP app_log_records_total Log records enqueued, by level',
+            '# TYPE app_log_records_total counter',
+        ]
+        for level, count in sorted(stats['records'].items()):
+            lines.append(f'app_log_records_total{{level="{level}",worker="{worker}"}} {count}')
+        lines += [
+            '# HELP app_log_records_dropped_total Log records dropped because the queue was full',
+            '# TYPE app_log_records_dropped_total counter',
+            f'app_log_records_dropped_total{{worker="{worker}"}} {stats["dropped"]}',
+            '# HELP app_log_records_suppressed_total Hot-path log records suppressed by rate limiting',
+            '# TYPE app_log_records_suppressed_total counter',
+            f'app_log_records_suppressed_total{{worker="{worker}"}} {stats["suppressed"]}',
+            '# HELP app_log_write_seconds_total Listener time spent formatting and writing records',
+            '# TYPE app_log_write_seconds_total counter',
+            f'app_log_write_seconds_total{{worker="{worker}"}} {self._write_seconds:.6f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class _Pipeline:
+    """The queue, its handler on the root logger, and the listener thread"""
+
+    def __init__(self):
+        self.queue: Optional[queue.Queue] = None
+        self.handler: Optional[_DroppingQueueHandler] = None
+        self.listener: Optional[_TimedQueueListener] = None
+        self.targets = []
+
+    def start(self, targets):
+        self.targets = targets
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = _DroppingQueueHandler(self.queue)
+        self.listener = _TimedQueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Flush what is queued and stop the listener thread"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def restart_after_fork(self):
+        # The listener thread does not survive fork; records queued by the
+        # parent stay with the parent
+        if self.listener is None:
+            return
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler.queue = self.queue
+        self.listener = _TimedQueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+
+# Global instances
+logging_stats = LoggingStats()
+_pipeline = _Pipeline()
+_configure_lock = threading.Lock()
+
+atexit.register(_pipeline.stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'a=DEBUG, b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = None, module_levels: str = None, fmt: str = None,
+                      log_file: str = None, force: bool = False):
+    """Route all logging through the queue; safe to call more than once"""
+    with _configure_lock:
+        if _pipeline.listener is not None and not force:
+            return
+        _pipeline.stop()
+
+        if (fmt or LOG_FORMAT) == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(formatter)
+        targets = [stream]
+        log_file = log_file or LOG_FILE
+        if log_file:
+            file_handler = RotatingFileHandler(log_file, maxBytes=50 * 1024 * 1024, backupCount=5)
+            file_handler.setFormatter(formatter)
+            targets.append(file_handler)
+
+        _pipeline.start(targets)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_pipeline.handler)
+        root.setLevel(level or LOG_LEVEL)
+
+        levels = dict(DEFAULT_MODULE_LEVELS)
+        levels.update(parse_module_levels(LOG_LEVELS if module_levels is None else module_levels))
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets ``burst`` records per call site through every ``interval`` seconds"""
+
+    def __init__(self, interval: float = HOT_LOG_INTERVAL, burst: int = HOT_LOG_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._windows: Dict[tuple, list] = {}  # site -> [window start, passed, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(site)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[site] = [now, 0, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (suppressed {suppressed} similar messages)"
+                    record.args = None
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+        logging_stats.record_suppressed()
+        return False
+
+
+def get_hot_logger(name: str, interval: float = HOT_LOG_INTERVAL, burst: int = HOT_LOG_BURST) -> logging.Logger:
+    """Rate-limited child of ``name`` for per-item logging in loops"""
+    hot = logging.getLogger(f"{name}.hot")
+    if not any(isinstance(f, RateLimitFilter) for f in hot.filters):
+        hot.addFilter(RateLimitFilter(interval, burst))
+    return hot
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    return logging_stats.get_stats()
@@ -14,6 +14,10 @@ import re
 from app.utils.visualization.visualization_service import is_stock
 from app.utils.cache.stock_cache import stock_cache
 from app.utils.cache.optimized_long_period_cache import long_period_cache
+from app.utils.cache.single_flight import single_flight
+from app.utils.cache.price_arena import price_arena, price_arena_ttl
+from app.utils.cache.stale_while_revalidate import serve_cached, record_staleness, miss_metadata
+from app.utils.config.logging_config import get_hot_logger
 
 from time import sleep
 from functools import wraps
@@ -23,6 +27,7 @@ import traceback
 
 # Configure logger
 logger = logging.getLogger(__name__)
+hot_logger = get_hot_logger(__name__)
 
 def retry_with_backoff(retries: int = 3, backoff_in_seconds: float = 1.0):
     """Retry decorator with exponential backoff"""
@@ -194,6 +199,13 @@ class DataService:
         # Format ticker for Yahoo
         ticker = self.format_yahoo_symbol(ticker)
         
+        # Hot series are shared by all workers on this host, without decoding
+        arena_key = f"history:{ticker}:{start_date}:{end_date}"
+        df = price_arena.get(arena_key)
+        if df is not None:
+            logger.debug(f"🧠 Shared price arena hit for {ticker} ({start_date} to {end_date})")
+            return df
+        
         # Calculate lookback period
         start_dt = pd.to_datetime(start_date)
         end_dt = pd.to_datetime(end_date)
@@ -201,9 +213,16 @@ class DataService:
         
         # Check if this is a long-period analysis (> 365 days)
         if lookback_days > 365:
-            return self._get_long_period_data(ticker, lookback_days, end_date)
+            df = self._get_long_period_data(ticker, lookback_days, end_date)
         else:
-            return self._get_standard_period_data(ticker, start_date, end_date)
+            df = self._get_standard_period_data(ticker, start_date, end_date)
+        
+        if df is not None and not df.empty and price_arena.note_request(arena_key):
+            try:
+                price_arena.put(arena_key, df, ttl=price_arena_ttl(end_date))
+            except Exception as arena_error:
+                logger.warning(f"⚠️ Failed to publish {ticker} to the price arena: {str(arena_error)}")
+        return df
     
     def _get_long_period_data(self, ticker: str, lookback_days: int, end_date: str) -> pd.DataFrame:
         """Handle long-period data retrieval with partitioned caching"""
@@ -230,7 +249,11 @@ class DataService:
         
         # For non-SP500 tickers, try partitioned cache first
         if ticker != '^GSPC':
-            cached_data, was_cached = self.long_cache.get_partitioned_data(ticker, lookback_days, end_date)
+            refresh_start = (pd.to_datetime(end_date) - timedelta(days=lookback_days + 10)).strftime('%Y-%m-%d')
+            cached_data, was_cached = self.long_cache.get_partitioned_data(
+                ticker, lookback_days, end_date,
+                loader=lambda: self._fetch_coalesced(ticker, refresh_start, end_date)
+            )
             
             if cached_data is not None:
                 duration = time.time() - start_time
@@ -239,11 +262,12 @@ class DataService:
         
         # Fetch fresh data if not cached
         logger.info(f"🔄 Fetching long-period data for {ticker} ({lookback_days} days)")
+        record_staleness('long_period_data', miss_metadata())
         
         end_dt = pd.to_datetime(end_date)
         start_dt = end_dt - timedelta(days=lookback_days + 10)  # Add buffer for weekends
         
-        df = self._get_data_from_yfinance_direct(ticker, start_dt.strftime('%Y-%m-%d'), end_date)
+        df = self._fetch_coalesced(ticker, start_dt.strftime('%Y-%m-%d'), end_date)
         
         if df is not None and not df.empty:
             # Cache using appropriate strategy
@@ -289,7 +313,7 @@ class DataService:
             logger.debug(f"🔄 End date is current day, fetching fresh data for {ticker}")
             # Add 1 day to ensure we get latest price
             adjusted_end_date = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
-            df = self._get_data_from_yfinance_direct(ticker, start_date, adjusted_end_date)
+            df = self._fetch_coalesced(ticker, start_date, adjusted_end_date)
             
             if df is not None and not df.empty:
                 # Cache with shorter expiration for current day data
@@ -303,25 +327,26 @@ class DataService:
                         logger.warning(f"⚠️ Failed to cache SP500 data: {str(cache_error)}")
                 else:
                     # Use regular stock cache for other tickers
-                    stock_cache.set_stock_data(ticker, start_date, end_date, df.to_dict('records'), expire=300)  # 5 minutes
+                    stock_cache.set_stock_data(ticker, start_date, end_date, df, expire=300)  # 5 minutes
                 
             return df
         
         # For historical data, check cache first (non-SP500 tickers)
         if ticker != '^GSPC':
             cached_data = stock_cache.get_stock_data(ticker, start_date, end_date)
-            if cached_data is not None:
+            if cached_data is not None and 'index' in cached_data:
                 logger.debug(f"🎯 Stock data cache hit for {ticker} ({start_date} to {end_date})")
-                # Convert cached dict back to DataFrame
-                df = pd.DataFrame(cached_data)
-                if 'Date' in df.columns:
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    df.set_index('Date', inplace=True)
-                return df
+                # Stale entries are served as-is and refreshed in the background
+                serve_cached(
+                    'stock_data', f"stock_data:{ticker}:{start_date}:{end_date}", cached_data,
+                    lambda: self._refresh_standard_period_data(ticker, start_date, end_date)
+                )
+                return stock_cache.stock_data_to_dataframe(cached_data)
         
         # Fetch from yfinance if not cached
         logger.debug(f"🔄 Cache miss, fetching data from yfinance for {ticker}")
-        df = self._get_data_from_yfinance_direct(ticker, start_date, end_date)
+        record_staleness('stock_data', miss_metadata())
+        df = self._fetch_coalesced(ticker, start_date, end_date)
         
         if df is not None and not df.empty:
             # Cache the result
@@ -335,9 +360,23 @@ class DataService:
                     logger.warning(f"⚠️ Failed to cache SP500 data: {str(cache_error)}")
             else:
                 # Use regular stock cache for other tickers
-                stock_cache.set_stock_data(ticker, start_date, end_date, df.to_dict('records'), expire=3600)  # 1 hour
+                stock_cache.set_stock_data(ticker, start_date, end_date, df, expire=3600)  # 1 hour
             
         return df
+    
+    def _refresh_standard_period_data(self, ticker: str, start_date: str, end_date: str):
+        """Background refresh of a stale historical range"""
+        df = self._fetch_coalesced(ticker, start_date, end_date)
+        if df is not None and not df.empty:
+            stock_cache.set_stock_data(ticker, start_date, end_date, df, expire=3600)
+
+    def _fetch_coalesced(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Download from yfinance once for concurrent identical cache misses (all workers)"""
+        return single_flight.do(
+            f"history:{ticker}:{start_date}:{end_date}",
+            lambda: self._get_data_from_yfinance_direct(ticker, start_date, end_date),
+            lease_seconds=30
+        )
 
     def _get_data_from_yfinance_direct(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -375,7 +414,7 @@ class DataService:
                     time.sleep(1.0)  # Longer pause on error
             
             if df.empty:
-                logger.error(f"No data available for {ticker} from {start_date} to {end_date}")
+                hot_logger.warning(f"No data available for {ticker} from {start_date} to {end_date}")
                 return pd.DataFrame()
             
             # Data validation and cleaning
@@ -424,8 +424,10 @@ class DuplicatePreventionService:
             # Step 3: Add symbols with deduplication
             if article_data.get('symbols'):
                 unique_symbols = self.deduplicate_symbols(article_data['symbols'])
+                from app.utils.search.symbol_alias import link_article_symbols
+                symbol_ids = link_article_symbols(self.session, unique_symbols)
                 for symbol in unique_symbols:
-                    new_article.symbols.append(ArticleSymbol(symbol=symbol))
+                    new_article.symbols.append(ArticleSymbol(symbol=symbol, symbol_id=symbol_ids.get(symbol)))
             
             # Step 4: Save with integrity error handling
             try:
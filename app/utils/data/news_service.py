@@ -6,6 +6,7 @@ from datetime import datetime, timedelta, date, timezone
 from sqlalchemy.exc import SQLAlchemyError
 from app import db
 from app.models import NewsArticle, ArticleSymbol, ArticleMetric
+from app.utils.search.symbol_alias import link_article_symbols
 
 class NewsService:
     """Service class for handling news article operations"""
@@ -122,7 +123,7 @@ class NewsService:
 
             # Add symbols
             if article.get('symbols'):
-                seen_symbols = set()  # Track unique symbols
+                symbol_strs = []  # Unique symbols, in order
                 for symbol_data in article['symbols']:
                     symbol = symbol_data.get('symbol') if isinstance(symbol_data, dict) else symbol_data
                     
@@ -134,9 +135,13 @@ class NewsService:
                         else:
                             symbol_str = str(symbol).strip()
                         
-                        if symbol_str and symbol_str not in seen_symbols:
-                            seen_symbols.add(symbol_str)
-                            new_article.symbols.append(ArticleSymbol(symbol=symbol_str))
+                        if symbol_str and symbol_str not in symbol_strs:
+                            symbol_strs.append(symbol_str)
+
+                # Link each symbol to its canonical id for indexed symbol search
+                symbol_ids = link_article_symbols(db.session, symbol_strs)
+                for symbol_str in symbol_strs:
+                    new_article.symbols.append(ArticleSymbol(symbol=symbol_str, symbol_id=symbol_ids.get(symbol_str)))
 
             # Add metrics with deduplication
             if article.get('metrics'):
@@ -201,10 +206,12 @@ class NewsService:
             article (NewsArticle): Article object to add symbols to
             symbols_data (List): List of symbols or symbol dictionaries
         """
-        for symbol_data in symbols_data:
-            symbol = symbol_data.get('symbol') if isinstance(symbol_data, dict) else symbol_data
+        symbols = [symbol_data.get('symbol') if isinstance(symbol_data, dict) else symbol_data
+                   for symbol_data in symbols_data]
+        symbol_ids = link_article_symbols(db.session, [symbol for symbol in symbols if symbol])
+        for symbol in symbols:
             if symbol:
-                article.symbols.append(ArticleSymbol(symbol=symbol))
+                article.symbols.append(ArticleSymbol(symbol=symbol, symbol_id=symbol_ids.get(symbol)))
 
     def _add_metrics(self, article: NewsArticle, metrics_data: Dict) -> None:
         """
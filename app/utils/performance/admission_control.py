@@ -0,0 +1,409 @@
+# app/utils/performance/admission_control.py
+
+"""
+Admission control and load shedding for expensive analysis routes.
+
+A request has to pass two gates before it may compute:
+
+1. a per-client token bucket (user id, or IP for anonymous requests). A
+   request costs more tokens the longer its lookback, so one client cannot
+   flood the workers with 10,000-day analyses. A client out of tokens gets
+   429 with Retry-After;
+2. a global, cross-worker concurrency limit: a Redis semaphore (a sorted set
+   of leased slots, so slots held by a dead worker expire). A request waits
+   up to ADMISSION_QUEUE_TIMEOUT for a slot. If the wait fails it degrades
+   (when the route offers a degraded answer, such as a queued job) or is
+   shed with 503 and Retry-After.
+
+Leases held by running analyses are renewed in the background, so a long
+analysis keeps its slot. Queued analysis jobs take a slot too
+(``analysis_slot``): they wait for one instead of being shed.
+
+Both gates fall back to per-process limits while Redis is unavailable.
+"""
+
+import os
+import time
+import uuid
+import math
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from functools import cached_property, wraps
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from flask import Response, request, jsonify, make_response
+from redis import Redis, RedisError
+
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, redis_pool_manager
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+MAX_CONCURRENT_ANALYSES = int(os.getenv('ADMISSION_MAX_CONCURRENT', 6))
+LOCAL_MAX_CONCURRENT = int(os.getenv('ADMISSION_LOCAL_MAX_CONCURRENT', 2))
+SLOT_LEASE_SECONDS = int(os.getenv('ADMISSION_SLOT_LEASE_SECONDS', 180))
+# Held leases are pushed out this often, well before they can expire
+LEASE_RENEW_INTERVAL = SLOT_LEASE_SECONDS / 3
+QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))
+BUCKET_CAPACITY = float(os.getenv('ADMISSION_BUCKET_CAPACITY', 30))
+BUCKET_REFILL_PER_SECOND = float(os.getenv('ADMISSION_BUCKET_REFILL_PER_SECOND', 0.5))
+
+SLOTS_KEY = "admission:slots"
+BUCKET_PREFIX = "admission:bucket:"
+
+# Retry-After when shedding for lack of a slot
+SHED_RETRY_AFTER = 10
+POLL_INTERVAL = 0.2
+
+# Drop expired leases, then take a slot if one is free
+_ACQUIRE_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zcard', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('zadd', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('expire', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+# Refill the bucket for the elapsed time, then take ``cost`` tokens if available.
+# Returns {admitted, seconds until enough tokens}
+_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local admitted = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    admitted = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('hset', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('expire', KEYS[1], math.ceil(capacity / rate) + 1)
+return {admitted, tostring(wait)}
+"""
+
+
+def lookback_cost(default_lookback: int = 365) -> int:
+    """Token cost of the current request: one per year of lookback"""
+    params = request.get_json(silent=True) or {}
+    lookback = params.get('lookback_days') or request.form.get('lookback_days') or request.args.get('lookback_days')
+    try:
+        lookback_days = int(lookback) if lookback else default_lookback
+    except (TypeError, ValueError):
+        lookback_days = default_lookback
+    return max(1, min(int(BUCKET_CAPACITY), math.ceil(lookback_days / 365)))
+
+
+def client_identity() -> str:
+    """Bucket owner: the logged-in user, else the client address"""
+    try:
+        from flask_login import current_user
+        if current_user.is_authenticated:
+            return f"user:{current_user.get_id()}"
+    except Exception:
+        pass
+    return f"ip:{request.remote_addr or 'unknown'}"
+
+
+class AdmissionController:
+    """Token buckets per client plus a global concurrency limit"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_ANALYSES,
+                 local_max_concurrent: int = LOCAL_MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self.local_max_concurrent = local_max_concurrent
+        self._breaker = get_circuit_breaker()
+        self._lock = threading.Lock()
+        self._local_slots = threading.BoundedSemaphore(local_max_concurrent)
+        self._local_buckets: Dict[str, Tuple[float, float]] = {}
+        self._held: Set[str] = set()
+        self._renewer: Optional[threading.Thread] = None
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rate_limited': 0,
+            'shed': 0,
+            'degraded': 0,
+            'redis_bypassed': 0,
+        }
+
+    # Token buckets
+
+    @cached_property
+    def _redis(self) -> Redis:
+        """Created on first use, so importing this module does not connect to Redis"""
+        return get_redis_client()
+
+    def take_tokens(self, identity: str, cost: float) -> Tuple[bool, float]:
+        """Charge ``cost`` tokens; returns (admitted, seconds until it would be)"""
+        now = time.time()
+        if self._breaker.allow_request():
+            try:
+                admitted, wait = self._redis.eval(
+                    _BUCKET_SCRIPT, 1, BUCKET_PREFIX + identity,
+                    BUCKET_CAPACITY, BUCKET_REFILL_PER_SECOND, now, cost
+                )
+                self._breaker.record_success()
+                return bool(int(admitted)), float(wait)
+            except RedisError as e:
+                self._on_redis_error(e)
+        else:
+            self._record('redis_bypassed')
+
+        with self._lock:
+            tokens, ts = self._local_buckets.get(identity, (BUCKET_CAPACITY, now))
+            tokens = min(BUCKET_CAPACITY, tokens + max(0.0, now - ts) * BUCKET_REFILL_PER_SECOND)
+            admitted = tokens >= cost
+            if admitted:
+                tokens -= cost
+            self._local_buckets[identity] = (tokens, now)
+            if len(self._local_buckets) > 10000:
+                self._local_buckets.clear()
+        return admitted, 0.0 if admitted else (cost - tokens) / BUCKET_REFILL_PER_SECOND
+
+    # Global concurrency
+
+    def acquire_slot(self, timeout: float = None) -> Optional[str]:
+        """A slot token, waiting up to ``timeout`` seconds; None if none freed up"""
+        deadline = time.monotonic() + (QUEUE_TIMEOUT if timeout is None else timeout)
+        token = uuid.uuid4().hex
+        queued = False
+        while True:
+            if not self._breaker.allow_request():
+                self._record('redis_bypassed')
+                remaining = max(0.0, deadline - time.monotonic())
+                return 'local' if self._local_slots.acquire(timeout=remaining) else None
+            try:
+                now = time.time()
+                acquired = self._redis.eval(
+                    _ACQUIRE_SCRIPT, 1, SLOTS_KEY,
+                    now, self.max_concurrent, now + SLOT_LEASE_SECONDS, token, SLOT_LEASE_SECONDS
+                )
+                self._breaker.record_success()
+            except RedisError as e:
+                # Until the breaker opens, retry on the same schedule as a full semaphore
+                self._on_redis_error(e)
+            else:
+                if acquired:
+                    self._hold(token)
+                    return token
+                if not queued:
+                    queued = True
+                    self._record('queued')
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def release_slot(self, token: str):
+        if token == 'local':
+            self._local_slots.release()
+            return
+        with self._lock:
+            self._held.discard(token)
+        try:
+            self._redis.zrem(SLOTS_KEY, token)
+        except RedisError as e:
+            self._on_redis_error(e)
+
+    # Lease renewal
+
+    def _hold(self, token: str):
+        with self._lock:
+            self._held.add(token)
+            if self._renewer is None or not self._renewer.is_alive():
+                self._renewer = threading.Thread(target=self._renew_loop, name="admission-lease-renewer",
+                                                 daemon=True)
+                self._renewer.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(LEASE_RENEW_INTERVAL)
+            self.renew_leases()
+
+    def renew_leases(self) -> int:
+        """Push out the expiry of every slot this process holds; returns how many were renewed"""
+        with self._lock:
+            held = list(self._held)
+        if not held or not self._breaker.allow_request():
+            return 0
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            # XX: a slot released (or already expired) meanwhile must not come back
+            pipe.zadd(SLOTS_KEY, {token: time.time() + SLOT_LEASE_SECONDS for token in held}, xx=True, ch=True)
+            pipe.expire(SLOTS_KEY, SLOT_LEASE_SECONDS)
+            renewed = pipe.execute()[0]
+            self._breaker.record_success()
+        except RedisError as e:
+            self._on_redis_error(e)
+            return 0
+        if renewed < len(held):
+            logger.debug(f"🚦 {len(held) - renewed} analysis slot lease(s) expired before renewal")
+        return renewed
+
+    def in_flight(self) -> Optional[int]:
+        try:
+            self._redis.zremrangebyscore(SLOTS_KEY, '-inf', time.time())
+            count = self._redis.zcard(SLOTS_KEY)
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            return None
+        self._breaker.record_success()
+        return count
+
+    def _on_redis_error(self, error: Exception):
+        self._breaker.record_failure(error)
+        redis_pool_manager.ensure_health_thread()
+        logger.debug(f"Admission control falling back to local limits: {str(error)}")
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._local_slots = threading.BoundedSemaphore(self.local_max_concurrent)
+        self._local_buckets = {}
+        self._held = set()
+        self._renewer = None
+        self.__dict__.pop('_redis', None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight() if self._breaker.allow_request() else None,
+            'bucket_capacity': BUCKET_CAPACITY,
+            'bucket_refill_per_second': BUCKET_REFILL_PER_SECOND,
+        })
+        return stats
+
+
+# Global instance
+admission_controller = AdmissionController()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=admission_controller.reset_after_fork)
+
+
+def _reject(status: int, message: str, retry_after: float, html: bool):
+    retry_after = max(1, math.ceil(retry_after))
+    if html:
+        response = make_response(f'<div class="text-red-500">Error: {message}</div>', status)
+    else:
+        response = make_response(jsonify({'success': False, 'error': message, 'retry_after': retry_after}), status)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_controlled(cost: Callable[[], float] = lookback_cost,
+                         degrade: Optional[Callable[[], Any]] = None, html: bool = False):
+    """
+    Admit the decorated view through the token bucket and concurrency limit
+
+    ``degrade`` is called when no slot frees up in time; if it returns a
+    response that is served instead of a 503. A streamed response keeps
+    its slot until the server has sent all of it. ``html`` renders rejections
+    as the HTML error fragment the analysis page expects.
+    """
+    def decorator(func):
+        def admit():
+            """(slot token, None) to go ahead, or (None, rejection response)"""
+            identity = client_identity()
+            request_cost = cost()
+            admitted, wait = admission_controller.take_tokens(identity, request_cost)
+            if not admitted:
+                admission_controller._record('rate_limited')
+                logger.info(f"🚦 Rate limited {identity} on {request.endpoint} (cost {request_cost})")
+                return None, _reject(429, "Too many analysis requests, please retry shortly", wait, html)
+
+            token = admission_controller.acquire_slot()
+            if token is not None:
+                admission_controller._record('admitted')
+                return token, None
+
+            if degrade is not None:
+                degraded = degrade()
+                if degraded is not None:
+                    admission_controller._record('degraded')
+                    logger.info(f"🚦 Degraded {request.endpoint} under load")
+                    return None, degraded
+
+            admission_controller._record('shed')
+            logger.warning(f"🚦 Shedding {request.endpoint}: {admission_controller.max_concurrent} analyses already running")
+            return None, _reject(503, "The server is busy with other analyses, please retry shortly",
+                                 SHED_RETRY_AFTER, html)
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not ADMISSION_ENABLED:
+                    return await func(*args, **kwargs)
+                token, rejection = admit()
+                if token is None:
+                    return rejection
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    admission_controller.release_slot(token)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return func(*args, **kwargs)
+            token, rejection = admit()
+            if token is None:
+                return rejection
+            try:
+                response = func(*args, **kwargs)
+            except BaseException:
+                admission_controller.release_slot(token)
+                raise
+            if isinstance(response, Response) and response.is_streamed:
+                # The work happens while the body streams: hold the slot until the server closes it
+                response.call_on_close(lambda: admission_controller.release_slot(token))
+            else:
+                admission_controller.release_slot(token)
+            return response
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def analysis_slot(report: Callable[[str, int], None] = None):
+    """
+    Hold a global slot around work that must queue rather than be shed
+
+    Analysis jobs (including requests degraded to a job under load) run
+    outside the request path but compete for the same capacity, so they
+    wait here until a slot frees up. ``report`` is called on every round
+    of waiting so the job keeps showing progress.
+    """
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    token = admission_controller.acquire_slot()
+    while token is None:
+        if report is not None:
+            report('waiting for capacity', 0)
+        token = admission_controller.acquire_slot()
+    try:
+        yield
+    finally:
+        admission_controller.release_slot(token)
+
+
+def get_admission_stats() -> Dict[str, Any]:
+    return admission_controller.get_stats()
@@ -0,0 +1,314 @@
+# app/utils/performance/memory_watchdog.py
+
+"""
+Allocation sampling and an RSS watchdog for long-running workers.
+
+- AllocationSampler (opt-in, MEMORY_PROFILING_ENABLED): runs tracemalloc and
+  takes a snapshot every MEMORY_SNAPSHOT_INTERVAL seconds. Each snapshot is
+  diffed against the previous one and the first one, so the call sites
+  whose allocations keep growing stand out. Tracing costs CPU and memory, so
+  it stays off unless asked for (env, or the admin endpoint).
+- MemoryWatchdog (WORKER_MAX_RSS_MB, 0 disables): reads the worker's RSS
+  every MEMORY_CHECK_INTERVAL seconds. After MEMORY_OVER_LIMIT_CHECKS
+  consecutive readings over the limit it waits for in-flight requests to
+  finish (up to MEMORY_DRAIN_TIMEOUT) and sends itself SIGTERM, which
+  gunicorn handles as a graceful worker exit and replaces the worker.
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MEMORY_PROFILING_ENABLED = os.getenv('MEMORY_PROFILING_ENABLED', 'false').lower() == 'true'
+SNAPSHOT_INTERVAL = int(os.getenv('MEMORY_SNAPSHOT_INTERVAL', 300))
+TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', 10))
+TOP_ALLOCATORS = int(os.getenv('MEMORY_TOP_ALLOCATORS', 25))
+
+MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', 1536))
+CHECK_INTERVAL = int(os.getenv('MEMORY_CHECK_INTERVAL', 30))
+OVER_LIMIT_CHECKS = int(os.getenv('MEMORY_OVER_LIMIT_CHECKS', 3))
+DRAIN_TIMEOUT = int(os.getenv('MEMORY_DRAIN_TIMEOUT', 60))
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Allocations made by the tracing machinery itself
+_IGNORED_FRAMES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AllocationSampler:
+    """Periodic tracemalloc snapshots, diffed to find growing allocation sites"""
+
+    def __init__(self, interval: int = SNAPSHOT_INTERVAL, frames: int = TRACE_FRAMES):
+        self.interval = interval
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._previous = None
+        self._latest = None
+        self._latest_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._started_tracing = False
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, periodic: bool = True):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+            logger.info(f"🔬 Allocation tracing started ({self.frames} frames)")
+        self.snapshot()
+        if periodic and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='allocation-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("🔬 Allocation tracing stopped")
+        self._started_tracing = False
+        with self._lock:
+            self._baseline = self._previous = self._latest = None
+
+    def snapshot(self):
+        """Take a snapshot; the one before it becomes the comparison point"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_FRAMES)
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = snapshot
+            self._previous = self._latest
+            self._latest = snapshot
+            self._latest_at = time.time()
+        return snapshot
+
+    def top_allocators(self, limit: int = TOP_ALLOCATORS, compare_to: str = 'previous') -> List[Dict[str, Any]]:
+        """Call sites by allocated size, with the growth since ``compare_to`` ('previous' or 'baseline')"""
+        with self._lock:
+            latest = self._latest
+            reference = self._baseline if compare_to == 'baseline' else self._previous
+        if latest is None:
+            return []
+        if reference is None:
+            stats = latest.statistics('traceback')
+        else:
+            stats = latest.compare_to(reference, 'traceback')
+            stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+
+        allocators = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[-1]  # most recent frame
+            allocators.append({
+                'site': f"{frame.filename}:{frame.lineno}",
+                'traceback': stat.traceback.format(most_recent_first=True)[:self.frames * 2],
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1),
+                'count_diff': getattr(stat, 'count_diff', stat.count),
+            })
+        return allocators
+
+    def get_stats(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'traced_mb': round(current / 1024 / 1024, 1),
+            'traced_peak_mb': round(peak / 1024 / 1024, 1),
+            'last_snapshot_at': self._latest_at,
+            'snapshot_interval': self.interval,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+                growth = [entry for entry in self.top_allocators(5) if entry['size_diff_kb'] > 0]
+                if growth:
+                    logger.info("📈 Top allocation growth: " + '; '.join(
+                        f"{entry['site']} +{entry['size_diff_kb']}KB" for entry in growth
+                    ))
+            except Exception as e:
+                logger.warning(f"⚠️ Allocation snapshot failed: {str(e)}")
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+
+class MemoryWatchdog:
+    """Recycles the worker once its RSS stays over the limit"""
+
+    def __init__(self, max_rss_mb: int = MAX_RSS_MB, check_interval: int = CHECK_INTERVAL,
+                 over_limit_checks: int = OVER_LIMIT_CHECKS, drain_timeout: int = DRAIN_TIMEOUT,
+                 rss_reader: Callable[[], Optional[int]] = current_rss_bytes,
+                 recycle: Optional[Callable[[], None]] = None):
+        self.max_rss_mb = max_rss_mb
+        self.check_interval = check_interval
+        self.over_limit_checks = over_limit_checks
+        self.drain_timeout = drain_timeout
+        self._rss_reader = rss_reader
+        self._recycle = recycle or self._terminate
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._over_limit = 0
+        self._draining = False
+        self._thread = None
+        self._stats = {'checks': 0, 'peak_rss_mb': 0.0, 'recycles': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rss_mb > 0
+
+    # In-flight request tracking
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if self._in_flight == 0:
+                self._idle.notify_all()
+
+    # Checks
+
+    def check(self) -> bool:
+        """One RSS reading; True when the worker should be recycled"""
+        rss = self._rss_reader()
+        if rss is None:
+            return False
+        rss_mb = rss / 1024 / 1024
+        with self._lock:
+            self._stats['checks'] += 1
+            self._stats['peak_rss_mb'] = max(self._stats['peak_rss_mb'], round(rss_mb, 1))
+            self._stats['last_rss_mb'] = round(rss_mb, 1)
+            self._over_limit = self._over_limit + 1 if rss_mb > self.max_rss_mb else 0
+            return self._over_limit >= self.over_limit_checks and not self._draining
+
+    def drain_and_recycle(self):
+        """Wait for in-flight requests (up to drain_timeout), then recycle"""
+        with self._lock:
+            self._draining = True
+            logger.warning(
+                f"🧹 Worker {os.getpid()} over {self.max_rss_mb}MB RSS for {self._over_limit} checks; "
+                f"recycling after {self._in_flight} in-flight request(s)"
+            )
+            deadline = time.monotonic() + self.drain_timeout
+            while self._in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⚠️ Recycling with {self._in_flight} request(s) still in flight")
+                    break
+                self._idle.wait(remaining)
+            self._stats['recycles'] += 1
+        self._recycle()
+
+    @staticmethod
+    def _terminate():
+        if 'gunicorn' not in sys.modules:
+            # Nobody would replace this process, so only report it
+            logger.warning("⚠️ Not running under gunicorn; leaving the over-limit process running")
+            return
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name='memory-watchdog', daemon=True)
+        self._thread.start()
+        logger.info(f"🐕 Memory watchdog started (limit {self.max_rss_mb}MB RSS)")
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                if self.check():
+                    self.drain_and_recycle()
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Memory watchdog check failed: {str(e)}")
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._over_limit = 0
+        self._draining = False
+        self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'enabled': self.enabled,
+                'max_rss_mb': self.max_rss_mb,
+                'in_flight': self._in_flight,
+                'over_limit_checks': self._over_limit,
+                'draining': self._draining,
+            })
+        return stats
+
+
+# Global instances
+allocation_sampler = AllocationSampler()
+memory_watchdog = MemoryWatchdog()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=allocation_sampler.reset_after_fork)
+    os.register_at_fork(after_in_child=memory_watchdog.reset_after_fork)
+
+
+def init_memory_monitoring(app):
+    """Count in-flight requests for the watchdog and start the background threads"""
+    @app.before_request
+    def count_request_started():
+        from flask import g
+        g._memory_watchdog_counted = True
+        memory_watchdog.request_started()
+
+    @app.teardown_request
+    def count_request_finished(error=None):
+        from flask import g
+        if g.pop('_memory_watchdog_counted', False):
+            memory_watchdog.request_finished()
+
+    memory_watchdog.start()
+    if MEMORY_PROFILING_ENABLED:
+        allocation_sampler.start()
+
+
+def get_memory_stats() -> Dict[str, Any]:
+    rss = current_rss_bytes()
+    return {
+        'pid': os.getpid(),
+        'rss_mb': round(rss / 1024 / 1024, 1) if rss is not None else None,
+        'watchdog': memory_watchdog.get_stats(),
+        'allocations': allocation_sampler.get_stats(),
+    }
@@ -0,0 +1,242 @@
+# app/utils/performance/query_tracker.py
+
+"""
+Per-request SQL statement counts and N+1 detection.
+
+The request profiler's engine events and per-request accumulator carry a
+QueryLog, which counts every statement a request executes and the time
+spent in it. Statements are grouped by fingerprint (the SQL with its
+literals and IN lists collapsed), so a lazy relationship loaded once per
+row, or a query issued once per symbol or per day, shows up as one
+fingerprint executed many times.
+
+A fingerprint executed at least N_PLUS_ONE_THRESHOLD times in one request is
+flagged: the route, the count and the application call site that issued it
+are logged. In strict mode (QUERY_TRACKER_STRICT, or ``track_queries(strict=True)``
+in tests) a flagged request raises NPlusOneDetected instead.
+"""
+
+import os
+import re
+import sys
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.utils.performance import request_profiler
+from app.utils.performance.request_profiler import (
+    RequestTimings, _escape, current_timings, init_request_profiling, instrument_sqlalchemy, timings_scope
+)
+
+logger = logging.getLogger(__name__)
+
+QUERY_TRACKING_ENABLED = os.getenv('QUERY_TRACKING_ENABLED', 'true').lower() == 'true'
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
+STRICT_MODE = os.getenv('QUERY_TRACKER_STRICT', 'false').lower() == 'true'
+
+# Call sites are reported from project code, not SQLAlchemy internals
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# Statements are recorded from the profiler's engine listener, so skip both modules
+_TRACKER_FILES = {os.path.abspath(__file__), os.path.abspath(request_profiler.__file__)}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|%s)\s*,?)+\)", re.IGNORECASE)
+_POSITIONAL_PARAMS = re.compile(r"(?:__\[POSTCOMPILE_\w+\])")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneDetected(AssertionError):
+    """Raised in strict mode when a request repeats a statement shape too often"""
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals become ?, IN lists become IN (...)"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _POSITIONAL_PARAMS.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _call_site() -> Optional[str]:
+    """Innermost project frame outside the tracking modules"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_PROJECT_ROOT) and filename not in _TRACKER_FILES and 'site-packages' not in filename:
+            relative = os.path.relpath(filename, _PROJECT_ROOT)
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryLog:
+    """Statements executed while it is current (one request, or a track_queries block)"""
+
+    def __init__(self, threshold: int = None):
+        self.threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, statement: str, seconds: float):
+        shape = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            entry = self.shapes.get(shape)
+            if entry is None:
+                entry = self.shapes[shape] = {'count': 0, 'seconds': 0.0, 'call_site': None}
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            # Walk the stack once per repeated shape, not per statement
+            needs_site = entry['count'] == self.threshold
+        if needs_site:
+            entry['call_site'] = _call_site()
+
+    def repeated(self) -> List[Dict[str, Any]]:
+        """Shapes at or over the threshold, most frequent first"""
+        with self._lock:
+            flagged = [
+                dict(entry, statement=shape) for shape, entry in self.shapes.items()
+                if entry['count'] >= self.threshold
+            ]
+        return sorted(flagged, key=lambda entry: entry['count'], reverse=True)
+
+
+def current_query_log() -> Optional[QueryLog]:
+    timings = current_timings()
+    return timings.query_log if timings is not None else None
+
+
+class QueryStats:
+    """Statement counts per endpoint across requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, route: str, log: QueryLog, flagged: List[Dict[str, Any]]):
+        with self._lock:
+            entry = self._endpoints.setdefault(route, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'query_seconds': 0.0, 'n_plus_one': 0,
+            })
+            entry['requests'] += 1
+            entry['queries'] += log.count
+            entry['max_queries'] = max(entry['max_queries'], log.count)
+            entry['query_seconds'] += log.seconds
+            if flagged:
+                entry['n_plus_one'] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                route: dict(entry, avg_queries=round(entry['queries'] / entry['requests'], 2))
+                for route, entry in self._endpoints.items()
+            }
+
+    def render_prometheus(self) -> str:
+        worker = os.getpid()
+        lines = [
+            '# HELP flask_request_queries_total SQL statements executed, by route',
+            '# TYPE flask_request_queries_total counter',
+        ]
+        stats = self.get_stats()
+        for route, entry in sorted(stats.items()):
+            lines.append(f'flask_request_queries_total{{route="{_escape(route)}",worker="{worker}"}} {entry["queries"]}')
+        lines += [
+            '# HELP flask_request_n_plus_one_total Requests that repeated a statement shape past the threshold',
+            '# TYPE flask_request_n_plus_one_total counter',
+        ]
+        for route, entry in sorted(stats.items()):
+            lines.append(f'flask_request_n_plus_one_total{{route="{_escape(route)}",worker="{worker}"}} '
+                         f'{entry["n_plus_one"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+
+# Global instance
+query_stats = QueryStats()
+
+
+def report(log: QueryLog, label: str, strict: bool = False) -> List[Dict[str, Any]]:
+    """Log (or in strict mode raise on) the repeated statement shapes of ``log``"""
+    flagged = log.repeated()
+    for entry in flagged:
+        logger.warning(
+            f"🔁 Possible N+1 in {label}: {entry['count']} x ({entry['seconds'] * 1000:.0f}ms) "
+            f"from {entry['call_site'] or 'unknown call site'}: {entry['statement'][:200]}"
+        )
+    if flagged and strict:
+        worst = flagged[0]
+        raise NPlusOneDetected(
+            f"{label} executed the same statement {worst['count']} times "
+            f"(threshold {log.threshold}) from {worst['call_site']}: {worst['statement'][:200]}"
+        )
+    return flagged
+
+
+@contextmanager
+def track_queries(strict: bool = None, threshold: int = None, label: str = 'block'):
+    """Track the statements of the enclosed block; yields the QueryLog"""
+    instrument_sqlalchemy()
+    log = QueryLog(threshold)
+    timings = current_timings()
+    if timings is None:
+        with timings_scope(RequestTimings()) as timings:
+            timings.query_log = log
+            yield log
+    else:
+        outer, timings.query_log = timings.query_log, log
+        try:
+            yield log
+        finally:
+            timings.query_log = outer
+    report(log, label, STRICT_MODE if strict is None else strict)
+
+
+def init_query_tracking(app):
+    """Track statements per request and report N+1 patterns when it finishes"""
+    if not QUERY_TRACKING_ENABLED:
+        return
+    # The log rides on the profiler's per-request accumulator, so its hooks run first
+    if 'request_profiling' not in app.extensions:
+        init_request_profiling(app)
+
+    @app.before_request
+    def start_query_tracking():
+        from flask import g
+        timings = current_timings()
+        # A test's track_queries block takes precedence over the request's own log
+        if timings is not None and timings.query_log is None:
+            g._query_log = timings.query_log = QueryLog()
+
+    def finish(strict: bool):
+        from flask import g, request
+        log = g.pop('_query_log', None)
+        if log is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        query_stats.observe(route, log, log.repeated())
+        report(log, f"{request.method} {route}", strict)
+
+    @app.after_request
+    def finish_query_tracking(response):
+        finish(STRICT_MODE)
+        return response
+
+    @app.teardown_request
+    def finish_failed_query_tracking(error=None):
+        # Only still pending when the view raised and after_request never ran;
+        # the profiler's teardown resets the request context itself
+        finish(strict=False)
+
+
+def get_query_stats() -> Dict[str, Dict[str, Any]]:
+    return query_stats.get_stats()
@@ -0,0 +1,353 @@
+# app/utils/performance/request_profiler.py
+
+"""
+Per-request latency breakdown, histograms and Prometheus metrics.
+
+Every request gets a context-local accumulator. Instrumentation adds to it:
+
+- db: SQLAlchemy cursor execution (engine events, all engines);
+- redis: socket sends and reads on pooled Redis connections;
+- http: outgoing requests / curl_cffi calls (yfinance and other APIs);
+- cpu: thread CPU time of the request thread.
+
+Wall time and the components are kept as in-memory histograms per route
+and served by ``/metrics`` in Prometheus text format. The histograms are per
+worker process, so every series carries a ``worker`` label.
+
+With REQUEST_PROFILING_ENABLED a sample of requests (REQUEST_PROFILE_SAMPLE_RATE)
+is run under pyinstrument, or cProfile when it is not installed. The
+profiles of sampled requests slower than REQUEST_SLOW_MS are kept for
+``/api/performance/slow-profiles``.
+"""
+
+import io
+import os
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv('REQUEST_PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILE_SAMPLE_RATE', 0.05))
+SLOW_REQUEST_MS = float(os.getenv('REQUEST_SLOW_MS', 2000))
+MAX_SLOW_PROFILES = int(os.getenv('REQUEST_MAX_SLOW_PROFILES', 20))
+
+COMPONENTS = ('wall', 'db', 'redis', 'http', 'cpu')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:
+    _Pyinstrument = None
+
+
+class RequestTimings:
+    """Seconds spent per component by one request (shared with its worker threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {'db': 0.0, 'redis': 0.0, 'http': 0.0}
+        # Statement log attached by the query tracker, fed by the same engine events
+        self.query_log = None
+
+    def add(self, component: str, seconds: float):
+        with self._lock:
+            self.seconds[component] += seconds
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def timings_scope(timings: RequestTimings):
+    """Make ``timings`` current for the enclosed block (outside a request)"""
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def add_time(component: str, seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(component, seconds)
+
+
+@contextmanager
+def timed(component: str):
+    """Charge the enclosed block to ``component`` of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(component, time.perf_counter() - start)
+
+
+class RouteMetrics:
+    """Request counts and component histograms per (route, method)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, Dict[str, List[float]]] = {}
+        self._requests: Dict[tuple, int] = {}
+
+    def observe(self, route: str, method: str, status: int, seconds: Dict[str, float]):
+        with self._lock:
+            key = (route, method)
+            self._requests[key + (str(status),)] = self._requests.get(key + (str(status),), 0) + 1
+            histograms = self._histograms.setdefault(
+                key, {component: [0] * (len(BUCKETS) + 2) for component in COMPONENTS}
+            )
+            for component, value in seconds.items():
+                histogram = histograms[component]
+                for i, bound in enumerate(BUCKETS):
+                    if value <= bound:
+                        histogram[i] += 1
+                        break
+                else:
+                    histogram[len(BUCKETS)] += 1
+                histogram[-1] += value  # running sum
+
+    def render_prometheus(self) -> str:
+        worker = os.getpid()
+        lines = [
+            '# HELP flask_requests_total Requests handled, by route, method and status',
+            '# TYPE flask_requests_total counter',
+        ]
+        with self._lock:
+            requests = dict(self._requests)
+            histograms = {key: {c: list(h) for c, h in value.items()} for key, value in self._histograms.items()}
+
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(f'flask_requests_total{{route="{_escape(route)}",method="{method}",status="{status}",'
+                         f'worker="{worker}"}} {count}')
+
+        lines += [
+            '# HELP flask_request_seconds Request time by component (wall, db, redis, http, cpu)',
+            '# TYPE flask_request_seconds histogram',
+        ]
+        for (route, method), components in sorted(histograms.items()):
+            for component, histogram in components.items():
+                labels = f'route="{_escape(route)}",method="{method}",component="{component}",worker="{worker}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram):
+                    cumulative += count
+                    lines.append(f'flask_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += histogram[len(BUCKETS)]
+                lines.append(f'flask_request_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f'flask_request_seconds_sum{{{labels}}} {histogram[-1]:.6f}')
+                lines.append(f'flask_request_seconds_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._requests = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Global instances
+route_metrics = RouteMetrics()
+slow_profiles: deque = deque(maxlen=MAX_SLOW_PROFILES)
+
+
+class _Sampler:
+    """One sampled profile: pyinstrument if available, cProfile otherwise"""
+
+    def __init__(self):
+        if _Pyinstrument is not None:
+            self._profiler = _Pyinstrument()
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> str:
+        if _Pyinstrument is not None:
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True, color=False)
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        return out.getvalue()
+
+
+def _start_request():
+    from flask import g
+    timings = RequestTimings()
+    outer = _current.get()
+    if outer is not None:
+        # A track_queries block around a test request keeps collecting its statements
+        timings.query_log = outer.query_log
+    g._profiling = {
+        'timings': timings,
+        'start': time.perf_counter(),
+        'cpu_start': time.thread_time(),
+        'sampler': None,
+    }
+    g._profiling['token'] = _current.set(g._profiling['timings'])
+    if PROFILING_ENABLED and random.random() < PROFILE_SAMPLE_RATE:
+        try:
+            g._profiling['sampler'] = _Sampler()
+        except Exception as e:
+            # Another profiler may already be active on this thread
+            logger.debug(f"Request profiling skipped: {str(e)}")
+
+
+def _finish_request(status: int):
+    from flask import g, request
+    state = g.pop('_profiling', None)
+    if state is None:
+        return
+    wall = time.perf_counter() - state['start']
+    seconds = dict(state['timings'].seconds, wall=wall, cpu=time.thread_time() - state['cpu_start'])
+    _current.reset(state['token'])
+
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    route_metrics.observe(route, request.method, status, seconds)
+
+    profile = state['sampler'].stop() if state['sampler'] is not None else None
+    if wall * 1000 >= SLOW_REQUEST_MS:
+        logger.info(
+            f"🐢 Slow request {request.method} {route} ({status}): " +
+            ', '.join(f"{component}={seconds[component] * 1000:.0f}ms" for component in COMPONENTS)
+        )
+        if profile is not None:
+            slow_profiles.append({
+                'route': route,
+                'method': request.method,
+                'status': status,
+                'timestamp': time.time(),
+                'seconds': {component: round(value, 4) for component, value in seconds.items()},
+                'profile': profile,
+            })
+
+
+def init_request_profiling(app):
+    """Install the per-request accumulators and the DB / Redis / HTTP instrumentation"""
+    app.extensions['request_profiling'] = True
+
+    @app.before_request
+    def start_request_profiling():
+        _start_request()
+
+    @app.after_request
+    def finish_request_profiling(response):
+        _finish_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_failed_request_profiling(error=None):
+        # Only still pending when the view raised and after_request never ran
+        _finish_request(500)
+
+    instrument_sqlalchemy()
+    instrument_http_clients()
+
+
+_instrumented = set()
+
+
+def instrument_sqlalchemy():
+    """Time cursor execution on every engine, and log statements for the query tracker"""
+    if 'sqlalchemy' in _instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profiler_starts', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_profiler_starts')
+        timings = _current.get()
+        if starts:
+            seconds = time.perf_counter() - starts.pop()
+            if timings is not None:
+                timings.add('db', seconds)
+                if timings.query_log is not None:
+                    timings.query_log.record(statement, seconds)
+
+    _instrumented.add('sqlalchemy')
+
+
+def _wrap_timed(owner, name: str, component: str):
+    original = getattr(owner, name)
+    if getattr(original, '_request_profiler', False):
+        return
+
+    def wrapper(*args, **kwargs):
+        with timed(component):
+            return original(*args, **kwargs)
+
+    wrapper._request_profiler = True
+    wrapper.__wrapped__ = original
+    setattr(owner, name, wrapper)
+
+
+def instrument_http_clients():
+    """Time outgoing HTTP through requests and curl_cffi (used by yfinance)"""
+    if 'http' in _instrumented:
+        return
+    try:
+        from requests.adapters import HTTPAdapter
+        _wrap_timed(HTTPAdapter, 'send', 'http')
+    except ImportError:
+        pass
+    try:
+        from curl_cffi.requests import Session as CurlSession
+        _wrap_timed(CurlSession, 'request', 'http')
+    except ImportError:
+        pass
+    _instrumented.add('http')
+
+
+_timed_connection_classes: Dict[type, type] = {}
+
+
+def timed_connection_class(base: type) -> type:
+    """Subclass of a redis-py connection class that charges socket I/O to 'redis'"""
+    cls = _timed_connection_classes.get(base)
+    if cls is None:
+        class TimedConnection(base):
+            def send_packed_command(self, *args, **kwargs):
+                with timed('redis'):
+                    return super().send_packed_command(*args, **kwargs)
+
+            def read_response(self, *args, **kwargs):
+                with timed('redis'):
+                    return super().read_response(*args, **kwargs)
+
+        TimedConnection.__name__ = f"Timed{base.__name__}"
+        cls = _timed_connection_classes[base] = TimedConnection
+    return cls
+
+
+def get_slow_profiles() -> List[Dict[str, Any]]:
+    return list(slow_profiles)
+
+
+def render_metrics() -> str:
+    return route_metrics.render_prometheus()
@@ -19,12 +19,13 @@ import time
 import logging
 from typing import Dict, Any, Optional, Union, List
 from flask import Response, request, jsonify
-import redis
 from functools import wraps
 import hashlib
 import sys
 from dataclasses import dataclass, asdict
 
+from app.utils.cache.redis_pool import get_redis_client, get_circuit_breaker, record_redis_outcome
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -45,21 +46,8 @@ class ResponseOptimizer:
     """
     
     def __init__(self, redis_client=None):
-        self.redis_client = redis_client
-        if not self.redis_client:
-            try:
-                self.redis_client = redis.Redis(
-                    host='localhost', 
-                    port=6379, 
-                    db=2,  # Use separate DB for response cache
-                    decode_responses=False,  # Keep binary for compression
-                    socket_keepalive=True
-                )
-                self.redis_client.ping()
-                logger.info("✅ Redis connected for response optimization")
-            except Exception as e:
-                logger.warning(f"⚠️ Redis unavailable for response caching: {e}")
-                self.redis_client = None
+        # Separate DB for response cache, binary for compression; shared pool
+        self._redis_client = redis_client or get_redis_client(db=2, decode_responses=False)
         
         # Configuration
         self.compression_threshold = 1024  # Compress responses > 1KB
@@ -76,6 +64,11 @@ class ResponseOptimizer:
         
         logger.info("🔧 ResponseOptimizer initialized")
     
+    @property
+    def redis_client(self):
+        """Shared-pool client, or None while the Redis circuit breaker is open (read once per operation)"""
+        return self._redis_client if get_circuit_breaker().allow_request() else None
+    
     def _supports_compression(self, accept_encoding: str) -> str:
         """Determine best compression method based on client support"""
         if 'br' in accept_encoding:
@@ -230,20 +223,23 @@ class ResponseOptimizer:
                 headers['X-Compression-Ratio'] = f"{compression_ratio:.2%}"
             
             # Cache response if requested
-            if cache_key and self.redis_client and cache_ttl:
+            redis_client = self.redis_client if cache_key and cache_ttl else None
+            if redis_client:
                 try:
                     cache_data = {
                         'data': compressed_data,
                         'headers': dict(headers),
                         'compression': compression_method
                     }
-                    self.redis_client.setex(
+                    redis_client.setex(
                         cache_key, 
                         cache_ttl or self.cache_ttl, 
                         json.dumps(cache_data).encode()
                     )
+                    record_redis_outcome()
                     headers['X-Cache'] = 'MISS'
                 except Exception as e:
+                    record_redis_outcome(e)
                     logger.warning(f"Response caching failed: {e}")
             
             # Track metrics
@@ -270,11 +266,13 @@ class ResponseOptimizer:
     
     def get_cached_response(self, cache_key: str) -> Optional[Response]:
         """Retrieve cached response"""
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return None
         
         try:
-            cached_data = self.redis_client.get(cache_key)
+            cached_data = redis_client.get(cache_key)
+            record_redis_outcome()
             if cached_data:
                 cache_info = json.loads(cached_data.decode())
                 
@@ -298,6 +296,7 @@ class ResponseOptimizer:
                     status=200
                 )
         except Exception as e:
+            record_redis_outcome(e)
             logger.warning(f"Cache retrieval failed: {e}")
         
         return None
@@ -377,21 +376,24 @@ class ResponseOptimizer:
             'avg_response_size': round(avg_response_size / 1024, 2),  # KB
             'total_bytes_saved': round(total_bytes_saved / 1024, 2),  # KB
             'endpoint_stats': endpoint_stats,
-            'redis_available': self.redis_client is not None
+            'redis_available': not get_circuit_breaker().is_open
         }
     
     def clear_cache(self) -> bool:
         """Clear response cache"""
-        if not self.redis_client:
+        redis_client = self.redis_client
+        if not redis_client:
             return False
         
         try:
-            keys = self.redis_client.keys('response:*')
+            keys = redis_client.keys('response:*')
             if keys:
-                self.redis_client.delete(*keys)
+                redis_client.delete(*keys)
                 logger.info(f"🧹 Cleared {len(keys)} cached responses")
+            record_redis_outcome()
             return True
         except Exception as e:
+            record_redis_outcome(e)
             logger.error(f"Cache clear failed: {e}")
             return False
 
@@ -33,11 +33,12 @@ from app.models import NewsArticle
 # 🔑 AUTOMATIC KEYWORD EXTRACTION: Import the auto keyword extraction service
 from app.utils.keywords.auto_keyword_extraction import AutoKeywordExtractor
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 🌍 Region classification for search index rows written before region_mask existed
+from app.utils.search.news_regions import region_classifier
+
+# Set up logging (no-op when the app already configured it)
+from app.utils.config.logging_config import configure_logging
+configure_logging()
 logger = logging.getLogger(__name__)
 
 class NewsAIScheduler:
@@ -633,6 +634,11 @@ class NewsAIScheduler:
                 else:
                     logger.info("🔍 No AI-processed articles found to clear from buffer")
                 
+                # 🌍 REGION BACKFILL: Classify search index rows written before region_mask existed
+                classified = region_classifier.backfill(session, max_batches=1)
+                if classified:
+                    logger.info(f"🌍 Step 1.55: Classified {classified} search index rows by region")
+                
                 # 🧹 CLEANUP: Remove articles that don't meet AI processing requirements
                 logger.info("🧹 Step 1.6: Cleaning up unprocessable articles from buffer...")
                 cleanup_stats = self._cleanup_unprocessable_articles(session)
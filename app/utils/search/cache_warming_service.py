@@ -126,21 +126,22 @@ class CacheWarmingService:
             # Get trending keywords
             trending_keywords = self.get_trending_keywords(days=3, limit=15)
             
-            # Warm symbol searches
-            for symbol in popular_symbols:
-                if self.warm_symbol_search(symbol):
-                    warmed_count += 1
-            
-            # Warm keyword searches
-            for keyword in trending_keywords:
-                if self.warm_keyword_search(keyword):
-                    warmed_count += 1
-            
-            # Warm mixed searches (popular combinations)
-            popular_combinations = self.get_popular_search_combinations(limit=10)
-            for combo in popular_combinations:
-                if self.warm_mixed_search(combo):
-                    warmed_count += 1
+            with self.cache.batched_writes():
+                # Warm symbol searches
+                for symbol in popular_symbols:
+                    if self.warm_symbol_search(symbol):
+                        warmed_count += 1
+                
+                # Warm keyword searches
+                for keyword in trending_keywords:
+                    if self.warm_keyword_search(keyword):
+                        warmed_count += 1
+                
+                # Warm mixed searches (popular combinations)
+                popular_combinations = self.get_popular_search_combinations(limit=10)
+                for combo in popular_combinations:
+                    if self.warm_mixed_search(combo):
+                        warmed_count += 1
             
             # Update stats
             duration = (datetime.now() - start_time).total_seconds()
@@ -179,18 +180,18 @@ class CacheWarmingService:
             ).group_by(ArticleSymbol.symbol).order_by(desc('article_count')).limit(25).all()
             
             # Warm cache for each trending symbol
-            for symbol, count in trending_symbols:
-                # Warm different filter combinations
-                filters = [
-                    {'sentiment_filter': None, 'sort_order': 'LATEST'},
-                    {'sentiment_filter': 'POSITIVE', 'sort_order': 'LATEST'},
-                    {'sentiment_filter': 'NEGATIVE', 'sort_order': 'LATEST'},
-                    {'sentiment_filter': None, 'sort_order': 'HIGHEST'}
-                ]
-                
-                for filter_combo in filters:
-                    if self.warm_symbol_search(symbol, **filter_combo):
-                        warmed_count += 1
+            filters = [
+                {'sentiment_filter': None, 'sort_order': 'LATEST'},
+                {'sentiment_filter': 'POSITIVE', 'sort_order': 'LATEST'},
+                {'sentiment_filter': 'NEGATIVE', 'sort_order': 'LATEST'},
+                {'sentiment_filter': None, 'sort_order': 'HIGHEST'}
+            ]
+            with self.cache.batched_writes():
+                for symbol, count in trending_symbols:
+                    # Warm different filter combinations
+                    for filter_combo in filters:
+                        if self.warm_symbol_search(symbol, **filter_combo):
+                            warmed_count += 1
             
             # Update stats
             duration = (datetime.now() - start_time).total_seconds()
@@ -236,9 +237,10 @@ class CacheWarmingService:
                 {'keywords': ['nvidia'], 'sort_order': 'LATEST'}
             ]
             
-            for query in recent_queries:
-                if self.warm_keyword_search(query['keywords'], sort_order=query['sort_order']):
-                    warmed_count += 1
+            with self.cache.batched_writes():
+                for query in recent_queries:
+                    if self.warm_keyword_search(query['keywords'], sort_order=query['sort_order']):
+                        warmed_count += 1
             
             # Update stats
             duration = (datetime.now() - start_time).total_seconds()
@@ -266,13 +268,16 @@ class CacheWarmingService:
         try:
             logger.info("🔄 Starting full cache warming cycle...")
             
-            # Run all warming methods
-            self.warm_popular_searches()
-            self.warm_trending_symbols()
-            self.warm_recent_news()
-            
-            # Warm additional specific queries
-            self.warm_high_value_queries()
+            # Buffer every search result written during the cycle and flush
+            # them with one pipelined write instead of a SET per key
+            with self.cache.batched_writes():
+                # Run all warming methods
+                self.warm_popular_searches()
+                self.warm_trending_symbols()
+                self.warm_recent_news()
+                
+                # Warm additional specific queries
+                self.warm_high_value_queries()
             
             duration = (datetime.now() - start_time).total_seconds()
             logger.info(f"✅ Full warming cycle completed in {duration:.2f}s")
@@ -16,7 +16,9 @@ from apscheduler.triggers.cron import CronTrigger
 
 from app import db
 from app.models import NewsArticle, NewsSearchIndex
-import json
+from app.utils.cache.news_cache import NewsCache, NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_NEWS_FEED
+from app.utils.search.news_feeds import news_feeds
+from app.utils.search.search_index_sync import SearchIndexSyncService
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,9 @@ class NewsIndexSyncService:
     """
     Automated synchronization service for news search index.
     
+    Rows are written through SearchIndexSyncService, so every sync also
+    invalidates the cached searches it affects and updates the news feeds.
+    
     Features:
     - Incremental sync every 5 minutes
     - Full rebuild daily at 2 AM
@@ -105,10 +110,8 @@ class NewsIndexSyncService:
                 NewsArticle.ai_insights != ''
             ).all()
             
-            synced_count = 0
-            for article in new_articles:
-                if self.sync_article_to_index(article):
-                    synced_count += 1
+            sync_stats = SearchIndexSyncService(db.session).sync_multiple_articles(new_articles)
+            synced_count = sync_stats['added'] + sync_stats['updated']
             
             # Update stats
             duration = (datetime.now() - start_time).total_seconds()
@@ -151,20 +154,19 @@ class NewsIndexSyncService:
             
             synced_count = 0
             batch_size = 100
+            index_sync = SearchIndexSyncService(db.session)
             
             for i in range(0, len(articles), batch_size):
-                batch = articles[i:i+batch_size]
-                
-                for article in batch:
-                    if self.sync_article_to_index(article):
-                        synced_count += 1
-                
-                # Commit batch
-                db.session.commit()
+                # Each batch is committed, invalidated and published by the sync service
+                batch_stats = index_sync.sync_multiple_articles(articles[i:i+batch_size])
+                synced_count += batch_stats['added'] + batch_stats['updated']
                 
                 if i % 1000 == 0:
                     logger.info(f"🔄 Processed {i}/{len(articles)} articles...")
             
+            # Rows that were not re-added must leave every cached result and feed
+            self._invalidate_everything()
+            
             # Update stats
             duration = (datetime.now() - start_time).total_seconds()
             self.sync_stats['last_sync'] = datetime.now()
@@ -184,48 +186,16 @@ class NewsIndexSyncService:
             db.session.rollback()
     
     def sync_article_to_index(self, article: NewsArticle) -> bool:
-        """Sync single article to search index"""
+        """Sync single article to search index (committed, like every index write)"""
+        return SearchIndexSyncService(db.session).sync_article(article)
+    
+    def _invalidate_everything(self):
+        """After bulk deletes: drop cached searches, suggestions and the materialized feeds"""
         try:
-            # Check if article already exists in index
-            existing = db.session.query(NewsSearchIndex).filter_by(
-                external_id=article.external_id
-            ).first()
-            
-            # Extract symbols as JSON
-            symbols_json = json.dumps([symbol.symbol for symbol in article.symbols])
-            
-            if existing:
-                # Update existing entry
-                existing.title = article.title
-                existing.url = article.url
-                existing.published_at = article.published_at
-                existing.source = article.source
-                existing.ai_sentiment_rating = article.ai_sentiment_rating
-                existing.symbols_json = symbols_json
-                existing.ai_summary = article.ai_summary
-                existing.ai_insights = article.ai_insights
-                existing.updated_at = datetime.now()
-            else:
-                # Create new entry
-                index_entry = NewsSearchIndex(
-                    article_id=article.id,
-                    external_id=article.external_id,
-                    title=article.title,
-                    url=article.url,
-                    published_at=article.published_at,
-                    source=article.source,
-                    ai_sentiment_rating=article.ai_sentiment_rating,
-                    symbols_json=symbols_json,
-                    ai_summary=article.ai_summary,
-                    ai_insights=article.ai_insights
-                )
-                db.session.add(index_entry)
-            
-            return True
-            
+            NewsCache().bump_namespace(NAMESPACE_SEARCH, NAMESPACE_SUGGESTION, NAMESPACE_NEWS_FEED)
         except Exception as e:
-            logger.error(f"❌ Failed to sync article {article.id}: {str(e)}")
-            return False
+            logger.debug(f"Search cache invalidation failed: {str(e)}")
+        news_feeds.reset()
     
     def cleanup_old_entries(self):
         """Remove old entries from search index"""
@@ -238,6 +208,8 @@ class NewsIndexSyncService:
             ).delete()
             
             db.session.commit()
+            if deleted_count:
+                self._invalidate_everything()
             
             logger.info(f"🗑️ Cleaned up {deleted_count} old search index entries")
             
@@ -288,7 +260,6 @@ class NewsIndexSyncService:
             
             success = self.sync_article_to_index(article)
             if success:
-                db.session.commit()
                 logger.info(f"✅ Force synced article {article_id}")
             
             return success
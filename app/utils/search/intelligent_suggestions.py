@@ -19,7 +19,8 @@ from app.models import (
     SearchAnalytics, KeywordSimilarity, NewsSearchIndex
 )
 from app.utils.ai.keyword_extraction_service import keyword_extraction_service
-from app.utils.cache.news_cache import NewsCache
+from app.utils.cache.news_cache import NewsCache, NAMESPACE_SUGGESTION
+from app.utils.search.search_invalidation import KIND_SUGGESTION, SUGGESTION_CACHE_TTL, search_invalidator, term_tag
 from app.utils.search.acronym_expansion import acronym_expansion_service
 import uuid
 
@@ -42,7 +43,7 @@ class IntelligentSuggestionService:
         self.cache = None
         self.min_suggestion_relevance = 0.3
         self.max_suggestions = 10
-        self.cache_ttl = 300  # 5 minutes
+        self.cache_ttl = SUGGESTION_CACHE_TTL  # 5 minutes; also dropped when synced articles mention the query
         
         # Initialize cache
         try:
@@ -77,9 +78,12 @@ class IntelligentSuggestionService:
         query = query.strip()
         
         # Check cache first
-        cache_key = f"search_suggestions:{query.lower()}:{limit}"
+        cache_key = None
         if self.cache:
             try:
+                cache_key = self.cache.namespace_key(
+                    NAMESPACE_SUGGESTION, f"search_suggestions:{query.lower()}:{limit}"
+                )
                 cached_suggestions = self.cache.get_json(cache_key)
                 if cached_suggestions:
                     logger.debug(f"Cache hit for suggestions: {query}")
@@ -119,9 +123,11 @@ class IntelligentSuggestionService:
         suggestions = self._deduplicate_and_rank(suggestions, limit)
         
         # Cache results
-        if self.cache:
+        if self.cache and cache_key:
             try:
-                self.cache.set_json(cache_key, suggestions, expire=self.cache_ttl)
+                self.cache.set_json(cache_key, suggestions, expire=self.cache_ttl,
+                                    tags=[term_tag(KIND_SUGGESTION, query.lower())])
+                search_invalidator.watch(self.cache, KIND_SUGGESTION, [query.lower()])
             except Exception as e:
                 logger.debug(f"Cache storage failed: {str(e)}")
         
@@ -0,0 +1,419 @@
+# app/utils/search/news_feeds.py
+
+"""
+Materialized latest-news feeds in Redis.
+
+Unfiltered "latest" pages (globally, per symbol and per region) used to
+query news_search_index ordered by published_at on every load. Each feed
+is now a Redis sorted set of search index ids scored by publish time and
+trimmed to NEWS_FEED_CAP. Feeds only hold articles published within the
+last NEWS_FEED_CARD_RETENTION_DAYS. The card for each id lives in a
+per-day hash (news_feed:cards:<YYYYMMDD>) that expires once the whole day
+has left that window. A page is one ZREVRANGE plus one HMGET per day it
+spans, in one pipeline, with no SQL.
+
+SearchIndexSyncService publishes each synced row to every feed it belongs
+to as soon as it commits. A feed is only served while its ready marker
+exists. The first request for a cold feed warms it from SQL under a
+short lease. The marker expires after NEWS_FEED_READY_TTL, so exact totals
+and any missed updates are rebuilt periodically. Whenever a feed cannot
+answer, callers get None and fall back to SQL. That covers Redis being
+down, a cold feed, and a page past the cap or the retention window.
+Articles that age out of the window are a normal SQL fallback and never
+trigger a re-warm. A card missing inside the window (evicted) clears the
+ready marker, so the next request rebuilds the feed once.
+"""
+
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from redis import Redis, RedisError
+from sqlalchemy.orm import Session
+
+from ...models import NewsSearchIndex
+from ..cache.redis_pool import get_redis_client, get_circuit_breaker
+from .news_projection import SEARCH_CARD_COLUMNS, search_index_card
+from .news_regions import REGION_BITS, region_classifier
+
+logger = logging.getLogger(__name__)
+
+FEED_PREFIX = 'news_feed:'
+FEED_CAP = int(os.getenv('NEWS_FEED_CAP', 500))
+# How long a warmed feed is trusted before it is rebuilt from SQL
+FEED_READY_TTL = int(os.getenv('NEWS_FEED_READY_TTL', 6 * 3600))
+# Feeds nobody publishes to or reads expire after this
+FEED_KEY_TTL = int(os.getenv('NEWS_FEED_KEY_TTL', 7 * 86400))
+CARD_RETENTION_DAYS = int(os.getenv('NEWS_FEED_CARD_RETENTION_DAYS', 30))
+WARM_LEASE_SECONDS = 30
+
+GLOBAL_FEED = 'global'
+COUNTS_KEY = FEED_PREFIX + 'counts'
+
+
+def symbol_feed(symbol: str) -> str:
+    return f'symbol:{symbol.strip().upper()}'
+
+
+def region_feed(region: str) -> str:
+    return f'region:{region.upper()}'
+
+
+def feed_score(published_at: datetime) -> float:
+    """Sorted-set score for a (naive, UTC) publish time"""
+    return published_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _zset_key(feed: str) -> str:
+    return f'{FEED_PREFIX}z:{feed}'
+
+
+def _ready_key(feed: str) -> str:
+    return f'{FEED_PREFIX}ready:{feed}'
+
+
+def _card_day(score: float) -> datetime:
+    return datetime.fromtimestamp(score, tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _card_key(score: float) -> str:
+    return f'{FEED_PREFIX}cards:{_card_day(score):%Y%m%d}'
+
+
+def _card_ttl(score: float) -> int:
+    """Seconds until the card's day has fully left the retention window"""
+    expires = _card_day(score) + timedelta(days=CARD_RETENTION_DAYS + 1)
+    return int(expires.timestamp() - time.time())
+
+
+def retention_cutoff() -> float:
+    """Oldest score a feed holds; older articles are only served from SQL"""
+    return time.time() - CARD_RETENTION_DAYS * 86400
+
+
+# _read_page/_read_recent result when the feed has no ready marker
+_COLD = object()
+
+
+@dataclass
+class FeedEntry:
+    """One search index row, ready to be written to its feeds"""
+    member: str
+    score: float
+    feeds: List[str]
+    card: Dict
+
+
+def feed_entry(row: NewsSearchIndex) -> Optional[FeedEntry]:
+    """FeedEntry for a loaded search index row; None if it is not shown in feeds"""
+    if not (row.id and row.published_at and row.ai_summary and row.ai_insights):
+        return None
+    card = search_index_card(row)
+    feeds = [GLOBAL_FEED]
+    feeds.extend(dict.fromkeys(symbol_feed(symbol) for symbol in card.symbols if symbol))
+    feeds.extend(region_feed(region) for region, bit in REGION_BITS.items() if (row.region_mask or 0) & bit)
+    return FeedEntry(str(row.id), feed_score(row.published_at), feeds, card.to_dict())
+
+
+def feed_entries(rows: Iterable[NewsSearchIndex]) -> List[FeedEntry]:
+    return [entry for entry in map(feed_entry, rows) if entry is not None]
+
+
+class NewsFeedStore:
+    """Reads and maintains the materialized feeds; every method degrades to a no-op without Redis"""
+
+    def __init__(self):
+        self._breaker = get_circuit_breaker()
+
+    @cached_property
+    def _redis(self) -> Redis:
+        """Created on first use, so importing this module does not connect to Redis"""
+        return get_redis_client(decode_responses=True)
+
+    @property
+    def available(self) -> bool:
+        return self._breaker.allow_request()
+
+    # ----- writes -----
+
+    def publish(self, entries: List[FeedEntry]) -> bool:
+        """Add (or re-score) entries in all their feeds and bump the feed totals"""
+        if not entries or not self.available:
+            return False
+        cutoff = retention_cutoff()
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            added_to = []
+            for entry in entries:
+                # Too old to be shown from a feed, but it may change a total: rebuild those feeds once
+                if entry.score < cutoff:
+                    pipe.delete(*(_ready_key(feed) for feed in entry.feeds))
+                    continue
+                card_key = _card_key(entry.score)
+                pipe.hset(card_key, entry.member, json.dumps(entry.card))
+                pipe.expire(card_key, _card_ttl(entry.score))
+                for feed in entry.feeds:
+                    pipe.zadd(_zset_key(feed), {entry.member: entry.score})
+                    added_to.append(feed)
+            for feed in dict.fromkeys(added_to):
+                pipe.zremrangebyscore(_zset_key(feed), '-inf', f'({cutoff}')
+                pipe.zremrangebyrank(_zset_key(feed), 0, -(FEED_CAP + 1))
+                pipe.expire(_zset_key(feed), FEED_KEY_TTL)
+            results = pipe.execute()
+
+            # ZADD replies say which ids are new to each feed
+            added = {}
+            replies = iter(results)
+            for entry in entries:
+                next(replies)
+                if entry.score < cutoff:
+                    continue
+                next(replies)
+                for feed in entry.feeds:
+                    added[feed] = added.get(feed, 0) + int(next(replies))
+            self._incr_counts(added)
+            self._breaker.record_success()
+            return True
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            logger.debug(f"News feed publish failed: {str(e)}")
+            return False
+
+    def discard(self, entries: List[FeedEntry]) -> bool:
+        """Remove deleted rows from their feeds"""
+        if not entries or not self.available:
+            return False
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for entry in entries:
+                pipe.hdel(_card_key(entry.score), entry.member)
+                for feed in entry.feeds:
+                    pipe.zrem(_zset_key(feed), entry.member)
+            replies = iter(pipe.execute())
+            removed = {}
+            for entry in entries:
+                next(replies)
+                for feed in entry.feeds:
+                    removed[feed] = removed.get(feed, 0) - int(next(replies))
+            self._incr_counts(removed)
+            self._breaker.record_success()
+            return True
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            logger.debug(f"News feed discard failed: {str(e)}")
+            return False
+
+    def reset(self) -> int:
+        """
+        Drop every feed, card and ready marker; returns the number of keys removed.
+
+        For bulk changes to the index (clearing or rebuilding it): warm()
+        only adds rows, so deleted ones would otherwise stay in the feeds.
+        Feeds are rebuilt from SQL on their next request.
+        """
+        if not self.available:
+            return 0
+        removed = 0
+        try:
+            batch = []
+            for key in self._redis.scan_iter(match=f'{FEED_PREFIX}*', count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    removed += self._redis.unlink(*batch)
+                    batch = []
+            if batch:
+                removed += self._redis.unlink(*batch)
+            self._breaker.record_success()
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            logger.warning(f"⚠️ News feed reset failed after {removed} keys: {str(e)}")
+            return removed
+        logger.info(f"📰 Reset news feeds: {removed} keys removed")
+        return removed
+
+    def _incr_counts(self, deltas: Dict[str, int]):
+        deltas = {feed: delta for feed, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        for feed, delta in deltas.items():
+            pipe.hincrby(COUNTS_KEY, feed, delta)
+        pipe.execute()
+
+    def warm(self, session: Session, feed: str) -> bool:
+        """Fill ``feed`` from SQL (latest FEED_CAP rows plus the exact total) and mark it ready"""
+        if not self.available:
+            return False
+        query = self._feed_query(session, feed)
+        if query is None:
+            return False
+        lease_key = f'{FEED_PREFIX}warming:{feed}'
+        try:
+            if not self._redis.set(lease_key, '1', nx=True, ex=WARM_LEASE_SECONDS):
+                return False
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            return False
+
+        try:
+            cutoff = retention_cutoff()
+            total = query.count()
+            oldest = datetime.fromtimestamp(cutoff, tz=timezone.utc).replace(tzinfo=None)
+            rows = query.with_entities(*SEARCH_CARD_COLUMNS).filter(
+                NewsSearchIndex.published_at >= oldest
+            ).order_by(NewsSearchIndex.published_at.desc()).limit(FEED_CAP).all()
+
+            pipe = self._redis.pipeline(transaction=False)
+            members = {}
+            for row in rows:
+                score = feed_score(row.published_at)
+                card_key = _card_key(score)
+                pipe.hset(card_key, str(row.id), json.dumps(search_index_card(row).to_dict()))
+                pipe.expire(card_key, _card_ttl(score))
+                members[str(row.id)] = score
+            if members:
+                pipe.zadd(_zset_key(feed), members)
+            pipe.zremrangebyscore(_zset_key(feed), '-inf', f'({cutoff}')
+            pipe.zremrangebyrank(_zset_key(feed), 0, -(FEED_CAP + 1))
+            pipe.expire(_zset_key(feed), FEED_KEY_TTL)
+            pipe.hset(COUNTS_KEY, feed, total)
+            pipe.set(_ready_key(feed), '1', ex=FEED_READY_TTL)
+            pipe.execute()
+            self._breaker.record_success()
+            logger.debug(f"📰 Warmed news feed {feed}: {len(rows)} of {total} articles")
+            return True
+        except RedisError as e:
+            self._breaker.record_failure(e)
+            logger.debug(f"News feed warm failed for {feed}: {str(e)}")
+            return False
+        finally:
+            try:
+                self._redis.delete(lease_key)
+            except RedisError:
+                pass
+
+    def _feed_query(self, session: Session, feed: str):
+        """SQL equivalent of a feed, or None when it cannot be built yet"""
+        query = session.query(NewsSearchIndex).filter(
+            NewsSearchIndex.published_at.isnot(None),
+            NewsSearchIndex.ai_summary.isnot(None),
+            NewsSearchIndex.ai_insights.isnot(None),
+            NewsSearchIndex.ai_summary != '',
+            NewsSearchIndex.ai_insights != ''
+        )
+        if feed == GLOBAL_FEED:
+            return query
+        kind, _, value = feed.partition(':')
+        if kind == 'symbol' and value:
+            return query.filter(NewsSearchIndex.symbols_json.like(f'%"{value}"%'))
+        if kind == 'region' and value in REGION_BITS:
+            # Rows without a region_mask are not in region feeds yet
+            if not region_classifier.all_classified(session):
+                return None
+            return query.filter(region_classifier.region_condition(session, value))
+        return None
+
+    # ----- reads -----
+
+    def page(self, session: Session, feed: str, offset: int, limit: int) -> Optional[Tuple[List[Dict], int]]:
+        """(cards, total) for one page of ``feed``, warming it on first use; None means use SQL"""
+        if offset < 0 or limit <= 0 or offset + limit > FEED_CAP or not self.available:
+            return None
+        result = self._read_page(feed, offset, limit)
+        if result is _COLD:
+            result = self._read_page(feed, offset, limit) if self.warm(session, feed) else None
+        return None if result is _COLD else result
+
+    def _read_page(self, feed: str, offset: int, limit: int):
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.exists(_ready_key(feed))
+            pipe.zrevrangebyscore(_zset_key(feed), '+inf', retention_cutoff(),
+                                  start=offset, num=limit, withscores=True)
+            pipe.hget(COUNTS_KEY, feed)
+            ready, entries, total = pipe.execute()
+            if not ready:
+                return _COLD
+            total = int(total or 0)
+            # The page runs past the cap or the retention window: let SQL answer
+            if len(entries) < min(limit, max(total - offset, 0)):
+                return None
+            cards = self._load_cards(feed, entries)
+            self._breaker.record_success()
+            return (cards, total) if cards is not None else None
+        except (RedisError, ValueError) as e:
+            if isinstance(e, RedisError):
+                self._breaker.record_failure(e)
+            logger.debug(f"News feed read failed for {feed}: {str(e)}")
+            return None
+
+    def recent(self, session: Session, feed: str, since: datetime, limit: int) -> Optional[List[Dict]]:
+        """Up to ``limit`` cards published at or after ``since``, newest first; None means use SQL"""
+        if limit <= 0 or limit > FEED_CAP or not self.available:
+            return None
+        result = self._read_recent(feed, since, limit)
+        if result is _COLD:
+            result = self._read_recent(feed, since, limit) if self.warm(session, feed) else None
+        return None if result is _COLD else result
+
+    def _read_recent(self, feed: str, since: datetime, limit: int):
+        cutoff = retention_cutoff()
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.exists(_ready_key(feed))
+            pipe.zrevrangebyscore(_zset_key(feed), '+inf', max(feed_score(since), cutoff),
+                                  start=0, num=limit, withscores=True)
+            pipe.zcount(_zset_key(feed), cutoff, '+inf')
+            ready, entries, size = pipe.execute()
+            if not ready:
+                return _COLD
+            # A short answer may be cut off by the cap or the retention window
+            if len(entries) < limit and (size >= FEED_CAP or feed_score(since) < cutoff):
+                return None
+            cards = self._load_cards(feed, entries)
+            self._breaker.record_success()
+            return cards
+        except (RedisError, ValueError) as e:
+            if isinstance(e, RedisError):
+                self._breaker.record_failure(e)
+            logger.debug(f"News feed read failed for {feed}: {str(e)}")
+            return None
+
+    def _load_cards(self, feed: str, entries: List[Tuple[str, float]]) -> Optional[List[Dict]]:
+        """Cards for (member, score) pairs, one HMGET per day
+
+        Members are all inside the retention window, so a missing card was
+        evicted: returns None and drops the ready marker so the next
+        request rebuilds the feed once.
+        """
+        by_day = {}
+        for member, score in entries:
+            by_day.setdefault(_card_key(score), []).append(member)
+        if not by_day:
+            return []
+        pipe = self._redis.pipeline(transaction=False)
+        for card_key, members in by_day.items():
+            pipe.hmget(card_key, members)
+        cards = {}
+        for (card_key, members), values in zip(by_day.items(), pipe.execute()):
+            cards.update(zip(members, values))
+        if any(cards[member] is None for member, _ in entries):
+            self._redis.delete(_ready_key(feed))
+            return None
+        return [json.loads(cards[member]) for member, _ in entries]
+
+    def reset_after_fork(self):
+        self.__dict__.pop('_redis', None)
+        self._breaker = get_circuit_breaker()
+
+
+# Global instance
+news_feeds = NewsFeedStore()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=news_feeds.reset_after_fork)
@@ -0,0 +1,170 @@
+# app/utils/search/news_projection.py
+
+"""
+Column projections for news list and search pages.
+
+List pages only show title, date, source, sentiment, AI summary and
+symbols, so they select those columns instead of hydrating ORM objects.
+No identity map, no lazy ``symbols``/``metrics`` loads, and symbols_json is
+parsed once per row. NewsArticle rows get their symbols from a single
+``IN`` query over the page.
+
+NewsCard.to_dict() returns the same shape as NewsSearchIndex.to_dict(),
+so cached results and templates are unaffected.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Query, Session
+
+from ...models import ArticleSymbol, NewsArticle, NewsSearchIndex
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CARD_COLUMNS = (
+    NewsSearchIndex.id,
+    NewsSearchIndex.article_id,
+    NewsSearchIndex.external_id,
+    NewsSearchIndex.title,
+    NewsSearchIndex.url,
+    NewsSearchIndex.published_at,
+    NewsSearchIndex.source,
+    NewsSearchIndex.ai_sentiment_rating,
+    NewsSearchIndex.ai_summary,
+    NewsSearchIndex.ai_insights,
+    NewsSearchIndex.symbols_json,
+)
+
+ARTICLE_CARD_COLUMNS = (
+    NewsArticle.id,
+    NewsArticle.external_id,
+    NewsArticle.title,
+    NewsArticle.url,
+    NewsArticle.published_at,
+    NewsArticle.source,
+    NewsArticle.ai_sentiment_rating,
+    NewsArticle.ai_summary,
+    NewsArticle.ai_insights,
+    NewsArticle.sentiment_label,
+    NewsArticle.sentiment_score,
+)
+
+
+@dataclass
+class NewsCard:
+    """What a list or search page shows for one article"""
+    id: int
+    external_id: str
+    title: str
+    url: Optional[str]
+    published_at: Optional[datetime]
+    source: Optional[str]
+    ai_sentiment_rating: Optional[int]
+    ai_summary: Optional[str]
+    ai_insights: Optional[str]
+    symbols: List[str] = field(default_factory=list)
+    sentiment_label: Optional[str] = None
+    sentiment_score: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'external_id': self.external_id,
+            'title': self.title,
+            'content': self.ai_summary,
+            'url': self.url,
+            'published_at': self.published_at.isoformat() if self.published_at else None,
+            'source': self.source,
+            'sentiment': {
+                'label': self.sentiment_label,
+                'score': self.sentiment_score,
+                'explanation': None
+            },
+            'summary': {
+                'brief': None,
+                'key_points': None,
+                'market_impact': None,
+                'ai_summary': self.ai_summary,
+                'ai_insights': self.ai_insights,
+                'ai_sentiment_rating': self.ai_sentiment_rating
+            },
+            'symbols': [{'symbol': symbol} for symbol in self.symbols],
+            'metrics': []
+        }
+
+
+def parse_symbols(symbols_json: Optional[str]) -> List[str]:
+    """symbols_json column -> list of symbols; bad or empty JSON gives []"""
+    if not symbols_json:
+        return []
+    try:
+        symbols = json.loads(symbols_json)
+    except (TypeError, ValueError):
+        return []
+    return symbols if isinstance(symbols, list) else []
+
+
+def search_index_card(row) -> NewsCard:
+    """Card for a NewsSearchIndex row or projected row (anything with the SEARCH_CARD_COLUMNS attributes)"""
+    return NewsCard(
+        id=row.article_id or row.id,
+        external_id=row.external_id,
+        title=row.title,
+        url=row.url,
+        published_at=row.published_at,
+        source=row.source,
+        ai_sentiment_rating=row.ai_sentiment_rating,
+        ai_summary=row.ai_summary,
+        ai_insights=row.ai_insights,
+        symbols=parse_symbols(row.symbols_json),
+    )
+
+
+def search_index_cards(query: Query) -> List[NewsCard]:
+    """Run a NewsSearchIndex query (filters, order and limit kept) as a column projection"""
+    return [search_index_card(row) for row in query.with_entities(*SEARCH_CARD_COLUMNS)]
+
+
+def load_article_symbols(session: Session, article_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Symbols for many articles in one IN query"""
+    article_ids = list(article_ids)
+    symbols: Dict[int, List[str]] = {article_id: [] for article_id in article_ids}
+    if not article_ids:
+        return symbols
+    rows = session.query(ArticleSymbol.article_id, ArticleSymbol.symbol).filter(
+        ArticleSymbol.article_id.in_(article_ids)
+    )
+    for article_id, symbol in rows:
+        symbols[article_id].append(symbol)
+    return symbols
+
+
+def article_cards(session: Session, query: Query) -> List[NewsCard]:
+    """Run a NewsArticle query as a column projection plus one symbols query"""
+    rows = query.with_entities(*ARTICLE_CARD_COLUMNS).all()
+    symbols = load_article_symbols(session, [row.id for row in rows])
+    return [
+        NewsCard(
+            id=row.id,
+            external_id=row.external_id,
+            title=row.title,
+            url=row.url,
+            published_at=row.published_at,
+            source=row.source,
+            ai_sentiment_rating=row.ai_sentiment_rating,
+            ai_summary=row.ai_summary,
+            ai_insights=row.ai_insights,
+            symbols=symbols[row.id],
+            sentiment_label=row.sentiment_label,
+            sentiment_score=row.sentiment_score,
+        )
+        for row in rows
+    ]
+
+
+def serialize_cards(cards: Iterable[NewsCard]) -> List[Dict]:
+    return [card.to_dict() for card in cards]
@@ -0,0 +1,185 @@
+# app/utils/search/news_regions.py
+
+"""
+Region classification for the news search index.
+
+Region filters used to OR together LIKE patterns over symbols_json on
+every request. Each search index row is now classified once, when it is
+written: the market of every symbol and the home region of the source are
+OR-ed into news_search_index.region_mask (NULL = not classified yet,
+0 = no known region).
+
+Filtering by one region is region_mask IN (every mask with its bit set),
+a short IN list on the indexed (region_mask, published_at) column pair.
+region_classifier.backfill() classifies rows written before the column
+existed; the AI scheduler runs it a batch at a time.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from ...models import NewsSearchIndex
+from .news_projection import parse_symbols
+from .symbol_alias import canonical_symbol
+
+logger = logging.getLogger(__name__)
+
+REGIONS = ('US', 'HK', 'CHINA', 'UK', 'JP')
+REGION_BITS = {region: 1 << position for position, region in enumerate(REGIONS)}
+
+BACKFILL_BATCH_SIZE = int(os.getenv('REGION_BACKFILL_BATCH_SIZE', 1000))
+# How long "every row is classified" is trusted before re-checking
+CLASSIFIED_CHECK_TTL = int(os.getenv('REGION_CLASSIFIED_CHECK_TTL', 300))
+
+EXCHANGE_REGIONS = {
+    'NASDAQ': 'US', 'NYSE': 'US', 'AMEX': 'US', 'NYSEARCA': 'US', 'OTC': 'US',
+    'HKEX': 'HK',
+    'SSE': 'CHINA', 'SZSE': 'CHINA',
+    'LSE': 'UK',
+    'TSE': 'JP',
+}
+SUFFIX_REGIONS = {'.HK': 'HK', '.SS': 'CHINA', '.SZ': 'CHINA', '.L': 'UK', '.T': 'JP'}
+_US_TICKER = re.compile(r'^[A-Z]{1,5}(\.[A-Z])?$')
+
+REGION_SOURCES = {
+    'CHINA': [
+        'China Daily', 'Xinhua', 'Global Times', 'SCMP',
+        'Caixin', 'Shanghai Daily', 'People\'s Daily',
+        'China.org.cn', 'Sina Finance', 'Eastmoney',
+        'Securities Times', 'China Securities Journal',
+        '中国日报', '新华社', '环球时报'
+    ],
+    'HK': [
+        'SCMP', 'South China Morning Post', 'Hong Kong Free Press',
+        'HKEJ', 'Hong Kong Economic Journal', 'RTHK',
+        'Ming Pao', 'Apple Daily', 'Oriental Daily',
+        'AAStocks', 'ET Net', 'HK01', 'The Standard'
+    ],
+    'US': [
+        'Reuters', 'Bloomberg', 'CNBC', 'Wall Street Journal', 'WSJ',
+        'MarketWatch', 'Yahoo Finance', 'Forbes', 'Fortune',
+        'CNN Business', 'Fox Business', 'Seeking Alpha', 'SeekingAlpha',
+        'The Motley Fool', 'Investor\'s Business Daily', 'Barron\'s',
+        'Associated Press', 'NPR', 'USA Today', 'Washington Post'
+    ],
+    'UK': [
+        'BBC', 'Financial Times', 'Guardian', 'Telegraph',
+        'Sky News', 'Independent', 'Evening Standard',
+        'City AM', 'This is Money', 'The Times', 'Reuters UK'
+    ],
+    'JP': [
+        'Nikkei', 'Japan Times', 'Kyodo News', 'NHK',
+        'Asahi Shimbun', 'Mainichi Shimbun', 'Yomiuri Shimbun',
+        'Japan Today', 'Tokyo Shimbun'
+    ]
+}
+_SOURCE_MASKS = {}
+for _region, _sources in REGION_SOURCES.items():
+    for _source in _sources:
+        _SOURCE_MASKS[_source] = _SOURCE_MASKS.get(_source, 0) | REGION_BITS[_region]
+
+
+def symbol_region(symbol: str) -> Optional[str]:
+    """Home market of a symbol, None for commodities, crypto and anything unrecognised"""
+    raw = symbol.strip().upper()
+    if ':' in raw:
+        return EXCHANGE_REGIONS.get(raw.split(':', 1)[0])
+    canonical = canonical_symbol(raw)
+    for suffix, region in SUFFIX_REGIONS.items():
+        if canonical.endswith(suffix):
+            return region
+    if _US_TICKER.match(canonical):
+        return 'US'
+    return None
+
+
+def region_mask(symbols: Iterable[str], source: str = None) -> int:
+    """Bitmask of the regions an article belongs to, from its symbols and source"""
+    mask = _SOURCE_MASKS.get(source, 0) if source else 0
+    for symbol in symbols:
+        region = symbol_region(symbol) if symbol else None
+        if region:
+            mask |= REGION_BITS[region]
+    return mask
+
+
+def masks_with(region: str) -> List[int]:
+    """Every mask value that has ``region``'s bit set; [] for unknown regions"""
+    bit = REGION_BITS.get(region.upper()) if region else None
+    if bit is None:
+        return []
+    return [mask for mask in range(1, 1 << len(REGIONS)) if mask & bit]
+
+
+class RegionClassifier:
+    """Tracks whether unclassified rows remain, and classifies them in batches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classified_until = 0.0
+
+    def all_classified(self, session: Session) -> bool:
+        now = time.monotonic()
+        if now < self._classified_until:
+            return True
+        pending = session.query(NewsSearchIndex.id).filter(NewsSearchIndex.region_mask.is_(None)).first()
+        if pending is None:
+            with self._lock:
+                self._classified_until = now + CLASSIFIED_CHECK_TTL
+            return True
+        return False
+
+    def region_condition(self, session: Session, region: str, legacy_condition=None):
+        """
+        Filter for ``region``, or None for unknown regions. While unclassified
+        rows remain they are matched by ``legacy_condition`` (the old pattern
+        filter) so results do not shrink during the backfill.
+        """
+        masks = masks_with(region)
+        if not masks:
+            return None
+        condition = NewsSearchIndex.region_mask.in_(masks)
+        if legacy_condition is not None and not self.all_classified(session):
+            condition = or_(condition, and_(NewsSearchIndex.region_mask.is_(None), legacy_condition))
+        return condition
+
+    def backfill(self, session: Session, batch_size: int = BACKFILL_BATCH_SIZE, max_batches: int = None) -> int:
+        """Classify rows whose region_mask is NULL; returns rows classified"""
+        classified = 0
+        batches = 0
+        last_id = 0
+        while max_batches is None or batches < max_batches:
+            rows = session.query(
+                NewsSearchIndex.id, NewsSearchIndex.symbols_json, NewsSearchIndex.source
+            ).filter(
+                NewsSearchIndex.region_mask.is_(None),
+                NewsSearchIndex.id > last_id
+            ).order_by(NewsSearchIndex.id).limit(batch_size).all()
+            if not rows:
+                break
+            session.bulk_update_mappings(NewsSearchIndex, [
+                {'id': row.id, 'region_mask': region_mask(parse_symbols(row.symbols_json), row.source)}
+                for row in rows
+            ])
+            session.commit()
+            last_id = rows[-1].id
+            classified += len(rows)
+            batches += 1
+        if classified:
+            logger.info(f"🌍 Classified {classified} search index rows by region")
+        return classified
+
+    def reset(self):
+        with self._lock:
+            self._classified_until = 0.0
+
+
+# Global instance
+region_classifier = RegionClassifier()
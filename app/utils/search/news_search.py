@@ -77,11 +77,10 @@ class NewsSearch:
                     ))
             query = query.filter(and_(*keyword_filters))
 
-        # Symbol filter
+        # Symbol filter (canonical ids, so any spelling of a ticker matches)
         if symbols:
-            query = query.join(ArticleSymbol).filter(
-                ArticleSymbol.symbol.in_(symbols)
-            )
+            from .symbol_alias import symbol_registry
+            query = query.filter(NewsArticle.id.in_(symbol_registry.article_ids_query(self.session, symbols)))
 
         # Sentiment filter
         if sentiment:
@@ -430,19 +429,13 @@ class NewsSearch:
         # Build optimized query
         query = self.session.query(NewsArticle)
         
-        # Apply symbol filter using optimized approach
+        # Apply symbol filter: every variant resolves to one canonical id,
+        # matched on the covering (symbol_id, article_id) index
+        article_ids = None
         if symbols:
-            symbol_conditions = []
-            for symbol in symbols:
-                # Use exact match first, then fallback to variants
-                symbol_conditions.append(ArticleSymbol.symbol == symbol)
-            
-            # Use EXISTS subquery for better performance
-            subquery = self.session.query(ArticleSymbol.article_id).filter(
-                or_(*symbol_conditions)
-            ).subquery()
-            
-            query = query.filter(NewsArticle.id.in_(subquery))
+            from .symbol_alias import symbol_registry
+            article_ids = symbol_registry.article_ids_query(self.session, symbols)
+            query = query.filter(NewsArticle.id.in_(article_ids))
 
         # Apply other filters efficiently
         query = self._apply_filters(query, sentiment_filter, date_filter, 
@@ -464,16 +457,8 @@ class NewsSearch:
             count_query = self.session.query(NewsArticle)
             
             # Apply same filters for count
-            if symbols:
-                symbol_conditions = []
-                for symbol in symbols:
-                    symbol_conditions.append(ArticleSymbol.symbol == symbol)
-                
-                count_subquery = self.session.query(ArticleSymbol.article_id).filter(
-                    or_(*symbol_conditions)
-                ).subquery()
-                
-                count_query = count_query.filter(NewsArticle.id.in_(count_subquery))
+            if article_ids is not None:
+                count_query = count_query.filter(NewsArticle.id.in_(article_ids))
             
             count_query = self._apply_filters(count_query, sentiment_filter, date_filter, 
                                            region_filter, processing_filter)
@@ -625,7 +610,8 @@ class NewsSearch:
 
     def _build_cache_key(self, *args):
         """Build cache key from arguments"""
-        return ':'.join(str(arg) for arg in args if arg is not None)
+        from ..cache.news_cache import NAMESPACE_SEARCH
+        return self.cache.namespace_key(NAMESPACE_SEARCH, ':'.join(str(arg) for arg in args if arg is not None))
 
     def get_symbol_variants(self, symbol: str) -> List[str]:
         """Get all possible variants for a symbol, including bare number format for Investing.com compatibility"""
@@ -718,4 +704,5 @@ class NewsSearch:
             if pattern:
                 self.cache.delete_pattern(pattern)
             else:
-                self.cache.delete_pattern('symbol_search:*')
\ No newline at end of file
+                from ..cache.news_cache import NAMESPACE_SEARCH
+                self.cache.bump_namespace(NAMESPACE_SEARCH)
\ No newline at end of file
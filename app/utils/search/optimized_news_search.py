@@ -1,9 +1,16 @@
 # app/utils/search/optimized_news_search.py
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy import or_, and_, func, desc, text
 from sqlalchemy.orm import Session
 from ...models import NewsSearchIndex
+from .news_projection import search_index_cards, serialize_cards
+from .news_regions import region_classifier, masks_with
+from .news_feeds import GLOBAL_FEED, news_feeds, region_feed, symbol_feed
+from .search_invalidation import (
+    KIND_KEYWORD, LATEST_SEARCH_CACHE_TTL, SEARCH_CACHE_TTL, keyword_search_tags, keyword_terms,
+    search_invalidator, symbol_search_tags
+)
 import json
 import re
 from datetime import datetime, timedelta
@@ -64,13 +71,26 @@ class OptimizedNewsSearch:
         Returns: (articles, total_count, has_more)
         """
         cache_key = None
+
+        # 📰 MATERIALIZED FEED: Plain "latest" pages come straight from Redis, no SQL
+        feed = self._feed_for(symbols, sentiment_filter, sort_order, date_filter, region_filter)
+        if feed:
+            feed_page = news_feeds.page(self.session, feed, (page - 1) * per_page, per_page)
+            if feed_page is not None:
+                articles, total_count = feed_page
+                return articles, total_count, page * per_page < total_count
+        
+        # "latest" without symbols is a rolling window: cached apart and only briefly
+        latest_window = not symbols and getattr(self, '_has_latest_keyword', False)
+        cache_ttl = LATEST_SEARCH_CACHE_TTL if latest_window else SEARCH_CACHE_TTL
         
         # 🎯 SMART CACHING: Try cache first for instant results
         if self.is_cache_available():
             try:
                 cache_key = self._build_cache_key(
                     'standalone_symbol', symbols, sentiment_filter, sort_order,
-                    date_filter, region_filter, processing_filter, page, per_page
+                    date_filter, region_filter, processing_filter, page, per_page,
+                    'latest' if latest_window else None
                 )
                 cached_result = self.cache.get_json(cache_key)
                 if cached_result:
@@ -104,8 +124,7 @@ class OptimizedNewsSearch:
         query = self._apply_standalone_filters(query, sentiment_filter, date_filter, region_filter)
         
         # Special handling for "latest" in symbol search (when no specific symbols provided)
-        if not symbols and hasattr(self, '_has_latest_keyword') and self._has_latest_keyword:
-            from datetime import datetime, timedelta
+        if latest_window:
             three_days_ago = datetime.now() - timedelta(days=3)
             query = query.filter(NewsSearchIndex.published_at >= three_days_ago)
             sort_order = 'LATEST'  # Ensure latest first
@@ -116,14 +135,14 @@ class OptimizedNewsSearch:
         
         # Apply sorting and pagination
         query = self._apply_sorting(query, sort_order)
-        articles = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        articles = search_index_cards(query.offset((page - 1) * per_page).limit(per_page + 1))
         
         has_more = len(articles) > per_page
         if has_more:
             articles = articles[:-1]
 
-        # 🚀 INSTANT CONVERSION: All data already in search index
-        article_dicts = [article.to_dict() for article in articles]
+        # 🚀 INSTANT CONVERSION: Column projection, symbols parsed once per row
+        article_dicts = serialize_cards(articles)
 
         # 💾 CACHE RESULTS: Store for future instant access
         if self.is_cache_available() and cache_key:
@@ -134,10 +153,10 @@ class OptimizedNewsSearch:
                     'has_more': has_more,
                     'cached_at': datetime.now().isoformat()
                 }
-                # Longer cache for popular symbols
-                cache_expire = 600 if symbols and len(symbols) == 1 else 300
-                self.cache.set_json(cache_key, cache_data, expire=cache_expire)
-                logger.debug(f"💾 Cached standalone symbol search for {cache_expire}s")
+                # Long TTL: index syncs drop the entry as soon as one of its symbols/regions changes
+                self.cache.set_json(cache_key, cache_data, expire=cache_ttl,
+                                    tags=symbol_search_tags(symbols, region_filter))
+                logger.debug(f"💾 Cached standalone symbol search for {cache_ttl}s")
             except Exception as e:
                 logger.debug(f"Cache storage failed: {str(e)}")
 
@@ -167,13 +186,16 @@ class OptimizedNewsSearch:
         Returns: (articles, total_count, has_more)
         """
         cache_key = None
+        # "latest" searches are a rolling window the index syncs cannot invalidate
+        latest_window = force_latest_filter or any(kw.lower() == 'latest' for kw in keywords or [])
+        cache_ttl = LATEST_SEARCH_CACHE_TTL if latest_window else SEARCH_CACHE_TTL
         
         # 🎯 SMART CACHING: Popular keywords get instant results
         if self.is_cache_available():
             try:
                 cache_key = self._build_cache_key(
                     'standalone_keyword', keywords, sentiment_filter, sort_order,
-                    date_filter, page, per_page
+                    date_filter, page, per_page, 'force_latest' if force_latest_filter else None
                 )
                 cached_result = self.cache.get_json(cache_key)
                 if cached_result:
@@ -196,7 +218,6 @@ class OptimizedNewsSearch:
         # 🧠 HANDLE FORCE LATEST FILTER FIRST (before keyword processing)
         if force_latest_filter:
             # For "latest" search, show AI-processed articles from last 3 days ONLY
-            from datetime import datetime, timedelta
             three_days_ago = datetime.now() - timedelta(days=3)
             query = query.filter(
                 NewsSearchIndex.published_at >= three_days_ago
@@ -228,7 +249,6 @@ class OptimizedNewsSearch:
             
             if has_latest_keyword and not force_latest_filter:
                 # For "latest" keyword, show AI-processed articles from last 3 days ONLY
-                from datetime import datetime, timedelta
                 three_days_ago = datetime.now() - timedelta(days=3)
                 query = query.filter(
                     NewsSearchIndex.published_at >= three_days_ago
@@ -298,14 +318,14 @@ class OptimizedNewsSearch:
         # Get results with pagination
         total_count = query.count()
         query = self._apply_sorting(query, sort_order)
-        articles = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        articles = search_index_cards(query.offset((page - 1) * per_page).limit(per_page + 1))
         
         has_more = len(articles) > per_page
         if has_more:
             articles = articles[:-1]
 
-        # 🚀 INSTANT CONVERSION: All AI data already available
-        article_dicts = [article.to_dict() for article in articles]
+        # 🚀 INSTANT CONVERSION: Column projection, symbols parsed once per row
+        article_dicts = serialize_cards(articles)
         
         # 💾 INTELLIGENT CACHING: Popular keywords cached longer
         if self.is_cache_available() and cache_key:
@@ -316,10 +336,11 @@ class OptimizedNewsSearch:
                     'has_more': has_more,
                     'cached_at': datetime.now().isoformat()
                 }
-                # Smart cache duration based on keyword popularity
-                cache_expire = 600 if keywords and any(kw.lower() in ['latest', 'earnings', 'ai', 'technology', 'tesla', 'apple', 'bitcoin'] for kw in keywords) else 300
-                self.cache.set_json(cache_key, cache_data, expire=cache_expire)
-                logger.debug(f"💾 Cached standalone keyword search for {cache_expire}s")
+                # Long TTL: index syncs drop the entry as soon as a synced article mentions a keyword
+                self.cache.set_json(cache_key, cache_data, expire=cache_ttl,
+                                    tags=keyword_search_tags(keywords))
+                search_invalidator.watch(self.cache, KIND_KEYWORD, keyword_terms(keywords))
+                logger.debug(f"💾 Cached standalone keyword search for {cache_ttl}s")
             except Exception as e:
                 logger.debug(f"Cache storage failed: {str(e)}")
         
@@ -342,6 +363,11 @@ class OptimizedNewsSearch:
         Get recent AI-enhanced news efficiently from standalone search index.
         """
         cutoff_time = datetime.now() - timedelta(hours=hours)
+
+        if not sentiment_filter:
+            recent = news_feeds.recent(self.session, GLOBAL_FEED, cutoff_time, limit)
+            if recent is not None:
+                return recent
         
         query = self.session.query(NewsSearchIndex).filter(
             NewsSearchIndex.published_at >= cutoff_time,
@@ -355,9 +381,7 @@ class OptimizedNewsSearch:
         if sentiment_filter:
             query = self._apply_sentiment_filter_standalone(query, sentiment_filter)
         
-        articles = query.order_by(desc(NewsSearchIndex.published_at)).limit(limit).all()
-        
-        return [article.to_dict() for article in articles]
+        return serialize_cards(search_index_cards(query.order_by(desc(NewsSearchIndex.published_at)).limit(limit)))
 
     def advanced_search(
         self,
@@ -438,7 +462,7 @@ class OptimizedNewsSearch:
         query = query.offset((page - 1) * per_page).limit(per_page)
 
         # Convert to dict
-        articles = [article.to_dict() for article in query.all()]
+        articles = serialize_cards(search_index_cards(query))
         
         return articles, total_count
 
@@ -468,23 +492,13 @@ class OptimizedNewsSearch:
             except ValueError:
                 pass  # Invalid date format
 
-        # Region filter using symbols_json and source
+        # Region filter on the precomputed region_mask (indexed)
         if region_filter:
-            region_conditions = []
-            
-            # Get region-specific symbol patterns and search in JSON
-            region_patterns = self._get_region_symbol_patterns(region_filter)
-            if region_patterns:
-                for pattern in region_patterns:
-                    region_conditions.append(NewsSearchIndex.symbols_json.like(f'%{pattern}%'))
-            
-            # Source-based filtering
-            region_sources = self._get_region_sources(region_filter)
-            if region_sources:
-                region_conditions.append(NewsSearchIndex.source.in_(region_sources))
-            
-            if region_conditions:
-                query = query.filter(or_(*region_conditions))
+            region_condition = region_classifier.region_condition(
+                self.session, region_filter, self._legacy_region_condition(region_filter)
+            )
+            if region_condition is not None:
+                query = query.filter(region_condition)
 
         return query
 
@@ -513,6 +527,32 @@ class OptimizedNewsSearch:
         else:  # LATEST
             return query.order_by(NewsSearchIndex.published_at.desc())
 
+    def _feed_for(self, symbols, sentiment_filter, sort_order, date_filter, region_filter) -> Optional[str]:
+        """Materialized feed that answers this symbol search exactly, if any"""
+        if sentiment_filter or date_filter or (sort_order or 'LATEST') != 'LATEST':
+            return None
+        if getattr(self, '_has_latest_keyword', False):
+            return None
+        symbols = [symbol for symbol in (symbols or []) if symbol]
+        # Unknown regions apply no filter (see _apply_standalone_filters)
+        region = region_filter if region_filter and masks_with(region_filter) else None
+        if len(symbols) > 1 or (symbols and region):
+            return None
+        if symbols:
+            return symbol_feed(symbols[0])
+        return region_feed(region) if region else GLOBAL_FEED
+
+    def _legacy_region_condition(self, region_filter):
+        """Pattern match over symbols_json and source, for rows not yet classified"""
+        region_conditions = [
+            NewsSearchIndex.symbols_json.like(f'%{pattern}%')
+            for pattern in self._get_region_symbol_patterns(region_filter)
+        ]
+        region_sources = self._get_region_sources(region_filter)
+        if region_sources:
+            region_conditions.append(NewsSearchIndex.source.in_(region_sources))
+        return or_(*region_conditions) if region_conditions else None
+
     def _get_region_symbol_patterns(self, region_filter):
         """Get comprehensive symbol patterns for region filtering"""
         region_patterns = {
@@ -590,8 +630,9 @@ class OptimizedNewsSearch:
     def _build_cache_key(self, search_type, *args):
         """Build cache key for search results"""
         # Convert all arguments to strings and create hash-like key
+        from ..cache.news_cache import NAMESPACE_SEARCH
         key_parts = [search_type] + [str(arg) for arg in args if arg is not None]
-        return f"standalone_search:{'_'.join(key_parts)}"
+        return self.cache.namespace_key(NAMESPACE_SEARCH, f"standalone_search:{'_'.join(key_parts)}")
 
     def cache_popular_search(self, search_term: str, result_count: int):
         """Track popular searches for optimization"""
@@ -642,13 +683,8 @@ class OptimizedNewsSearch:
             if pattern:
                 self.cache.delete_pattern(pattern)
             else:
-                # Clear standalone search caches
-                patterns = [
-                    'standalone_search:*',
-                    'standalone_symbol:*', 
-                    'standalone_keyword:*',
-                    'popular_search:*'
-                ]
-                for pattern in patterns:
-                    self.cache.delete_pattern(pattern)
+                from ..cache.news_cache import NAMESPACE_SEARCH
+                # Bumping the search generation orphans every cached search at once
+                self.cache.bump_namespace(NAMESPACE_SEARCH)
+                self.cache.delete_pattern('popular_search:*')
                 logger.info("🧹 Cleared all standalone search caches") 
\ No newline at end of file
@@ -8,8 +8,14 @@ from sqlalchemy.orm import Session
 
 from ...models import NewsArticle, NewsSearchIndex
 from ... import db
+from ..cache.news_cache import NewsCache, NAMESPACE_NEWS_FEED
+from ..config.logging_config import get_hot_logger
+from .news_feeds import feed_entries, news_feeds
+from .search_invalidation import IndexChange, index_change, search_invalidator
 
 logger = logging.getLogger(__name__)
+# Per-article messages, rate-limited per call site
+hot_logger = get_hot_logger(__name__)
 
 class SearchIndexSyncService:
     """
@@ -25,6 +31,21 @@ class SearchIndexSyncService:
     def __init__(self, session: Session = None):
         self.session = session or db.session
         self.logger = logger
+        try:
+            self.cache = NewsCache()
+        except Exception as e:
+            self.logger.debug(f"Cache initialization failed: {str(e)}")
+            self.cache = None
+    
+    def _invalidate_search_caches(self, change: IndexChange):
+        """Drop the cached searches and suggestions ``change`` can affect, and the recent-article feeds"""
+        if self.cache is None:
+            return
+        try:
+            search_invalidator.handle(self.cache, change)
+            self.cache.bump_namespace(NAMESPACE_NEWS_FEED)
+        except Exception as e:
+            self.logger.debug(f"Search cache invalidation failed: {str(e)}")
     
     def sync_article(self, article: NewsArticle) -> bool:
         """
@@ -39,7 +60,7 @@ class SearchIndexSyncService:
         try:
             # Skip articles without required fields
             if not article.external_id or not article.published_at:
-                self.logger.warning(f"⚠️ Skipping article {article.id}: missing external_id or published_at")
+                hot_logger.warning(f"⚠️ Skipping article {article.id}: missing external_id or published_at")
                 return False
             
             # Check if article already exists in search index
@@ -47,9 +68,12 @@ class SearchIndexSyncService:
                 external_id=article.external_id
             ).first()
             
+            change = IndexChange()
             if existing_entry:
-                # Update existing entry
-                existing_entry.update_from_article(article)
+                # Update existing entry (its old state may sit in cached results too)
+                search_entry = existing_entry
+                change.add(search_entry)
+                search_entry.update_from_article(article)
                 self.logger.debug(f"✏️ Updated search index for article {article.id}")
             else:
                 # Create new entry
@@ -57,11 +81,17 @@ class SearchIndexSyncService:
                 self.session.add(search_entry)
                 self.logger.debug(f"➕ Added article {article.id} to search index")
             
+            # Feed entries are built before commit expires the row
+            self.session.flush()
+            entries = feed_entries([search_entry])
+            change.add(search_entry)
             self.session.commit()
+            self._invalidate_search_caches(change)
+            news_feeds.publish(entries)
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Error syncing article {article.id} to search index: {str(e)}")
+            hot_logger.error(f"❌ Error syncing article {article.id} to search index: {str(e)}")
             self.session.rollback()
             return False
     
@@ -93,6 +123,8 @@ class SearchIndexSyncService:
                     existing_entries[entry.external_id] = entry
             
             # Process each article
+            synced_entries = []
+            change = IndexChange()
             for article in articles:
                 try:
                     # Skip articles without required fields
@@ -101,21 +133,31 @@ class SearchIndexSyncService:
                         continue
                     
                     if article.external_id in existing_entries:
-                        # Update existing entry
+                        # Update existing entry (its old state may sit in cached results too)
+                        change.add(existing_entries[article.external_id])
                         existing_entries[article.external_id].update_from_article(article)
+                        synced_entries.append(existing_entries[article.external_id])
                         stats['updated'] += 1
                     else:
                         # Create new entry
                         search_entry = NewsSearchIndex.create_from_article(article)
                         self.session.add(search_entry)
+                        synced_entries.append(search_entry)
                         stats['added'] += 1
                         
                 except Exception as e:
-                    self.logger.error(f"❌ Error processing article {article.id}: {str(e)}")
+                    hot_logger.error(f"❌ Error processing article {article.id}: {str(e)}")
                     stats['errors'] += 1
             
-            # Commit all changes
+            # Commit all changes (feed entries first, while the rows are still loaded)
+            self.session.flush()
+            entries = feed_entries(synced_entries)
+            for search_entry in synced_entries:
+                change.add(search_entry)
             self.session.commit()
+            if stats['added'] or stats['updated']:
+                self._invalidate_search_caches(change)
+                news_feeds.publish(entries)
             
             self.logger.info(f"📊 Bulk sync completed: {stats['added']} added, {stats['updated']} updated, "
                            f"{stats['skipped']} skipped, {stats['errors']} errors")
@@ -195,12 +237,16 @@ class SearchIndexSyncService:
                 return 0
             
             # Remove orphaned entries
+            entries = feed_entries(orphaned_entries)
+            change = index_change(orphaned_entries)
             removed_count = 0
             for entry in orphaned_entries:
                 self.session.delete(entry)
                 removed_count += 1
             
             self.session.commit()
+            self._invalidate_search_caches(change)
+            news_feeds.discard(entries)
             
             self.logger.info(f"🗑️ Removed {removed_count} orphaned search index entries")
             return removed_count
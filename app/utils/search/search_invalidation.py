@@ -0,0 +1,184 @@
+# app/utils/search/search_invalidation.py
+
+"""
+Event-driven invalidation of cached search and suggestion results.
+
+Every index sync used to bump the whole search and suggestion namespaces,
+so any new article dropped every cached page. That kept TTLs short.
+Now the sync path emits an IndexChange for the rows it touched. It holds
+their symbols, regions and searchable text, taken both before and after an
+update. Only the cached entries those rows could appear in are dropped:
+
+- symbol searches are tagged per symbol (search:symbol:<SYM>);
+- region-only searches are tagged per region (search:region:<REGION>);
+- searches with neither are tagged search:all and go on any change;
+- keyword searches and suggestions are tagged per term. The terms being
+  cached are tracked in a sorted set scored by last use. A change drops
+  the terms it mentions, using the same substring rule as the LIKE
+  filters they stand for.
+
+If more than MAX_WATCHED_TERMS terms are tracked, matching them all is
+no longer cheap. The whole namespace is bumped instead, as before.
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+from redis import RedisError
+
+from ...models import NewsSearchIndex
+from ..cache.news_cache import NewsCache, NAMESPACE_SEARCH, NAMESPACE_SUGGESTION
+from .news_projection import parse_symbols
+from .news_regions import REGION_BITS
+
+logger = logging.getLogger(__name__)
+
+# Entries are dropped by change events, so they can live much longer than before
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 3600))
+# "latest" searches cover a rolling last-3-days window that moves without any
+# index change, so they only get a short TTL
+LATEST_SEARCH_CACHE_TTL = int(os.getenv('LATEST_SEARCH_CACHE_TTL', 300))
+# Suggestions also come from keyword frequencies and trends that index syncs
+# know nothing about, so they keep their short TTL
+SUGGESTION_CACHE_TTL = int(os.getenv('SUGGESTION_CACHE_TTL', 300))
+# Above this many tracked terms a kind falls back to a namespace bump
+MAX_WATCHED_TERMS = int(os.getenv('SEARCH_MAX_WATCHED_TERMS', 5000))
+
+TAG_ALL_RESULTS = 'search:all'
+KIND_KEYWORD = 'search:keyword'
+KIND_SUGGESTION = 'suggestion:query'
+KIND_NAMESPACES = {KIND_KEYWORD: NAMESPACE_SEARCH, KIND_SUGGESTION: NAMESPACE_SUGGESTION}
+KIND_TTLS = {KIND_KEYWORD: SEARCH_CACHE_TTL, KIND_SUGGESTION: SUGGESTION_CACHE_TTL}
+
+# Keywords that steer sorting or date range instead of matching text
+NON_CONTENT_KEYWORDS = {'latest', 'highest', 'lowest'}
+
+
+def symbol_tag(symbol: str) -> str:
+    return f'search:symbol:{symbol.strip().upper()}'
+
+
+def region_tag(region: str) -> str:
+    return f'search:region:{region.upper()}'
+
+
+def term_tag(kind: str, term: str) -> str:
+    return f'{kind}:{term}'
+
+
+def _watch_key(kind: str) -> str:
+    return f'{kind}:watched'
+
+
+@dataclass
+class IndexChange:
+    """What changed in the search index: the symbols, regions and text of the touched rows"""
+    symbols: Set[str] = field(default_factory=set)
+    regions: Set[str] = field(default_factory=set)
+    texts: List[str] = field(default_factory=list)
+    rows: int = 0
+
+    def add(self, row: NewsSearchIndex):
+        """Record a row; call before and after an update so old matches are dropped too"""
+        self.symbols.update(symbol.strip().upper() for symbol in parse_symbols(row.symbols_json) if symbol)
+        self.regions.update(region for region, bit in REGION_BITS.items() if (row.region_mask or 0) & bit)
+        self.texts.append(' '.join(
+            part for part in (row.title, row.ai_summary, row.ai_insights, row.source) if part
+        ).lower())
+        self.rows += 1
+
+    def mentions(self, term: str) -> bool:
+        """True if a LIKE '%term%' over the rows' text or symbols could match"""
+        return any(term in text for text in self.texts) or any(term.upper() in symbol for symbol in self.symbols)
+
+    def __bool__(self):
+        return self.rows > 0
+
+
+def index_change(rows: Iterable[NewsSearchIndex]) -> IndexChange:
+    change = IndexChange()
+    for row in rows:
+        change.add(row)
+    return change
+
+
+def symbol_search_tags(symbols: Optional[List[str]], region_filter: Optional[str] = None) -> List[str]:
+    """Tags for a cached symbol search: any row it can contain hits at least one of them"""
+    symbols = [symbol for symbol in (symbols or []) if symbol]
+    if symbols:
+        return [symbol_tag(symbol) for symbol in symbols]
+    if region_filter and region_filter.upper() in REGION_BITS:
+        return [region_tag(region_filter)]
+    return [TAG_ALL_RESULTS]
+
+
+def keyword_terms(keywords: Optional[List[str]]) -> List[str]:
+    """Lower-cased text terms of a keyword search, as its LIKE filters use them"""
+    terms = []
+    for keyword in keywords or []:
+        term = keyword.replace('"', '').strip().lower()
+        if term and term not in NON_CONTENT_KEYWORDS:
+            terms.append(term)
+    return list(dict.fromkeys(terms))
+
+
+def keyword_search_tags(keywords: Optional[List[str]]) -> List[str]:
+    terms = keyword_terms(keywords)
+    return [term_tag(KIND_KEYWORD, term) for term in terms] if terms else [TAG_ALL_RESULTS]
+
+
+class SearchCacheInvalidator:
+    """Tracks which terms are cached and drops the entries an IndexChange touches"""
+
+    def watch(self, cache: NewsCache, kind: str, terms: Iterable[str]):
+        """Remember that entries tagged with these terms are cached"""
+        terms = list(terms)
+        if not terms or not cache.redis_available:
+            return
+        try:
+            pipe = cache.redis.pipeline(transaction=False)
+            pipe.zadd(_watch_key(kind), {term: time.time() for term in terms})
+            pipe.expire(_watch_key(kind), KIND_TTLS[kind])
+            pipe.execute()
+        except RedisError as e:
+            logger.debug(f"Could not track cached {kind} terms: {str(e)}")
+
+    def _watched_terms(self, cache: NewsCache, kind: str) -> List[str]:
+        """Terms cached within their TTL; entries older than that have expired on their own"""
+        pipe = cache.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(_watch_key(kind), '-inf', time.time() - KIND_TTLS[kind])
+        pipe.zrange(_watch_key(kind), 0, MAX_WATCHED_TERMS)
+        return pipe.execute()[1]
+
+    def handle(self, cache: Optional[NewsCache], change: IndexChange) -> int:
+        """Invalidate what ``change`` can affect; returns the number of entries dropped"""
+        if cache is None or not change or not cache.redis_available:
+            return 0
+
+        tags = [TAG_ALL_RESULTS]
+        tags.extend(symbol_tag(symbol) for symbol in sorted(change.symbols))
+        tags.extend(region_tag(region) for region in sorted(change.regions))
+        bumped = []
+        try:
+            for kind in (KIND_KEYWORD, KIND_SUGGESTION):
+                terms = self._watched_terms(cache, kind)
+                if len(terms) > MAX_WATCHED_TERMS:
+                    bumped.append(KIND_NAMESPACES[kind])
+                    continue
+                tags.extend(term_tag(kind, term) for term in terms if change.mentions(term))
+        except RedisError as e:
+            logger.debug(f"Watched term lookup failed, bumping search namespaces: {str(e)}")
+            bumped = list(KIND_NAMESPACES.values())
+
+        if bumped:
+            cache.bump_namespace(*bumped)
+        removed = cache.invalidate_tags(*tags)
+        logger.debug(f"🎯 Index change ({change.rows} rows) invalidated {removed} cached search entries")
+        return removed
+
+
+# Global instance
+search_invalidator = SearchCacheInvalidator()
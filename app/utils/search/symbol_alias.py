@@ -0,0 +1,333 @@
+# app/utils/search/symbol_alias.py
+
+"""
+Canonical symbols and their aliases.
+
+The same instrument reaches us as AAPL, NASDAQ:AAPL, 0700.HK, HKEX:700,
+700, SSE:600519, 600519, COMEX:GC1!, XAUUSD... canonical_symbol() maps any
+of these to one yfinance-style form, and the symbol_alias table maps every
+known spelling to that form's canonical_symbols.id.
+
+ArticleSymbol rows carry the canonical id (set at ingest, see
+SymbolRegistry.resolve), so symbol search is one indexed equality lookup
+on article_symbols(symbol_id, article_id) however the user typed the
+ticker. The table is seeded from tickers.ts; unknown symbols are added
+when an article first mentions them.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List
+
+from sqlalchemy import event, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
+
+from ...models import ArticleSymbol, CanonicalSymbol, SymbolAlias
+
+logger = logging.getLogger(__name__)
+
+TICKERS_FILE = os.getenv(
+    'TICKERS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'tickers.ts')
+)
+# How long "every article symbol has a canonical id" is trusted before re-checking
+LINK_CHECK_TTL = int(os.getenv('SYMBOL_LINK_CHECK_TTL', 300))
+
+_TICKER_PATTERN = re.compile(r'{[^}]*symbol:\s*"([^"]*)",[^}]*name:\s*"([^"]*)"[^}]*}')
+_MARKET_SUFFIX = re.compile(r'\.(HK|SS|SZ|T|L)$')
+_MAX_ALIAS_LENGTH = 32
+# session.info key for ids this transaction may have created; cached only once it commits
+_PENDING_IDS = 'symbol_registry_pending_ids'
+
+US_EXCHANGES = ('NASDAQ', 'NYSE', 'AMEX', 'NYSEARCA', 'OTC')
+SUFFIX_EXCHANGES = {'SSE': '.SS', 'SZSE': '.SZ', 'TSE': '.T', 'LSE': '.L'}
+FUTURES_EXCHANGES = ('COMEX', 'NYMEX')
+COMMODITIES = {
+    'GC=F': ('COMEX:GC1!', 'COMEX:GC', 'TVC:GOLD', 'FXCM:GOLD', 'XAUUSD', 'GOLD'),
+    'SI=F': ('COMEX:SI1!', 'COMEX:SI', 'TVC:SILVER', 'FXCM:SILVER', 'XAGUSD', 'SILVER'),
+}
+_COMMODITY_ALIASES = {alias: canonical for canonical, aliases in COMMODITIES.items() for alias in aliases}
+
+
+def _hk(number: str) -> str:
+    return f"{str(int(number)).zfill(4)}.HK"
+
+
+def canonical_symbol(raw: str) -> str:
+    """Any spelling of a symbol -> its canonical (yfinance-style) form"""
+    symbol = raw.strip().upper()
+    if symbol in _COMMODITY_ALIASES:
+        return _COMMODITY_ALIASES[symbol]
+
+    if ':' in symbol:
+        exchange, base = symbol.split(':', 1)
+        if exchange == 'HKEX' and base.isdigit():
+            return _hk(base)
+        if exchange in SUFFIX_EXCHANGES:
+            return base + SUFFIX_EXCHANGES[exchange]
+        if exchange in FUTURES_EXCHANGES:
+            return base[:-2] + '=F' if base.endswith('1!') else base + '=F'
+        return base
+
+    if symbol.isdigit():
+        # Bare numbers, as Investing.com writes them
+        if len(symbol) == 6 and symbol.startswith('6'):
+            return f"{symbol}.SS"
+        if len(symbol) == 6 and symbol.startswith(('0', '3')):
+            return f"{symbol}.SZ"
+        if 3 <= len(symbol) <= 5:
+            return _hk(symbol)
+        return symbol
+
+    if symbol.endswith('.HK') and symbol[:-3].isdigit():
+        return _hk(symbol[:-3])
+    return symbol
+
+
+def alias_forms(canonical: str) -> List[str]:
+    """The spellings of a canonical symbol we expect to see; each maps back to it"""
+    forms = {canonical}
+    forms.update(COMMODITIES.get(canonical, ()))
+    if canonical.endswith('.HK'):
+        base = canonical[:-3]
+        short = str(int(base)) if base.isdigit() else base
+        forms.update({base, f"{short}.HK", f"HKEX:{base}", f"HKEX:{short}"})
+        if len(short) >= 3:
+            # Shorter bare numbers are too ambiguous to claim
+            forms.add(short)
+    elif canonical.endswith(('.SS', '.SZ')):
+        base = canonical[:-3]
+        exchange = 'SSE' if canonical.endswith('.SS') else 'SZSE'
+        forms.update({base, f"{exchange}:{base}"})
+    elif canonical.endswith(('.T', '.L')):
+        # No bare form: bare numbers are Hong Kong, bare letters are US
+        base = canonical[:-2]
+        exchange = 'TSE' if canonical.endswith('.T') else 'LSE'
+        forms.add(f"{exchange}:{base}")
+    elif canonical.endswith('=F'):
+        root = canonical[:-2]
+        for exchange in FUTURES_EXCHANGES:
+            forms.update({f"{exchange}:{root}", f"{exchange}:{root}1!"})
+    elif not _MARKET_SUFFIX.search(canonical) and not canonical.startswith('^'):
+        forms.update(f"{exchange}:{canonical}" for exchange in US_EXCHANGES)
+    return sorted(form for form in forms if len(form) <= _MAX_ALIAS_LENGTH)
+
+
+def load_ticker_file(path: str = None) -> Dict[str, str]:
+    """tickers.ts -> {symbol: name}"""
+    path = path or TICKERS_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except OSError as e:
+        logger.warning(f"⚠️ Could not read tickers file {path}: {str(e)}")
+        return {}
+    return {symbol: name for symbol, name in _TICKER_PATTERN.findall(content)}
+
+
+class SymbolRegistry:
+    """Resolves raw symbols to canonical ids, with a per-process cache of known aliases"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._links_complete_until = 0.0
+
+    def resolve(self, session: Session, symbols: Iterable[str], create: bool = False) -> Dict[str, int]:
+        """
+        {raw symbol: canonical id} for the symbols that are known. With
+        ``create``, unknown symbols get a canonical row and their aliases,
+        so every non-empty symbol resolves.
+        """
+        wanted = {}
+        for raw in symbols:
+            if raw and raw.strip():
+                wanted[raw] = (raw.strip().upper(), canonical_symbol(raw))
+
+        with self._lock:
+            missing = {key for pair in wanted.values() for key in pair if key not in self._ids}
+        if missing:
+            rows = session.query(SymbolAlias.alias, SymbolAlias.symbol_id).filter(
+                SymbolAlias.alias.in_(missing)
+            ).all()
+            self._remember(session, dict(rows))
+
+        resolved = {}
+        unknown = {}
+        known = dict(session.info.get(_PENDING_IDS, {}))
+        with self._lock:
+            known.update(self._ids)
+            for raw, (alias, canonical) in wanted.items():
+                symbol_id = known.get(alias) or known.get(canonical)
+                if symbol_id:
+                    resolved[raw] = symbol_id
+                else:
+                    unknown.setdefault(canonical, set()).add(alias)
+
+        if create and unknown:
+            for canonical, aliases in unknown.items():
+                symbol_id = self._create(session, canonical, aliases)
+                for raw, (alias, raw_canonical) in wanted.items():
+                    if raw_canonical == canonical:
+                        resolved[raw] = symbol_id
+        return resolved
+
+    def _create(self, session: Session, canonical: str, extra_aliases: Iterable[str] = (), name: str = None) -> int:
+        """Insert a canonical symbol and its aliases; another worker may have done it first"""
+        forms = set(alias_forms(canonical))
+        forms.update(alias for alias in extra_aliases if len(alias) <= _MAX_ALIAS_LENGTH)
+        try:
+            with session.begin_nested():
+                row = session.query(CanonicalSymbol).filter_by(symbol=canonical).first()
+                if row is None:
+                    row = CanonicalSymbol(symbol=canonical, name=name)
+                    session.add(row)
+                    session.flush()
+                taken = {alias for (alias,) in session.query(SymbolAlias.alias).filter(SymbolAlias.alias.in_(forms))}
+                session.add_all(SymbolAlias(alias=alias, symbol_id=row.id) for alias in forms - taken)
+            symbol_id = row.id
+        except IntegrityError:
+            symbol_id = session.query(CanonicalSymbol.id).filter_by(symbol=canonical).scalar()
+            logger.debug(f"Symbol {canonical} was registered concurrently")
+        # Cached by the after_commit hook below, so a rolled-back insert never leaves a dangling id
+        ids = {alias: symbol_id for alias in forms}
+        ids[canonical] = symbol_id
+        session.info.setdefault(_PENDING_IDS, {}).update(ids)
+        return symbol_id
+
+    def _remember(self, session: Session, ids: Dict[str, int]):
+        """
+        Cache looked-up ids. Once this transaction has created symbols, its
+        reads may include those uncommitted rows, so they wait for the commit.
+        """
+        pending = session.info.get(_PENDING_IDS)
+        if pending is not None:
+            pending.update(ids)
+            return
+        with self._lock:
+            self._ids.update(ids)
+
+    def _committed(self, session: Session):
+        ids = session.info.pop(_PENDING_IDS, None)
+        if ids:
+            with self._lock:
+                for alias, symbol_id in ids.items():
+                    self._ids.setdefault(alias, symbol_id)
+
+    @staticmethod
+    def _rolled_back(session: Session, previous_transaction):
+        # A savepoint rollback (a concurrent registration) keeps the outer transaction's ids
+        if previous_transaction.parent is None:
+            session.info.pop(_PENDING_IDS, None)
+
+    def seed_from_tickers(self, session: Session, path: str = None) -> int:
+        """Add every tickers.ts symbol and its aliases; returns how many symbols were new"""
+        tickers = load_ticker_file(path)
+        by_canonical = {}
+        for symbol, name in tickers.items():
+            by_canonical.setdefault(canonical_symbol(symbol), (symbol, name))
+
+        existing = {symbol for (symbol,) in session.query(CanonicalSymbol.symbol)}
+        new_rows = [CanonicalSymbol(symbol=canonical, name=name)
+                    for canonical, (symbol, name) in by_canonical.items() if canonical not in existing]
+        session.add_all(new_rows)
+        session.flush()
+
+        ids = dict(session.query(CanonicalSymbol.symbol, CanonicalSymbol.id))
+        taken = {alias for (alias,) in session.query(SymbolAlias.alias)}
+        aliases = []
+        for canonical, (symbol, _) in by_canonical.items():
+            for alias in alias_forms(canonical) + [symbol.strip().upper()]:
+                if alias not in taken and len(alias) <= _MAX_ALIAS_LENGTH:
+                    taken.add(alias)
+                    aliases.append({'alias': alias, 'symbol_id': ids[canonical]})
+        session.bulk_insert_mappings(SymbolAlias, aliases)
+        session.commit()
+        logger.info(f"🏷️ Seeded {len(new_rows)} canonical symbols and {len(aliases)} aliases from tickers")
+        return len(new_rows)
+
+    def backfill_article_symbols(self, session: Session, batch_size: int = 500) -> int:
+        """Set symbol_id on article_symbols rows that predate it; returns rows updated"""
+        updated = 0
+        last = ''
+        while True:
+            symbols = [symbol for (symbol,) in session.query(ArticleSymbol.symbol).filter(
+                ArticleSymbol.symbol_id.is_(None),
+                ArticleSymbol.symbol > last
+            ).distinct().order_by(ArticleSymbol.symbol).limit(batch_size)]
+            if not symbols:
+                break
+            last = symbols[-1]
+            for symbol, symbol_id in self.resolve(session, symbols, create=True).items():
+                updated += session.query(ArticleSymbol).filter(
+                    ArticleSymbol.symbol == symbol,
+                    ArticleSymbol.symbol_id.is_(None)
+                ).update({ArticleSymbol.symbol_id: symbol_id}, synchronize_session=False)
+            session.commit()
+            logger.info(f"🔗 Linked {updated} article symbols to canonical ids so far")
+        with self._lock:
+            self._links_complete_until = 0.0
+        return updated
+
+    def links_complete(self, session: Session) -> bool:
+        """True once no article_symbols row is missing its canonical id (cached for LINK_CHECK_TTL)"""
+        now = time.monotonic()
+        if now < self._links_complete_until:
+            return True
+        unlinked = session.query(ArticleSymbol.article_id).filter(ArticleSymbol.symbol_id.is_(None)).first()
+        if unlinked is None:
+            with self._lock:
+                self._links_complete_until = now + LINK_CHECK_TTL
+            return True
+        return False
+
+    def article_ids_query(self, session: Session, symbols: List[str]) -> Query:
+        """
+        Article ids mentioning any of ``symbols``. Known symbols match on the
+        canonical id; unknown ones, and rows not yet backfilled, fall back to
+        the raw string.
+        """
+        ids = self.resolve(session, symbols)
+        unresolved = [symbol for symbol in symbols if symbol not in ids]
+        conditions = []
+        if ids:
+            conditions.append(ArticleSymbol.symbol_id.in_(sorted(set(ids.values()))))
+            if not self.links_complete(session):
+                unresolved = list(symbols)
+        if unresolved:
+            conditions.append(ArticleSymbol.symbol.in_(unresolved))
+        return session.query(ArticleSymbol.article_id).filter(or_(*conditions))
+
+    def reset(self):
+        with self._lock:
+            self._ids.clear()
+            self._links_complete_until = 0.0
+
+
+# Global instance
+symbol_registry = SymbolRegistry()
+
+
+@event.listens_for(Session, 'after_commit')
+def _cache_committed_symbols(session):
+    symbol_registry._committed(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_rolled_back_symbols(session, previous_transaction):
+    symbol_registry._rolled_back(session, previous_transaction)
+
+
+def link_article_symbols(session: Session, symbols: Iterable[str]) -> Dict[str, int]:
+    """Canonical ids for an article's symbols at ingest, registering new ones"""
+    symbols = list(symbols)
+    try:
+        return symbol_registry.resolve(session, symbols, create=True)
+    except Exception as e:
+        # Linking is an optimization; the backfill picks these rows up later
+        logger.warning(f"⚠️ Could not resolve canonical symbols for {symbols}: {str(e)}")
+        return {}
@@ -0,0 +1,32 @@
+"""Add news_search_index.region_mask for regional news filtering
+
+Revision ID: add_search_region_mask
+Revises: add_symbol_alias
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_region_mask'
+down_revision = 'add_symbol_alias'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """Precomputed region bitmask plus an index for region + date ordered pages"""
+
+    op.add_column('news_search_index', sa.Column('region_mask', sa.Integer(), nullable=True))
+    op.create_index('idx_search_region_published', 'news_search_index', ['region_mask', 'published_at'])
+
+    print("✅ Added news_search_index.region_mask")
+    print("🔄 Run populate_region_masks.py to classify existing rows (the AI scheduler also backfills in batches)")
+
+def downgrade():
+    """Drop the region bitmask"""
+
+    op.drop_index('idx_search_region_published', 'news_search_index')
+    op.drop_column('news_search_index', 'region_mask')
+
+    print("❌ Removed news_search_index.region_mask")
@@ -0,0 +1,53 @@
+"""Add canonical symbols, symbol aliases and article_symbols.symbol_id
+
+Revision ID: add_symbol_alias
+Revises: 79a10d7ce1c5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_symbol_alias'
+down_revision = '79a10d7ce1c5'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """Canonical symbol tables plus a covering (symbol_id, article_id) index for symbol search"""
+
+    op.create_table('canonical_symbols',
+        sa.Column('id', sa.Integer(), nullable=False, primary_key=True),
+        sa.Column('symbol', sa.String(32), nullable=False, unique=True),
+        sa.Column('name', sa.String(255)),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_table('symbol_alias',
+        sa.Column('alias', sa.String(32), nullable=False, primary_key=True),
+        sa.Column('symbol_id', sa.Integer(),
+                  sa.ForeignKey('canonical_symbols.id', ondelete='CASCADE'), nullable=False),
+    )
+    op.create_index('idx_symbol_alias_lookup', 'symbol_alias', ['alias', 'symbol_id'])
+    op.create_index('idx_symbol_alias_symbol', 'symbol_alias', ['symbol_id'])
+
+    op.add_column('article_symbols', sa.Column('symbol_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('article_symbols_symbol_id_fk', 'article_symbols', 'canonical_symbols',
+                          ['symbol_id'], ['id'])
+    op.create_index('idx_symbol_id_article', 'article_symbols', ['symbol_id', 'article_id'])
+
+    print("✅ Added canonical_symbols, symbol_alias and article_symbols.symbol_id")
+    print("🔄 Run populate_symbol_aliases.py to seed from tickers.ts and link existing article symbols")
+
+def downgrade():
+    """Drop the canonical symbol tables"""
+
+    op.drop_index('idx_symbol_id_article', 'article_symbols')
+    op.drop_constraint('article_symbols_symbol_id_fk', 'article_symbols', type_='foreignkey')
+    op.drop_column('article_symbols', 'symbol_id')
+    op.drop_index('idx_symbol_alias_symbol', 'symbol_alias')
+    op.drop_index('idx_symbol_alias_lookup', 'symbol_alias')
+    op.drop_table('symbol_alias')
+    op.drop_table('canonical_symbols')
+
+    print("❌ Removed canonical symbol tables")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Populate Search Index Region Masks
+Classifies news_search_index rows written before region_mask existed.
+Safe to re-run; only rows with a NULL region_mask are touched.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import NewsSearchIndex
+from app.utils.search.news_regions import REGION_BITS, region_classifier
+import logging
+
+logger = logging.getLogger(__name__)
+
+def main():
+    app = create_app()
+    with app.app_context():
+        classified = region_classifier.backfill(db.session)
+        logger.info(f"🌍 Classified {classified} search index rows")
+
+        for region, bit in REGION_BITS.items():
+            count = NewsSearchIndex.query.filter(NewsSearchIndex.region_mask.op('&')(bit) != 0).count()
+            logger.info(f"📊 {region}: {count} rows")
+        unknown = NewsSearchIndex.query.filter(NewsSearchIndex.region_mask == 0).count()
+        logger.info(f"✅ {unknown} rows with no known region")
+
+if __name__ == "__main__":
+    main()
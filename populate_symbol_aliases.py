@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Populate Canonical Symbols and Aliases
+Seeds canonical_symbols/symbol_alias from tickers.ts and links existing
+article_symbols rows to their canonical id. Safe to re-run.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import ArticleSymbol, CanonicalSymbol, SymbolAlias
+from app.utils.search.symbol_alias import symbol_registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+def main():
+    app = create_app()
+    with app.app_context():
+        created = symbol_registry.seed_from_tickers(db.session)
+        logger.info(f"🏷️ {created} new canonical symbols from tickers.ts")
+
+        linked = symbol_registry.backfill_article_symbols(db.session)
+        logger.info(f"🔗 Linked {linked} existing article symbols")
+
+        unlinked = ArticleSymbol.query.filter(ArticleSymbol.symbol_id.is_(None)).count()
+        logger.info(
+            f"✅ {CanonicalSymbol.query.count()} canonical symbols, {SymbolAlias.query.count()} aliases, "
+            f"{unlinked} article symbols still unlinked"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Analysis Job Worker
+
+Runs queued stock analyses outside the web workers. The Docker image
+starts it alongside gunicorn; elsewhere run it next to the web server
+(ANALYSIS_JOB_BACKEND=redis, the default, for both):
+
+    python run_analysis_worker.py --processes 2
+"""
+
+import sys
+import argparse
+import multiprocessing
+sys.path.insert(0, '.')
+
+from dotenv import load_dotenv
+
+
+def run_worker():
+    """Body of one worker process"""
+    load_dotenv()
+    from app.utils.config.logging_config import configure_logging
+    configure_logging()
+    from app.utils.analyzer.analysis_jobs import AnalysisJobQueue
+    AnalysisJobQueue(backend='redis').run_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run analysis job workers')
+    parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+    args = parser.parse_args()
+
+    print(f"👷 Starting {args.processes} analysis job worker(s)")
+    workers = [
+        multiprocessing.Process(target=run_worker, name=f"analysis-worker-{i + 1}")
+        for i in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("🛑 Stopping analysis job workers")
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control on the expensive analysis routes
+
+Uses a small Flask app and fakeredis, which runs the real semaphore and
+token bucket Lua scripts (it needs lupa for that), so it runs without a
+Redis server.
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+from redis import RedisError
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa', reason="fakeredis needs lupa to run the admission Lua scripts")
+
+from app.utils.performance import admission_control
+from app.utils.performance.admission_control import AdmissionController, admission_controlled, SLOTS_KEY
+from app.utils.cache.redis_pool import CircuitBreaker
+
+
+class FailingRedis:
+    """A Redis that times out on every script call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def eval(self, *args):
+        self.calls += 1
+        raise RedisError("Timeout reading from socket")
+
+
+def make_app(controller, degrade=None):
+    admission_control.admission_controller = controller
+    app = Flask(__name__)
+
+    @app.route('/analyze_json', methods=['POST'])
+    @admission_controlled(degrade=degrade)
+    def analyze_json():
+        return jsonify({'success': True})
+
+    return app
+
+
+def make_controller(max_concurrent=2):
+    controller = AdmissionController(max_concurrent=max_concurrent)
+    controller._redis = fakeredis.FakeRedis(decode_responses=True)
+    controller._breaker = CircuitBreaker()
+    return controller
+
+
+def test_token_bucket_is_weighted_by_lookback():
+    """A 10,000-day analysis spends most of a client's bucket; others are unaffected"""
+    print("🧪 Testing cost-weighted token buckets...")
+    client = make_app(make_controller()).test_client()
+
+    assert client.post('/analyze_json', data={'lookback_days': 10000}).status_code == 200
+    limited = client.post('/analyze_json', data={'lookback_days': 10000})
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) > 1
+    # A cheaper request still fits in what is left
+    assert client.post('/analyze_json', data={'lookback_days': 365}).status_code == 200
+    # Another client has its own bucket
+    other = client.post('/analyze_json', data={'lookback_days': 10000}, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 200
+    print("✅ Cost-weighted token buckets work")
+
+
+def test_overload_sheds_with_retry_after():
+    """With every global slot taken, a request waits out its deadline and gets 503"""
+    print("🧪 Testing load shedding...")
+    controller = make_controller(max_concurrent=1)
+    client = make_app(controller).test_client()
+    saved = admission_control.QUEUE_TIMEOUT
+    admission_control.QUEUE_TIMEOUT = 0.3
+    try:
+        held = controller.acquire_slot()
+        response = client.post('/analyze_json', data={'lookback_days': 365})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(admission_control.SHED_RETRY_AFTER)
+        assert response.get_json()['retry_after'] == admission_control.SHED_RETRY_AFTER
+
+        controller.release_slot(held)
+        assert client.post('/analyze_json', data={'lookback_days': 365}).status_code == 200
+        # Admitted requests give their slot back
+        assert controller._redis.zcard(SLOTS_KEY) == 0
+    finally:
+        admission_control.QUEUE_TIMEOUT = saved
+    stats = controller.get_stats()
+    assert stats['shed'] == 1 and stats['queued'] == 1 and stats['admitted'] == 1
+    print("✅ Load shedding works")
+
+
+def test_overload_degrades_when_possible():
+    """A route with a degraded answer serves it instead of a 503"""
+    print("🧪 Testing degradation...")
+    controller = make_controller(max_concurrent=1)
+    client = make_app(controller, degrade=lambda: (jsonify({'success': True, 'status': 'queued'}), 202)).test_client()
+    saved = admission_control.QUEUE_TIMEOUT
+    admission_control.QUEUE_TIMEOUT = 0.1
+    try:
+        controller.acquire_slot()
+        response = client.post('/analyze_json', data={'lookback_days': 365})
+    finally:
+        admission_control.QUEUE_TIMEOUT = saved
+    assert response.status_code == 202 and response.get_json()['status'] == 'queued'
+    assert controller.get_stats()['degraded'] == 1
+    print("✅ Degradation works")
+
+
+def test_local_limits_without_redis():
+    """With the circuit breaker open, per-process limits still apply"""
+    print("🧪 Testing local fallback...")
+    controller = make_controller()
+    controller._breaker.force_open()
+    client = make_app(controller).test_client()
+    saved = admission_control.QUEUE_TIMEOUT
+    admission_control.QUEUE_TIMEOUT = 0.1
+    try:
+        held = [controller.acquire_slot() for _ in range(controller.local_max_concurrent)]
+        assert held == ['local'] * controller.local_max_concurrent
+        assert client.post('/analyze_json', data={'lookback_days': 365}).status_code == 503
+        for token in held:
+            controller.release_slot(token)
+        assert client.post('/analyze_json', data={'lookback_days': 10000}).status_code == 200
+        assert client.post('/analyze_json', data={'lookback_days': 10000}).status_code == 429
+    finally:
+        admission_control.QUEUE_TIMEOUT = saved
+    assert controller._redis.zcard(SLOTS_KEY) == 0
+    print("✅ Local fallback works")
+
+
+def test_streams_hold_their_slot_until_closed():
+    """A streamed analysis is charged and keeps its slot while the body is sent"""
+    print("🧪 Testing streamed responses...")
+    controller = make_controller(max_concurrent=1)
+    admission_control.admission_controller = controller
+    app = Flask(__name__)
+
+    @app.route('/stream')
+    @admission_controlled()
+    def stream():
+        def generate():
+            for stage in ('prices', 'metrics'):
+                assert controller._redis.zcard(SLOTS_KEY) == 1
+                yield f"event: {stage}\n\n"
+        return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+    client = app.test_client()
+    saved = admission_control.QUEUE_TIMEOUT
+    admission_control.QUEUE_TIMEOUT = 0.1
+    try:
+        response = client.get('/stream?lookback_days=3650', buffered=False)
+        assert response.status_code == 200 and controller._redis.zcard(SLOTS_KEY) == 1
+        assert client.get('/stream').status_code == 503
+        assert b'event: metrics' in b''.join(response.response)
+        response.close()
+        assert controller._redis.zcard(SLOTS_KEY) == 0
+        assert client.get('/stream').status_code == 200
+    finally:
+        admission_control.QUEUE_TIMEOUT = saved
+    # The long lookback was charged to the client's bucket
+    assert controller.take_tokens('ip:127.0.0.1', admission_control.BUCKET_CAPACITY)[0] is False
+    print("✅ Streams hold their slot until closed")
+
+
+def test_expired_leases_free_their_slot():
+    """A slot whose holder died without releasing it is reclaimed once its lease runs out"""
+    print("🧪 Testing lease expiry...")
+    controller = make_controller(max_concurrent=1)
+    held = controller.acquire_slot()
+    assert controller.acquire_slot(timeout=0) is None
+    controller._redis.zadd(SLOTS_KEY, {held: time.time() - 1})
+    assert controller.acquire_slot(timeout=0) is not None
+    assert controller._redis.zscore(SLOTS_KEY, held) is None
+    print("✅ Expired leases are reclaimed")
+
+
+def test_held_leases_are_renewed():
+    """Long analyses keep their slot; released slots are not brought back"""
+    print("🧪 Testing lease renewal...")
+    controller = make_controller()
+    running = controller.acquire_slot()
+    finished = controller.acquire_slot()
+    controller._redis.zadd(SLOTS_KEY, {running: time.time() + 1})
+    controller.release_slot(finished)
+
+    assert controller.renew_leases() == 1
+    assert controller._redis.zscore(SLOTS_KEY, running) > time.time() + admission_control.SLOT_LEASE_SECONDS - 5
+    assert controller._redis.zscore(SLOTS_KEY, finished) is None
+    assert controller._renewer.is_alive()
+    controller.release_slot(running)
+    assert controller.renew_leases() == 0
+    print("✅ Lease renewal works")
+
+
+def test_redis_errors_respect_the_deadline():
+    """Failing Redis calls are retried at the poll interval and give up at the deadline"""
+    print("🧪 Testing Redis errors while queued...")
+    controller = make_controller()
+    controller._redis = FailingRedis()
+    controller._breaker = CircuitBreaker(failure_threshold=1000)
+    started = time.monotonic()
+    assert controller.acquire_slot(timeout=0.5) is None
+    elapsed = time.monotonic() - started
+    assert 0.5 <= elapsed < 1.0, elapsed
+    assert controller._redis.calls <= 0.5 / admission_control.POLL_INTERVAL + 2
+    print("✅ Redis errors respect the deadline")
+
+
+def test_jobs_wait_for_a_slot():
+    """Work run through analysis_slot queues behind the global limit instead of being shed"""
+    print("🧪 Testing analysis jobs under the global limit...")
+    controller = make_controller(max_concurrent=1)
+    admission_control.admission_controller = controller
+    saved = admission_control.QUEUE_TIMEOUT
+    admission_control.QUEUE_TIMEOUT = 0.1
+    held = controller.acquire_slot()
+    reports, ran = [], threading.Event()
+
+    def job():
+        with admission_control.analysis_slot(lambda stage, percent: reports.append(stage)):
+            assert controller._redis.zcard(SLOTS_KEY) == 1
+            ran.set()
+
+    try:
+        worker = threading.Thread(target=job)
+        worker.start()
+        assert not ran.wait(0.35)
+        assert reports and set(reports) == {'waiting for capacity'}
+        controller.release_slot(held)
+        assert ran.wait(2)
+        worker.join()
+    finally:
+        admission_control.QUEUE_TIMEOUT = saved
+    assert controller._redis.zcard(SLOTS_KEY) == 0
+    print("✅ Analysis jobs wait for a slot")
+
+
+if __name__ == "__main__":
+    test_token_bucket_is_weighted_by_lookback()
+    test_overload_sheds_with_retry_after()
+    test_overload_degrades_when_possible()
+    test_local_limits_without_redis()
+    test_streams_hold_their_slot_until_closed()
+    test_expired_leases_free_their_slot()
+    test_held_leases_are_renewed()
+    test_redis_errors_respect_the_deadline()
+    test_jobs_wait_for_a_slot()
+    print("\n🎉 All admission control tests passed!")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for the asynchronous analysis job queue (Redis backend)
+
+Uses an in-memory stand-in for Redis and a fake analysis, so it runs
+without a Redis server or market data.
+"""
+
+import json
+
+from redis import ConnectionError as RedisConnectionError
+
+from app.utils.analyzer import analysis_jobs
+from app.utils.analyzer.analysis_jobs import AnalysisJobQueue, QUEUE_KEY, job_id_for
+from app.utils.cache.redis_pool import CircuitBreaker
+
+
+class QueueRedis:
+    """GET / SET NX / LPUSH / RPOP subset used by the job queue"""
+
+    def __init__(self):
+        self.store = {}
+        self.lists = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def pop(self, key):
+        return self.lists[key].pop()
+
+    def pipeline(self, transaction=True):
+        return QueuePipeline(self)
+
+
+class QueuePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def make_queue():
+    queue = AnalysisJobQueue(backend='redis')
+    queue._redis = QueueRedis()
+    queue._breaker = CircuitBreaker()
+    return queue
+
+
+def fake_analysis(progress_log, fail=False):
+    def execute(params, report):
+        report('technical_analysis', 30)
+        progress_log.append(params['ticker'])
+        if fail:
+            raise ValueError(f"No historical data found for {params['ticker']}")
+        return json.dumps({'data': [], 'layout': {'title': params['ticker']}})
+    return execute
+
+
+def test_identical_submissions_share_a_job():
+    """The same parameters map to one job id and one queue entry"""
+    print("🧪 Testing job deduplication...")
+    queue = make_queue()
+
+    first = queue.submit('aapl', '2024-06-28', 3650, 365)
+    second = queue.submit('AAPL', '2024-06-28', 3650, 365)
+    other = queue.submit('AAPL', '2024-06-28', 365, 365)
+
+    assert first['job_id'] == second['job_id'] == job_id_for('AAPL', '2024-06-28', 3650, 365)
+    assert not first['deduplicated'] and second['deduplicated']
+    assert other['job_id'] != first['job_id']
+    assert queue._redis.llen(QUEUE_KEY) == 2
+    print("✅ Job deduplication works")
+
+
+def test_worker_runs_job_and_stores_result():
+    """A worker picks the job up, reports progress and stores the figure"""
+    print("🧪 Testing job execution...")
+    queue = make_queue()
+    ran = []
+    original = analysis_jobs.execute_analysis_job
+    analysis_jobs.execute_analysis_job = fake_analysis(ran)
+    try:
+        job = queue.submit('MSFT', '2024-06-28', 365, 365)
+        queue.run_redis_job(queue._redis.pop(QUEUE_KEY))
+    finally:
+        analysis_jobs.execute_analysis_job = original
+
+    finished = queue.get_job(job['job_id'])
+    assert ran == ['MSFT']
+    assert finished['status'] == 'done' and finished['progress'] == 100
+    assert json.loads(queue.get_result(job['job_id']))['layout']['title'] == 'MSFT'
+    # Finished jobs are served to later identical submissions
+    assert queue.submit('MSFT', '2024-06-28', 365, 365)['status'] == 'done'
+    print("✅ Job execution works")
+
+
+def test_failed_job_can_be_resubmitted():
+    """Failures are reported and a new submission queues the job again"""
+    print("🧪 Testing failed jobs...")
+    queue = make_queue()
+    original = analysis_jobs.execute_analysis_job
+    analysis_jobs.execute_analysis_job = fake_analysis([], fail=True)
+    try:
+        job = queue.submit('ZZZZ', '2024-06-28', 365, 365)
+        queue.run_redis_job(queue._redis.pop(QUEUE_KEY))
+    finally:
+        analysis_jobs.execute_analysis_job = original
+
+    failed = queue.get_job(job['job_id'])
+    assert failed['status'] == 'failed'
+    assert 'No historical data' in failed['error']
+
+    retried = queue.submit('ZZZZ', '2024-06-28', 365, 365)
+    assert retried['status'] == 'queued' and not retried['deduplicated']
+    assert queue._redis.llen(QUEUE_KEY) == 1
+    assert queue.get_stats()['failed'] == 1
+    print("✅ Failed jobs work")
+
+
+class DownRedis:
+    """Every command fails as with an unreachable server"""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise RedisConnectionError("Error 111 connecting to 127.0.0.1:1. Connection refused.")
+        return fail
+
+
+def test_submit_without_redis():
+    """An unreachable job store makes submit return None instead of raising"""
+    print("🧪 Testing submission without Redis...")
+    queue = make_queue()
+    queue._redis = DownRedis()
+    queue._breaker = CircuitBreaker(failure_threshold=2)
+
+    assert queue.submit('AAPL', '2024-06-28', 365, 365) is None
+    assert queue._breaker.consecutive_failures == 1
+    assert queue.submit('AAPL', '2024-06-28', 365, 365) is None
+    assert queue._breaker.is_open
+    # With the circuit open Redis is not even tried
+    queue._redis = QueueRedis()
+    assert queue.submit('AAPL', '2024-06-28', 365, 365) is None and queue._redis.store == {}
+    assert queue.get_stats()['submitted'] == 0
+    print("✅ Submission without Redis works")
+
+
+class FinishedFuture:
+    def __init__(self, result):
+        self._result = result
+
+    def exception(self):
+        return None
+
+    def result(self):
+        return self._result
+
+
+def test_local_backend_limits():
+    """The local backend refuses multi-worker servers and keeps a bounded set of results"""
+    print("🧪 Testing local backend limits...")
+    original_workers, original_bytes = analysis_jobs.WEB_WORKERS, analysis_jobs.LOCAL_RESULT_MAX_BYTES
+    analysis_jobs.WEB_WORKERS = 4
+    try:
+        AnalysisJobQueue(backend='local')
+        assert False, "local backend must not start with several web workers"
+    except RuntimeError as e:
+        assert 'ANALYSIS_JOB_BACKEND=redis' in str(e)
+
+    analysis_jobs.WEB_WORKERS, analysis_jobs.LOCAL_RESULT_MAX_BYTES = 1, 100
+    try:
+        queue = AnalysisJobQueue(backend='local')
+        queue._local_jobs = {}
+        for job_id in ('a', 'b', 'c'):
+            queue._local_jobs[job_id] = {'job_id': job_id, 'status': 'running', 'updated_at': 0}
+            queue._finish_local(job_id, FinishedFuture('x' * 40))
+        assert queue.get_result('a') is None and queue.get_result('c') == 'x' * 40
+        # A finished job whose figure was evicted is run again rather than served as done
+        assert queue._is_dead(queue.get_job('a')) and not queue._is_dead(queue.get_job('c'))
+    finally:
+        analysis_jobs.WEB_WORKERS, analysis_jobs.LOCAL_RESULT_MAX_BYTES = original_workers, original_bytes
+    print("✅ Local backend limits work")
+
+
+if __name__ == "__main__":
+    test_identical_submissions_share_a_job()
+    test_worker_runs_job_and_stores_result()
+    test_failed_job_can_be_resubmitted()
+    test_submit_without_redis()
+    test_local_backend_limits()
+    print("\n🎉 All analysis job tests passed!")
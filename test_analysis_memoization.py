@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for fingerprint-keyed memoization of analysis results
+
+Uses an in-memory stand-in for the stock cache, so it runs without Redis.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from app.utils.cache.analysis_result_cache import AnalysisResultCache
+
+
+class MemoryStockCache:
+    """Dict-backed stand-in for StockCache's pickled analysis storage"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get_analysis_object(self, ticker, analysis_type, params_hash):
+        return self.store.get((ticker, analysis_type, params_hash))
+
+    def set_analysis_object(self, ticker, analysis_type, params_hash, result, expire=3600):
+        self.store[(ticker, analysis_type, params_hash)] = result
+        return True
+
+    def is_available(self):
+        return True
+
+
+def make_prices(days=300):
+    index = pd.date_range('2024-01-01', periods=days, freq='B')
+    close = np.linspace(100, 150, days)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000}, index=index)
+
+
+def make_memo():
+    memo = AnalysisResultCache()
+    memo.cache = MemoryStockCache()
+    return memo
+
+
+def test_fingerprint_tracks_inputs():
+    """Same data and parameters share a fingerprint; a new bar or parameter changes it"""
+    print("🧪 Testing analysis fingerprints...")
+    memo = make_memo()
+    prices = make_prices()
+    base = memo.fingerprint('legacy', 'AAPL', '2024-12-31', 365, 180, prices)
+
+    assert memo.fingerprint('legacy', 'aapl', '2024-12-31', 365, 180, prices.copy()) == base
+    assert memo.fingerprint('legacy', 'AAPL', '2024-12-31', 730, 180, prices) != base
+    assert memo.fingerprint('full', 'AAPL', '2024-12-31', 365, 180, prices) != base
+
+    new_bar = make_prices(301)
+    assert memo.fingerprint('legacy', 'AAPL', '2024-12-31', 365, 180, new_bar) != base
+
+    revised = prices.copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] += 0.5
+    assert memo.fingerprint('legacy', 'AAPL', '2024-12-31', 365, 180, revised) != base
+    print("✅ Fingerprints work")
+
+
+def test_outputs_and_figure_cached_separately():
+    """Outputs and figure JSON are stored under separate keys with hit rates"""
+    print("🧪 Testing memoized outputs and figures...")
+    memo = make_memo()
+    fingerprint = memo.fingerprint('legacy', 'AAPL', '2024-12-31', 365, 180, make_prices())
+
+    assert memo.get_figure('AAPL', fingerprint) is None
+    assert memo.get_analysis('AAPL', fingerprint) is None
+
+    memo.set_analysis('AAPL', fingerprint, {'signal_returns': [{'Signal': 'Buy'}]})
+    assert memo.get_analysis('AAPL', fingerprint) == {'signal_returns': [{'Signal': 'Buy'}]}
+    assert memo.get_figure('AAPL', fingerprint) is None
+
+    figure = go.Figure(go.Scatter(x=[1, 2, 3], y=[4, 5, 6], name='Price'))
+    assert memo.set_figure('AAPL', fingerprint, figure)
+    restored = memo.get_figure('AAPL', fingerprint)
+    assert list(restored.data[0].y) == [4, 5, 6]
+
+    stats = memo.get_stats()
+    assert stats['analysis_hits'] == 1 and stats['analysis_misses'] == 1
+    assert stats['figure_hits'] == 1 and stats['figure_misses'] == 2
+    assert stats['analysis_hit_rate'] == 0.5
+    print("✅ Memoized outputs and figures work")
+
+
+def test_code_version_changes_keys():
+    """A different code version never reads entries written by the old one"""
+    print("🧪 Testing code version invalidation...")
+    memo = make_memo()
+    fingerprint = memo.fingerprint('legacy', 'AAPL', '2024-12-31', 365, 180, make_prices())
+    memo.set_analysis('AAPL', fingerprint, {'value': 1})
+
+    memo.analysis_version = 'changed'
+    assert memo.get_analysis('AAPL', fingerprint) is None
+    print("✅ Code version invalidation works")
+
+
+if __name__ == "__main__":
+    test_fingerprint_tracks_inputs()
+    test_outputs_and_figure_cached_separately()
+    test_code_version_changes_keys()
+    print("\n🎉 All analysis memoization tests passed!")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for pipelined multi-key cache reads and writes
+
+Uses a small in-memory stand-in for the Redis client that counts round trips,
+so it runs without a Redis server.
+"""
+
+import json
+
+from app.utils.cache.news_cache import NewsCache
+from app.utils.cache.redis_pool import CircuitBreaker
+from app.utils.cache.local_cache import local_cache
+
+
+class CountingRedis:
+    """Minimal Redis stand-in that records every network round trip"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    def get(self, key):
+        self.round_trips += 1
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.round_trips += 1
+        self.store[key] = value
+        self.ttls[key] = ex
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    def publish(self, channel, message):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return CountingPipeline(self)
+
+
+class CountingPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    def execute(self):
+        self.client.round_trips += 1
+        for key, ttl, value in self.commands:
+            self.client.store[key] = value
+            self.client.ttls[key] = ttl
+
+
+def make_cache():
+    cache = NewsCache()
+    cache.redis = CountingRedis()
+    cache._breaker = CircuitBreaker()
+    cache.use_local_tier = False
+    local_cache.clear()
+    return cache
+
+
+def test_get_many_single_round_trip():
+    """N lookups cost one MGET"""
+    print("🧪 Testing get_many...")
+    cache = make_cache()
+    for i in range(10):
+        cache.redis.store[f"company:basic_info:T{i}"] = json.dumps({'longName': f"Company {i}"})
+
+    keys = [f"company:basic_info:T{i}" for i in range(12)]
+    results = cache.get_many(keys)
+
+    assert cache.redis.round_trips == 1
+    assert len(results) == 10
+    assert results["company:basic_info:T3"] == {'longName': 'Company 3'}
+    assert "company:basic_info:T11" not in results
+    print("✅ get_many uses one round trip")
+
+
+def test_set_many_per_key_ttl():
+    """set_many pipelines SETEX with per-key TTLs"""
+    print("🧪 Testing set_many...")
+    cache = make_cache()
+    ok = cache.set_many(
+        {'a': {'v': 1}, 'b': {'v': 2}, 'c': [1, 2, 3]},
+        expire={'a': 60, 'b': 300}
+    )
+
+    assert ok
+    assert cache.redis.round_trips == 1
+    assert cache.redis.ttls == {'a': 60, 'b': 300, 'c': 3600}
+    assert json.loads(cache.redis.store['c']) == [1, 2, 3]
+    print("✅ set_many pipelines writes with per-key TTLs")
+
+
+def test_batched_writes():
+    """set_json calls inside batched_writes are flushed together"""
+    print("🧪 Testing batched_writes...")
+    cache = make_cache()
+    other = NewsCache()  # Separate instance in the same thread is buffered too
+
+    with cache.batched_writes():
+        for i in range(5):
+            other.set_json(f"search:{i}", {'page': i}, expire=120)
+        # Buffered values are visible to reads inside the block
+        assert other.get_json("search:2") == {'page': 2}
+        assert cache.redis.round_trips == 0
+
+    assert cache.redis.round_trips == 1
+    assert len(cache.redis.store) == 5
+    assert set(cache.redis.ttls.values()) == {120}
+    print("✅ batched_writes flushes with one pipeline")
+
+
+if __name__ == "__main__":
+    test_get_many_single_round_trip()
+    test_set_many_per_key_ttl()
+    test_batched_writes()
+    print("\n🎉 All batch cache tests passed!")
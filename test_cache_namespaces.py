@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for generation-counter namespaced cache invalidation
+
+Uses a small in-memory stand-in for the Redis client, so it runs without a
+Redis server.
+"""
+
+import json
+
+from app.utils.cache.news_cache import NewsCache, NAMESPACE_SEARCH, NAMESPACE_NEWS_FEED
+from app.utils.cache.redis_pool import CircuitBreaker
+from app.utils.cache.local_cache import local_cache
+
+
+class NamespaceRedis:
+    """Minimal Redis stand-in covering the commands used by namespaced keys"""
+
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        return True
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def publish(self, channel, message):
+        self.published.append(json.loads(message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        return NamespacePipeline(self)
+
+
+class NamespacePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append(('set', args, kwargs))
+
+    def incr(self, *args):
+        self.commands.append(('incr', args, {}))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def make_cache(use_local_tier=False):
+    cache = NewsCache()
+    cache.redis = NamespaceRedis()
+    cache._breaker = CircuitBreaker()
+    cache.use_local_tier = use_local_tier
+    cache._on_redis_success = lambda: None
+    local_cache.clear()
+    return cache
+
+
+def test_namespace_key_embeds_generation():
+    """Keys embed the namespace generation, seeded from the clock"""
+    print("🧪 Testing namespaced keys...")
+    cache = make_cache()
+    key = cache.namespace_key(NAMESPACE_SEARCH, "standalone_search:AAPL")
+    generation = cache.get_generation(NAMESPACE_SEARCH)
+
+    assert generation > 1_000_000_000
+    assert key == f"ns:search:{generation}:standalone_search:AAPL"
+    # Stable until bumped
+    assert cache.namespace_key(NAMESPACE_SEARCH, "standalone_search:AAPL") == key
+    print("✅ Namespaced keys work")
+
+
+def test_bump_invalidates_only_its_namespace():
+    """One INCR moves the namespace to fresh keys; other namespaces are untouched"""
+    print("🧪 Testing namespace bump...")
+    cache = make_cache()
+    search_key = cache.namespace_key(NAMESPACE_SEARCH, "q")
+    feed_key = cache.namespace_key(NAMESPACE_NEWS_FEED, "recent")
+
+    generations = cache.bump_namespace(NAMESPACE_SEARCH)
+
+    assert generations[NAMESPACE_SEARCH] == cache.get_generation(NAMESPACE_SEARCH)
+    assert cache.namespace_key(NAMESPACE_SEARCH, "q") != search_key
+    assert cache.namespace_key(NAMESPACE_NEWS_FEED, "recent") == feed_key
+    print("✅ Namespace bump works")
+
+
+def test_bump_evicts_local_generation():
+    """Workers cache generations locally; a bump evicts and broadcasts them"""
+    print("🧪 Testing local generation eviction...")
+    cache = make_cache(use_local_tier=True)
+    old_key = cache.namespace_key(NAMESPACE_SEARCH, "q")
+
+    cache.bump_namespace(NAMESPACE_SEARCH)
+
+    assert cache.namespace_key(NAMESPACE_SEARCH, "q") != old_key
+    assert cache.redis.published[-1]['keys'] == [cache.generation_key(NAMESPACE_SEARCH)]
+    print("✅ Local generation eviction works")
+
+
+def test_unavailable_redis_is_harmless():
+    """Without Redis bumps are no-ops and keys fall back to generation 0"""
+    print("🧪 Testing behaviour without Redis...")
+    cache = make_cache()
+    cache._breaker.force_open()
+
+    assert cache.bump_namespace(NAMESPACE_SEARCH) == {}
+    assert cache.namespace_key(NAMESPACE_SEARCH, "q") == "ns:search:0:q"
+    print("✅ Unavailable Redis handled")
+
+
+if __name__ == "__main__":
+    test_namespace_key_embeds_generation()
+    test_bump_invalidates_only_its_namespace()
+    test_bump_evicts_local_generation()
+    test_unavailable_redis_is_harmless()
+    print("\n🎉 All cache namespace tests passed!")
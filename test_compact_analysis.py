@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact (float32, columnar) analyze_stock_data mode
+
+The peak-memory test traces allocations during one long analysis, so memory
+already held by the test process does not count.
+"""
+
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.utils.analysis.analysis_service import AnalysisService
+
+# A 10,000-day lookback plus a 365-day crossover window is about 7,100 trading days
+LONG_HISTORY_ROWS = 7100
+PEAK_MEMORY_LIMIT_MB = 4
+
+
+def make_prices(rows, seed=0):
+    index = pd.bdate_range(end='2024-12-31', periods=rows)
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, rows)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                         'Close': close, 'Volume': 1000}, index=index)
+
+
+def test_compact_mode_matches_full_analysis():
+    """The compact columns agree with the per-day DataFrame implementation"""
+    print("🧪 Testing compact mode results...")
+    data = make_prices(600)
+    full = AnalysisService.analyze_stock_data(data, 365, compact=False)
+    compact = AnalysisService.analyze_stock_data(data, 365, compact=True)
+
+    assert (full['Date'].values == compact['Date'].values).all()
+    assert list(compact.columns) == ['Date', 'Close', 'Price', 'Retracement_Ratio_Pct', 'Price_Position_Pct', 'R2_Pct']
+    for column in ('Retracement_Ratio_Pct', 'Price_Position_Pct', 'R2_Pct'):
+        assert compact[column].dtype == np.float32
+        np.testing.assert_allclose(compact[column], full[column].astype(float), atol=1e-3)
+    np.testing.assert_array_equal(compact['Price'], full['Price'])
+    print("✅ Compact mode results work")
+
+
+def test_long_histories_use_compact_mode():
+    """Long histories switch to compact mode without the caller asking"""
+    print("🧪 Testing automatic compact mode...")
+    analysis = AnalysisService.analyze_stock_data(make_prices(LONG_HISTORY_ROWS), 365)
+    assert analysis['R2_Pct'].dtype == np.float32
+    assert 'Volume' not in analysis.columns
+    assert len(analysis) > LONG_HISTORY_ROWS - 30
+    print("✅ Automatic compact mode works")
+
+
+def test_peak_memory_of_long_analysis_is_bounded():
+    """A 10,000-day analysis allocates less than the limit at its peak"""
+    print("🧪 Testing peak memory...")
+    data = make_prices(LONG_HISTORY_ROWS)
+    AnalysisService.analyze_stock_data(make_prices(100), 365)  # warm up lazy imports
+
+    # NumPy and pandas buffers are traced, so this is the analysis' own peak
+    tracemalloc.start()
+    try:
+        AnalysisService.analyze_stock_data(data, 365)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    peak_mb = peak / 1024 / 1024
+    print(f"   Peak allocation: {peak_mb:.1f} MB")
+    assert peak_mb < PEAK_MEMORY_LIMIT_MB, f"peak allocation was {peak_mb:.1f} MB"
+    print("✅ Peak memory works")
+
+
+if __name__ == "__main__":
+    test_compact_mode_matches_full_analysis()
+    test_long_histories_use_compact_mode()
+    test_peak_memory_of_long_analysis_is_bounded()
+    print("\n🎉 All compact analysis tests passed!")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for deriving weekly and monthly dashboard bars from daily data
+
+yfinance and the Redis-backed cache are replaced by stubs, so it runs
+offline.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.stock import optimized_dashboard
+from app.stock.optimized_dashboard import aggregate_bars, analyze_stock_multi_period_cached
+
+
+def make_daily(start='2024-01-02', days=600, tz='America/New_York', weekmask='Mon Tue Wed Thu Fri'):
+    index = pd.bdate_range(start=start, periods=days, freq='C', weekmask=weekmask, tz=tz, name='Date')
+    close = 100 + np.cumsum(np.sin(np.arange(days)))
+    return pd.DataFrame({
+        'Open': close - 0.5, 'High': close + 2, 'Low': close - 2, 'Close': close,
+        'Volume': np.full(days, 1000, dtype=np.int64),
+        'Dividends': np.where(np.arange(days) == 10, 0.25, 0.0),
+        'Stock Splits': np.where(np.arange(days) == 20, 4.0, 0.0),
+    }, index=index)
+
+
+def test_weekly_bars_have_ohlcv_semantics():
+    """Open is the first open, High/Low the extremes, Close the last close, Volume the sum"""
+    print("🧪 Testing weekly bars...")
+    daily = make_daily()
+    weekly = aggregate_bars(daily, 'W-SUN')
+
+    first_week = daily.loc['2024-01-02':'2024-01-05']
+    bar = weekly.iloc[0]
+    assert weekly.index[0] == pd.Timestamp('2024-01-01', tz='America/New_York')
+    assert bar['Open'] == first_week['Open'].iloc[0]
+    assert bar['High'] == first_week['High'].max()
+    assert bar['Low'] == first_week['Low'].min()
+    assert bar['Close'] == first_week['Close'].iloc[-1]
+    assert bar['Volume'] == 4000
+    assert all(label.dayofweek == 0 for label in weekly.index)
+    assert weekly['Volume'].sum() == daily['Volume'].sum()
+    assert weekly['Dividends'].sum() == 0.25
+    assert sorted(weekly['Stock Splits'].unique()) == [0.0, 4.0]
+    print("✅ Weekly bars work")
+
+
+def test_monthly_bars_and_cached_mixed_offsets():
+    """Monthly bars follow the exchange calendar, also for cached frames with mixed UTC offsets"""
+    print("🧪 Testing monthly bars...")
+    daily = make_daily()
+    monthly = aggregate_bars(daily, 'M')
+    assert monthly.index[0] == pd.Timestamp('2024-01-01', tz='America/New_York')
+    assert monthly.loc['2024-03', 'Close'].iloc[0] == daily.loc['2024-03', 'Close'].iloc[-1]
+
+    # The yfinance cache rebuilds the index from strings spanning DST changes
+    cached = daily.copy()
+    cached.index = pd.Index([pd.Timestamp(str(ts)).to_pydatetime() for ts in daily.index], dtype=object)
+    pd.testing.assert_frame_equal(aggregate_bars(cached, 'M').reset_index(drop=True),
+                                  monthly.reset_index(drop=True))
+    print("✅ Monthly bars work")
+
+
+def test_sunday_week_exchanges():
+    """Sunday-to-Thursday exchanges keep a trading week in one bar"""
+    print("🧪 Testing exchange week boundaries...")
+    daily = make_daily(start='2024-01-07', days=40, tz='Asia/Riyadh', weekmask='Sun Mon Tue Wed Thu')
+    weekly = aggregate_bars(daily, optimized_dashboard._week_frequency('2222.SR'))
+    assert all(label.dayofweek == 6 for label in weekly.index)
+    assert (weekly['Volume'] == 5000).all()
+    assert optimized_dashboard._week_frequency('AAPL') == 'W-SUN'
+    print("✅ Exchange week boundaries work")
+
+
+class StubCache:
+    def __init__(self):
+        self.stored = {}
+
+    def get_multi_period_analysis(self, ticker, period):
+        return None
+
+    def set_multi_period_analysis(self, ticker, period, daily, weekly, monthly):
+        self.stored['multi'] = (daily, weekly, monthly)
+
+    def get_yfinance_data(self, ticker, period, interval):
+        return None
+
+    def set_yfinance_data(self, ticker, period, interval, data):
+        self.stored[interval] = data
+
+    def track_analysis_performance(self, *args, **kwargs):
+        pass
+
+
+class StubTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period, interval='1d'):
+        StubTicker.calls.append(interval)
+        return make_daily()
+
+
+def test_one_fetch_feeds_all_periods():
+    """Only daily data is downloaded; indicators run on all three periods"""
+    print("🧪 Testing single fetch...")
+    saved = (optimized_dashboard.enhanced_stock_cache, optimized_dashboard.yf.Ticker)
+    cache = StubCache()
+    optimized_dashboard.enhanced_stock_cache = cache
+    optimized_dashboard.yf.Ticker = StubTicker
+    try:
+        daily, weekly, monthly = analyze_stock_multi_period_cached('AAPL', '2y')
+    finally:
+        optimized_dashboard.enhanced_stock_cache, optimized_dashboard.yf.Ticker = saved
+
+    assert StubTicker.calls == ['1d']
+    assert set(cache.stored) == {'1d', 'multi'}
+    assert 'MA_200' in daily and 'MA_200' not in weekly
+    # Weekly volatility is annualized with 52 periods even when there are more than 52 bars
+    expected = weekly['Return'].rolling(window=4).std() * np.sqrt(52)
+    pd.testing.assert_series_equal(weekly['Volatility'], expected, check_names=False)
+    assert monthly['Close'].iloc[-1] == weekly['Close'].iloc[-1] == daily['Close'].iloc[-1]
+    print("✅ Single fetch works")
+
+
+if __name__ == "__main__":
+    test_weekly_bars_have_ohlcv_semantics()
+    test_monthly_bars_and_cached_mixed_offsets()
+    test_sunday_week_exchanges()
+    test_one_fetch_feeds_all_periods()
+    print("\n🎉 All dashboard aggregation tests passed!")
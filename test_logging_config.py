@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for queued JSON logging and rate-limited hot-path loggers
+
+The pipeline tests log to a temporary file and restore the normal
+configuration afterwards.
+"""
+
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+
+from app.utils.config import logging_config
+from app.utils.config.logging_config import (
+    JsonFormatter, RateLimitFilter, configure_logging, get_hot_logger, logging_stats, parse_module_levels,
+    _DroppingQueueHandler, _TimedQueueListener
+)
+
+
+class SlowHandler(logging.Handler):
+    """A sink that takes 5 ms per record, like a slow disk or pipe"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(0.005)
+        self.messages.append(self.format(record))
+
+
+def test_logging_does_not_wait_for_the_sink():
+    """Callers only enqueue; the listener thread formats and writes"""
+    print("🧪 Testing queued logging...")
+    records = queue.Queue()
+    sink = SlowHandler()
+    sink.setFormatter(JsonFormatter())
+    listener = _TimedQueueListener(records, sink)
+    logger = logging.getLogger('test.queued')
+    logger.propagate = False
+    handler = _DroppingQueueHandler(records)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        start = time.perf_counter()
+        for i in range(100):
+            logger.warning("processed %s", i)
+        elapsed = time.perf_counter() - start
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    # 100 records at 5 ms each would take 0.5 s inline
+    assert elapsed < 0.1, f"logging took {elapsed:.3f}s"
+    assert len(sink.messages) == 100
+    assert json.loads(sink.messages[-1])['message'] == 'processed 99'
+    print("✅ Queued logging works")
+
+
+def test_full_queue_drops_instead_of_blocking():
+    print("🧪 Testing dropping on a full queue...")
+    logging_stats.reset()
+    logger = logging.getLogger('test.dropping')
+    logger.propagate = False
+    handler = _DroppingQueueHandler(queue.Queue(3))
+    logger.addHandler(handler)
+    try:
+        for i in range(10):
+            logger.warning("record %s", i)
+    finally:
+        logger.removeHandler(handler)
+    stats = logging_stats.get_stats()
+    assert stats['records'] == {'WARNING': 3} and stats['dropped'] == 7
+    print("✅ Dropping on a full queue works")
+
+
+def test_json_output_with_levels_and_extra():
+    """configure_logging writes JSON lines, honours per-module levels and keeps extra fields"""
+    print("🧪 Testing JSON pipeline...")
+    path = os.path.join(tempfile.mkdtemp(), 'app.log')
+    try:
+        configure_logging(level='INFO', module_levels='test.quiet=ERROR', fmt='json', log_file=path, force=True)
+        logging.getLogger('test.loud').info("hello %s", 'world', extra={'ticker': 'AAPL'})
+        logging.getLogger('test.quiet').warning("filtered out")
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logging.getLogger('test.loud').exception("failed")
+        logging_config._pipeline.stop()
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        assert [line['message'] for line in lines] == ['hello world', 'failed']
+        assert lines[0]['ticker'] == 'AAPL' and lines[0]['level'] == 'INFO' and lines[0]['logger'] == 'test.loud'
+        assert 'ValueError: boom' in lines[1]['exc']
+    finally:
+        configure_logging(force=True)
+    assert parse_module_levels('a=debug, b.c=WARNING') == {'a': 'DEBUG', 'b.c': 'WARNING'}
+    print("✅ JSON pipeline works")
+
+
+def test_hot_logger_rate_limits_per_call_site():
+    """A loop logs its first few records; the rest are counted and reported later"""
+    print("🧪 Testing hot-path rate limiting...")
+    logging_stats.reset()
+    captured = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            captured.append(record.getMessage())
+
+    hot = get_hot_logger('test.loop', interval=0.2, burst=3)
+    assert get_hot_logger('test.loop') is hot and len(hot.filters) == 1
+    hot.propagate = False
+    hot.addHandler(Capture())
+    hot.setLevel(logging.INFO)
+
+    def log_article(i):
+        hot.warning(f"Skipping article {i}")
+
+    for i in range(50):
+        log_article(i)
+    assert captured == ['Skipping article 0', 'Skipping article 1', 'Skipping article 2']
+    assert logging_stats.get_stats()['suppressed'] == 47
+
+    time.sleep(0.25)
+    log_article(50)
+    assert captured[-1] == 'Skipping article 50 (suppressed 47 similar messages)'
+    print("✅ Hot-path rate limiting works")
+
+
+if __name__ == "__main__":
+    test_logging_does_not_wait_for_the_sink()
+    test_full_queue_drops_instead_of_blocking()
+    test_json_output_with_levels_and_extra()
+    test_hot_logger_rate_limits_per_call_site()
+    print("\n🎉 All logging tests passed!")
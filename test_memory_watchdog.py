@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the allocation sampler and the RSS watchdog
+
+The watchdog gets a scripted RSS reader and a recycle callback, so no
+process is signalled.
+"""
+
+import threading
+import time
+
+from app.utils.performance.memory_watchdog import AllocationSampler, MemoryWatchdog, current_rss_bytes
+
+_leak = []
+
+
+def leaky_cache_fill(rows):
+    _leak.extend(bytearray(1024) for _ in range(rows))
+
+
+def test_sampler_finds_growing_call_site():
+    """The call site whose allocations grew between snapshots comes first"""
+    print("🧪 Testing allocation sampler...")
+    sampler = AllocationSampler(frames=5)
+    sampler.start(periodic=False)
+    try:
+        leaky_cache_fill(2000)
+        sampler.snapshot()
+        top = sampler.top_allocators(limit=3)
+        assert top and 'test_memory_watchdog.py' in top[0]['site']
+        assert top[0]['size_diff_kb'] >= 2000
+        assert any('leaky_cache_fill' in line for line in top[0]['traceback'])
+        assert sampler.get_stats()['tracing']
+    finally:
+        sampler.stop()
+        _leak.clear()
+    assert not sampler.tracing and sampler.top_allocators() == []
+    print("✅ Allocation sampler works")
+
+
+def test_watchdog_needs_consecutive_readings():
+    """A single spike does not recycle; sustained excess does"""
+    print("🧪 Testing watchdog thresholds...")
+    readings = iter([900, 1200, 900, 1200, 1200, 1200])
+    watchdog = MemoryWatchdog(max_rss_mb=1000, over_limit_checks=3,
+                              rss_reader=lambda: next(readings) * 1024 * 1024, recycle=lambda: None)
+    decisions = [watchdog.check() for _ in range(6)]
+    assert decisions == [False, False, False, False, False, True]
+    assert watchdog.get_stats()['peak_rss_mb'] == 1200
+    print("✅ Watchdog thresholds work")
+
+
+def test_watchdog_recycles_after_in_flight_requests():
+    """Recycling waits until the in-flight request has finished"""
+    print("🧪 Testing graceful recycling...")
+    recycled_at = []
+    watchdog = MemoryWatchdog(max_rss_mb=1, over_limit_checks=1, drain_timeout=5,
+                              rss_reader=lambda: 2 * 1024 * 1024,
+                              recycle=lambda: recycled_at.append(time.monotonic()))
+    watchdog.request_started()
+    assert watchdog.check()
+
+    recycler = threading.Thread(target=watchdog.drain_and_recycle)
+    recycler.start()
+    time.sleep(0.2)
+    assert recycled_at == [] and watchdog.get_stats()['draining']
+
+    finished_at = time.monotonic()
+    watchdog.request_finished()
+    recycler.join(timeout=2)
+    assert len(recycled_at) == 1 and recycled_at[0] >= finished_at
+    assert watchdog.get_stats()['recycles'] == 1
+    # Already draining: later readings do not trigger a second recycle
+    assert not watchdog.check()
+    print("✅ Graceful recycling works")
+
+
+def test_rss_reader():
+    print("🧪 Testing RSS reader...")
+    rss = current_rss_bytes()
+    assert rss is None or rss > 10 * 1024 * 1024
+    print("✅ RSS reader works")
+
+
+if __name__ == "__main__":
+    test_sampler_finds_growing_call_site()
+    test_watchdog_needs_consecutive_readings()
+    test_watchdog_recycles_after_in_flight_requests()
+    test_rss_reader()
+    print("\n🎉 All memory watchdog tests passed!")
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Test script for materialized Redis news feeds
+
+Uses an in-memory SQLite database and a small in-memory stand-in for the
+sorted-set and hash commands, so it runs without a Redis server.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from app import db
+from app.models import ArticleSymbol, NewsArticle, NewsSearchIndex
+from app.utils.cache.redis_pool import CircuitBreaker
+from app.utils.search import news_feeds as feeds_module
+from app.utils.search.news_feeds import (
+    GLOBAL_FEED, feed_entries, feed_entry, news_feeds, region_feed, symbol_feed
+)
+from app.utils.search.news_regions import region_classifier
+from app.utils.search.search_index_sync import SearchIndexSyncService
+
+# Feeds only hold the last CARD_RETENTION_DAYS, so articles are dated from the real clock
+NOW = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+class FeedRedis:
+    """Minimal Redis stand-in covering the commands used by the feed store
+
+    Expiries are applied against ``clock``, which tests can move forward.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.hashes = {}
+        self.zsets = {}
+        self.deadlines = {}
+        self.offset = 0
+        self.commands = 0
+
+    def clock(self):
+        return time.time() + self.offset
+
+    def _expire_keys(self):
+        for key, deadline in list(self.deadlines.items()):
+            if deadline <= self.clock():
+                self._drop(key)
+
+    def _drop(self, key):
+        self.deadlines.pop(key, None)
+        return sum(1 for store in (self.strings, self.hashes, self.zsets) if store.pop(key, None) is not None)
+
+    def set(self, key, value, ex=None, nx=False):
+        self._expire_keys()
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value)
+        self.deadlines.pop(key, None)
+        if ex:
+            self.expire(key, ex)
+        return True
+
+    def delete(self, *keys):
+        self._expire_keys()
+        return sum(self._drop(key) for key in keys)
+
+    def unlink(self, *keys):
+        return self.delete(*keys)
+
+    def scan_iter(self, match=None, count=None):
+        self._expire_keys()
+        prefix = (match or '*').rstrip('*')
+        keys = set(self.strings) | set(self.hashes) | set(self.zsets)
+        return iter([key for key in keys if key.startswith(prefix)])
+
+    def exists(self, key):
+        return int(key in self.strings or key in self.hashes or key in self.zsets)
+
+    def expire(self, key, seconds):
+        if not self.exists(key):
+            return False
+        if seconds <= 0:
+            self._drop(key)
+        else:
+            self.deadlines[key] = self.clock() + seconds
+        return True
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+        return 1
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        return sum(1 for field in fields if self.hashes.get(key, {}).pop(field, None) is not None)
+
+    def hincrby(self, key, field, amount=1):
+        value = int(self.hashes.get(key, {}).get(field, 0)) + amount
+        self.hset(key, field, value)
+        return value
+
+    def zadd(self, key, mapping):
+        zset = self.zsets.setdefault(key, {})
+        added = sum(1 for member in mapping if member not in zset)
+        zset.update(mapping)
+        return added
+
+    def zrem(self, key, *members):
+        return sum(1 for member in members if self.zsets.get(key, {}).pop(member, None) is not None)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zcount(self, key, min, max):
+        return sum(1 for score in self.zsets.get(key, {}).values() if score >= float(min))
+
+    def zremrangebyscore(self, key, min, max):
+        exclusive = str(max).startswith('(')
+        high = float(str(max).lstrip('('))
+        doomed = [member for member, score in self.zsets.get(key, {}).items()
+                  if score < high or (score == high and not exclusive)]
+        for member in doomed:
+            del self.zsets[key][member]
+        return len(doomed)
+
+    def _descending(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def zremrangebyrank(self, key, start, end):
+        ascending = list(reversed(self._descending(key)))
+        end = len(ascending) + end if end < 0 else end
+        doomed = ascending[start:end + 1]
+        for member, _ in doomed:
+            del self.zsets[key][member]
+        return len(doomed)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        return self._descending(key)[start:end + 1]
+
+    def zrevrangebyscore(self, key, max, min, start=0, num=None, withscores=False):
+        entries = [(member, score) for member, score in self._descending(key) if score >= min]
+        return entries[start:start + num]
+
+    def pipeline(self, transaction=True):
+        return FeedPipeline(self)
+
+
+class FeedPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        self.client.commands += 1
+        self.client._expire_keys()
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@contextmanager
+def feed_database(articles=12):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from sqlalchemy.pool import StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                               'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    region_classifier.reset()
+    original = news_feeds._redis, news_feeds._breaker
+    news_feeds._redis, news_feeds._breaker = FeedRedis(), CircuitBreaker()
+    with app.app_context():
+        db.create_all()
+        for i in range(1, articles + 1):
+            add_article(db.session, i, ['NASDAQ:AAPL', f'SYM{i}'] if i % 2 else ['HKEX:700'])
+        db.session.commit()
+        db.session.add_all(NewsSearchIndex.create_from_article(article) for article in NewsArticle.query)
+        db.session.commit()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+            news_feeds._redis, news_feeds._breaker = original
+            region_classifier.reset()
+
+
+def add_article(session, article_id, symbols, hours_ago=None):
+    article = NewsArticle(
+        id=article_id, external_id=f'ext-{article_id}', title=f'Article {article_id}',
+        url=f'https://example.com/{article_id}', source='Reuters',
+        published_at=NOW - timedelta(hours=article_id if hours_ago is None else hours_ago),
+        ai_summary=f'Summary {article_id}', ai_insights='Insights', ai_sentiment_rating=3,
+    )
+    article.symbols = [ArticleSymbol(symbol=symbol) for symbol in symbols]
+    session.add(article)
+    return article
+
+
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def feeds_disabled():
+    """Run with the feed store unavailable, so searches take the SQL path"""
+    breaker = news_feeds._breaker
+    news_feeds._breaker = CircuitBreaker()
+    news_feeds._breaker.force_open()
+    try:
+        yield
+    finally:
+        news_feeds._breaker = breaker
+
+
+def test_feed_entries():
+    print("🧪 Testing feed membership...")
+    row = NewsSearchIndex(id=7, external_id='ext-7', title='T', published_at=NOW, source='Reuters',
+                          ai_summary='S', ai_insights='I', symbols_json=json.dumps(['AAPL', 'HKEX:700', 'AAPL']),
+                          region_mask=0b11)
+    entry = feed_entry(row)
+    assert entry.member == '7'
+    assert entry.feeds == [GLOBAL_FEED, 'symbol:AAPL', 'symbol:HKEX:700', 'region:US', 'region:HK']
+    assert entry.card == row.to_dict()
+
+    row.ai_insights = ''
+    assert feed_entry(row) is None and feed_entries([row]) == []
+    assert symbol_feed(' aapl ') == 'symbol:AAPL' and region_feed('hk') == 'region:HK'
+    print("✅ Feed membership works")
+
+
+def test_feed_pages_match_sql():
+    """Feed pages carry the same cards and totals as the SQL search they replace"""
+    print("🧪 Testing feed pages against SQL...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with feed_database() as database:
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+        cases = [
+            {'symbols': None}, {'symbols': ['NASDAQ:AAPL']}, {'symbols': ['SYM3']},
+            {'symbols': None, 'region_filter': 'HK'}, {'symbols': ['HKEX:700'], 'region_filter': 'OTHER'},
+        ]
+        for params in cases:
+            for page in (1, 2, 3):
+                with feeds_disabled():
+                    expected = search.search_by_symbols(page=page, per_page=4, **params)
+                assert search.search_by_symbols(page=page, per_page=4, **params) == expected, (params, page)
+
+        # Warm feeds answer without touching the database
+        with capture_statements(database.engine) as statements:
+            articles, total, has_more = search.search_by_symbols(['NASDAQ:AAPL'], page=1, per_page=4)
+        assert statements == [] and total == 6 and has_more
+        assert [article['external_id'] for article in articles] == ['ext-1', 'ext-3', 'ext-5', 'ext-7']
+
+        # Searches a feed cannot answer exactly still go to SQL
+        assert search._feed_for(['AAPL', 'MSFT'], None, 'LATEST', None, None) is None
+        assert search._feed_for(['AAPL'], 'POSITIVE', 'LATEST', None, None) is None
+        assert search._feed_for(['AAPL'], None, 'HIGHEST', None, None) is None
+        assert search._feed_for(['AAPL'], None, 'LATEST', None, 'HK') is None
+        assert search._feed_for(None, None, None, None, 'other') == GLOBAL_FEED
+    print("✅ Feed pages match SQL")
+
+
+def test_sync_updates_feeds():
+    """A synced article shows up in its feeds at once, and deleted rows drop out"""
+    print("🧪 Testing feed updates on sync...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with feed_database() as database:
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+        search.search_by_symbols(None, per_page=5)
+        search.search_by_symbols(['HKEX:700'], per_page=5)
+
+        article = add_article(database.session, 100, ['HKEX:700'], hours_ago=0)
+        database.session.commit()
+        assert SearchIndexSyncService(database.session).sync_article(article)
+
+        with capture_statements(database.engine) as statements:
+            latest, total, _ = search.search_by_symbols(None, per_page=5)
+            hk, hk_total, _ = search.search_by_symbols(['HKEX:700'], per_page=5)
+        assert statements == []
+        assert latest[0]['external_id'] == 'ext-100' and total == 13
+        assert hk[0]['external_id'] == 'ext-100' and hk_total == 7
+
+        # Re-syncing an existing article does not change the totals
+        stats = SearchIndexSyncService(database.session).sync_multiple_articles([article])
+        assert stats['updated'] == 1
+        assert search.search_by_symbols(None, per_page=5)[1] == 13
+
+        # An index row whose article is gone
+        database.session.query(NewsSearchIndex).filter_by(external_id='ext-100').update({'article_id': 9999})
+        database.session.commit()
+        assert SearchIndexSyncService(database.session).remove_deleted_articles() == 1
+        latest, total, _ = search.search_by_symbols(None, per_page=5)
+        assert latest[0]['external_id'] == 'ext-1' and total == 12
+    print("✅ Feeds update on sync")
+
+
+def test_feed_fallbacks():
+    print("🧪 Testing feed fallbacks...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with feed_database(articles=8) as database:
+        redis = news_feeds._redis
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 5)[1] == 8
+
+        # Past the cap
+        original_cap = feeds_module.FEED_CAP
+        feeds_module.FEED_CAP = 6
+        try:
+            assert news_feeds.page(database.session, GLOBAL_FEED, 5, 5) is None
+        finally:
+            feeds_module.FEED_CAP = original_cap
+
+        # An evicted card sends this request to SQL and the next one rebuilds the feed
+        for cards in redis.hashes.values():
+            cards.pop('1', None)
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 5) is None
+        assert not redis.exists('news_feed:ready:global')
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 5)[0][0]['external_id'] == 'ext-1'
+
+        # A cold feed whose warm-up lease is taken elsewhere
+        redis.set('news_feed:warming:symbol:SYM5', '1')
+        assert news_feeds.page(database.session, symbol_feed('SYM5'), 0, 5) is None
+
+        # Region feeds wait for the region backfill
+        database.session.query(NewsSearchIndex).filter_by(external_id='ext-2').update({'region_mask': None})
+        database.session.commit()
+        region_classifier.reset()
+        assert news_feeds.page(database.session, region_feed('HK'), 0, 5) is None
+
+        # Recent news honours the time window
+        aapl = symbol_feed('NASDAQ:AAPL')
+        recent = news_feeds.recent(database.session, aapl, NOW - timedelta(hours=4), 10)
+        assert [card['external_id'] for card in recent] == ['ext-1', 'ext-3']
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+        hours = max(int((datetime.now() - NOW).total_seconds() // 3600), 0) + 5
+        with feeds_disabled():
+            expected = search.get_recent_news(limit=3, hours=hours)
+        assert search.get_recent_news(limit=3, hours=hours) == expected
+
+        # A short answer from a full feed may have been cut off by the cap
+        feeds_module.FEED_CAP = 4
+        try:
+            assert news_feeds.recent(database.session, aapl, NOW - timedelta(hours=4), 4) is None
+            assert len(news_feeds.recent(database.session, aapl, NOW - timedelta(hours=8), 4)) == 4
+        finally:
+            feeds_module.FEED_CAP = original_cap
+    print("✅ Feed fallbacks work")
+
+
+def test_retention_window():
+    """Articles past the retention window stay out of the feeds and never trigger a re-warm"""
+    print("🧪 Testing the card retention window...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    days = feeds_module.CARD_RETENTION_DAYS
+    with feed_database(articles=4) as database:
+        redis = news_feeds._redis
+        for i, age in ((5, days - 1), (6, days + 2), (7, days + 40)):
+            add_article(database.session, i, ['HKEX:700'], hours_ago=age * 24)
+        database.session.commit()
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+
+        # Only in-window articles are written, and every card key expires with a TTL in the future
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 3)[1] == 4
+        assert SearchIndexSyncService(database.session).sync_multiple_articles(
+            NewsArticle.query.filter(NewsArticle.id >= 5).all())['added'] == 3
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 3)[1] == 7
+        assert set(redis.zsets['news_feed:z:global']) == {'1', '2', '3', '4', '5'}
+        card_keys = [key for key in redis.hashes if key.startswith('news_feed:cards:')]
+        assert card_keys and all(redis.deadlines[key] > redis.clock() for key in card_keys)
+
+        with feeds_disabled():
+            expected = [search.search_by_symbols(None, page=page, per_page=3) for page in (1, 2, 3)]
+
+        # Pages reaching past the window go to SQL, without recounting or rebuilding the feed
+        assert [search.search_by_symbols(None, page=page, per_page=3) for page in (1, 2, 3)] == expected
+        with capture_statements(database.engine) as statements:
+            search.search_by_symbols(None, page=2, per_page=3)
+            search.search_by_symbols(None, page=3, per_page=3)
+        assert len(statements) == 4, statements
+        assert not any('LIMIT' in statement and 'OFFSET' not in statement for statement in statements)
+        assert redis.exists('news_feed:ready:global')
+
+        # Once the oldest day's card expires for real, that article has left the window
+        redis.offset = 2 * 86400
+        original = time.time
+        time.time = lambda: original() + redis.offset
+        try:
+            assert news_feeds.page(database.session, GLOBAL_FEED, 0, 4) is not None
+            assert news_feeds.page(database.session, GLOBAL_FEED, 4, 3) is None
+            assert redis.exists('news_feed:ready:global')
+        finally:
+            time.time = original
+    print("✅ Retention window works")
+
+
+def test_reset():
+    """Clearing the search index drops the feeds, so removed articles stop showing"""
+    print("🧪 Testing feed reset...")
+    with feed_database(articles=4) as database:
+        redis = news_feeds._redis
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 3)[1] == 4
+        redis.set('unrelated', '1')
+
+        database.session.query(NewsSearchIndex).delete()
+        database.session.commit()
+        assert news_feeds.reset() > 0
+        assert not any(key.startswith('news_feed:') for key in
+                       set(redis.strings) | set(redis.hashes) | set(redis.zsets))
+        assert redis.exists('unrelated')
+
+        # The next read re-warms from the (now empty) index
+        assert news_feeds.page(database.session, GLOBAL_FEED, 0, 3)[1] == 0
+    print("✅ Feed reset works")
+
+
+if __name__ == "__main__":
+    test_feed_entries()
+    test_feed_pages_match_sql()
+    test_sync_updates_feeds()
+    test_feed_fallbacks()
+    test_retention_window()
+    test_reset()
+    print("\n🎉 All news feed tests passed!")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for column-projected news cards
+
+Uses an in-memory SQLite database and checks the cards against the ORM
+to_dict() output they replace.
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from app import db
+from app.models import ArticleSymbol, NewsArticle, NewsSearchIndex
+from app.utils.search.news_projection import (
+    NewsCard, article_cards, parse_symbols, search_index_cards, serialize_cards
+)
+
+
+@contextmanager
+def news_database(articles=30):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from sqlalchemy.pool import StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                               'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        now = datetime(2026, 1, 1, 12, 0)
+        for i in range(1, articles + 1):
+            article = NewsArticle(
+                id=i, external_id=f'ext-{i}', title=f'Article {i}', content='long body ' * 50,
+                url=f'https://example.com/{i}', published_at=now - timedelta(hours=i), source='Reuters',
+                ai_summary=f'Summary {i}', ai_insights='Insights', ai_sentiment_rating=i % 5,
+                sentiment_label='POSITIVE', sentiment_score=0.5,
+            )
+            article.symbols = [ArticleSymbol(symbol='AAPL'), ArticleSymbol(symbol=f'SYM{i}')]
+            db.session.add(article)
+            db.session.flush()
+            db.session.add(NewsSearchIndex.create_from_article(article))
+        # One row with a corrupt symbols_json
+        db.session.query(NewsSearchIndex).filter_by(external_id='ext-3').update({'symbols_json': '{not json'})
+        db.session.commit()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_parse_symbols():
+    print("🧪 Testing symbols_json parsing...")
+    assert parse_symbols('["AAPL", "MSFT"]') == ['AAPL', 'MSFT']
+    assert parse_symbols(None) == [] and parse_symbols('') == []
+    assert parse_symbols('{broken') == [] and parse_symbols('{"a": 1}') == []
+    print("✅ symbols_json parsing works")
+
+
+def test_search_index_cards_match_to_dict():
+    """Projected rows serialize exactly like NewsSearchIndex.to_dict()"""
+    print("🧪 Testing search index cards...")
+    with news_database() as database:
+        query = NewsSearchIndex.query.order_by(NewsSearchIndex.published_at.desc()).offset(1).limit(20)
+        expected = [row.to_dict() for row in query.all()]
+        database.session.expunge_all()
+
+        cards = search_index_cards(query)
+        assert all(isinstance(card, NewsCard) for card in cards)
+        assert serialize_cards(cards) == expected
+        assert len(cards) == 20 and cards[0].external_id == 'ext-2'
+        assert next(card for card in cards if card.external_id == 'ext-3').symbols == []
+        # Nothing was loaded into the identity map
+        assert len(database.session.identity_map) == 0
+    print("✅ Search index cards work")
+
+
+def test_article_cards_load_symbols_in_one_query():
+    """A page of NewsArticle cards costs two statements, whatever its size"""
+    print("🧪 Testing article cards...")
+    with news_database() as database:
+        query = NewsArticle.query.order_by(NewsArticle.published_at.desc()).limit(25)
+        with capture_statements(database.engine) as statements:
+            cards = article_cards(database.session, query)
+        assert len(statements) == 2, statements
+        assert 'IN' in statements[1]
+        assert len(cards) == 25
+        assert cards[0].title == 'Article 1' and sorted(cards[0].symbols) == ['AAPL', 'SYM1']
+        assert cards[0].published_at == datetime(2026, 1, 1, 11, 0)
+
+        card = cards[0].to_dict()
+        assert card['sentiment']['label'] == 'POSITIVE' and card['summary']['ai_summary'] == 'Summary 1'
+        assert sorted(entry['symbol'] for entry in card['symbols']) == ['AAPL', 'SYM1']
+        assert article_cards(database.session, NewsArticle.query.filter(NewsArticle.id < 0)) == []
+    print("✅ Article cards work")
+
+
+def test_optimized_search_uses_cards():
+    """Search results keep their shape after the switch to projections"""
+    print("🧪 Testing optimized search output...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with news_database() as database:
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+        articles, total, has_more = search.search_by_symbols(['SYM7'], per_page=10)
+        assert total == 1 and not has_more
+        expected = NewsSearchIndex.query.filter_by(external_id='ext-7').one().to_dict()
+        assert articles == [expected]
+        assert json.loads(json.dumps(articles)) == articles
+
+        recent = search.get_recent_news(limit=5, hours=24 * 365 * 100)
+        assert [article['external_id'] for article in recent] == [f'ext-{i}' for i in range(1, 6)]
+    print("✅ Optimized search output works")
+
+
+if __name__ == "__main__":
+    test_parse_symbols()
+    test_search_index_cards_match_to_dict()
+    test_article_cards_load_symbols_in_one_query()
+    test_optimized_search_uses_cards()
+    print("\n🎉 All news projection tests passed!")
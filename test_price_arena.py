@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared-memory price arena
+
+Each test uses its own temporary arena directory; a second PriceArena on
+the same directory plays the part of another gunicorn worker.
+"""
+
+import os
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.utils.cache.price_arena import DEFAULT_MAX_BYTES, PriceArena
+
+
+def make_prices(days=500, tz=None):
+    index = pd.bdate_range(end='2024-12-31', periods=days, tz=tz, name='Date')
+    close = np.linspace(100, 200, days)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': np.arange(days, dtype=np.int64)}, index=index)
+
+
+def test_series_round_trip_between_workers():
+    """A series published by one worker reads back identically, zero-copy, in another"""
+    print("🧪 Testing cross-worker round trip...")
+    directory = tempfile.mkdtemp()
+    writer = PriceArena(directory=directory, promote_after=1)
+    reader = PriceArena(directory=directory, promote_after=1)
+    prices = make_prices(tz='America/New_York')
+
+    assert reader.get('history:AAPL') is None
+    assert writer.put('history:AAPL', prices)
+    shared = reader.get('history:AAPL')
+
+    pd.testing.assert_frame_equal(shared, prices, check_freq=False)
+    # Price columns wrap the mapping instead of owning a copy
+    assert not shared['Close'].to_numpy().flags.owndata
+    # Copy-on-write: a caller's in-place edit stays private to that caller
+    shared.iloc[0, 0] = -1.0
+    assert reader.get('history:AAPL').iloc[0, 0] == prices.iloc[0, 0]
+    assert reader.get_stats()['hits'] == 2
+    print("✅ Cross-worker round trip works")
+
+
+def test_expired_entries_are_not_served():
+    """Series are served only until their TTL"""
+    print("🧪 Testing expiry...")
+    arena = PriceArena(directory=tempfile.mkdtemp(), promote_after=1)
+    assert arena.put('history:MSFT', make_prices(), ttl=-1)
+    assert arena.get('history:MSFT') is None
+    assert arena.get_stats()['expired'] == 1
+    print("✅ Expiry works")
+
+
+def test_memory_is_bounded_with_lru_eviction():
+    """Publishing past the size limit evicts the least recently used series"""
+    print("🧪 Testing LRU eviction...")
+    prices = make_prices()
+    probe = PriceArena(directory=tempfile.mkdtemp(), promote_after=1)
+    probe.put('probe', prices)
+    entry_size = probe.get_stats()['bytes']
+
+    arena = PriceArena(directory=tempfile.mkdtemp(), max_bytes=entry_size * 3, promote_after=1)
+    for i, ticker in enumerate(['A', 'B', 'C']):
+        arena.put(f'history:{ticker}', prices)
+        # Oldest first, with mtimes far enough apart to order them
+        os.utime(arena._path(f'history:{ticker}'), (time.time() - 100 + i, time.time() - 100 + i))
+    # Reading A makes it the most recently used
+    os.utime(arena._path('history:A'))
+
+    assert arena.put('history:D', prices)
+    stats = arena.get_stats()
+    assert stats['bytes'] <= entry_size * 3
+    assert arena.get('history:B') is None
+    assert arena.get('history:A') is not None and arena.get('history:D') is not None
+    print("✅ LRU eviction works")
+
+
+def test_only_popular_series_are_published():
+    """note_request gates publishing until a series has been asked for often enough"""
+    print("🧪 Testing promotion...")
+    arena = PriceArena(directory=tempfile.mkdtemp(), promote_after=2)
+    assert not arena.note_request('history:NVDA')
+    assert arena.note_request('history:NVDA')
+    print("✅ Promotion works")
+
+
+def test_busy_writer_skips_publish():
+    """Writers never queue behind each other; a busy arena lock skips the publish"""
+    print("🧪 Testing single writer...")
+    import fcntl
+    arena = PriceArena(directory=tempfile.mkdtemp(), promote_after=1)
+    arena.put('history:first', make_prices())
+    with open(os.path.join(arena.directory, '.writer.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert not arena.put('history:AMZN', make_prices())
+    assert arena.get_stats()['skipped_busy'] == 1
+    assert arena.put('history:AMZN', make_prices())
+    print("✅ Single writer works")
+
+
+def test_failed_write_leaves_no_temp_file():
+    """A write that fails (a full /dev/shm) removes its temp file and publishes nothing"""
+    print("🧪 Testing failed writes...")
+    arena = PriceArena(directory=tempfile.mkdtemp(), promote_after=1)
+    original = os.replace
+
+    def disk_full(src, dst):
+        raise OSError(28, 'No space left on device')
+
+    os.replace = disk_full
+    try:
+        assert not arena.put('history:META', make_prices())
+    finally:
+        os.replace = original
+    assert os.listdir(arena.directory) == ['.writer.lock']
+    assert arena.get_stats()['errors'] == 1
+    print("✅ Failed writes clean up")
+
+
+def test_default_size_fits_the_filesystem():
+    """Without PRICE_ARENA_MAX_MB the arena stays well inside a 64MB Docker /dev/shm"""
+    print("🧪 Testing default arena size...")
+    arena = PriceArena(directory=tempfile.mkdtemp(), max_bytes=None)
+    st = os.statvfs(arena.directory)
+    assert 0 < arena.max_bytes <= min(DEFAULT_MAX_BYTES, st.f_blocks * st.f_frsize // 2)
+    assert DEFAULT_MAX_BYTES < 64 * 1024 * 1024
+    print("✅ Default arena size works")
+
+
+if __name__ == "__main__":
+    test_series_round_trip_between_workers()
+    test_expired_entries_are_not_served()
+    test_memory_is_bounded_with_lru_eviction()
+    test_only_popular_series_are_published()
+    test_busy_writer_skips_publish()
+    test_failed_write_leaves_no_temp_file()
+    test_default_size_fits_the_filesystem()
+    print("\n🎉 All price arena tests passed!")
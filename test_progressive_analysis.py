@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for staged (server-sent events) analysis streaming
+
+Price data, regression and metrics are stubbed and the stage cache is kept
+in memory, so it runs without Redis, MySQL or market data.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.utils.analyzer import progressive_analysis
+from app.utils.analyzer.progressive_analysis import iter_analysis_stages, format_sse, STAGES
+from app.utils.cache.analysis_result_cache import analysis_result_cache
+from app.utils.data.data_service import DataService
+from app.utils.analysis.analysis_service import AnalysisService
+
+
+class MemoryStockCache:
+    """Dict-backed stand-in for StockCache's pickled analysis storage"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get_analysis_object(self, ticker, analysis_type, params_hash):
+        return self.store.get((ticker, analysis_type, params_hash))
+
+    def set_analysis_object(self, ticker, analysis_type, params_hash, result, expire=3600):
+        self.store[(ticker, analysis_type, params_hash)] = result
+        return True
+
+
+def make_prices(end_date='2024-12-31', days=900):
+    index = pd.bdate_range(end=end_date, periods=days)
+    close = 100 + 20 * np.sin(np.linspace(0, 12, days)) + np.linspace(0, 50, days)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000}, index=index)
+
+
+class StubbedPipeline:
+    """Swap the slow collaborators for stubs that count their calls"""
+
+    def __init__(self):
+        self.calls = {'regression': 0, 'metrics': 0}
+
+    def regression(self, data, future_days=180, calculate_sp500_baseline=True, symbol=None):
+        self.calls['regression'] += 1
+        predictions = np.linspace(100, 200, len(data) + future_days).tolist()
+        predictions[0] = float('nan')
+        return {
+            'predictions': predictions,
+            'upper_band': predictions,
+            'lower_band': predictions,
+            'r2': 0.9,
+            'equation': 'y = x',
+            'total_score': {'score': 72.5, 'benchmark': {'sp500_return': 10.0}},
+        }
+
+    def metrics(self, data_service, ticker):
+        self.calls['metrics'] += 1
+        return pd.DataFrame({'2023': [1.5], 'CAGR %': [np.nan]}, index=['revenue'])
+
+    def __enter__(self):
+        self.saved = (DataService.get_historical_data, AnalysisService.perform_polynomial_regression,
+                      progressive_analysis._fetch_metrics_table, analysis_result_cache.cache)
+        DataService.get_historical_data = lambda service, ticker, start, end: make_prices()
+        AnalysisService.perform_polynomial_regression = staticmethod(self.regression)
+        progressive_analysis._fetch_metrics_table = self.metrics
+        analysis_result_cache.cache = MemoryStockCache()
+        return self
+
+    def __exit__(self, *exc):
+        (DataService.get_historical_data, regression,
+         progressive_analysis._fetch_metrics_table, analysis_result_cache.cache) = self.saved
+        AnalysisService.perform_polynomial_regression = staticmethod(regression)
+
+
+def test_stages_arrive_in_order():
+    """The price chart comes first, then regression, then fundamentals"""
+    print("🧪 Testing stage order...")
+    with StubbedPipeline():
+        stages = list(iter_analysis_stages('AAPL', '2024-12-31', 365, 180))
+
+    assert tuple(name for name, _ in stages) == STAGES
+    price = stages[0][1]
+    assert price['dates'][-1] == '2024-12-31'
+    assert len(price['dates']) == len(price['close'])
+    assert stages[1][1]['total_score']['score'] == 72.5
+    assert stages[1][1]['benchmark'] == {'sp500_return': 10.0}
+    assert 'signal_summary' in stages[2][1]
+    assert stages[2][1]['metrics']['index'] == ['revenue']
+    print("✅ Stage order works")
+
+
+def test_stages_are_cached_independently():
+    """A repeated request replays every stage from the cache"""
+    print("🧪 Testing per-stage caching...")
+    with StubbedPipeline() as pipeline:
+        first = list(iter_analysis_stages('AAPL', '2024-12-31', 365, 180))
+        second = list(iter_analysis_stages('AAPL', '2024-12-31', 365, 180))
+        assert pipeline.calls == {'regression': 1, 'metrics': 1}
+
+        # Dropping one stage recomputes only that stage
+        store = analysis_result_cache.cache.store
+        for key in [key for key in store if key[1] == 'memo_stage:fundamentals']:
+            del store[key]
+        list(iter_analysis_stages('AAPL', '2024-12-31', 365, 180))
+        assert pipeline.calls == {'regression': 1, 'metrics': 2}
+
+    assert first == second
+    print("✅ Per-stage caching works")
+
+
+def reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def test_events_are_valid_json():
+    """NaN values become null so browsers can JSON.parse every event"""
+    print("🧪 Testing event encoding...")
+    with StubbedPipeline():
+        stages = list(iter_analysis_stages('AAPL', '2024-12-31', 365, 180))
+
+    for name, payload in stages:
+        event = format_sse(name, payload)
+        assert event.startswith(f"event: {name}\ndata: ") and event.endswith("\n\n")
+        data = json.loads(event.split('data: ', 1)[1], parse_constant=reject_constant)
+        if name == 'regression':
+            assert data['predictions'][0] is None
+    print("✅ Event encoding works")
+
+
+if __name__ == "__main__":
+    test_stages_arrive_in_order()
+    test_stages_are_cached_independently()
+    test_events_are_valid_json()
+    print("\n🎉 All progressive analysis tests passed!")
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the hot SQL paths
+
+Each registered hot query runs the real code path against a seeded
+synthetic dataset while its statements are captured. Every captured
+statement an expectation matches is then explained (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN on MySQL) and checked:
+
+- the indexes it must use are still used;
+- it does not sort in a temp structure or fully scan a table it must not;
+- the work stays within budget: SQLite VM steps (its closest measure of
+  rows examined) or the summed MySQL EXPLAIN row estimates.
+
+Runs on in-memory SQLite by default. Set QUERY_PLAN_MYSQL_URL to a
+throwaway MySQL database to check MySQL plans instead (its tables are
+dropped and recreated).
+"""
+
+import json
+import os
+import random
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, text
+
+from app import db
+from app.models import NewsArticle, NewsSearchIndex, ArticleSymbol
+from app.utils.search.symbol_alias import symbol_registry
+
+MYSQL_URL = os.getenv('QUERY_PLAN_MYSQL_URL')
+
+ARTICLES = 5000
+SYMBOLS = ['AAPL', 'MSFT', 'TSLA', 'NVDA', '0700.HK', '600519.SS', 'BTC-USD'] + [f'SYM{i}' for i in range(200)]
+SOURCES = ['Bloomberg', 'Reuters', 'CNBC', 'SCMP', 'Xinhua']
+
+# SQLite steps are counted in units of this many VM instructions
+STEP_UNIT = 100
+
+Expectation = namedtuple('Expectation', 'statement indexes no_sort no_full_scan max_steps max_rows')
+
+
+def expect(statement, indexes=(), no_sort=False, no_full_scan=(), max_steps=None, max_rows=None):
+    """
+    ``statement`` is a regex matched against the captured SQL. ``indexes`` is
+    a list of alternatives tuples: one index of each tuple must be used.
+    """
+    return Expectation(re.compile(statement, re.IGNORECASE | re.DOTALL), indexes, no_sort,
+                       set(no_full_scan), max_steps, max_rows)
+
+
+PRIMARY = ('PRIMARY',)
+PUBLISHED_AT = ('idx_search_published_sentiment', 'ix_news_search_index_published_at')
+INDEX_EXTERNAL_ID = ('ix_news_search_index_external_id', 'idx_search_external_published')
+
+
+def _search_by_keywords(session):
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    OptimizedNewsSearch(session).search_by_keywords(['tesla'])
+
+
+def _news_feed(session):
+    # The search page's default feed: latest AI-processed articles, no symbol filter
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    OptimizedNewsSearch(session).search_by_symbols()
+
+
+def _optimized_symbol_search(session):
+    from app.utils.search.news_search import NewsSearch
+    NewsSearch(session).optimized_symbol_search(['AAPL'])
+
+
+def _batch_sync_missing_articles(session):
+    from app.utils.scheduler.news_scheduler import NewsAIScheduler
+    scheduler = NewsAIScheduler.__new__(NewsAIScheduler)  # no scheduler threads
+    scheduler._batch_sync_missing_articles(session)
+    session.rollback()  # keep the dataset identical for the other queries
+
+
+def _generate_analytics_data(session):
+    from app.news.routes import _generate_analytics_data
+    _generate_analytics_data(30, chart_type='summary')
+
+
+HOT_QUERIES = {
+    'search_by_keywords': (_search_by_keywords, [
+        # LIKE '%keyword%' cannot use an index, so the count is bounded by budget only
+        expect(r'^SELECT count\(\*\).*FROM news_search_index', max_steps=1300, max_rows=ARTICLES),
+        expect(r'FROM news_search_index.*ORDER BY news_search_index\.published_at DESC.*LIMIT',
+               indexes=[PUBLISHED_AT], no_sort=True, max_steps=100, max_rows=ARTICLES),
+    ]),
+    'news_feed': (_news_feed, [
+        expect(r'^SELECT count\(\*\).*FROM news_search_index',
+               indexes=[('idx_search_ai_content', 'idx_search_ai_summary', 'idx_search_ai_insights')],
+               max_steps=600, max_rows=ARTICLES),
+        expect(r'FROM news_search_index.*ORDER BY news_search_index\.published_at DESC.*LIMIT',
+               indexes=[PUBLISHED_AT], no_sort=True, max_steps=50, max_rows=ARTICLES),
+    ]),
+    'optimized_symbol_search': (_optimized_symbol_search, [
+        expect(r'FROM news_articles.*article_symbols.*ORDER BY news_articles\.published_at DESC.*LIMIT',
+               indexes=[('idx_symbol_id_article',), PRIMARY],
+               no_full_scan={'news_articles', 'article_symbols'}, max_steps=100, max_rows=1000),
+        expect(r'^SELECT count\(\*\).*FROM news_articles',
+               indexes=[('idx_symbol_id_article',), PRIMARY],
+               no_full_scan={'news_articles', 'article_symbols'}, max_steps=50, max_rows=1000),
+    ]),
+    '_batch_sync_missing_articles': (_batch_sync_missing_articles, [
+        # The anti-join stops after 50 rows; the subquery must stay index-only
+        expect(r'SELECT DISTINCT na\.id.*NOT IN',
+               indexes=[INDEX_EXTERNAL_ID], max_steps=700, max_rows=2 * ARTICLES),
+        expect(r'COUNT\(DISTINCT na\.external_id\)',
+               indexes=[INDEX_EXTERNAL_ID, ('ix_news_articles_external_id',)],
+               max_steps=1600, max_rows=2 * ARTICLES),
+        expect(r'SELECT news_search_index\.external_id .*WHERE news_search_index\.external_id IN',
+               indexes=[INDEX_EXTERNAL_ID], no_full_scan={'news_search_index'},
+               max_steps=50, max_rows=200),
+        expect(r'FROM news_articles\s+WHERE news_articles\.id IN',
+               indexes=[PRIMARY], no_full_scan={'news_articles'}, max_steps=50, max_rows=200),
+    ]),
+    '_generate_analytics_data': (_generate_analytics_data, [
+        expect(r'FROM news_articles\s+WHERE news_articles\.published_at >=',
+               indexes=[('ix_news_articles_published_at', 'idx_published_sentiment', 'idx_published_created')],
+               no_full_scan={'news_articles'}, max_steps=800, max_rows=2 * ARTICLES),
+    ]),
+}
+
+
+# Harness
+
+def seed(session, articles=ARTICLES):
+    """Deterministic articles, symbols and search index rows spread over 90 days"""
+    rng = random.Random(0)
+    now = datetime.now()
+    rows, symbols, index_rows = [], [], []
+    for i in range(1, articles + 1):
+        published = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        processed = rng.random() < 0.8
+        article_symbols = rng.sample(SYMBOLS, 2)
+        summary = 'Tesla earnings beat estimates' if rng.random() < 0.2 else 'Markets were mixed'
+        rows.append({
+            'id': i, 'external_id': f'ext-{i}', 'title': f'Article {i} on {article_symbols[0]}',
+            'content': 'content', 'url': f'https://example.com/{i}', 'published_at': published,
+            'source': rng.choice(SOURCES),
+            'ai_summary': summary if processed else None,
+            'ai_insights': 'Insights' if processed else None,
+            'ai_sentiment_rating': rng.randint(1, 5) if processed else None,
+        })
+        symbols += [{'article_id': i, 'symbol': symbol} for symbol in article_symbols]
+        # A few processed articles are still missing from the index, as after a fetch
+        if processed and i % 10:
+            index_rows.append({
+                'article_id': i, 'external_id': f'ext-{i}', 'title': rows[-1]['title'], 'url': rows[-1]['url'],
+                'published_at': published, 'source': rows[-1]['source'],
+                'ai_sentiment_rating': rows[-1]['ai_sentiment_rating'], 'symbols_json': json.dumps(article_symbols),
+                'ai_summary': summary, 'ai_insights': 'Insights',
+            })
+    session.bulk_insert_mappings(NewsArticle, rows)
+    session.bulk_insert_mappings(ArticleSymbol, symbols)
+    session.bulk_insert_mappings(NewsSearchIndex, index_rows)
+    session.commit()
+    # Link article symbols to canonical ids, as populate_symbol_aliases.py does
+    symbol_registry.reset()
+    symbol_registry.backfill_article_symbols(session)
+    # Planner statistics, as production databases have
+    session.execute(text('ANALYZE' if session.get_bind().dialect.name == 'sqlite'
+                         else 'ANALYZE TABLE news_articles, article_symbols, news_search_index'))
+    session.commit()
+
+
+@contextmanager
+def cache_disabled():
+    """Keep the Redis result cache and the materialized feeds out of the way, so every query reaches SQL"""
+    from app.utils.cache.redis_pool import CircuitBreaker
+    from app.utils.search.news_feeds import news_feeds
+    from app.utils.search.news_search import NewsSearch
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    feed_breaker = news_feeds._breaker
+    news_feeds._breaker = CircuitBreaker()
+    news_feeds._breaker.force_open()
+    originals = {cls: cls.is_cache_available for cls in (NewsSearch, OptimizedNewsSearch)}
+    for cls in originals:
+        cls.is_cache_available = lambda self: False
+    try:
+        yield
+    finally:
+        news_feeds._breaker = feed_breaker
+        for cls, original in originals.items():
+            cls.is_cache_available = original
+
+
+@contextmanager
+def plan_database():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = MYSQL_URL or 'sqlite://'
+    if not MYSQL_URL:
+        # One connection, so the in-memory database outlives each checkout
+        from sqlalchemy.pool import StaticPool
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                                   'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    with app.app_context(), cache_disabled():
+        db.drop_all()
+        db.create_all()
+        seed(db.session)
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            if MYSQL_URL:
+                db.drop_all()
+
+
+@contextmanager
+def capture_statements(engine):
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+Plan = namedtuple('Plan', 'lines indexes full_scans sorts steps rows')
+
+
+def explain(engine, statement, parameters) -> Plan:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if engine.dialect.name == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            lines = [row[3] for row in cursor.fetchall()]
+            indexes = set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', ' '.join(lines)))
+            if any('INTEGER PRIMARY KEY' in line for line in lines):
+                indexes.add('PRIMARY')
+            full_scans = {match.group(1) for line in lines
+                          for match in [re.match(r'SCAN (\w+)$', line)] if match}
+            sorts = any('TEMP B-TREE FOR ORDER BY' in line for line in lines)
+
+            # Execute it once, counting VM instructions
+            steps = [0]
+
+            def count():
+                steps[0] += 1
+                return 0
+
+            raw.driver_connection.set_progress_handler(count, STEP_UNIT)
+            try:
+                cursor.execute(statement, parameters)
+                cursor.fetchall()
+            finally:
+                raw.driver_connection.set_progress_handler(None, STEP_UNIT)
+            return Plan(lines, indexes, full_scans, sorts, steps[0], None)
+
+        cursor.execute('EXPLAIN ' + statement, parameters)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        lines = [str(row) for row in rows]
+        indexes = {row['key'] for row in rows if row.get('key')}
+        full_scans = {row['table'] for row in rows if row.get('type') == 'ALL'}
+        sorts = any('Using filesort' in (row.get('Extra') or '') for row in rows)
+        return Plan(lines, indexes, full_scans, sorts, None, sum(int(row.get('rows') or 0) for row in rows))
+    finally:
+        raw.close()
+
+
+def check_hot_query(name):
+    run, expectations = HOT_QUERIES[name]
+    with plan_database() as database:
+        engine = database.engine
+        with capture_statements(engine) as captured:
+            run(database.session)
+
+        failures = []
+        for expectation in expectations:
+            matches = [(sql, params) for sql, params in captured if expectation.statement.search(sql)]
+            if not matches:
+                failures.append(f"no statement matched /{expectation.statement.pattern}/")
+                continue
+            sql, params = matches[0]
+            plan = explain(engine, sql, params)
+            where = f"/{expectation.statement.pattern}/ plan {plan.lines}"
+            for alternatives in expectation.indexes:
+                if not plan.indexes & set(alternatives):
+                    failures.append(f"lost index (one of {alternatives}): {where}")
+            if expectation.no_sort and plan.sorts:
+                failures.append(f"sorts instead of reading an index in order: {where}")
+            scanned = {table for table in plan.full_scans if table in expectation.no_full_scan}
+            if scanned:
+                failures.append(f"full scan of {sorted(scanned)}: {where}")
+            if plan.steps is not None and expectation.max_steps and plan.steps > expectation.max_steps:
+                failures.append(f"{plan.steps * STEP_UNIT} VM steps > budget {expectation.max_steps * STEP_UNIT}: {where}")
+            if plan.rows is not None and expectation.max_rows and plan.rows > expectation.max_rows:
+                failures.append(f"{plan.rows} rows examined > budget {expectation.max_rows}: {where}")
+        assert not failures, f"{name}:\n  " + "\n  ".join(failures)
+
+
+def _run(name):
+    print(f"🧪 Testing query plans of {name}...")
+    check_hot_query(name)
+    print(f"✅ Query plans of {name} work")
+
+
+def test_search_by_keywords_plans():
+    _run('search_by_keywords')
+
+
+def test_news_feed_plans():
+    _run('news_feed')
+
+
+def test_optimized_symbol_search_plans():
+    _run('optimized_symbol_search')
+
+
+def test_batch_sync_missing_articles_plans():
+    _run('_batch_sync_missing_articles')
+
+
+def test_generate_analytics_data_plans():
+    try:
+        import app.news.routes  # noqa: F401
+    except LookupError as e:
+        # app.news needs the NLTK vader lexicon at import time
+        pytest.skip(f"app.news.routes cannot be imported here ({type(e).__name__}: NLTK vader lexicon missing)")
+    _run('_generate_analytics_data')
+
+
+def test_harness_catches_a_lost_index():
+    """Dropping the published_at index turns the feed page into a sort and fails"""
+    print("🧪 Testing that a lost index is caught...")
+    run, expectations = HOT_QUERIES['news_feed']
+    with plan_database() as database:
+        database.session.execute(text('DROP INDEX idx_search_published_sentiment' if not MYSQL_URL else
+                                      'DROP INDEX idx_search_published_sentiment ON news_search_index'))
+        database.session.execute(text('DROP INDEX ix_news_search_index_published_at' if not MYSQL_URL else
+                                      'DROP INDEX ix_news_search_index_published_at ON news_search_index'))
+        database.session.commit()
+        with capture_statements(database.engine) as captured:
+            run(database.session)
+        page = next(sql_params for sql_params in captured if expectations[1].statement.search(sql_params[0]))
+        plan = explain(database.engine, *page)
+    assert plan.sorts and not plan.indexes & set(PUBLISHED_AT)
+    print("✅ A lost index is caught")
+
+
+if __name__ == "__main__":
+    test_search_by_keywords_plans()
+    test_news_feed_plans()
+    test_optimized_symbol_search_plans()
+    test_batch_sync_missing_articles_plans()
+    try:
+        test_generate_analytics_data_plans()
+    except pytest.skip.Exception as e:
+        print(f"⏭️ Skipping _generate_analytics_data: {e.msg}")
+    test_harness_catches_a_lost_index()
+    print("\n🎉 All query plan tests passed!")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for per-request query counts and N+1 detection
+
+Uses an in-memory SQLite database with an article/symbol pair shaped like
+NewsArticle.symbols, so lazy loading per row is a real N+1.
+"""
+
+from flask import Flask, jsonify
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, select
+from sqlalchemy.orm import Session, declarative_base, relationship, selectinload
+
+from app.utils.performance import query_tracker
+from app.utils.performance.query_tracker import (
+    NPlusOneDetected, QueryLog, current_query_log, fingerprint, init_query_tracking, query_stats, track_queries
+)
+from app.utils.performance.request_profiler import current_timings
+
+Base = declarative_base()
+
+
+class Article(Base):
+    __tablename__ = 'articles'
+    id = Column(Integer, primary_key=True)
+    title = Column(String(100))
+    symbols = relationship('Symbol', back_populates='article')
+
+
+class Symbol(Base):
+    __tablename__ = 'symbols'
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, ForeignKey('articles.id'))
+    symbol = Column(String(20))
+    article = relationship('Article', back_populates='symbols')
+
+
+def make_engine(articles=20):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(articles):
+            session.add(Article(title=f'Article {i}', symbols=[Symbol(symbol='AAPL'), Symbol(symbol='MSFT')]))
+        session.commit()
+    return engine
+
+
+def lazy_feed(session):
+    return [[s.symbol for s in article.symbols] for article in session.scalars(select(Article))]
+
+
+def eager_feed(session):
+    query = select(Article).options(selectinload(Article.symbols))
+    return [[s.symbol for s in article.symbols] for article in session.scalars(query)]
+
+
+def test_fingerprint_collapses_literals():
+    """Statements differing only in literals or IN list length share a shape"""
+    print("🧪 Testing statement fingerprints...")
+    assert fingerprint("SELECT * FROM t WHERE id = 5 AND s = 'a'") == fingerprint("SELECT * FROM t WHERE id = 17 AND s = 'b'")
+    assert fingerprint("SELECT * FROM t WHERE id IN (?, ?)") == fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?, ?)")
+    assert fingerprint("SELECT a FROM t") != fingerprint("SELECT b FROM t")
+    print("✅ Statement fingerprints work")
+
+
+def test_strict_mode_fails_on_lazy_loading():
+    """Loading a relationship per row fails in strict mode; eager loading passes"""
+    print("🧪 Testing strict N+1 detection...")
+    engine = make_engine()
+
+    with Session(engine) as session:
+        try:
+            with track_queries(strict=True, label='lazy feed'):
+                lazy_feed(session)
+        except NPlusOneDetected as e:
+            assert 'test_query_tracker.py' in str(e) and 'FROM symbols' in str(e)
+        else:
+            raise AssertionError("per-row lazy loading was not detected")
+
+    with Session(engine) as session:
+        with track_queries(strict=True, label='eager feed') as log:
+            eager_feed(session)
+    assert log.count == 2 and log.repeated() == []
+    print("✅ Strict N+1 detection works")
+
+
+def test_requests_report_per_endpoint():
+    """Per-request counts are aggregated by route; N+1 requests are counted"""
+    print("🧪 Testing per-request tracking...")
+    engine = make_engine()
+    query_stats.reset()
+    app = Flask(__name__)
+    app.testing = True
+    init_query_tracking(app)
+
+    @app.route('/feed/<mode>')
+    def feed(mode):
+        with Session(engine) as session:
+            return jsonify(lazy_feed(session) if mode == 'lazy' else eager_feed(session))
+
+    client = app.test_client()
+    assert client.get('/feed/eager').status_code == 200
+    assert client.get('/feed/lazy').status_code == 200
+
+    stats = query_stats.get_stats()['/feed/<mode>']
+    assert stats['requests'] == 2 and stats['n_plus_one'] == 1
+    assert stats['max_queries'] == 21 and stats['queries'] == 23
+    assert 'flask_request_n_plus_one_total{route="/feed/<mode>"' in query_stats.render_prometheus()
+
+    saved = query_tracker.STRICT_MODE
+    query_tracker.STRICT_MODE = True
+    try:
+        client.get('/feed/lazy')
+    except NPlusOneDetected:
+        pass
+    else:
+        raise AssertionError("strict mode did not fail the request")
+    finally:
+        query_tracker.STRICT_MODE = saved
+    print("✅ Per-request tracking works")
+
+
+def test_failed_requests_are_cleaned_up():
+    """A view that raises is still counted and leaves no log behind on the thread"""
+    print("🧪 Testing failed requests...")
+    engine = make_engine(articles=3)
+    query_stats.reset()
+    app = Flask(__name__)
+    init_query_tracking(app)
+
+    @app.route('/broken')
+    def broken():
+        with Session(engine) as session:
+            lazy_feed(session)
+        raise RuntimeError("view failed")
+
+    assert app.test_client().get('/broken').status_code == 500
+    assert current_timings() is None and current_query_log() is None
+    stats = query_stats.get_stats()['/broken']
+    assert stats['requests'] == 1 and stats['queries'] == 4
+    print("✅ Failed requests are cleaned up")
+
+
+def test_prometheus_labels_are_escaped():
+    print("🧪 Testing Prometheus label escaping...")
+    query_stats.reset()
+    query_stats.observe('/q/"quoted"\\path', QueryLog(), [])
+    rendered = query_stats.render_prometheus()
+    assert 'route="/q/\\"quoted\\"\\\\path"' in rendered, rendered
+    query_stats.reset()
+    print("✅ Prometheus labels are escaped")
+
+
+if __name__ == "__main__":
+    test_fingerprint_collapses_literals()
+    test_strict_mode_fails_on_lazy_loading()
+    test_requests_report_per_endpoint()
+    test_failed_requests_are_cleaned_up()
+    test_prometheus_labels_are_escaped()
+    print("\n🎉 All query tracker tests passed!")
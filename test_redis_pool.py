@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared Redis connection pool and circuit breaker
+
+Verifies that the breaker opens after consecutive failures, fails fast while
+open, lets one half-open probe through after the cool-down and closes again
+on success. Runs without a Redis server.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from redis import ConnectionError as RedisConnectionError
+
+from app.utils.cache import redis_pool
+from app.utils.cache.redis_pool import CircuitBreaker, RedisPoolManager, NO_TIMEOUT
+
+
+def test_circuit_breaker_transitions():
+    """closed -> open -> half-open -> closed"""
+    print("🧪 Testing circuit breaker state transitions...")
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+
+    assert breaker.allow_request()
+    breaker.record_failure(ConnectionError("boom"))
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure(ConnectionError("boom"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Fails fast while open
+    assert not breaker.allow_request()
+    assert breaker.get_stats()['rejected_calls'] == 1
+
+    # One probe after the cool-down
+    time.sleep(0.25)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    print("✅ Circuit breaker transitions work")
+
+
+def test_failed_probe_reopens():
+    """A failing half-open probe re-opens the circuit immediately"""
+    print("🧪 Testing failed half-open probe...")
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.1)
+    breaker.force_open(ConnectionError("down"))
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    breaker.record_failure(ConnectionError("still down"))
+    assert breaker.state == CircuitBreaker.OPEN
+    print("✅ Failed probe re-opens the circuit")
+
+
+def test_pools_are_shared():
+    """Clients with the same settings share one pool; no connection is opened eagerly"""
+    print("🧪 Testing shared pool reuse...")
+    manager = RedisPoolManager()
+    manager._url = "redis://localhost:6379/0"
+
+    first = manager.get_client(decode_responses=True)
+    second = manager.get_client(decode_responses=True)
+    binary = manager.get_client(decode_responses=False)
+    listener = manager.get_client(decode_responses=True, socket_timeout=NO_TIMEOUT)
+
+    assert first.connection_pool is second.connection_pool
+    assert binary.connection_pool is not first.connection_pool
+    assert listener.connection_pool.connection_kwargs['socket_timeout'] is None
+    # An explicit db wins over the /0 in the URL
+    assert manager.get_client(db=2).connection_pool.connection_kwargs['db'] == 2
+    assert first.connection_pool.connection_kwargs['db'] == 0
+
+    stats = manager.get_stats()
+    assert len(stats['pools']) == 4
+    assert all(pool['created_connections'] == 0 for pool in stats['pools'])
+
+    manager.reset_after_fork()
+    assert manager.get_stats()['pools'] == []
+    print("✅ Pools are shared per process")
+
+
+class ProbeRedis:
+    """Answers GET with nothing, or raises while ``down``"""
+
+    def __init__(self, down=False):
+        self.down = down
+
+    def get(self, key):
+        if self.down:
+            raise RedisConnectionError("still down")
+        return None
+
+
+def test_guarded_clients_resolve_the_probe():
+    """A half-open probe through SP500Cache closes or re-opens the shared breaker"""
+    print("🧪 Testing breaker reporting from guarded clients...")
+    from app.utils.cache.sp500_cache import SP500Cache
+    original = redis_pool.redis_pool_manager.breaker
+    breaker = redis_pool.redis_pool_manager.breaker = CircuitBreaker(reset_timeout=0)
+    try:
+        cache = SP500Cache()
+        end = datetime.now()
+        for down, state in ((True, CircuitBreaker.OPEN), (False, CircuitBreaker.CLOSED)):
+            cache._redis_client = ProbeRedis(down)
+            breaker.force_open(RedisConnectionError("down"))
+            # The probe's own follow-up calls must not be turned away by the half-open state
+            assert cache.get_sp500_score(end - timedelta(days=365), end) is None
+            assert breaker.state == state, (down, breaker.state)
+    finally:
+        redis_pool.redis_pool_manager.breaker = original
+    print("✅ Guarded clients resolve the probe")
+
+
+if __name__ == "__main__":
+    test_circuit_breaker_transitions()
+    test_failed_probe_reopens()
+    test_pools_are_shared()
+    test_guarded_clients_resolve_the_probe()
+    print("\n🎉 All Redis pool tests passed!")
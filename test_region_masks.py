@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for precomputed search index region masks
+
+Uses an in-memory SQLite database.
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text
+
+from app import db
+from app.models import NewsSearchIndex
+from app.utils.search.news_regions import (
+    REGION_BITS, masks_with, region_classifier, region_mask, symbol_region
+)
+
+US, HK, CHINA, UK, JP = (REGION_BITS[region] for region in ('US', 'HK', 'CHINA', 'UK', 'JP'))
+
+
+@contextmanager
+def region_database():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from sqlalchemy.pool import StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                               'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    region_classifier.reset()
+    with app.app_context():
+        db.create_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+            region_classifier.reset()
+
+
+def add_index_row(session, row_id, symbols, source='Unknown Wire', classified=True):
+    session.add(NewsSearchIndex(
+        id=row_id, external_id=f'ext-{row_id}', title=f'Article {row_id}',
+        published_at=datetime(2026, 1, 1) - timedelta(hours=row_id), source=source,
+        symbols_json=json.dumps(symbols), ai_summary='Summary', ai_insights='Insights',
+        region_mask=region_mask(symbols, source) if classified else None,
+    ))
+
+
+def test_classification():
+    print("🧪 Testing symbol and article classification...")
+    assert symbol_region('NASDAQ:AAPL') == 'US' and symbol_region('MSFT') == 'US' and symbol_region('BRK.B') == 'US'
+    assert symbol_region('HKEX:700') == 'HK' and symbol_region('0700.HK') == 'HK'
+    assert symbol_region('SSE:600519') == 'CHINA' and symbol_region('000001.SZ') == 'CHINA'
+    assert symbol_region('LSE:SHEL') == 'UK' and symbol_region('TSE:7203') == 'JP'
+    assert symbol_region('COMEX:GC1!') is None and symbol_region('BINANCE:BTCUSDT') is None
+
+    assert region_mask([]) == 0
+    assert region_mask(['AAPL', 'HKEX:700']) == US | HK
+    assert region_mask([], 'SCMP') == CHINA | HK
+    assert region_mask(['TSE:7203'], 'BBC') == JP | UK
+
+    hk_masks = masks_with('hk')
+    assert len(hk_masks) == 16 and all(mask & HK for mask in hk_masks)
+    assert masks_with('OTHER') == [] and masks_with(None) == []
+    print("✅ Classification works")
+
+
+def test_backfill_and_legacy_fallback():
+    """Unclassified rows still match through the old patterns until backfilled"""
+    print("🧪 Testing region backfill...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with region_database() as database:
+        add_index_row(database.session, 1, ['NASDAQ:AAPL'])
+        add_index_row(database.session, 2, ['HKEX:700'])
+        add_index_row(database.session, 3, ['HKEX:700'], classified=False)
+        add_index_row(database.session, 4, ['NASDAQ:MSFT'], source='SCMP', classified=False)
+        add_index_row(database.session, 5, ['COMEX:GC1!'], classified=False)
+        database.session.commit()
+
+        search = OptimizedNewsSearch(database.session)
+        search.cache_enabled = False
+
+        def hk_ids():
+            articles, total, _ = search.search_by_symbols(['HKEX:700', 'NASDAQ:MSFT'], region_filter='HK')
+            return sorted(article['external_id'] for article in articles)
+
+        assert not region_classifier.all_classified(database.session)
+        assert hk_ids() == ['ext-2', 'ext-3', 'ext-4']
+
+        assert region_classifier.backfill(database.session, batch_size=2) == 3
+        assert region_classifier.backfill(database.session) == 0
+        masks = dict(database.session.query(NewsSearchIndex.external_id, NewsSearchIndex.region_mask))
+        assert masks == {'ext-1': US, 'ext-2': HK, 'ext-3': HK, 'ext-4': US | HK | CHINA, 'ext-5': 0}
+
+        assert region_classifier.all_classified(database.session)
+        assert hk_ids() == ['ext-2', 'ext-3', 'ext-4']
+        articles, total, _ = search.search_by_symbols(['NASDAQ:AAPL'], region_filter='OTHER')
+        assert total == 1
+    print("✅ Region backfill works")
+
+
+def test_region_filter_uses_index():
+    print("🧪 Testing region filter query plan...")
+    with region_database() as database:
+        for row_id in range(1, 201):
+            add_index_row(database.session, row_id, ['HKEX:700' if row_id % 10 == 0 else 'AAPL'])
+        database.session.commit()
+        assert region_classifier.all_classified(database.session)
+
+        query = database.session.query(NewsSearchIndex.id).filter(
+            region_classifier.region_condition(database.session, 'HK')
+        ).order_by(NewsSearchIndex.published_at.desc())
+        assert query.count() == 20
+        compiled = query.statement.compile(database.engine, compile_kwargs={'literal_binds': True})
+        plan = ' '.join(row[-1] for row in database.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')))
+        assert 'idx_search_region_published' in plan, plan
+    print("✅ Region filter uses idx_search_region_published")
+
+
+if __name__ == "__main__":
+    test_classification()
+    test_backfill_and_legacy_fallback()
+    test_region_filter_uses_index()
+    print("\n🎉 All region mask tests passed!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-request latency breakdown and /metrics output
+
+Uses a small Flask app with an in-memory SQLite engine; Redis and HTTP time
+are charged through the same helpers the instrumented clients use.
+"""
+
+import time
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+from app.utils.performance import request_profiler
+from app.utils.performance.request_profiler import (
+    init_request_profiling, route_metrics, timed, timed_connection_class, render_metrics
+)
+from app.utils.analyzer.stage_graph import StageGraph
+
+
+def make_app():
+    route_metrics.reset()
+    request_profiler.slow_profiles.clear()
+    app = Flask(__name__)
+    init_request_profiling(app)
+    engine = create_engine('sqlite://')
+
+    @app.route('/quote/<symbol>')
+    def quote(symbol):
+        with engine.connect() as conn:
+            conn.execute(text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000) "
+                              "SELECT sum(x) FROM c")).scalar()
+        with timed('redis'):
+            time.sleep(0.02)
+        with timed('http'):
+            time.sleep(0.05)
+        return jsonify({'symbol': symbol})
+
+    @app.route('/staged')
+    def staged():
+        # Stage threads charge the request that started the graph
+        graph = StageGraph('test')
+        graph.add('a', lambda results: _sleep_http(0.05))
+        graph.add('b', lambda results: _sleep_http(0.05))
+        graph.run()
+        return jsonify({'success': True})
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    return app
+
+
+def _sleep_http(seconds):
+    with timed('http'):
+        time.sleep(seconds)
+
+
+def _sum(component, route):
+    prefix = f'flask_request_seconds_sum{{route="{route}",method="GET",component="{component}"'
+    line = next(line for line in render_metrics().splitlines() if line.startswith(prefix))
+    return float(line.rsplit(' ', 1)[1])
+
+
+def test_breakdown_per_route():
+    """DB, Redis, HTTP, CPU and wall time are recorded under the route template"""
+    print("🧪 Testing latency breakdown...")
+    client = make_app().test_client()
+    assert client.get('/quote/AAPL').status_code == 200
+    assert client.get('/quote/MSFT').status_code == 200
+
+    route = '/quote/<symbol>'
+    assert _sum('db', route) > 0
+    assert 0.04 <= _sum('redis', route) < 0.1
+    assert 0.1 <= _sum('http', route) < 0.2
+    assert _sum('cpu', route) > 0
+    assert _sum('wall', route) >= _sum('db', route) + _sum('redis', route) + _sum('http', route)
+    assert f'flask_request_seconds_count{{route="{route}",method="GET",component="wall"' in render_metrics()
+    print("✅ Latency breakdown works")
+
+
+def test_stage_threads_charge_the_request():
+    """Time spent in StageGraph worker threads lands on the calling request"""
+    print("🧪 Testing stage thread accounting...")
+    client = make_app().test_client()
+    assert client.get('/staged').status_code == 200
+    # Two concurrent 50 ms stages: 100 ms of HTTP time inside ~50 ms of wall time
+    assert _sum('http', '/staged') >= 0.1
+    print("✅ Stage thread accounting works")
+
+
+def test_prometheus_histogram_format():
+    """Buckets are cumulative and end in +Inf equal to the count"""
+    print("🧪 Testing Prometheus output...")
+    client = make_app().test_client()
+    client.get('/quote/AAPL')
+    client.get('/fail')
+
+    output = render_metrics()
+    assert '# TYPE flask_request_seconds histogram' in output
+    assert 'flask_requests_total{route="/fail",method="GET",status="500"' in output
+    buckets = [line for line in output.splitlines()
+               if line.startswith('flask_request_seconds_bucket{route="/quote/<symbol>",method="GET",component="wall"')]
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 1
+    assert buckets[-1].split('le="')[1].startswith('+Inf')
+    print("✅ Prometheus output works")
+
+
+def test_slow_requests_are_profiled():
+    """Sampled requests over the slow threshold keep their profile"""
+    print("🧪 Testing slow request profiles...")
+    saved = (request_profiler.PROFILING_ENABLED, request_profiler.PROFILE_SAMPLE_RATE, request_profiler.SLOW_REQUEST_MS)
+    request_profiler.PROFILING_ENABLED, request_profiler.PROFILE_SAMPLE_RATE = True, 1.0
+    try:
+        client = make_app().test_client()
+        request_profiler.SLOW_REQUEST_MS = 10000
+        client.get('/quote/AAPL')
+        assert request_profiler.get_slow_profiles() == []
+
+        request_profiler.SLOW_REQUEST_MS = 10
+        client.get('/quote/AAPL')
+    finally:
+        request_profiler.PROFILING_ENABLED, request_profiler.PROFILE_SAMPLE_RATE, request_profiler.SLOW_REQUEST_MS = saved
+
+    profiles = request_profiler.get_slow_profiles()
+    assert len(profiles) == 1 and profiles[0]['route'] == '/quote/<symbol>'
+    assert 'quote' in profiles[0]['profile']
+    print("✅ Slow request profiles work")
+
+
+def test_timed_redis_connection_class():
+    """Pooled Redis connections charge their socket I/O to 'redis'"""
+    print("🧪 Testing timed Redis connections...")
+    from redis import Connection, SSLConnection
+    timed_cls = timed_connection_class(Connection)
+    assert issubclass(timed_cls, Connection) and timed_connection_class(Connection) is timed_cls
+    assert issubclass(timed_connection_class(SSLConnection), SSLConnection)
+    print("✅ Timed Redis connections work")
+
+
+if __name__ == "__main__":
+    test_breakdown_per_route()
+    test_stage_threads_charge_the_request()
+    test_prometheus_histogram_format()
+    test_slow_requests_are_profiled()
+    test_timed_redis_connection_class()
+    print("\n🎉 All request profiler tests passed!")
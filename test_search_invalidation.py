@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Test script for event-driven search cache invalidation
+
+Uses an in-memory SQLite database and a small in-memory stand-in for the
+Redis client, so it runs without a Redis server.
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from app import db
+from app.models import ArticleSymbol, NewsArticle, NewsSearchIndex
+from app.utils.cache.local_cache import local_cache
+from app.utils.cache.news_cache import NewsCache, NAMESPACE_NEWS_FEED, NAMESPACE_SEARCH
+from app.utils.cache.redis_pool import CircuitBreaker
+from app.utils.search import search_invalidation
+from app.utils.search.news_feeds import news_feeds
+from app.utils.search.search_index_sync import SearchIndexSyncService
+from app.utils.search.search_invalidation import (
+    KIND_SUGGESTION, TAG_ALL_RESULTS, IndexChange, index_change, keyword_search_tags,
+    keyword_terms, search_invalidator, symbol_search_tags, term_tag
+)
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+class InvalidationRedis:
+    """Minimal Redis stand-in covering strings, legacy tag sets and the tag and watched-term sorted sets"""
+
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+        self.zsets = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        self.ttls[key] = ex
+        return True
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def expire(self, key, seconds):
+        return True
+
+    def unlink(self, *keys):
+        return sum(1 for key in keys if any(data.pop(key, None) is not None
+                                            for data in (self.store, self.sets, self.zsets)))
+
+    def publish(self, channel, message):
+        return 0
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        doomed = [member for member, score in zset.items() if score <= float(high)]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    def zrange(self, key, start, end):
+        members = [member for member, _ in sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])]
+        return members[start:end + 1]
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+                if float(low) <= score <= float(high)]
+
+    def pipeline(self, transaction=True):
+        return InvalidationPipeline(self)
+
+
+class InvalidationPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def make_cache():
+    cache = NewsCache()
+    cache.redis = InvalidationRedis()
+    cache._breaker = CircuitBreaker()
+    cache.use_local_tier = False
+    cache._on_redis_success = lambda: None
+    local_cache.clear()
+    return cache
+
+
+@contextmanager
+def search_database():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from sqlalchemy.pool import StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                               'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    # Keep the materialized feeds out of the way so searches hit the result cache
+    feed_breaker = news_feeds._breaker
+    news_feeds._breaker = CircuitBreaker()
+    news_feeds._breaker.force_open()
+    with app.app_context():
+        db.create_all()
+        add_article(db.session, 1, ['NASDAQ:AAPL'], 'Apple beats estimates')
+        add_article(db.session, 2, ['NASDAQ:TSLA'], 'Tesla deliveries slow')
+        add_article(db.session, 3, ['HKEX:700'], 'Tencent gaming revenue')
+        db.session.commit()
+        db.session.add_all(NewsSearchIndex.create_from_article(article) for article in NewsArticle.query)
+        db.session.commit()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+            news_feeds._breaker = feed_breaker
+
+
+def add_article(session, article_id, symbols, title, source='Reuters'):
+    article = NewsArticle(
+        id=article_id, external_id=f'ext-{article_id}', title=title, source=source,
+        published_at=NOW - timedelta(hours=article_id),
+        ai_summary=f'{title} summary', ai_insights='Insights', ai_sentiment_rating=3,
+    )
+    article.symbols = [ArticleSymbol(symbol=symbol) for symbol in symbols]
+    session.add(article)
+    return article
+
+
+def cached_searches(session, cache):
+    """Run a spread of searches through the result cache; returns {name: cache key}"""
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    search = OptimizedNewsSearch(session)
+    search.cache, search.cache_enabled = cache, True
+    symbol_searches = {
+        'aapl': (['NASDAQ:AAPL'], None), 'tencent': (['HKEX:700'], None),
+        'hk': (None, 'HK'), 'all': (None, None),
+    }
+    keys = {}
+    for name, (symbols, region) in symbol_searches.items():
+        search.search_by_symbols(symbols, region_filter=region)
+        keys[name] = search._build_cache_key('standalone_symbol', symbols, None, 'LATEST', None, region, 'all', 1, 20)
+    for keyword in ('apple', 'tesla', 'gaming'):
+        search.search_by_keywords([keyword])
+        keys[keyword] = search._build_cache_key('standalone_keyword', [keyword], None, 'LATEST', None, 1, 20)
+    assert all(key in cache.redis.store for key in keys.values()), keys
+    return keys
+
+
+def test_tags_and_changes():
+    print("🧪 Testing tags and change events...")
+    assert symbol_search_tags(['nasdaq:aapl', 'MSFT']) == ['search:symbol:NASDAQ:AAPL', 'search:symbol:MSFT']
+    assert symbol_search_tags(None, 'hk') == ['search:region:HK']
+    assert symbol_search_tags([], 'OTHER') == [TAG_ALL_RESULTS]
+    assert keyword_terms(['Apple', '"rate cut"', 'latest', 'apple']) == ['apple', 'rate cut']
+    assert keyword_search_tags(['latest', 'highest']) == [TAG_ALL_RESULTS]
+
+    row = NewsSearchIndex(title='Fed signals Rate Cut', ai_summary='Markets rally', ai_insights='Bonds',
+                          source='Reuters', symbols_json=json.dumps(['NASDAQ:AAPL']), region_mask=0b1)
+    change = index_change([row])
+    assert change and change.rows == 1
+    assert change.symbols == {'NASDAQ:AAPL'} and change.regions == {'US'}
+    assert change.mentions('rate cut') and change.mentions('reuters') and change.mentions('aap')
+    assert not change.mentions('tesla')
+    assert not IndexChange()
+    print("✅ Tags and change events work")
+
+
+def test_tag_sets_are_trimmed():
+    """Members that expired on their own leave the tag set on the next write"""
+    print("🧪 Testing tag set trimming...")
+    cache = make_cache()
+    cache.set_json('short', 1, expire=1, tags=['busy'])
+    cache.set_json('long', 2, expire=3600, tags=['busy'])
+    tag_key = cache.tag_key('busy')
+    assert set(cache.redis.zsets[tag_key]) == {'short', 'long'}
+
+    cache.redis.zsets[tag_key]['short'] -= 10  # as if written ten seconds ago
+    cache.set_json('other', 3, expire=60, tags=['busy'])
+    assert set(cache.redis.zsets[tag_key]) == {'long', 'other'}
+
+    # Plain sets written before the switch are still honoured
+    cache.redis.sadd('tag:busy', 'legacy')
+    cache.redis.set('legacy', 4)
+    assert cache.invalidate_tags('busy') == 3
+    assert not {'long', 'other', 'legacy'} & set(cache.redis.store)
+    assert tag_key not in cache.redis.zsets and 'tag:busy' not in cache.redis.sets
+    print("✅ Tag sets are trimmed")
+
+
+def test_latest_searches_expire_quickly():
+    """Rolling "latest" windows get their own cache keys and the short TTL"""
+    print("🧪 Testing latest search TTLs...")
+    from app.utils.search.optimized_news_search import OptimizedNewsSearch
+    with search_database() as database:
+        cache = make_cache()
+        search = OptimizedNewsSearch(database.session)
+        search.cache, search.cache_enabled = cache, True
+
+        search.search_by_keywords(['apple'])
+        search.search_by_keywords(['apple'], force_latest_filter=True)
+        search.search_by_keywords(['latest'])
+        plain = search._build_cache_key('standalone_keyword', ['apple'], None, 'LATEST', None, 1, 20)
+        forced = search._build_cache_key('standalone_keyword', ['apple'], None, 'LATEST', None, 1, 20, 'force_latest')
+        latest = search._build_cache_key('standalone_keyword', ['latest'], None, 'LATEST', None, 1, 20)
+        assert plain != forced
+        assert cache.redis.ttls[plain] == search_invalidation.SEARCH_CACHE_TTL
+        assert cache.redis.ttls[forced] == search_invalidation.LATEST_SEARCH_CACHE_TTL
+        assert cache.redis.ttls[latest] == search_invalidation.LATEST_SEARCH_CACHE_TTL
+
+        search._has_latest_keyword = True
+        search.search_by_symbols(None)
+        window = search._build_cache_key('standalone_symbol', None, None, 'LATEST', None, None, 'all', 1, 20, 'latest')
+        assert cache.redis.ttls[window] == search_invalidation.LATEST_SEARCH_CACHE_TTL
+    print("✅ Latest searches expire quickly")
+
+
+def test_sync_drops_only_affected_entries():
+    """A synced Apple article drops Apple, US and unfiltered results; Tesla and Tencent stay cached"""
+    print("🧪 Testing targeted invalidation on sync...")
+    with search_database() as database:
+        cache = make_cache()
+        keys = cached_searches(database.session, cache)
+        search_generation = cache.get_generation(NAMESPACE_SEARCH)
+        feed_generation = cache.get_generation(NAMESPACE_NEWS_FEED)
+
+        article = add_article(database.session, 10, ['NASDAQ:AAPL'], 'Apple unveils new chip')
+        database.session.commit()
+        sync = SearchIndexSyncService(database.session)
+        sync.cache = cache
+        assert sync.sync_article(article)
+
+        dropped = {name for name, key in keys.items() if key not in cache.redis.store}
+        assert dropped == {'aapl', 'all', 'apple'}, dropped
+        assert cache.get_generation(NAMESPACE_SEARCH) == search_generation
+        assert cache.get_generation(NAMESPACE_NEWS_FEED) == feed_generation + 1
+    print("✅ Sync drops only affected entries")
+
+
+def test_update_drops_entries_for_old_state():
+    """An article that stops mentioning a keyword leaves that keyword's results too"""
+    print("🧪 Testing invalidation of an article's previous state...")
+    with search_database() as database:
+        cache = make_cache()
+        keys = cached_searches(database.session, cache)
+
+        article = database.session.get(NewsArticle, 2)
+        article.title = 'EV deliveries slow'
+        article.ai_summary = 'Deliveries summary'
+        database.session.commit()
+        sync = SearchIndexSyncService(database.session)
+        sync.cache = cache
+        assert sync.sync_multiple_articles([article])['updated'] == 1
+
+        dropped = {name for name, key in keys.items() if key not in cache.redis.store}
+        assert dropped == {'all', 'tesla'}, dropped
+    print("✅ Previous state is invalidated")
+
+
+def test_suggestions_and_overflow():
+    print("🧪 Testing suggestion terms and the watched-term limit...")
+    with search_database() as database:
+        cache = make_cache()
+        for query in ('tenc', 'nvid'):
+            cache.set_json(f'suggest:{query}', ['s'], tags=[term_tag(KIND_SUGGESTION, query)])
+        search_invalidator.watch(cache, KIND_SUGGESTION, ['tenc', 'nvid'])
+
+        change = index_change(NewsSearchIndex.query.filter_by(external_id='ext-3'))
+        assert search_invalidator.handle(cache, change) >= 1
+        assert 'suggest:tenc' not in cache.redis.store and 'suggest:nvid' in cache.redis.store
+
+        original = search_invalidation.MAX_WATCHED_TERMS
+        search_invalidation.MAX_WATCHED_TERMS = 1
+        try:
+            search_invalidator.watch(cache, KIND_SUGGESTION, ['tenc', 'amzn'])
+            generation = cache.get_generation('suggestion')
+            search_invalidator.handle(cache, change)
+            assert cache.get_generation('suggestion') == generation + 1
+        finally:
+            search_invalidation.MAX_WATCHED_TERMS = original
+
+        cache._breaker.force_open()
+        assert search_invalidator.handle(cache, change) == 0
+        assert search_invalidator.handle(None, change) == 0
+    print("✅ Suggestion terms and overflow work")
+
+
+if __name__ == "__main__":
+    test_tags_and_changes()
+    test_tag_sets_are_trimmed()
+    test_latest_searches_expire_quickly()
+    test_sync_drops_only_affected_entries()
+    test_update_drops_entries_for_old_state()
+    test_suggestions_and_overflow()
+    print("\n🎉 All search invalidation tests passed!")
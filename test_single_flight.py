@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight coalescing of concurrent cache misses
+
+Uses a thread-safe in-memory stand-in for Redis so several SingleFlight
+instances can play the part of separate gunicorn workers.
+"""
+
+import time
+import threading
+
+from app.utils.cache.single_flight import SingleFlight
+from app.utils.cache.redis_pool import CircuitBreaker, redis_pool_manager
+
+
+class SharedRedis:
+    """Just enough of SET NX / GET / EVAL / PUBLISH / pub-sub for the lock protocol"""
+
+    def __init__(self):
+        self.store = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.store:
+                return None
+            self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+            return True
+
+    def get(self, key):
+        with self.lock:
+            return self.store.get(key)
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.store.get(key) == token.encode():
+                del self.store[key]
+                return 1
+            return 0
+
+    def publish(self, channel, message):
+        return 0
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return SharedPubSub()
+
+    def pipeline(self, transaction=True):
+        return SharedPipeline(self)
+
+
+class SharedPubSub:
+    def subscribe(self, channel):
+        pass
+
+    def get_message(self, timeout=0):
+        time.sleep(min(timeout, 0.05))
+        return None
+
+    def close(self):
+        pass
+
+
+class SharedPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def make_flight(redis_client=None):
+    flight = SingleFlight()
+    flight._breaker = CircuitBreaker()
+    if redis_client is None:
+        flight._breaker.force_open()
+    else:
+        flight._redis = redis_client
+    return flight
+
+
+def run_concurrently(flights, key, fn, per_flight=4):
+    results = []
+    threads = [
+        threading.Thread(target=lambda f=flight: results.append(f.do(key, fn)))
+        for flight in flights for _ in range(per_flight)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_threads_share_one_call():
+    """Concurrent callers in one worker trigger a single computation"""
+    print("🧪 Testing in-process coalescing...")
+    flight = make_flight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'rows': 252}
+
+    results = run_concurrently([flight], 'history:AAPL', compute, per_flight=8)
+
+    assert len(calls) == 1
+    assert results == [{'rows': 252}] * 8
+    assert flight.get_stats()['local_joins'] == 7
+    print("✅ In-process coalescing works")
+
+
+def test_workers_share_one_call():
+    """Separate workers coordinate through the Redis lock and result handoff"""
+    print("🧪 Testing cross-worker coalescing...")
+    redis_client = SharedRedis()
+    workers = [make_flight(redis_client) for _ in range(3)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return [1.0, 2.0, 3.0]
+
+    results = run_concurrently(workers, 'analysis:abc', compute, per_flight=3)
+
+    assert len(calls) == 1
+    assert results == [[1.0, 2.0, 3.0]] * 9
+    assert sum(worker.get_stats()['remote_joins'] for worker in workers) == 2
+    # The lock is released once the result is handed over
+    assert redis_client.get('sf:lock:analysis:abc') is None
+    print("✅ Cross-worker coalescing works")
+
+
+def test_errors_propagate_and_release():
+    """A failing leader releases the key so the next call can retry"""
+    print("🧪 Testing leader failure...")
+    flight = make_flight(SharedRedis())
+
+    def fail():
+        raise ValueError("No historical data found")
+
+    try:
+        flight.do('history:BAD', fail)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    assert flight.do('history:BAD', lambda: 'recovered') == 'recovered'
+    assert flight._redis.get('sf:lock:history:BAD') is None
+    print("✅ Leader failure handled")
+
+
+def test_lazy_client_and_probe():
+    """No Redis client until first use; a half-open probe closes the circuit on success"""
+    print("🧪 Testing lazy client and probe reporting...")
+    pools = dict(redis_pool_manager._pools)
+    flight = SingleFlight()
+    assert '_redis' not in vars(flight)
+    assert redis_pool_manager._pools == pools
+
+    flight._redis = SharedRedis()
+    flight._breaker = CircuitBreaker(reset_timeout=0)
+    flight._breaker.force_open()
+    assert flight.do('history:PROBE', lambda: 'ok') == 'ok'
+    assert flight._breaker.state == CircuitBreaker.CLOSED
+    print("✅ Lazy client and probe reporting work")
+
+
+if __name__ == "__main__":
+    test_threads_share_one_call()
+    test_workers_share_one_call()
+    test_errors_propagate_and_release()
+    test_lazy_client_and_probe()
+    print("\n🎉 All single-flight tests passed!")
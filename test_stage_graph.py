@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the analysis stage graph
+
+Stages are plain functions that sleep or fail, so it runs without Redis,
+MySQL or market data.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.analyzer import stage_graph
+from app.utils.analyzer.stage_graph import StageGraph, StageTimeout, get_stage_timing_stats
+
+
+def sleeper(seconds, value):
+    def stage(results):
+        time.sleep(seconds)
+        return value
+    return stage
+
+
+def test_independent_stages_run_concurrently():
+    """Three 0.3s fetches finish in about 0.3s, and dependents see their results"""
+    print("🧪 Testing concurrent stages...")
+    graph = StageGraph(label='test')
+    graph.add('prices', sleeper(0.3, [1, 2, 3]))
+    graph.add('metrics', sleeper(0.3, 'metrics'), required=False)
+    graph.add('benchmark', sleeper(0.3, 'benchmark'), required=False)
+    graph.add('analysis', lambda results: (sum(results['prices']), results['metrics']),
+              deps=('prices', 'metrics', 'benchmark'))
+
+    started = time.monotonic()
+    results = graph.run()
+    elapsed = time.monotonic() - started
+
+    assert results['analysis'] == (6, 'metrics')
+    assert elapsed < 0.6, f"stages ran serially ({elapsed:.2f}s)"
+    assert all(results.ok(name) for name in ('prices', 'metrics', 'benchmark', 'analysis'))
+    assert results.timings['prices']['ms'] >= 300
+    assert '_total' in results.timings
+    print("✅ Concurrent stages work")
+
+
+def test_optional_stage_timeout_uses_default():
+    """A slow optional stage is abandoned and its dependents go on with the default"""
+    print("🧪 Testing optional stage timeout...")
+    graph = StageGraph(label='test')
+    graph.add('prices', sleeper(0.05, 'prices'))
+    graph.add('metrics', sleeper(2, 'late'), timeout=0.2, required=False, default=None)
+    graph.add('analysis', lambda results: (results['prices'], results['metrics']), deps=('prices', 'metrics'))
+
+    started = time.monotonic()
+    results = graph.run()
+
+    assert time.monotonic() - started < 1
+    assert results['analysis'] == ('prices', None)
+    assert results.timings['metrics']['status'] == 'timeout'
+    assert not results.ok('metrics')
+    assert get_stage_timing_stats()['metrics']['timeouts'] >= 1
+    print("✅ Optional stage timeout works")
+
+
+def test_required_stage_failures_propagate():
+    """A failing or slow required stage fails the run; optional errors do not"""
+    print("🧪 Testing required stage failures...")
+
+    def no_data(results):
+        raise ValueError("No historical data found for ZZZZ")
+
+    graph = StageGraph(label='test')
+    graph.add('prices', no_data)
+    graph.add('metrics', no_data, required=False, default='fallback')
+    graph.add('analysis', lambda results: 'unreachable', deps=('prices', 'metrics'))
+    try:
+        graph.run()
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert 'No historical data' in str(e)
+
+    graph = StageGraph(label='test')
+    graph.add('prices', sleeper(2, 'late'), timeout=0.1)
+    try:
+        graph.run()
+        assert False, "expected StageTimeout"
+    except StageTimeout:
+        pass
+
+    graph = StageGraph(label='test')
+    graph.add('metrics', no_data, required=False, default='fallback')
+    graph.add('analysis', lambda results: results['metrics'], deps=('metrics',))
+    assert graph.run()['analysis'] == 'fallback'
+    print("✅ Required stage failures work")
+
+
+def test_unknown_dependency_is_rejected():
+    """Stages may only depend on stages added before them, which keeps the graph acyclic"""
+    print("🧪 Testing dependency validation...")
+    graph = StageGraph(label='test')
+    try:
+        graph.add('analysis', lambda results: None, deps=('prices',))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Dependency validation works")
+
+
+def test_done_when_skips_unneeded_stages():
+    """A memoized hit returns once the prices are in, without waiting on slow optional fetches"""
+    print("🧪 Testing early finish...")
+    graph = StageGraph(label='test')
+    graph.add('prices', sleeper(0.05, 'prices'))
+    graph.add('benchmark', sleeper(1, 'benchmark'), required=False)
+    graph.add('memoized', lambda results: 'figure', deps=('prices',))
+    graph.add('analysis', lambda results: 'computed', deps=('memoized', 'benchmark'))
+
+    started = time.monotonic()
+    results = graph.run(done_when=lambda results: results.get('memoized') is not None)
+    assert time.monotonic() - started < 0.5
+    assert results['memoized'] == 'figure' and 'analysis' not in results
+    assert results.timings['_total']['status'] == 'ok'
+    print("✅ Early finish works")
+
+
+def test_timeout_starts_when_stage_runs():
+    """Time spent queued behind other stages does not count against a stage's timeout"""
+    print("🧪 Testing stage timeouts against queueing...")
+    original = stage_graph._executors._stage_pool
+    stage_graph._executors._stage_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        graph = StageGraph(label='test')
+        graph.add('prices', sleeper(0.3, 'prices'))
+        graph.add('metrics', sleeper(0.05, 'metrics'), timeout=0.2)
+        results = graph.run()
+    finally:
+        stage_graph._executors._stage_pool.shutdown(wait=False)
+        stage_graph._executors._stage_pool = original
+    assert results.ok('metrics'), results.timings
+    assert results.timings['metrics']['queued_ms'] >= 250 and results.timings['metrics']['ms'] < 200
+    print("✅ Stage timeouts start when the stage runs")
+
+
+if __name__ == "__main__":
+    test_independent_stages_run_concurrently()
+    test_optional_stage_timeout_uses_default()
+    test_required_stage_failures_propagate()
+    test_unknown_dependency_is_rejected()
+    test_done_when_skips_unneeded_stages()
+    test_timeout_starts_when_stage_runs()
+    print("\n🎉 All stage graph tests passed!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for stale-while-revalidate cache entries
+
+Uses a dict-backed stand-in for the cache and no Redis server; the refresh
+lease is skipped while the circuit breaker is open.
+"""
+
+import time
+import threading
+
+from flask import Flask, g
+
+from app.utils.cache import stale_while_revalidate as swr
+from app.utils.cache.stale_while_revalidate import (
+    RefreshScheduler, mark_fresh_for, staleness, apply_staleness_headers, served_staleness,
+    FRESH_UNTIL_FIELD, STORED_AT_FIELD
+)
+from app.utils.cache.redis_pool import CircuitBreaker
+from app.utils.cache.company_info_cache import CompanyInfoCache
+
+
+class DictCache:
+    """The get_many/set_many subset of StockCache used by CompanyInfoCache"""
+
+    def __init__(self):
+        self.store = {}
+        self.expirations = {}
+
+    def get_many(self, keys):
+        return {key: self.store[key] for key in keys if key in self.store}
+
+    def set_many(self, mapping, expire=3600):
+        self.store.update(mapping)
+        self.expirations.update(expire)
+
+
+def make_scheduler(**kwargs):
+    scheduler = RefreshScheduler(**kwargs)
+    scheduler._breaker = CircuitBreaker()
+    scheduler._breaker.force_open()
+    return scheduler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_soft_deadline():
+    """Payloads turn stale after the soft TTL; unstamped payloads count as fresh"""
+    print("🧪 Testing soft deadlines...")
+    assert staleness(mark_fresh_for({}, 60))['status'] == 'fresh'
+    assert staleness(mark_fresh_for({}, -1))['status'] == 'stale'
+    assert staleness({'data': []}) == {'status': 'fresh', 'age_seconds': None}
+    assert swr.hard_ttl(300) == 300 * swr.HARD_TTL_FACTOR
+    print("✅ Soft deadlines work")
+
+
+def test_refreshes_are_deduplicated_and_bounded():
+    """One refresh per key at a time; a full queue drops new refreshes"""
+    print("🧪 Testing refresh deduplication...")
+    scheduler = make_scheduler(max_workers=2, max_pending=2)
+    release = threading.Event()
+    runs = []
+
+    def slow_refresh():
+        runs.append(1)
+        release.wait(5)
+
+    assert scheduler.schedule('a', slow_refresh)
+    assert scheduler.schedule('a', slow_refresh)
+    assert scheduler.schedule('b', slow_refresh)
+    assert not scheduler.schedule('c', slow_refresh)
+    release.set()
+
+    assert wait_for(lambda: scheduler.get_stats()['pending'] == 0)
+    stats = scheduler.get_stats()
+    assert len(runs) == 2
+    assert stats['deduplicated'] == 1
+    assert stats['dropped'] == 1
+    assert stats['completed'] == 2
+    print("✅ Refresh deduplication works")
+
+
+def test_company_info_served_stale_while_refreshing():
+    """A stale category is returned at once and refreshed in the background"""
+    print("🧪 Testing stale company info...")
+    original_scheduler = swr.refresh_scheduler
+    swr.refresh_scheduler = make_scheduler()
+    try:
+        company_cache = CompanyInfoCache()
+        company_cache.cache = DictCache()
+        fetched = threading.Event()
+        company_cache._fetch_from_yfinance = lambda ticker, categories: (
+            fetched.set() or {'currentPrice': 200.0}
+        )
+
+        company_cache._cache_by_categories('AAPL', {'currentPrice': 100.0})
+        key = 'company:market_data:AAPL'
+        assert company_cache.cache.expirations[key] == swr.hard_ttl(300)
+        company_cache.cache.store[key][FRESH_UNTIL_FIELD] = time.time() - 1
+
+        app = Flask(__name__)
+        with app.test_request_context('/'):
+            info = company_cache.get_market_data('AAPL')
+            assert info['currentPrice'] == 100.0
+            assert served_staleness('company_info')['status'] == 'stale'
+            assert served_staleness('company_info')['refreshing'] is True
+
+        # Soft-deadline stamps and staleness stay out of the data handed to templates and scoring
+        assert not {STORED_AT_FIELD, FRESH_UNTIL_FIELD, '_staleness'} & set(info)
+        assert not {STORED_AT_FIELD, FRESH_UNTIL_FIELD} & set(company_cache.get_cached_company_info_many(['AAPL'])['AAPL'])
+        assert fetched.wait(5)
+        assert wait_for(lambda: company_cache.cache.store[key]['currentPrice'] == 200.0)
+        with app.test_request_context('/'):
+            company_cache.get_market_data('AAPL')
+            assert served_staleness('company_info')['status'] == 'fresh'
+    finally:
+        swr.refresh_scheduler = original_scheduler
+    print("✅ Stale company info works")
+
+
+def test_staleness_headers():
+    """Responses report the stalest data the request served"""
+    print("🧪 Testing staleness headers...")
+    app = Flask(__name__)
+    with app.test_request_context('/'):
+        swr.record_staleness('stock_data', {'status': 'fresh', 'age_seconds': 10.0})
+        swr.record_staleness('company_info', {'status': 'stale', 'age_seconds': 420.5})
+        response = apply_staleness_headers(app.response_class('ok'))
+        assert response.headers['X-Cache-Status'] == 'stale'
+        assert response.headers['X-Cache-Age'] == '420'
+        assert 'cache_staleness' in g
+
+    with app.test_request_context('/'):
+        response = apply_staleness_headers(app.response_class('ok'))
+        assert 'X-Cache-Status' not in response.headers
+    print("✅ Staleness headers work")
+
+
+if __name__ == "__main__":
+    test_soft_deadline()
+    test_refreshes_are_deduplicated_and_bounded()
+    test_company_info_served_stale_while_refreshing()
+    test_staleness_headers()
+    print("\n🎉 All stale-while-revalidate tests passed!")
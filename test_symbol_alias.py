@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for canonical symbols and symbol aliases
+
+Uses an in-memory SQLite database seeded from the real tickers.ts.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event, text
+
+from app import db
+from app.models import ArticleSymbol, CanonicalSymbol, NewsArticle, SymbolAlias
+from app.utils.search.symbol_alias import (
+    alias_forms, canonical_symbol, link_article_symbols, load_ticker_file, symbol_registry
+)
+
+
+@contextmanager
+def symbol_database():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from sqlalchemy.pool import StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': StaticPool,
+                                               'connect_args': {'check_same_thread': False}}
+    db.init_app(app)
+    symbol_registry.reset()
+    with app.app_context():
+        # pysqlite's own transaction handling breaks SAVEPOINT rollbacks; let SQLAlchemy emit BEGIN
+        event.listen(db.engine, 'connect', lambda connection, _: setattr(connection, 'isolation_level', None))
+        event.listen(db.engine, 'begin', lambda connection: connection.exec_driver_sql('BEGIN'))
+        db.engine.dispose()
+        db.create_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+            symbol_registry.reset()
+
+
+def add_article(session, article_id, symbols, symbol_ids=None):
+    article = NewsArticle(
+        id=article_id, external_id=f'ext-{article_id}', title=f'Article {article_id}',
+        published_at=datetime(2026, 1, 1) - timedelta(hours=article_id),
+        ai_summary='Summary', ai_insights='Insights',
+    )
+    symbol_ids = symbol_ids or {}
+    article.symbols = [ArticleSymbol(symbol=symbol, symbol_id=symbol_ids.get(symbol)) for symbol in symbols]
+    session.add(article)
+
+
+def test_canonical_forms():
+    print("🧪 Testing canonical symbol forms...")
+    cases = {
+        'AAPL': 'AAPL', 'nasdaq:aapl': 'AAPL', 'NYSE:IBM': 'IBM',
+        'HKEX:700': '0700.HK', '700': '0700.HK', '0700': '0700.HK', '700.HK': '0700.HK', '00700': '0700.HK',
+        'SSE:600519': '600519.SS', '600519': '600519.SS', 'SZSE:000001': '000001.SZ', '000001': '000001.SZ',
+        'TSE:7203': '7203.T', 'LSE:SHEL': 'SHEL.L',
+        'COMEX:GC1!': 'GC=F', 'XAUUSD': 'GC=F', 'TVC:SILVER': 'SI=F', 'NYMEX:CL1!': 'CL=F',
+    }
+    for raw, expected in cases.items():
+        assert canonical_symbol(raw) == expected, (raw, canonical_symbol(raw))
+
+    # Every alias we register maps back to its symbol, for every ticker we ship
+    tickers = load_ticker_file()
+    assert len(tickers) > 800
+    for symbol in list(tickers) + ['GC=F', 'SI=F', 'CL=F']:
+        canonical = canonical_symbol(symbol)
+        for alias in alias_forms(canonical):
+            assert canonical_symbol(alias) == canonical, (symbol, alias)
+    print("✅ Canonical symbol forms work")
+
+
+def test_seed_and_resolve():
+    print("🧪 Testing seeding from tickers.ts...")
+    with symbol_database() as database:
+        created = symbol_registry.seed_from_tickers(database.session)
+        assert created > 800
+        assert symbol_registry.seed_from_tickers(database.session) == 0  # idempotent
+
+        ids = symbol_registry.resolve(database.session, ['HKEX:700', '700', '0700.HK', 'AAPL', 'NASDAQ:AAPL', 'NOPE'])
+        assert ids['HKEX:700'] == ids['700'] == ids['0700.HK']
+        assert ids['AAPL'] == ids['NASDAQ:AAPL'] != ids['700']
+        assert 'NOPE' not in ids
+        assert database.session.get(CanonicalSymbol, ids['AAPL']).name == 'Apple Inc.'
+
+        # Unknown symbols are registered on demand, with their aliases
+        new_ids = link_article_symbols(database.session, ['NYSE:NEWCO'])
+        database.session.commit()
+        assert database.session.get(SymbolAlias, 'NEWCO').symbol_id == new_ids['NYSE:NEWCO']
+        symbol_registry.reset()
+        assert symbol_registry.resolve(database.session, ['NASDAQ:NEWCO']) == {'NASDAQ:NEWCO': new_ids['NYSE:NEWCO']}
+    print("✅ Seeding from tickers.ts works")
+
+
+def test_new_ids_cached_after_commit():
+    """Ids created in a transaction that rolls back never reach the process-wide cache"""
+    print("🧪 Testing symbol id caching across commit and rollback...")
+    with symbol_database() as database:
+        session = database.session
+        first = link_article_symbols(session, ['NYSE:GONE'])['NYSE:GONE']
+        assert symbol_registry.resolve(session, ['GONE']) == {'GONE': first}
+        assert 'GONE' not in symbol_registry._ids
+        session.rollback()
+        assert symbol_registry.resolve(session, ['GONE']) == {}
+
+        kept = link_article_symbols(session, ['NYSE:KEPT'])['NYSE:KEPT']
+        # A failed savepoint inside the transaction does not discard the pending ids
+        try:
+            with session.begin_nested():
+                session.add(CanonicalSymbol(symbol='KEPT'))
+                session.flush()
+        except Exception:
+            pass
+        session.commit()
+        assert symbol_registry._ids['NYSE:KEPT'] == kept
+        assert session.get(SymbolAlias, 'KEPT').symbol_id == kept
+    print("✅ Symbol ids are cached only after commit")
+
+
+def test_symbol_search_by_canonical_id():
+    """Articles stored under any spelling are found by any other spelling, via the covering index"""
+    print("🧪 Testing canonical symbol search...")
+    from app.utils.search.news_search import NewsSearch
+    with symbol_database() as database:
+        session = database.session
+        add_article(session, 1, ['HKEX:700'])  # legacy row, linked by the backfill
+        add_article(session, 2, ['0700.HK'], link_article_symbols(session, ['0700.HK']))
+        add_article(session, 3, ['AAPL'], link_article_symbols(session, ['AAPL']))
+        session.commit()
+
+        # Before the backfill, unlinked rows are still found by their raw string
+        assert not symbol_registry.links_complete(session)
+        ids = {row.article_id for row in symbol_registry.article_ids_query(session, ['HKEX:700'])}
+        assert ids == {1, 2}
+
+        assert symbol_registry.backfill_article_symbols(session) == 1
+        assert symbol_registry.links_complete(session)
+        query = symbol_registry.article_ids_query(session, ['700'])
+        assert {row.article_id for row in query} == {1, 2}
+
+        statement = str(query.statement.compile(compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[3] for row in session.execute(text('EXPLAIN QUERY PLAN ' + statement)))
+        assert 'COVERING INDEX idx_symbol_id_article' in plan, plan
+
+        search = NewsSearch(session)
+        search.cache_enabled = False
+        articles, total, _ = search.optimized_symbol_search(['HKEX:0700'])
+        assert total == 2 and [article['id'] for article in articles] == [1, 2]
+    print("✅ Canonical symbol search works")
+
+
+if __name__ == "__main__":
+    test_canonical_forms()
+    test_seed_and_resolve()
+    test_new_ids_cached_after_commit()
+    test_symbol_search_by_canonical_id()
+    print("\n🎉 All symbol alias tests passed!")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process LRU tier in front of Redis
+
+Checks byte-bounded LRU eviction, TTL expiry, pub/sub invalidation handling,
+the per-tier hit ratio stats, that local hits hand out private copies and
+leave the circuit breaker's half-open probe alone. Runs without a Redis server.
+"""
+
+import json
+import time
+
+from app.utils.cache.local_cache import LocalLRUCache, TierStats, CacheInvalidationBus, local_cache
+from app.utils.cache.news_cache import NewsCache
+from app.utils.cache.redis_pool import CircuitBreaker
+
+
+class TierRedis:
+    """GET / SET / PUBLISH, shared by the text and binary clients"""
+
+    def __init__(self):
+        self.store = {}
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+        return True
+
+    def publish(self, channel, message):
+        return 0
+
+
+def test_lru_eviction_by_bytes():
+    """Oldest entries are evicted once the byte budget is exceeded"""
+    print("🧪 Testing byte-bounded LRU eviction...")
+    cache = LocalLRUCache(max_bytes=100, max_item_bytes=60, default_ttl=60)
+
+    cache.set('a', {'v': 1}, 40)
+    cache.set('b', {'v': 2}, 40)
+    assert cache.get('a', None) == {'v': 1}  # 'a' becomes most recently used
+    cache.set('c', {'v': 3}, 40)             # evicts 'b'
+
+    assert cache.get('b', None) is None
+    assert cache.get('a', None) == {'v': 1}
+    assert cache.get('c', None) == {'v': 3}
+    assert cache.get_stats()['bytes'] <= 100
+
+    # Items over the per-item limit never enter the local tier
+    assert not cache.set('big', 'x' * 100, 100)
+    assert cache.get('big', None) is None
+    print("✅ LRU eviction works")
+
+
+def test_ttl_expiry():
+    """Entries expire after their TTL, capped by the tier default"""
+    print("🧪 Testing TTL expiry...")
+    cache = LocalLRUCache(max_bytes=1000, max_item_bytes=1000, default_ttl=60)
+    cache.set('short', 'value', 5, ttl=1)
+    assert cache.get('short', None) == 'value'
+    time.sleep(1.1)
+    assert cache.get('short', None) is None
+    print("✅ TTL expiry works")
+
+
+def test_invalidation_messages():
+    """Messages from other workers evict keys and patterns, own messages are ignored"""
+    print("🧪 Testing pub/sub invalidation handling...")
+    cache = LocalLRUCache(max_bytes=1000, max_item_bytes=1000, default_ttl=60)
+    bus = CacheInvalidationBus(cache)
+
+    cache.set('stock:info:AAPL', {'name': 'Apple'}, 20)
+    cache.set('stock:info:MSFT', {'name': 'Microsoft'}, 20)
+    cache.set('user:id:1', {'id': 1}, 10)
+
+    own = json.dumps({'origin': bus.origin, 'keys': ['user:id:1']})
+    assert bus.handle_message(own) == 0
+    assert cache.get('user:id:1', None) == {'id': 1}
+
+    other = json.dumps({'origin': 'other-worker', 'keys': ['user:id:1']})
+    assert bus.handle_message(other) == 1
+    assert cache.get('user:id:1', None) is None
+
+    pattern = json.dumps({'origin': 'other-worker', 'pattern': 'stock:info:*'}).encode()
+    assert bus.handle_message(pattern) == 2
+    assert cache.get_stats()['entries'] == 0
+
+    assert bus.handle_message('not json') == 0
+    print("✅ Invalidation handling works")
+
+
+def test_tier_stats():
+    """Hit ratios are reported per tier"""
+    print("🧪 Testing per-tier hit ratio stats...")
+    stats = TierStats()
+    for tier in ['local', 'local', 'redis', 'miss']:
+        stats.record(tier)
+
+    snapshot = stats.snapshot()
+    assert snapshot['lookups'] == 4
+    assert snapshot['local_hit_ratio'] == 0.5
+    assert snapshot['redis_hit_ratio'] == 0.5
+    assert snapshot['overall_hit_ratio'] == 0.75
+    print("✅ Tier stats work")
+
+
+def test_local_hits_are_private_copies():
+    """Mutating a value read from the local tier does not change what others read"""
+    print("🧪 Testing local tier copies...")
+    cache = NewsCache()
+    cache.redis = cache.binary_redis = TierRedis()
+    cache._breaker = CircuitBreaker()
+    cache.use_local_tier = True
+    cache._on_redis_success = lambda: None
+    local_cache.clear()
+    try:
+        cache.set_json('api_calls:today', {'count': 1})
+        counter = cache.get_json('api_calls:today')
+        counter['count'] += 1
+        assert cache.get_json('api_calls:today') == {'count': 1}
+        assert cache.get_many(['api_calls:today'])['api_calls:today'] == {'count': 1}
+
+        cache.set_object('perf:AAPL', {'total_requests': 3, 'timings': [1.0]})
+        perf = cache.get_object('perf:AAPL')
+        perf['total_requests'] += 1
+        perf['timings'].append(2.0)
+        assert cache.get_object('perf:AAPL') == {'total_requests': 3, 'timings': [1.0]}
+        # All of it was served by the local tier
+        assert cache.redis.gets == 0
+    finally:
+        local_cache.clear()
+    print("✅ Local tier hands out copies")
+
+
+def test_probe_is_claimed_by_redis_calls():
+    """Availability checks and local hits leave the half-open probe to a real Redis call"""
+    print("🧪 Testing half-open probe claims...")
+    cache = NewsCache()
+    cache.redis = cache.binary_redis = TierRedis()
+    breaker = cache._breaker = CircuitBreaker(reset_timeout=0)
+    cache.use_local_tier = True
+    cache._on_redis_success = breaker.record_success
+    local_cache.clear()
+    try:
+        cache.set_json('quote:AAPL', {'price': 190.0})
+        breaker.force_open()
+        assert not cache.redis_available
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # Another request holds the probe: local hits are still served, Redis is not touched
+        assert breaker.allow_request()
+        assert cache.get_json('quote:AAPL') == {'price': 190.0}
+        assert cache.get_json('quote:MSFT') is None
+        assert cache.redis.gets == 0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        # The first call that talks to Redis takes the probe and closes the circuit
+        breaker.force_open()
+        assert cache.set_json('quote:MSFT', {'price': 420.0})
+        assert breaker.state == CircuitBreaker.CLOSED
+    finally:
+        local_cache.clear()
+    print("✅ Half-open probe claims work")
+
+
+if __name__ == "__main__":
+    test_lru_eviction_by_bytes()
+    test_ttl_expiry()
+    test_invalidation_messages()
+    test_tier_stats()
+    test_local_hits_are_private_copies()
+    test_probe_is_claimed_by_redis_calls()
+    print("\n🎉 All two-tier cache tests passed!")